@@ -0,0 +1,141 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from .database import SessionLocal
+from .services.job_queue_service import JobQueueService, job_available
+from .services.backup_service import BackupService
+from .services.strategy_service import StrategyService
+from .services.config_manager import ConfigManager
+import logging
+
+logger = logging.getLogger(__name__)
+
+class BackupJobWorker:
+    """备份任务工作池：从持久化队列领取任务并执行"""
+
+    POLL_INTERVAL = 5  # 没有唤醒信号时的轮询间隔（秒）
+    HEARTBEAT_INTERVAL = 30  # 执行中任务的心跳间隔（秒）
+
+    def __init__(self):
+        self.running = False
+        self.threads = []
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._active_jobs = set()
+        self._active_lock = threading.Lock()
+
+    def start(self):
+        """启动工作线程"""
+        if self.running:
+            logger.info("备份任务工作池已在运行中")
+            return
+
+        self.running = True
+        concurrency = max(1, int(ConfigManager.get_config('backup', 'max_concurrent_jobs', 4)))
+        for index in range(concurrency):
+            thread = threading.Thread(target=self._run_worker, name=f"backup-worker-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+        heartbeat = threading.Thread(target=self._run_heartbeat, name="backup-worker-heartbeat", daemon=True)
+        heartbeat.start()
+        self.threads.append(heartbeat)
+        logger.info(f"备份任务工作池已启动，并发数: {concurrency}")
+
+    def stop(self):
+        """停止工作线程"""
+        self.running = False
+        job_available.set()
+        for thread in self.threads:
+            thread.join(timeout=5)
+        self.threads = []
+        logger.info("备份任务工作池已停止")
+
+    def _run_worker(self):
+        """工作线程主循环"""
+        while self.running:
+            try:
+                if not self._process_next_job():
+                    job_available.wait(self.POLL_INTERVAL)
+                    job_available.clear()
+            except Exception as e:
+                logger.error(f"备份任务工作线程错误: {str(e)}")
+                time.sleep(self.POLL_INTERVAL)
+
+    def _process_next_job(self) -> bool:
+        """领取并执行一个任务，队列为空时返回False"""
+        db = SessionLocal()
+        try:
+            job = JobQueueService.claim_next(db, self.worker_id)
+            if not job:
+                return False
+
+            with self._active_lock:
+                self._active_jobs.add(job.id)
+            try:
+                self._execute_job(db, job)
+            finally:
+                with self._active_lock:
+                    self._active_jobs.discard(job.id)
+            return True
+        finally:
+            db.close()
+
+    def _execute_job(self, db, job):
+        """执行单个备份任务"""
+        logger.info(f"开始执行备份任务 {job.id}: 设备={job.device_id}, 类型={job.backup_type}, 来源={job.source}")
+        try:
+            result = BackupService.execute_backup(db, job.device_id, job.backup_type)
+        except Exception as e:
+            logger.error(f"备份任务 {job.id} 执行异常: {str(e)}")
+            db.rollback()
+            result = {"success": False, "message": f"备份执行失败: {str(e)}"}
+
+        BackupJobWorker.finalize_job(db, job, result)
+        logger.info(f"备份任务 {job.id} 完成: {result.get('message')}")
+
+    @staticmethod
+    def finalize_job(db, job, result: dict, now=None):
+        """记录任务结果，成功的策略任务同时推进策略的下次执行时间"""
+        if result.get("success") and job.advance_strategy and job.strategy_id:
+            try:
+                StrategyService.mark_strategy_executed(db, job.strategy_id, now=now)
+            except Exception as e:
+                logger.error(f"更新策略 {job.strategy_id} 执行状态失败: {str(e)}")
+                db.rollback()
+
+        return JobQueueService.complete_job(db, job.id, result, now=now)
+
+    def _run_heartbeat(self):
+        """刷新本进程执行中任务的心跳，并回收其他崩溃进程遗留的任务"""
+        stale_seconds = self.HEARTBEAT_INTERVAL * 4
+        while self.running:
+            db = SessionLocal()
+            try:
+                with self._active_lock:
+                    active = list(self._active_jobs)
+                JobQueueService.heartbeat(db, active)
+                JobQueueService.requeue_stale_jobs(db, stale_seconds)
+            except Exception as e:
+                logger.error(f"备份任务心跳失败: {str(e)}")
+            finally:
+                db.close()
+
+            # 分段休眠，以便及时响应停止
+            for _ in range(self.HEARTBEAT_INTERVAL):
+                if not self.running:
+                    break
+                time.sleep(1)
+
+
+# 全局工作池实例
+job_worker = BackupJobWorker()
+
+def start_job_worker():
+    """启动备份任务工作池"""
+    job_worker.start()
+
+def stop_job_worker():
+    """停止备份任务工作池"""
+    job_worker.stop()
@@ -0,0 +1,170 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_, select
+from sqlalchemy.exc import IntegrityError
+from .database import SessionLocal
+from .models import SchedulerLease
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LeaderElection:
+    """基于数据库租约行的主节点选举
+
+    多个进程竞争同一行租约，只有持有未过期租约的进程是主节点。
+    主节点按 ttl/3 的间隔续约；主节点退出或失联后，租约过期即由其他进程接管。
+    租约时间以数据库服务器的时钟为准，各节点的本机时钟不一致时也不会同时成为主节点。
+    """
+
+    def __init__(self, name: str, ttl: int = 90, session_factory=SessionLocal):
+        self.name = name
+        self.ttl = ttl
+        self.session_factory = session_factory
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.running = False
+        self.thread = None
+        self._is_leader = False
+        self._lease_deadline = None
+
+    @property
+    def is_leader(self) -> bool:
+        """当前进程是否持有有效租约"""
+        # 续约失败时本地租约到期也要主动让出，避免与新主节点同时调度
+        if self._is_leader and self._lease_deadline and time.monotonic() >= self._lease_deadline:
+            logger.warning(f"租约 {self.name} 未能及时续约，放弃主节点身份")
+            self._is_leader = False
+        return self._is_leader
+
+    def start(self):
+        """启动选举心跳线程"""
+        if self.running:
+            return
+        self.running = True
+        self.try_acquire()
+        self.thread = threading.Thread(target=self._run_heartbeat, name=f"leader-{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """停止心跳并释放租约，以便其他进程尽快接管"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=5)
+        self.release()
+
+    def try_acquire(self) -> bool:
+        """获取或续约租约，返回当前是否为主节点"""
+        db = self.session_factory()
+        try:
+            # 本地截止时间从发起续约前开始计算，确保不晚于数据库中的过期时间
+            deadline = time.monotonic() + self.ttl
+            now = self._database_now(db)
+            expires_at = now + timedelta(seconds=self.ttl)
+
+            # 自己持有的租约直接续约；他人租约已过期则接管
+            updated = db.query(SchedulerLease).filter(
+                SchedulerLease.name == self.name,
+                or_(SchedulerLease.holder == self.holder_id, SchedulerLease.expires_at < now)
+            ).update({
+                SchedulerLease.holder: self.holder_id,
+                SchedulerLease.renewed_at: now,
+                SchedulerLease.expires_at: expires_at
+            }, synchronize_session=False)
+            db.commit()
+
+            if not updated:
+                # 租约行不存在时尝试创建，并发创建时只有一个进程成功
+                exists = db.query(SchedulerLease.name).filter(SchedulerLease.name == self.name).first()
+                if not exists:
+                    db.add(SchedulerLease(
+                        name=self.name,
+                        holder=self.holder_id,
+                        acquired_at=now,
+                        renewed_at=now,
+                        expires_at=expires_at
+                    ))
+                    try:
+                        db.commit()
+                        updated = 1
+                    except IntegrityError:
+                        db.rollback()
+
+            was_leader = self._is_leader
+            self._is_leader = bool(updated)
+            self._lease_deadline = deadline if updated else None
+
+            if self._is_leader and not was_leader:
+                db.query(SchedulerLease).filter(
+                    SchedulerLease.name == self.name,
+                    SchedulerLease.holder == self.holder_id
+                ).update({SchedulerLease.acquired_at: now}, synchronize_session=False)
+                db.commit()
+                logger.info(f"进程 {self.holder_id} 成为 {self.name} 主节点")
+            elif was_leader and not self._is_leader:
+                logger.warning(f"进程 {self.holder_id} 失去 {self.name} 主节点身份")
+
+            return self._is_leader
+        except Exception as e:
+            db.rollback()
+            logger.error(f"租约 {self.name} 续约失败: {str(e)}")
+            return self.is_leader
+        finally:
+            db.close()
+
+    def release(self):
+        """主动释放租约"""
+        if not self._is_leader:
+            return
+        db = self.session_factory()
+        try:
+            db.query(SchedulerLease).filter(
+                SchedulerLease.name == self.name,
+                SchedulerLease.holder == self.holder_id
+            ).update({SchedulerLease.expires_at: self._database_now(db)}, synchronize_session=False)
+            db.commit()
+            logger.info(f"进程 {self.holder_id} 已释放 {self.name} 租约")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"释放租约 {self.name} 失败: {str(e)}")
+        finally:
+            self._is_leader = False
+            self._lease_deadline = None
+            db.close()
+
+    @staticmethod
+    def _database_now(db) -> datetime:
+        """获取数据库服务器的当前时间"""
+        if db.get_bind().dialect.name == "sqlite":
+            # SQLite 数据库文件只能由同一主机上的进程共享，本机时钟即数据库时钟
+            return datetime.now()
+        return db.execute(select(func.localtimestamp())).scalar()
+
+    def get_status(self) -> dict:
+        """获取选举状态"""
+        db = self.session_factory()
+        try:
+            lease = db.query(SchedulerLease).filter(SchedulerLease.name == self.name).first()
+            return {
+                "name": self.name,
+                "holder_id": self.holder_id,
+                "is_leader": self.is_leader,
+                "ttl": self.ttl,
+                "current_holder": lease.holder if lease else None,
+                "acquired_at": lease.acquired_at.isoformat() if lease and lease.acquired_at else None,
+                "expires_at": lease.expires_at.isoformat() if lease and lease.expires_at else None
+            }
+        finally:
+            db.close()
+
+    def _run_heartbeat(self):
+        """心跳循环"""
+        interval = max(1, self.ttl // 3)
+        while self.running:
+            for _ in range(interval):
+                if not self.running:
+                    return
+                time.sleep(1)
+            self.try_acquire()
@@ -1,12 +1,19 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
 import time
 
-from .database import init_db
-from .routers import devices, backups, strategies, configs, analysis
-from .scheduler import start_scheduler, stop_scheduler
+from .database import init_db, get_database_status, close_async_engine
+from .pagination import InvalidCursorError, NEXT_CURSOR_HEADER
+from .responses import DefaultJSONResponse
+from .routers import devices, backups, strategies, configs, analysis, jobs, dashboard
+from .scheduler import scheduler, start_scheduler, stop_scheduler
+from .job_worker import start_job_worker, stop_job_worker
+from .services.file_deleter import stop_file_deleter
+from .services.http_client import close_http_clients
+from .services.analysis_jobs import recover_analysis_jobs, stop_analysis_jobs
 
 # 记录应用启动时间
 app_start_time = None
@@ -15,7 +22,9 @@ app_start_time = None
 app = FastAPI(
     title="XConfKit API",
     description="网络设备配置备份管理系统",
-    version="1.0.0"
+    version="1.0.0",
+    # 默认使用 orjson 序列化响应（未安装时为标准库 json）
+    default_response_class=DefaultJSONResponse
 )
 
 # 配置CORS
@@ -25,14 +34,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],  # 允许前端读取分页游标
 )
 
+@app.exception_handler(InvalidCursorError)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursorError):
+    """分页游标无效时返回400"""
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
 # 注册路由
 app.include_router(devices.router)
 app.include_router(backups.router)
 app.include_router(strategies.router)
 app.include_router(configs.router)
 app.include_router(analysis.router)
+app.include_router(jobs.router)
+app.include_router(dashboard.router)
 
 # 挂载静态文件（备份文件）
 if os.path.exists("./data/backups"):
@@ -45,8 +62,11 @@ async def startup_event():
     app_start_time = time.time()  # 记录启动时间
     
     init_db()
+    recover_analysis_jobs()  # 处理上次运行中断的分析任务
+    start_job_worker()  # 启动备份任务工作池
     start_scheduler()  # 启动备份策略调度器
     print("XConfKit 后端服务已启动")
+    print("备份任务工作池已启动")
     print("备份策略调度器已启动")
     print("API文档地址: http://localhost:8000/docs")
 
@@ -85,11 +105,30 @@ async def get_system_uptime():
         "current_time": current_time
     }
 
+@app.get("/api/system/scheduler")
+async def get_scheduler_status():
+    """获取调度器主节点选举状态"""
+    if scheduler.election is None:
+        return {"running": False}
+    
+    return {"running": scheduler.running, **scheduler.election.get_status()}
+
+@app.get("/api/system/database")
+def get_database_info():
+    """获取数据库引擎配置档和连接池状态"""
+    return get_database_status()
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭时停止调度器"""
     stop_scheduler()
+    stop_job_worker()
+    stop_file_deleter()  # 删除剩余的待删除备份文件
+    await stop_analysis_jobs()  # 取消执行中的分析任务
+    await close_async_engine()
+    await close_http_clients()  # 关闭AI接口的共享连接
     print("备份策略调度器已停止")
+    print("备份任务工作池已停止")
 
 if __name__ == "__main__":
     import uvicorn
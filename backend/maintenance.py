@@ -0,0 +1,173 @@
+"""
+数据库维护 - 数据保护和恢复脚本共用的数据库操作
+
+维护脚本通过 SQLAlchemy 访问 DATABASE_URL 指向的数据库，SQLite 和 PostgreSQL 使用同一套
+检查、快照和恢复逻辑：
+- SQLite 快照使用在线备份接口复制为 xconfkit.db（包含WAL中尚未检查点的数据）；
+- 其他数据库导出为 xconfkit.jsonl（每行一条记录），恢复时按外键依赖顺序写回并校正自增序列。
+"""
+
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import Date, DateTime, Integer, func, inspect, select, table, text
+from sqlalchemy.engine import Connection
+from .database import engine, sqlite_database_path
+from . import models
+import json
+import os
+import sqlite3
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 数据完整性检查的关键表
+REQUIRED_TABLES = ['devices', 'backups', 'strategies', 'configs', 'ai_configs', 'analysis_prompts']
+
+SQLITE_SNAPSHOT_FILE = "xconfkit.db"
+EXPORT_SNAPSHOT_FILE = "xconfkit.jsonl"
+
+# 导入记录时每批写入的行数
+IMPORT_BATCH_SIZE = 1000
+
+def get_missing_tables(tables: Iterable[str] = REQUIRED_TABLES) -> List[str]:
+    """返回数据库中不存在的表"""
+    inspector = inspect(engine)
+    return [name for name in tables if not inspector.has_table(name)]
+
+def count_rows(tables: Iterable[str] = REQUIRED_TABLES) -> Dict[str, int]:
+    """统计各表的记录数"""
+    counts = {}
+    with engine.connect() as connection:
+        for name in tables:
+            counts[name] = connection.execute(select(func.count()).select_from(table(name))).scalar()
+    return counts
+
+def find_snapshot(directory: str) -> Optional[str]:
+    """查找目录中的数据库快照文件"""
+    for filename in (SQLITE_SNAPSHOT_FILE, EXPORT_SNAPSHOT_FILE):
+        path = os.path.join(directory, filename)
+        if os.path.exists(path):
+            return path
+    return None
+
+def snapshot_database(target_dir: str) -> str:
+    """把当前数据库保存到 target_dir，返回快照文件路径"""
+    os.makedirs(target_dir, exist_ok=True)
+    if sqlite_database_path():
+        path = os.path.join(target_dir, SQLITE_SNAPSHOT_FILE)
+        _sqlite_backup_to_file(path)
+    else:
+        path = os.path.join(target_dir, EXPORT_SNAPSHOT_FILE)
+        _export_rows(path)
+    return path
+
+def restore_database(snapshot_path: str):
+    """用快照覆盖当前数据库"""
+    if snapshot_path.endswith(".jsonl"):
+        _import_rows(snapshot_path)
+        return
+
+    if not sqlite_database_path():
+        raise ValueError(f"SQLite 快照文件只能恢复到 SQLite 数据库: {snapshot_path}")
+    _sqlite_restore_from_file(snapshot_path)
+
+def reset_sequences(connection: Connection, tables: Optional[Iterable] = None):
+    """显式写入主键后校正 PostgreSQL 的自增序列（其他数据库无需处理）"""
+    if connection.dialect.name != "postgresql":
+        return
+    for model_table in tables or models.Base.metadata.sorted_tables:
+        primary_keys = list(model_table.primary_key.columns)
+        if len(primary_keys) != 1 or not isinstance(primary_keys[0].type, Integer):
+            continue
+        column = primary_keys[0].name
+        connection.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence(:table_name, :column), "
+                f"COALESCE(MAX({column}), 0) + 1, false) FROM {model_table.name}"
+            ),
+            {"table_name": model_table.name, "column": column}
+        )
+
+def _sqlite_backup_to_file(path: str):
+    """使用SQLite在线备份接口把数据库复制到文件"""
+    raw_connection = engine.raw_connection()
+    target = sqlite3.connect(path)
+    try:
+        raw_connection.driver_connection.backup(target)
+    finally:
+        target.close()
+        raw_connection.close()
+
+def _sqlite_restore_from_file(path: str):
+    """使用SQLite在线备份接口从文件恢复数据库（通过SQLite写入，避免残留的WAL文件与新数据库不一致）"""
+    source = sqlite3.connect(path)
+    raw_connection = engine.raw_connection()
+    try:
+        source.backup(raw_connection.driver_connection)
+    finally:
+        raw_connection.close()
+        source.close()
+    # 连接池中的连接可能缓存了旧的表结构
+    engine.dispose()
+
+def _existing_tables() -> List:
+    """数据库中已存在的模型表（按外键依赖排序）"""
+    inspector = inspect(engine)
+    return [model_table for model_table in models.Base.metadata.sorted_tables if inspector.has_table(model_table.name)]
+
+def _encode_value(value):
+    """JSON 不支持的类型转换为字符串"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"无法导出的数据类型: {type(value).__name__}")
+
+def _decode_row(model_table, row: Dict) -> Dict:
+    """把导出的字符串还原为日期时间"""
+    decoded = {}
+    for name, value in row.items():
+        if name not in model_table.c:
+            continue
+        column_type = model_table.c[name].type
+        if value is not None and isinstance(column_type, DateTime):
+            value = datetime.fromisoformat(value)
+        elif value is not None and isinstance(column_type, Date):
+            value = date.fromisoformat(value)
+        decoded[name] = value
+    return decoded
+
+def _export_rows(path: str):
+    """把所有模型表的记录导出为 JSON Lines"""
+    with engine.connect() as connection, open(path, "w", encoding="utf-8") as f:
+        for model_table in _existing_tables():
+            result = connection.execution_options(yield_per=IMPORT_BATCH_SIZE).execute(model_table.select())
+            for row in result.mappings():
+                f.write(json.dumps(
+                    {"table": model_table.name, "row": dict(row)},
+                    ensure_ascii=False, default=_encode_value
+                ))
+                f.write("\n")
+
+def _import_rows(path: str):
+    """清空模型表后写入 JSON Lines 快照中的记录（单个事务）"""
+    tables = _existing_tables()
+    by_name = {model_table.name: model_table for model_table in tables}
+    rows: Dict[str, List[Dict]] = {name: [] for name in by_name}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            model_table = by_name.get(record["table"])
+            if model_table is None:
+                logger.warning(f"快照中的表在当前数据库中不存在，已跳过: {record['table']}")
+                continue
+            rows[model_table.name].append(_decode_row(model_table, record["row"]))
+
+    with engine.begin() as connection:
+        for model_table in reversed(tables):
+            connection.execute(model_table.delete())
+        for model_table in tables:
+            table_rows = rows[model_table.name]
+            for start in range(0, len(table_rows), IMPORT_BATCH_SIZE):
+                connection.execute(model_table.insert(), table_rows[start:start + IMPORT_BATCH_SIZE])
+        reset_sequences(connection, tables)
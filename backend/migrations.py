@@ -0,0 +1,149 @@
+"""
+数据库迁移 - 为已有数据库补齐新增的索引和字段
+
+新建数据库由 create_all 直接按模型建表（包含索引），已有数据库的表不会被 create_all 修改，
+因此模型中新增的索引和字段需要在这里登记为迁移。已执行的版本记录在 schema_migrations 表中，
+启动时只执行尚未执行的迁移；每个迁移都应可重复执行（建索引前检查是否已存在）。
+"""
+
+from datetime import datetime
+from typing import Callable, List, Tuple
+from sqlalchemy import func, inspect, select
+from sqlalchemy.schema import CreateColumn, CreateTable
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from .database import Base
+from .models import Backup, BackupArchive, BackupStat, SchemaMigration
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _create_indexes(connection: Connection, table_name: str, index_names: List[str]):
+    """按模型中声明的索引定义创建索引（已存在则跳过）"""
+    table = Base.metadata.tables[table_name]
+    indexes = {index.name: index for index in table.indexes}
+    for name in index_names:
+        indexes[name].create(bind=connection, checkfirst=True)
+
+def _add_columns(connection: Connection, table_name: str, column_names: List[str]):
+    """按模型中声明的字段定义添加字段（已存在则跳过）"""
+    table = Base.metadata.tables[table_name]
+    existing = {column['name'] for column in inspect(connection).get_columns(table_name)}
+    for name in column_names:
+        if name not in existing:
+            column_ddl = CreateColumn(table.columns[name]).compile(dialect=connection.dialect)
+            connection.exec_driver_sql(f"ALTER TABLE {table_name} ADD COLUMN {column_ddl}")
+
+def _migration_query_indexes(connection: Connection):
+    """常用查询的复合索引：备份列表、设备最近备份、到期策略、分析历史"""
+    _create_indexes(connection, 'backups', [
+        'ix_backups_created_at',
+        'ix_backups_device_created',
+        'ix_backups_device_status_created',
+    ])
+    _create_indexes(connection, 'strategies', ['ix_strategies_active_next'])
+    _create_indexes(connection, 'analysis_records', [
+        'ix_analysis_records_created_at',
+        'ix_analysis_records_backup_id',
+    ])
+
+def _migration_pagination_indexes(connection: Connection):
+    """设备和策略列表游标分页使用的索引"""
+    _create_indexes(connection, 'devices', ['ix_devices_created_at'])
+    _create_indexes(connection, 'strategies', ['ix_strategies_created_at'])
+
+def _migration_backup_stats(connection: Connection):
+    """根据已有备份记录初始化备份统计表"""
+    from sqlalchemy.orm import Session
+    from .services.stats_service import StatsService
+    BackupStat.__table__.create(bind=connection, checkfirst=True)
+    session = Session(bind=connection)
+    try:
+        StatsService.rebuild(session)
+    finally:
+        session.close()
+
+def _migration_incremental_analysis(connection: Connection):
+    """增量分析：分析记录的基准记录字段和查找设备最近分析的索引"""
+    _add_columns(connection, 'analysis_records', ['baseline_record_id'])
+    _create_indexes(connection, 'analysis_records', ['ix_analysis_records_device_status_created'])
+
+def _migration_backup_autoincrement(connection: Connection):
+    """SQLite 的 backups 表改为 AUTOINCREMENT，新备份的ID不再复用已归档或已删除的备份ID
+
+    SQLite 不能修改已有表的主键，按当前模型重建 backups 表并复制数据，ID序列从热表和归档表中
+    最大的ID开始（删除旧表要求连接未启用 SQLite 外键检查，见 database.SQLITE_PRAGMAS）。
+    PostgreSQL 使用序列，ID不会复用，不需要迁移。
+    """
+    if connection.dialect.name != 'sqlite':
+        return
+    table_sql = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'backups'"
+    ).scalar()
+    if table_sql is None or 'AUTOINCREMENT' in table_sql.upper():
+        return
+
+    table = Backup.__table__
+    columns = ", ".join(column.name for column in table.columns)
+    create_sql = str(CreateTable(table).compile(dialect=connection.dialect))
+    # 先建新表再删除旧表（重命名旧表会同时修改其他表中引用 backups 的外键定义）
+    connection.exec_driver_sql(create_sql.replace("CREATE TABLE backups ", "CREATE TABLE backups_rebuild ", 1))
+    connection.exec_driver_sql(f"INSERT INTO backups_rebuild ({columns}) SELECT {columns} FROM backups")
+    connection.exec_driver_sql("DROP TABLE backups")
+    connection.exec_driver_sql("ALTER TABLE backups_rebuild RENAME TO backups")
+    for index in table.indexes:
+        index.create(bind=connection, checkfirst=True)
+
+    max_id = max(
+        connection.execute(select(func.max(table.c.id))).scalar() or 0,
+        connection.execute(select(func.max(BackupArchive.__table__.c.id))).scalar() or 0
+    )
+    connection.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'backups'")
+    connection.exec_driver_sql(f"INSERT INTO sqlite_sequence (name, seq) VALUES ('backups', {int(max_id)})")
+
+def _migration_backup_stat_totals(connection: Connection):
+    """备份统计增加累计行：按新的统计方式重建"""
+    _migration_backup_stats(connection)
+
+# (版本号, 说明, 迁移函数)，版本号只增不改
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "常用查询复合索引", _migration_query_indexes),
+    (2, "列表游标分页索引", _migration_pagination_indexes),
+    (3, "初始化备份统计", _migration_backup_stats),
+    (4, "增量分析基准记录", _migration_incremental_analysis),
+    (5, "备份ID不复用", _migration_backup_autoincrement),
+    (6, "备份统计累计行", _migration_backup_stat_totals),
+]
+
+def get_applied_versions(engine: Engine) -> set:
+    """获取已执行的迁移版本"""
+    if not inspect(engine).has_table(SchemaMigration.__tablename__):
+        return set()
+    with engine.connect() as connection:
+        rows = connection.execute(SchemaMigration.__table__.select()).fetchall()
+    return {row.version for row in rows}
+
+def run_migrations(engine: Engine) -> List[int]:
+    """执行尚未执行的迁移，返回本次执行的版本号"""
+    SchemaMigration.__table__.create(bind=engine, checkfirst=True)
+    applied = get_applied_versions(engine)
+
+    executed = []
+    for version, description, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        logger.info(f"执行数据库迁移 {version}: {description}")
+        try:
+            with engine.begin() as connection:
+                migrate(connection)
+                connection.execute(SchemaMigration.__table__.insert().values(
+                    version=version,
+                    description=description,
+                    applied_at=datetime.now()
+                ))
+        except IntegrityError:
+            # 其他进程已同时执行了该迁移
+            logger.info(f"数据库迁移 {version} 已由其他进程执行")
+            continue
+        executed.append(version)
+    return executed
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, JSON, Float
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Boolean, Text, ForeignKey, JSON, Float, Index, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -26,6 +26,11 @@ class Device(Base):
     
     backups = relationship("Backup", back_populates="device")
     strategies = relationship("Strategy", back_populates="device")
+    
+    __table_args__ = (
+        # 设备列表游标分页: ORDER BY created_at, id
+        Index('ix_devices_created_at', 'created_at'),
+    )
 
 class Backup(Base):
     __tablename__ = 'backups'
@@ -41,6 +46,49 @@ class Backup(Base):
     
     device = relationship("Device", back_populates="backups")
     analysis_records = relationship("AnalysisRecord", back_populates="backup")
+    
+    __table_args__ = (
+        # 备份列表: ORDER BY created_at DESC
+        Index('ix_backups_created_at', 'created_at'),
+        # 设备备份列表: WHERE device_id=? ORDER BY created_at DESC
+        Index('ix_backups_device_created', 'device_id', 'created_at'),
+        # 设备最近成功备份: WHERE device_id=? AND status='success' ORDER BY created_at DESC
+        Index('ix_backups_device_status_created', 'device_id', 'status', 'created_at'),
+        # 备份归档后保留原ID，SQLite 需要 AUTOINCREMENT 才不会把已删除的最大ID分配给新备份
+        {'sqlite_autoincrement': True},
+    )
+
+class BackupArchive(Base):
+    """超过归档期限的备份记录（冷数据），字段与 backups 相同并保留原备份ID"""
+    __tablename__ = 'backups_archive'
+    
+    id = Column(Integer, primary_key=True, autoincrement=False, comment="原备份ID")
+    # 不设外键：设备删除时与 backups 一样置空，归档记录保留
+    device_id = Column(Integer)
+    backup_type = Column(String(50), nullable=False)
+    status = Column(String(20), default="pending")
+    file_path = Column(String(255))
+    file_size = Column(Integer, default=0)
+    content = Column(Text)
+    created_at = Column(DateTime, default=datetime.now)
+    archived_at = Column(DateTime, default=datetime.now, comment="归档时间")
+    
+    device = relationship(
+        "Device",
+        primaryjoin="BackupArchive.device_id == Device.id",
+        foreign_keys="BackupArchive.device_id",
+        viewonly=True
+    )
+    
+    # 接口返回时标记为归档记录
+    archived = True
+    
+    __table_args__ = (
+        # 历史列表: ORDER BY created_at DESC；保留期清理: WHERE created_at < ?
+        Index('ix_backups_archive_created_at', 'created_at'),
+        # 设备历史: WHERE device_id=? ORDER BY created_at DESC
+        Index('ix_backups_archive_device_created', 'device_id', 'created_at'),
+    )
 
 class Strategy(Base):
     __tablename__ = 'strategies'
@@ -69,6 +117,13 @@ class Strategy(Base):
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     
     device = relationship("Device", back_populates="strategies")
+    
+    __table_args__ = (
+        # 调度器到期检查: WHERE is_active=1 AND next_execution<=?
+        Index('ix_strategies_active_next', 'is_active', 'next_execution'),
+        # 策略列表游标分页: ORDER BY created_at, id
+        Index('ix_strategies_created_at', 'created_at'),
+    )
 
 class Config(Base):
     __tablename__ = 'configs'
@@ -122,7 +177,101 @@ class AnalysisRecord(Base):
     result = Column(JSON)  # 存储分析结果
     error_message = Column(Text)
     processing_time = Column(Integer)  # 处理时间（秒）
+    baseline_record_id = Column(Integer, nullable=True)  # 增量分析的基准记录ID（删除基准记录时置空）
     created_at = Column(DateTime, default=datetime.now)
     
     device = relationship("Device")
     backup = relationship("Backup", back_populates="analysis_records")
+    
+    __table_args__ = (
+        # 分析历史: ORDER BY created_at DESC
+        Index('ix_analysis_records_created_at', 'created_at'),
+        # 按备份查找/清理分析记录
+        Index('ix_analysis_records_backup_id', 'backup_id'),
+        # 增量分析查找设备最近一次成功的分析: WHERE device_id = ? AND status = 'success' ORDER BY created_at DESC
+        Index('ix_analysis_records_device_status_created', 'device_id', 'status', 'created_at'),
+    )
+
+class AnalysisCacheEntry(Base):
+    __tablename__ = 'analysis_cache'
+    
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), nullable=False, unique=True, comment="配置内容、提示词和模型参数的SHA-256")
+    dimension = Column(String(50))
+    model = Column(String(100))
+    content = Column(Text, nullable=False, comment="AI分析结果")
+    hit_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.now)
+    last_hit_at = Column(DateTime, default=datetime.now, comment="最近一次写入或命中的时间，用于淘汰")
+    expires_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        # 清理过期缓存
+        Index('ix_analysis_cache_expires_at', 'expires_at'),
+        # 超出容量时淘汰最久未使用的缓存
+        Index('ix_analysis_cache_last_hit_at', 'last_hit_at'),
+    )
+
+class BackupJob(Base):
+    __tablename__ = 'backup_jobs'
+    
+    id = Column(Integer, primary_key=True, index=True)
+    device_id = Column(Integer, ForeignKey('devices.id'), nullable=False)
+    backup_type = Column(String(50), nullable=False)
+    priority = Column(Integer, default=0, comment="优先级，数值越大越先执行")
+    source = Column(String(20), default="manual", comment="任务来源(manual/quick/strategy/scheduled/auto)")
+    strategy_id = Column(Integer, ForeignKey('strategies.id'))
+    advance_strategy = Column(Boolean, default=False, comment="成功后是否推进策略的下次执行时间")
+    status = Column(String(20), default="queued")  # queued, running, success, failed
+    backup_id = Column(Integer, ForeignKey('backups.id'))
+    message = Column(Text)
+    worker_id = Column(String(100), comment="执行该任务的工作进程")
+    created_at = Column(DateTime, default=datetime.now)
+    started_at = Column(DateTime)
+    heartbeat_at = Column(DateTime, comment="执行中任务的最近心跳时间")
+    finished_at = Column(DateTime)
+    
+    device = relationship("Device")
+    
+    __table_args__ = (
+        # 领取任务: WHERE status='queued' ORDER BY priority DESC, id
+        Index('ix_backup_jobs_status_priority', 'status', 'priority', 'id'),
+        # 同一设备同一备份类型只允许存在一个排队中/执行中的任务
+        Index(
+            'uq_backup_jobs_active', 'device_id', 'backup_type', unique=True,
+            sqlite_where=text("status IN ('queued', 'running')"),
+            postgresql_where=text("status IN ('queued', 'running')")
+        ),
+    )
+
+class SchedulerLease(Base):
+    __tablename__ = 'scheduler_leases'
+    
+    name = Column(String(50), primary_key=True, comment="租约名称")
+    holder = Column(String(100), nullable=False, comment="当前持有者（主机:进程:随机标识）")
+    acquired_at = Column(DateTime, default=datetime.now)
+    renewed_at = Column(DateTime, default=datetime.now)
+    expires_at = Column(DateTime, nullable=False)
+
+class BackupStat(Base):
+    __tablename__ = 'backup_stats'
+    
+    id = Column(Integer, primary_key=True, index=True)
+    device_id = Column(Integer, nullable=False, comment="设备ID，0表示全部设备的合计")
+    day = Column(Date, nullable=False, comment="备份创建日期")
+    status = Column(String(20), nullable=False)
+    backup_count = Column(Integer, nullable=False, default=0)
+    total_bytes = Column(BigInteger, nullable=False, default=0, comment="备份文件字节数")
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    __table_args__ = (
+        # 同时用于按设备（或全部设备）和日期范围汇总
+        UniqueConstraint('device_id', 'day', 'status', name='uq_backup_stats_device_day_status'),
+    )
+
+class SchemaMigration(Base):
+    __tablename__ = 'schema_migrations'
+    
+    version = Column(Integer, primary_key=True, comment="迁移版本号")
+    description = Column(String(200), comment="迁移说明")
+    applied_at = Column(DateTime, default=datetime.now)
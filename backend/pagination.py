@@ -0,0 +1,115 @@
+"""
+游标分页 - 基于 (created_at, id) 的键集分页
+
+列表按 (created_at, id) 排序，下一页从上一页最后一条记录之后开始查询（WHERE 条件定位），
+不使用 OFFSET，因此任意深度的分页都只扫描一页的索引范围。
+游标是对最后一条记录排序键的不透明编码，通过响应头 X-Next-Cursor 返回，
+列表接口的响应体保持不变。
+created_at 为空的记录无法参与键集比较，不出现在分页结果中（模型默认写入创建时间，只有直接写库的记录可能为空）。
+"""
+
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+from sqlalchemy import and_, or_
+import base64
+import json
+
+# 返回下一页游标的响应头
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+class InvalidCursorError(ValueError):
+    """游标无法解析"""
+
+def encode_cursor(created_at: datetime, record_id: int) -> str:
+    """将排序键编码为游标"""
+    payload = json.dumps({"c": created_at.isoformat(), "i": record_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """解析游标，返回 (created_at, id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return datetime.fromisoformat(payload["c"]), int(payload["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError(f"无效的分页游标: {cursor}") from e
+
+def paginate(
+    query,
+    created_column,
+    id_column,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    descending: bool = True,
+    skip: int = 0,
+    key_func: Optional[Callable[[Any], Tuple[datetime, int]]] = None
+) -> Tuple[List, Optional[str]]:
+    """按 (created_at, id) 分页查询，返回 (当前页记录, 下一页游标)
+
+    没有下一页时游标为 None。skip 仅用于兼容旧的 offset 分页，传入游标时忽略。
+    key_func 用于从查询结果行中取出排序键，默认直接读取行上的同名属性。
+    """
+    query = query.filter(created_column.isnot(None))
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        if descending:
+            query = query.filter(or_(
+                created_column < created_at,
+                and_(created_column == created_at, id_column < last_id)
+            ))
+        else:
+            query = query.filter(or_(
+                created_column > created_at,
+                and_(created_column == created_at, id_column > last_id)
+            ))
+
+    if descending:
+        query = query.order_by(created_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(created_column.asc(), id_column.asc())
+    if skip and not cursor:
+        query = query.offset(skip)
+
+    # 多取一条判断是否还有下一页
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    if key_func is None:
+        key_func = lambda row: (getattr(row, created_column.key), getattr(row, id_column.key))
+    return rows, encode_cursor(*key_func(rows[-1]))
+
+def paginate_union(
+    sources: List[Tuple[Any, Any, Any]],
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    descending: bool = True,
+    skip: int = 0
+) -> Tuple[List, Optional[str]]:
+    """合并多个查询（如热表和归档表）按 (created_at, id) 分页，返回 (当前页记录, 下一页游标)
+
+    sources 为 [(查询, created_at 列, id 列), ...]，各查询的 ID 不能重复。同一个游标分别定位每个查询，
+    每个查询最多取 skip+limit 条后合并排序，结果与对合并后的整表分页相同。
+    """
+    if cursor:
+        skip = 0
+    fetch = skip + limit
+
+    keyed_rows = []
+    has_more = False
+    for query, created_column, id_column in sources:
+        rows, next_cursor = paginate(
+            query, created_column, id_column, cursor=cursor, limit=fetch, descending=descending
+        )
+        has_more = has_more or next_cursor is not None
+        keyed_rows.extend(
+            ((getattr(row, created_column.key), getattr(row, id_column.key)), row) for row in rows
+        )
+
+    keyed_rows.sort(key=lambda item: item[0], reverse=descending)
+    has_more = has_more or len(keyed_rows) > fetch
+    page = keyed_rows[skip:fetch]
+    if not has_more or not page:
+        return [row for _, row in page], None
+    return [row for _, row in page], encode_cursor(*page[-1][0])
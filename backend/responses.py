@@ -0,0 +1,27 @@
+"""
+JSON 响应 - 默认使用 orjson 序列化（未安装 orjson 时回退到标准库 json）
+
+列表接口返回由查询结果行直接构建的字典（只包含列表需要的字段），通过 list_response 直接序列化，
+不经过 response_model 逐行校验；路由上的 response_model 仍用于生成接口文档。
+"""
+
+from typing import Any, List, Optional
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from .pagination import NEXT_CURSOR_HEADER
+
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as DefaultJSONResponse
+    HAS_ORJSON = True
+except ImportError:
+    DefaultJSONResponse = JSONResponse
+    HAS_ORJSON = False
+
+def list_response(items: List[Any], next_cursor: Optional[str] = None):
+    """返回列表数据，下一页游标通过 X-Next-Cursor 响应头返回"""
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    if not HAS_ORJSON:
+        # 标准库 json 不支持 datetime 等类型
+        items = jsonable_encoder(items)
+    return DefaultJSONResponse(content=items, headers=headers)
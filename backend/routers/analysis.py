@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
-from ..database import get_db
+from typing import Dict, Any, Optional
+from datetime import datetime
+from ..database import get_db, get_async_db
 from ..services.analysis_service import AnalysisService
 from ..services.ai_service import ai_service_manager
+from ..services.analysis_cache import analysis_cache
+from ..services.analysis_jobs import analysis_job_manager
 from ..schemas import AnalysisRequest, AIConfigRequest
+from ..pagination import InvalidCursorError
+from ..responses import list_response
 import logging
 
 router = APIRouter(prefix="/api/analysis", tags=["AI分析"])
@@ -13,28 +19,18 @@ router = APIRouter(prefix="/api/analysis", tags=["AI分析"])
 async def analyze_config(
     request: AnalysisRequest,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db = Depends(get_async_db)
 ):
-    """分析配置"""
+    """分析配置（等待分析完成后返回结果，耗时较长时建议使用 POST /api/analysis/jobs）"""
     try:
-        # 如果请求中包含AI配置，转换为字典格式
-        ai_config_dict = None
-        if request.ai_config:
-            ai_config_dict = {
-                "provider": request.ai_config.provider,
-                "api_key": request.ai_config.api_key,
-                "model": request.ai_config.model,
-                "base_url": request.ai_config.base_url,
-                "timeout": request.ai_config.timeout,
-                "enable_cache": request.ai_config.enable_cache
-            }
-        
         result = await AnalysisService.analyze_config(
             device_id=request.device_id,
             backup_id=request.backup_id,
             dimensions=request.dimensions,  # 支持维度选择
-            ai_config=ai_config_dict,  # 传递AI配置
-            db=db
+            ai_config=_ai_config_dict(request),  # 传递AI配置
+            db=db,
+            combined=request.combined,
+            incremental=request.incremental
         )
         
         if result["success"]:
@@ -46,15 +42,84 @@ async def analyze_config(
         logging.error(f"分析配置失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"分析失败: {str(e)}")
 
+def _ai_config_dict(request: AnalysisRequest) -> Optional[Dict]:
+    """请求中包含AI配置时转换为字典格式"""
+    if not request.ai_config:
+        return None
+    return {
+        "provider": request.ai_config.provider,
+        "api_key": request.ai_config.api_key,
+        "model": request.ai_config.model,
+        "base_url": request.ai_config.base_url,
+        "timeout": request.ai_config.timeout,
+        "enable_cache": request.ai_config.enable_cache,
+        "auto_retry": request.ai_config.auto_retry
+    }
+
+@router.post("/jobs", status_code=202)
+async def submit_analysis_job(
+    request: AnalysisRequest,
+    db = Depends(get_async_db)
+):
+    """提交后台分析任务，立即返回任务ID（即分析记录ID）"""
+    result = await analysis_job_manager.submit(
+        db,
+        device_id=request.device_id,
+        backup_id=request.backup_id,
+        dimensions=request.dimensions,
+        ai_config=_ai_config_dict(request),
+        combined=request.combined,
+        incremental=request.incremental
+    )
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["message"])
+    return result
+
+@router.get("/jobs/{job_id}")
+async def get_analysis_job(job_id: int):
+    """查询分析任务的状态、进度和已完成维度的结果"""
+    job = await analysis_job_manager.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="分析任务不存在")
+    return job
+
+@router.get("/jobs/{job_id}/events")
+async def stream_analysis_job(job_id: int):
+    """以 SSE 推送分析任务进度（progress 事件），任务结束时发送 done 事件"""
+    if not await analysis_job_manager.get_job(job_id):
+        raise HTTPException(status_code=404, detail="分析任务不存在")
+    return StreamingResponse(
+        analysis_job_manager.stream(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/history")
 def get_analysis_history(
-    limit: int = 50,
+    device_id: Optional[int] = None,
+    status: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    include_result: bool = True,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
     db: Session = Depends(get_db)
 ):
-    """获取分析历史"""
+    """获取分析历史（下一页游标通过 X-Next-Cursor 响应头返回）"""
     try:
-        history = AnalysisService.get_analysis_history(db)
-        return history
+        history, next_cursor = AnalysisService.get_analysis_history_page(
+            db,
+            device_id=device_id,
+            status=status,
+            created_after=created_after,
+            created_before=created_before,
+            include_result=include_result,
+            cursor=cursor,
+            limit=limit
+        )
+        return list_response(history, next_cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取历史失败: {str(e)}")
 
@@ -89,6 +154,10 @@ def delete_analysis_record(
         if not record:
             raise HTTPException(status_code=404, detail="分析记录不存在")
         
+        # 以该记录为基准的增量分析记录不再关联基准
+        db.query(AnalysisRecord).filter(AnalysisRecord.baseline_record_id == record_id).update(
+            {AnalysisRecord.baseline_record_id: None}, synchronize_session=False
+        )
         db.delete(record)
         db.commit()
         
@@ -117,6 +186,17 @@ def delete_all_analysis_records(
         raise HTTPException(status_code=500, detail=f"删除失败: {str(e)}")
 
 # AI配置相关路由
+@router.get("/cache/stats")
+def get_analysis_cache_stats(db: Session = Depends(get_db)):
+    """获取分析结果缓存的命中统计"""
+    return analysis_cache.get_stats(db)
+
+@router.delete("/cache")
+def clear_analysis_cache(db: Session = Depends(get_db)):
+    """清空分析结果缓存"""
+    deleted = analysis_cache.clear(db)
+    return {"success": True, "message": f"已清空 {deleted} 条分析结果缓存"}
+
 @router.get("/config/ai")
 def get_ai_config(db: Session = Depends(get_db)):
     """获取AI配置"""
@@ -171,8 +251,7 @@ def save_ai_config(
 
 @router.post("/config/ai/test")
 async def test_ai_connection(
-    request: AIConfigRequest,
-    db: Session = Depends(get_db)
+    request: AIConfigRequest
 ):
     """测试AI连接"""
     try:
@@ -1,34 +1,59 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from ..database import get_db
-from ..schemas import Backup as BackupSchema, BackupCreate, BackupResponse, ResponseModel, BackupWithDevice
-from ..models import Backup
+from datetime import datetime
+from ..database import get_db, get_async_db, run_db
+from ..schemas import Backup as BackupSchema, BackupCreate, ResponseModel, BackupListItem, JobSubmitResponse
+from ..models import Device
 from ..services.backup_service import BackupService, AutoBackupService
+from ..services.archive_service import ArchiveService
+from ..services.job_queue_service import JobQueueService, PRIORITY_INTERACTIVE
+from ..responses import list_response
+from starlette.concurrency import run_in_threadpool
 import logging
 
 router = APIRouter(prefix="/api/backups", tags=["备份管理"])
 
-@router.post("/execute", response_model=BackupResponse)
+@router.post("/execute", response_model=JobSubmitResponse, status_code=202)
 def execute_backup(device_id: int, backup_type: str = "running-config", db: Session = Depends(get_db)):
-    """执行手动备份"""
-    result = BackupService.execute_backup(db, device_id, backup_type)
-    return BackupResponse(
-        success=result["success"],
-        message=result["message"],
-        backup_id=result.get("backup_id"),
-        file_path=result.get("file_path")
-    )
+    """提交手动备份任务（通过 /api/jobs/{job_id} 查询执行结果）"""
+    device = db.query(Device).filter(Device.id == device_id).first()
+    if not device:
+        raise HTTPException(status_code=404, detail="设备不存在")
+    
+    result = JobQueueService.submit(db, device_id, backup_type, priority=PRIORITY_INTERACTIVE, source="manual")
+    return JobSubmitResponse(**result)
 
-@router.get("/", response_model=List[BackupWithDevice])
-def get_backups(device_id: Optional[int] = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """获取备份记录"""
-    return BackupService.get_backups(db, device_id=device_id, skip=skip, limit=limit)
+@router.get("/", response_model=List[BackupListItem])
+def get_backups(
+    device_id: Optional[int] = None,
+    status: Optional[str] = None,
+    backup_type: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """获取备份记录，包含已归档的历史备份（下一页游标通过 X-Next-Cursor 响应头返回）"""
+    backups, next_cursor = BackupService.get_backup_list_page(
+        db,
+        device_id=device_id,
+        status=status,
+        backup_type=backup_type,
+        created_after=created_after,
+        created_before=created_before,
+        cursor=cursor,
+        skip=skip,
+        limit=limit
+    )
+    return list_response(backups, next_cursor)
 
 @router.get("/{backup_id}", response_model=BackupSchema)
 def get_backup(backup_id: int, db: Session = Depends(get_db)):
     """根据ID获取备份记录"""
-    backup = db.query(Backup).filter(Backup.id == backup_id).first()
+    backup = ArchiveService.find_backup(db, backup_id)
     if not backup:
         raise HTTPException(status_code=404, detail="备份记录不存在")
     return backup
@@ -36,7 +61,7 @@ def get_backup(backup_id: int, db: Session = Depends(get_db)):
 @router.get("/{backup_id}/content")
 def get_backup_content(backup_id: int, db: Session = Depends(get_db)):
     """获取备份文件内容（完整内容，支持滚动查看）"""
-    backup = db.query(Backup).filter(Backup.id == backup_id).first()
+    backup = ArchiveService.find_backup(db, backup_id)
     if not backup:
         raise HTTPException(status_code=404, detail="备份记录不存在")
     
@@ -68,7 +93,7 @@ def download_backup(backup_id: int, db: Session = Depends(get_db)):
     from fastapi.responses import FileResponse
     import os
     
-    backup = db.query(Backup).filter(Backup.id == backup_id).first()
+    backup = ArchiveService.find_backup(db, backup_id)
     if not backup:
         raise HTTPException(status_code=404, detail="备份记录不存在")
     
@@ -91,29 +116,12 @@ def download_backup(backup_id: int, db: Session = Depends(get_db)):
 @router.delete("/{backup_id}", response_model=ResponseModel)
 def delete_backup(backup_id: int, db: Session = Depends(get_db)):
     """删除备份记录"""
-    backup = db.query(Backup).filter(Backup.id == backup_id).first()
+    backup = ArchiveService.find_backup(db, backup_id)
     if not backup:
         raise HTTPException(status_code=404, detail="备份记录不存在")
     
-    # 保存设备ID，用于后续更新设备信息
-    device_id = backup.device_id
-    
-    # 删除备份文件
-    if backup.file_path:
-        try:
-            import os
-            if os.path.exists(backup.file_path):
-                os.remove(backup.file_path)
-        except Exception as e:
-            pass  # 忽略文件删除错误
-    
-    # 删除数据库记录
-    db.delete(backup)
-    db.commit()
-    
-    # 更新设备的最近备份信息
-    from ..services.backup_service import BackupService
-    BackupService.update_device_last_backup_info(db, device_id)
+    # 删除记录并更新设备的最近备份信息，备份文件由后台删除
+    BackupService.delete_backups(db, [backup_id])
     
     return ResponseModel(success=True, message="备份记录删除成功")
 
@@ -123,49 +131,33 @@ def batch_delete_backups(backup_ids: List[int], db: Session = Depends(get_db)):
     if not backup_ids:
         raise HTTPException(status_code=400, detail="请选择要删除的备份记录")
     
-    deleted_count = 0
-    failed_count = 0
-    affected_devices = set()  # 记录受影响的设备ID
-    
-    for backup_id in backup_ids:
-        try:
-            backup = db.query(Backup).filter(Backup.id == backup_id).first()
-            if backup:
-                # 记录受影响的设备ID
-                affected_devices.add(backup.device_id)
-                
-                # 删除备份文件
-                if backup.file_path:
-                    try:
-                        import os
-                        if os.path.exists(backup.file_path):
-                            os.remove(backup.file_path)
-                    except Exception as e:
-                        pass  # 忽略文件删除错误
-                
-                # 删除数据库记录
-                db.delete(backup)
-                deleted_count += 1
-            else:
-                failed_count += 1
-        except Exception as e:
-            failed_count += 1
-    
-    db.commit()
-    
-    # 更新受影响设备的最近备份信息
-    from ..services.backup_service import BackupService
-    for device_id in affected_devices:
-        BackupService.update_device_last_backup_info(db, device_id)
+    try:
+        result = BackupService.delete_backups(db, backup_ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"批量删除备份失败: {str(e)}")
     
-    message = f"成功删除 {deleted_count} 条备份记录"
-    if failed_count > 0:
-        message += f"，{failed_count} 条删除失败"
+    message = f"成功删除 {result['deleted']} 条备份记录"
+    if result["missing"] > 0:
+        message += f"，{result['missing']} 条删除失败"
     
-    return ResponseModel(success=True, message=message)
+    return ResponseModel(success=True, message=message, data=result)
+
+@router.get("/archive/status")
+def get_archive_status(db: Session = Depends(get_db)):
+    """获取备份归档状态"""
+    return ArchiveService.get_status(db)
+
+@router.post("/archive/run", response_model=ResponseModel)
+def run_archive(db: Session = Depends(get_db)):
+    """立即归档超过归档期限的备份"""
+    try:
+        result = ArchiveService.archive_old_backups(db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"归档备份失败: {str(e)}")
+    return ResponseModel(success=True, message=f"已归档 {result['archived']} 条备份记录", data=result)
 
 @router.post("/auto-backup/start")
-async def start_auto_backup(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def start_auto_backup(background_tasks: BackgroundTasks):
     """启动自动备份"""
     try:
         # 在后台执行自动备份
@@ -175,7 +167,7 @@ async def start_auto_backup(background_tasks: BackgroundTasks, db: Session = Dep
         raise HTTPException(status_code=500, detail=f"启动自动备份失败: {str(e)}")
 
 @router.get("/auto-backup/status")
-async def get_auto_backup_status(db: Session = Depends(get_db)):
+async def get_auto_backup_status(db = Depends(get_async_db)):
     """获取自动备份状态"""
     try:
         # 检查自动备份配置
@@ -186,25 +178,13 @@ async def get_auto_backup_status(db: Session = Depends(get_db)):
         retention_days = ConfigManager.get_config('backup', 'backup_retention_days', 30)
         
         # 获取最近的自动备份记录
-        recent_auto_backups = db.query(Backup).filter(
-            Backup.status == 'completed',
-            Backup.backup_type.like('%auto%')
-        ).order_by(Backup.created_at.desc()).limit(5).all()
+        recent_auto_backups = await run_db(db, AutoBackupService.get_recent_auto_backups)
         
         return {
             "enabled": auto_backup_enabled,
             "schedule_time": auto_backup_time,
             "retention_days": retention_days,
-            "recent_backups": [
-                {
-                    "id": backup.id,
-                    "device_id": backup.device_id,
-                    "backup_type": backup.backup_type,
-                    "status": backup.status,
-                    "created_at": backup.created_at.isoformat() if backup.created_at else None
-                }
-                for backup in recent_auto_backups
-            ]
+            "recent_backups": recent_auto_backups
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取自动备份状态失败: {str(e)}")
@@ -214,20 +194,23 @@ async def update_auto_backup_config(
     enabled: bool = None,
     schedule_time: str = None,
     retention_days: int = None,
-    db: Session = Depends(get_db)
+    db = Depends(get_async_db)
 ):
     """更新自动备份配置"""
     try:
         from ..services.config_manager import ConfigManager
+        from ..services.config_service import ConfigService
         
         if enabled is not None:
-            ConfigManager.set_config(db, 'backup', 'enable_auto_backup', str(enabled).lower())
+            await run_db(db, ConfigService.set_config_value, 'backup', 'enable_auto_backup', enabled, 'boolean')
         
         if schedule_time is not None:
-            ConfigManager.set_config(db, 'backup', 'auto_backup_time', schedule_time)
+            await run_db(db, ConfigService.set_config_value, 'backup', 'auto_backup_time', schedule_time)
         
         if retention_days is not None:
-            ConfigManager.set_config(db, 'backup', 'backup_retention_days', str(retention_days))
+            await run_db(db, ConfigService.set_config_value, 'backup', 'backup_retention_days', retention_days, 'integer')
+        
+        await run_in_threadpool(ConfigManager.refresh_cache)
         
         return {"success": True, "message": "自动备份配置已更新"}
     except Exception as e:
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from ..database import get_db
+from ..services.dashboard_service import DashboardService
+from ..services.stats_service import StatsService
+
+router = APIRouter(prefix="/api/dashboard", tags=["仪表盘"])
+
+@router.get("/summary")
+def get_dashboard_summary(db: Session = Depends(get_db)):
+    """获取仪表盘汇总统计"""
+    return DashboardService.get_summary(db)
+
+@router.post("/stats/rebuild")
+def rebuild_backup_stats(db: Session = Depends(get_db)):
+    """根据备份记录重建统计计数"""
+    result = StatsService.rebuild(db)
+    return {"success": True, "message": "备份统计已重建", "data": result}
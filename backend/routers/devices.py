@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 from ..database import get_db
-from ..schemas import Device, DeviceCreate, DeviceUpdate, ResponseModel
+from ..schemas import Device, DeviceCreate, DeviceUpdate, ResponseModel, JobSubmitResponse
 from ..services.device_service import DeviceService
+from ..pagination import NEXT_CURSOR_HEADER
 
 class CLICommandRequest(BaseModel):
     command: str
@@ -20,9 +21,27 @@ def create_device(device: DeviceCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=f"创建设备失败: {str(e)}")
 
 @router.get("/", response_model=List[Device])
-def get_devices(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """获取设备列表"""
-    return DeviceService.get_devices(db, skip=skip, limit=limit)
+def get_devices(
+    response: Response,
+    connection_status: Optional[str] = None,
+    protocol: Optional[str] = None,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """获取设备列表（下一页游标通过 X-Next-Cursor 响应头返回）"""
+    devices, next_cursor = DeviceService.get_devices_page(
+        db,
+        connection_status=connection_status,
+        protocol=protocol,
+        cursor=cursor,
+        skip=skip,
+        limit=limit
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return devices
 
 @router.get("/{device_id}", response_model=Device)
 def get_device(device_id: int, db: Session = Depends(get_db)):
@@ -80,24 +99,24 @@ def test_device_connection(device_id: int, db: Session = Depends(get_db)):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"测试连接失败: {str(e)}")
 
-@router.post("/{device_id}/quick-backup", response_model=ResponseModel)
+@router.post("/{device_id}/quick-backup", response_model=JobSubmitResponse, status_code=202)
 def quick_backup_device(device_id: int, db: Session = Depends(get_db)):
-    """快速备份设备（使用默认备份类型）"""
+    """快速备份设备（使用默认备份类型，提交到备份任务队列）"""
+    device = DeviceService.get_device(db, device_id)
+    if not device:
+        raise HTTPException(status_code=404, detail="设备不存在")
+    
     try:
         from ..services.config_manager import ConfigManager
-        from ..services.backup_service import BackupService
+        from ..services.job_queue_service import JobQueueService, PRIORITY_INTERACTIVE
         
         # 获取默认备份类型
         default_backup_type = ConfigManager.get_config('system', 'default_backup_type', 'running-config')
         
-        # 执行备份
-        result = BackupService.execute_backup(db, device_id, default_backup_type)
-        
-        return ResponseModel(
-            success=result["success"],
-            message=result["message"],
-            data=result
+        result = JobQueueService.submit(
+            db, device_id, default_backup_type, priority=PRIORITY_INTERACTIVE, source="quick"
         )
+        return JobSubmitResponse(**result)
     except Exception as e:
         import logging
         logger = logging.getLogger(__name__)
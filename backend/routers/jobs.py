@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from ..database import get_db
+from ..schemas import BackupJob as BackupJobSchema, BatchPlanRequest
+from ..models import Strategy
+from ..services.job_queue_service import JobQueueService
+from ..services.duration_service import DurationService
+
+router = APIRouter(prefix="/api/jobs", tags=["备份任务"])
+
+@router.get("/", response_model=List[BackupJobSchema])
+def get_jobs(status: Optional[str] = None, limit: int = 100, db: Session = Depends(get_db)):
+    """获取备份任务列表"""
+    return JobQueueService.get_jobs(db, status=status, limit=limit)
+
+@router.post("/plan")
+def plan_batch(request: BatchPlanRequest, db: Session = Depends(get_db)):
+    """预测一批备份任务的执行顺序和完成时间"""
+    items = [item.model_dump() for item in request.items]
+    if request.strategy_ids:
+        strategies = db.query(Strategy).filter(Strategy.id.in_(request.strategy_ids)).all()
+        items.extend({"device_id": s.device_id, "backup_type": s.backup_type} for s in strategies)
+    
+    if not items:
+        raise HTTPException(status_code=400, detail="请提供要预测的备份任务或策略")
+    
+    return DurationService.plan_batch(db, items, workers=request.workers)
+
+@router.get("/{job_id}", response_model=BackupJobSchema)
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    """查询备份任务状态"""
+    job = JobQueueService.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="备份任务不存在")
+    return job
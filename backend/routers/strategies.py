@@ -1,16 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from ..database import get_db
 from ..schemas import (
     BackupStrategy as BackupStrategySchema, 
     BackupStrategyCreate, 
     BackupStrategyUpdate, 
     BackupStrategyWithDevice,
+    BackupStrategyListItem,
+    JobSubmitResponse,
     ResponseModel
 )
 from ..models import Strategy
 from ..services.strategy_service import StrategyService
+from ..services.job_queue_service import JobQueueService, PRIORITY_INTERACTIVE
+from ..responses import list_response
 
 router = APIRouter(prefix="/api/strategies", tags=["备份策略"])
 
@@ -25,10 +29,29 @@ def create_strategy(strategy: BackupStrategyCreate, db: Session = Depends(get_db
     result = StrategyService.create_strategy(db, strategy)
     return result
 
-@router.get("/", response_model=List[BackupStrategyWithDevice])
-def get_strategies(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """获取备份策略列表"""
-    return StrategyService.get_strategies(db, skip=skip, limit=limit)
+@router.get("/", response_model=List[BackupStrategyListItem])
+def get_strategies(
+    device_id: Optional[int] = None,
+    is_active: Optional[bool] = None,
+    strategy_type: Optional[str] = None,
+    backup_type: Optional[str] = None,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """获取备份策略列表（下一页游标通过 X-Next-Cursor 响应头返回）"""
+    strategies, next_cursor = StrategyService.get_strategy_list_page(
+        db,
+        device_id=device_id,
+        is_active=is_active,
+        strategy_type=strategy_type,
+        backup_type=backup_type,
+        cursor=cursor,
+        skip=skip,
+        limit=limit
+    )
+    return list_response(strategies, next_cursor)
 
 @router.get("/{strategy_id}", response_model=BackupStrategyWithDevice)
 def get_strategy(strategy_id: int, db: Session = Depends(get_db)):
@@ -67,11 +90,9 @@ def get_due_strategies(db: Session = Depends(get_db)):
     """获取到期的策略"""
     return StrategyService.get_due_strategies(db)
 
-@router.post("/{strategy_id}/execute", response_model=ResponseModel)
+@router.post("/{strategy_id}/execute", response_model=JobSubmitResponse, status_code=202)
 def execute_strategy(strategy_id: int, db: Session = Depends(get_db)):
-    """执行备份策略（调度执行）"""
-    from ..services.backup_service import BackupService
-    
+    """执行备份策略（调度执行，任务成功后推进策略的下次执行时间）"""
     strategy = StrategyService.get_strategy(db, strategy_id)
     if not strategy:
         raise HTTPException(status_code=404, detail="备份策略不存在")
@@ -79,29 +100,20 @@ def execute_strategy(strategy_id: int, db: Session = Depends(get_db)):
     if not strategy.is_active:
         raise HTTPException(status_code=400, detail="策略已禁用")
     
-    try:
-        # 执行备份
-        backup_result = BackupService.execute_backup(
-            db=db,
-            device_id=strategy.device_id,
-            backup_type=strategy.backup_type
-        )
-        
-        if backup_result and backup_result.get('success'):
-            # 标记策略已执行
-            StrategyService.mark_strategy_executed(db, strategy_id)
-            return ResponseModel(success=True, message="策略执行成功，备份已完成")
-        else:
-            return ResponseModel(success=False, message=f"策略执行失败: {backup_result.get('message', '未知错误')}")
-            
-    except Exception as e:
-        return ResponseModel(success=False, message=f"策略执行失败: {str(e)}")
+    result = JobQueueService.submit(
+        db,
+        strategy.device_id,
+        strategy.backup_type,
+        priority=PRIORITY_INTERACTIVE,
+        source="strategy",
+        strategy_id=strategy_id,
+        advance_strategy=True
+    )
+    return JobSubmitResponse(**result)
 
-@router.post("/{strategy_id}/execute-now", response_model=ResponseModel)
+@router.post("/{strategy_id}/execute-now", response_model=JobSubmitResponse, status_code=202)
 def execute_strategy_now(strategy_id: int, db: Session = Depends(get_db)):
     """立即执行备份策略（不影响调度）"""
-    from ..services.backup_service import BackupService
-    
     strategy = StrategyService.get_strategy(db, strategy_id)
     if not strategy:
         raise HTTPException(status_code=404, detail="备份策略不存在")
@@ -109,19 +121,13 @@ def execute_strategy_now(strategy_id: int, db: Session = Depends(get_db)):
     if not strategy.is_active:
         raise HTTPException(status_code=400, detail="策略已禁用")
     
-    try:
-        # 执行备份
-        backup_result = BackupService.execute_backup(
-            db=db,
-            device_id=strategy.device_id,
-            backup_type=strategy.backup_type
-        )
-        
-        if backup_result and backup_result.get('success'):
-            # 立即执行不影响调度，不更新策略状态
-            return ResponseModel(success=True, message="策略立即执行成功，备份已完成")
-        else:
-            return ResponseModel(success=False, message=f"策略执行失败: {backup_result.get('message', '未知错误')}")
-            
-    except Exception as e:
-        return ResponseModel(success=False, message=f"策略执行失败: {str(e)}")
+    # 立即执行不影响调度，不更新策略状态
+    result = JobQueueService.submit(
+        db,
+        strategy.device_id,
+        strategy.backup_type,
+        priority=PRIORITY_INTERACTIVE,
+        source="strategy",
+        strategy_id=strategy_id
+    )
+    return JobSubmitResponse(**result)
@@ -5,16 +5,28 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from .database import SessionLocal
 from .services.strategy_service import StrategyService
-from .services.backup_service import BackupService
-from .models import Device
+from .services.job_queue_service import JobQueueService, PRIORITY_SCHEDULED
+from .services.config_manager import ConfigManager
+from .services.duration_service import DurationService
+from .services.archive_service import ArchiveService
+from .leader_election import LeaderElection
 import logging
 
 logger = logging.getLogger(__name__)
 
 class BackupScheduler:
-    def __init__(self):
+    CHECK_INTERVAL = 30  # 到期策略检查间隔（秒）
+    ARCHIVE_INTERVAL = 3600  # 备份归档检查间隔（秒）
+    
+    def __init__(self, session_factory=SessionLocal, clock=datetime.now, default_job_duration=None):
         self.running = False
         self.thread = None
+        self.election = None
+        # 可替换的数据库会话工厂与时钟，供调度仿真（backend.simulation）使用虚拟时钟运行真实调度逻辑
+        self.session_factory = session_factory
+        self.clock = clock
+        self.default_job_duration = default_job_duration
+        self._last_archive_at = None
         
     def start(self):
         """启动调度器"""
@@ -23,6 +35,10 @@ class BackupScheduler:
             return
             
         self.running = True
+        # 多进程部署时只有持有调度租约的进程执行策略调度
+        lease_ttl = int(ConfigManager.get_config('scheduler', 'lease_ttl', 90))
+        self.election = LeaderElection("backup_scheduler", ttl=lease_ttl)
+        self.election.start()
         self.thread = threading.Thread(target=self._run_scheduler, daemon=True)
         self.thread.start()
         logger.info("备份策略调度器已启动")
@@ -32,30 +48,47 @@ class BackupScheduler:
         self.running = False
         if self.thread:
             self.thread.join(timeout=5)
+        if self.election:
+            self.election.stop()
         logger.info("备份策略调度器已停止")
         
     def _run_scheduler(self):
         """调度器主循环"""
         while self.running:
             try:
-                self._check_and_execute_strategies()
+                if self.election.is_leader:
+                    self._check_and_execute_strategies()
+                    self._archive_if_due()
+                else:
+                    logger.debug("当前进程不是调度主节点，跳过策略检查")
                 # 每30秒检查一次
-                time.sleep(30)
+                time.sleep(self.CHECK_INTERVAL)
             except Exception as e:
                 logger.error(f"调度器运行错误: {str(e)}")
-                time.sleep(30)
+                time.sleep(self.CHECK_INTERVAL)
                 
     def _check_and_execute_strategies(self):
         """检查并执行到期的策略"""
         db = None
         try:
-            db = SessionLocal()
+            db = self.session_factory()
             # 获取到期的策略
-            due_strategies = StrategyService.get_due_strategies(db)
+            due_strategies = StrategyService.get_due_strategies(db, now=self.clock())
             
             if due_strategies:
                 logger.info(f"发现 {len(due_strategies)} 个到期策略")
                 
+                # 按预期耗时从长到短入队：同优先级任务按入队顺序领取，
+                # 长任务先开始，短任务填充其余工作线程，缩短整批备份的总时长
+                durations = DurationService.get_expected_durations(
+                    db,
+                    [(s.device_id, s.backup_type) for s in due_strategies],
+                    default_duration=self.default_job_duration
+                )
+                due_strategies = DurationService.order_longest_first(
+                    due_strategies, durations, lambda s: (s.device_id, s.backup_type)
+                )
+                
                 for strategy in due_strategies:
                     try:
                         self._execute_strategy(db, strategy)
@@ -73,38 +106,48 @@ class BackupScheduler:
                 except Exception as e:
                     logger.error(f"关闭数据库会话失败: {str(e)}")
             
-    def _execute_strategy(self, db: Session, strategy):
-        """执行单个策略"""
-        logger.info(f"开始执行策略: {strategy.name} (ID: {strategy.id})")
+    def _archive_if_due(self):
+        """每隔 ARCHIVE_INTERVAL 把超过归档期限的备份移到归档表（只在主节点执行）"""
+        now = self.clock()
+        if self._last_archive_at and now - self._last_archive_at < timedelta(seconds=self.ARCHIVE_INTERVAL):
+            return
+        self._last_archive_at = now
         
+        db = None
         try:
-            # 获取设备信息
-            device = db.query(Device).filter(Device.id == strategy.device_id).first()
-            device_name = device.name if device else f"设备{strategy.device_id}"
+            db = self.session_factory()
+            ArchiveService.archive_old_backups(db, now=now)
+        except Exception as e:
+            logger.error(f"归档备份失败: {str(e)}")
+        finally:
+            if db:
+                db.close()
             
-            # 执行备份
-            backup_result = BackupService.execute_backup(
-                db=db,
+    def _execute_strategy(self, db: Session, strategy):
+        """将到期策略提交到备份任务队列，返回新建的任务（已有相同任务时返回None）"""
+        logger.info(f"提交策略备份任务: {strategy.name} (ID: {strategy.id})")
+        
+        try:
+            # 策略状态在任务成功完成后由工作线程推进；
+            # 执行期间策略仍处于到期状态，重复提交会被队列去重
+            job, created = JobQueueService.enqueue(
+                db,
                 device_id=strategy.device_id,
-                backup_type=strategy.backup_type
+                backup_type=strategy.backup_type,
+                priority=PRIORITY_SCHEDULED,
+                source="scheduled",
+                strategy_id=strategy.id,
+                advance_strategy=True,
+                now=self.clock()
             )
-            
-            if backup_result and backup_result.get('success'):
-                logger.info(f"策略 {strategy.name} 执行成功")
-                # 标记策略已执行
-                StrategyService.mark_strategy_executed(db, strategy.id)
-                
-
-            else:
-                logger.error(f"策略 {strategy.name} 执行失败: {backup_result}")
-                
-
+            if created:
+                logger.info(f"策略 {strategy.name} 已入队，任务ID: {job.id}")
+                return job
                 
         except Exception as e:
-            logger.error(f"执行策略 {strategy.name} 时发生错误: {str(e)}")
-            
-
-    
+            db.rollback()
+            logger.error(f"提交策略 {strategy.name} 时发生错误: {str(e)}")
+        return None
 
 
 # 全局调度器实例
@@ -38,6 +38,12 @@ class Device(DeviceBase):
     class Config:
         from_attributes = True
 
+class DeviceSummary(BaseModel):
+    """列表中引用的设备（不包含登录凭据）"""
+    id: int
+    name: str
+    ip_address: str
+
 # 备份相关模型
 class BackupBase(BaseModel):
     device_id: int = Field(..., description="设备ID")
@@ -54,6 +60,7 @@ class Backup(BackupBase):
     content: Optional[str] = None  # 添加content字段
     error_message: Optional[str] = None
     created_at: datetime
+    archived: bool = Field(default=False, description="是否为归档的历史备份")
     
     class Config:
         from_attributes = True
@@ -64,6 +71,18 @@ class BackupWithDevice(Backup):
     class Config:
         from_attributes = True
 
+class BackupListItem(BaseModel):
+    """备份列表项（不包含配置内容，内容通过 /api/backups/{id}/content 获取）"""
+    id: int
+    device_id: Optional[int] = None
+    backup_type: str
+    status: str
+    file_path: Optional[str] = None
+    file_size: Optional[int] = None
+    created_at: datetime
+    archived: bool = False
+    device: Optional[DeviceSummary] = None
+
 # FTP服务器相关模型
 class FTPServerBase(BaseModel):
     name: str = Field(..., description="FTP服务器名称")
@@ -106,6 +125,40 @@ class BackupResponse(BaseModel):
     backup_id: Optional[int] = None
     file_path: Optional[str] = None
 
+# 备份任务队列相关模型
+class BackupJob(BaseModel):
+    id: int
+    device_id: int
+    backup_type: str
+    priority: int
+    source: str
+    strategy_id: Optional[int] = None
+    status: str = Field(..., description="任务状态(queued/running/success/failed)")
+    backup_id: Optional[int] = None
+    message: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class JobSubmitResponse(BaseModel):
+    success: bool
+    message: str
+    job_id: int
+    status: str
+    deduplicated: bool = Field(default=False, description="是否复用了已有的相同任务")
+
+class BatchPlanItem(BaseModel):
+    device_id: int = Field(..., description="设备ID")
+    backup_type: str = Field(default="running-config", description="备份类型")
+
+class BatchPlanRequest(BaseModel):
+    items: List[BatchPlanItem] = Field(default=[], description="计划执行的备份任务")
+    strategy_ids: List[int] = Field(default=[], description="计划执行的策略ID")
+    workers: Optional[int] = Field(None, description="并发工作线程数，默认使用系统配置")
+
 # 备份策略相关模型
 class BackupStrategyBase(BaseModel):
     name: str = Field(..., description="策略名称")
@@ -156,6 +209,10 @@ class BackupStrategyWithDevice(BackupStrategy):
     class Config:
         from_attributes = True
 
+class BackupStrategyListItem(BackupStrategy):
+    """策略列表项（设备只包含名称和地址）"""
+    device: Optional[DeviceSummary] = None
+
 # 系统配置相关模型
 class SystemConfigBase(BaseModel):
     category: str = Field(..., description="配置分类")
@@ -208,6 +265,8 @@ class AnalysisRequest(BaseModel):
     backup_id: int
     dimensions: Optional[List[str]] = None  # 支持维度选择，默认为None表示分析所有维度
     ai_config: Optional[AIConfigRequest] = None  # AI配置，如果不提供则使用数据库中的配置
+    combined: Optional[bool] = None  # 一次AI调用分析所有维度，默认使用系统配置 analysis.combined_mode
+    incremental: Optional[bool] = None  # 只分析相对上次分析变化的配置，默认使用系统配置 analysis.incremental
 
 class AnalysisPromptRequest(BaseModel):
     dimension: str = Field(..., description="分析维度")
@@ -230,6 +289,7 @@ class AnalysisRecord(BaseModel):
     result: Optional[Dict[str, Any]] = Field(None, description="分析结果")
     error_message: Optional[str] = Field(None, description="错误信息")
     processing_time: Optional[int] = Field(None, description="处理时间（秒）")
+    baseline_record_id: Optional[int] = Field(None, description="增量分析的基准记录ID")
     created_at: datetime
 
     class Config:
@@ -0,0 +1,172 @@
+"""
+AI接口限流和重试 - 按服务商共享的令牌桶（每分钟请求数、每分钟 token 数）和指数退避重试
+
+同一服务商（provider + base_url）的所有调用共用一个限流器：多维度分析、合并分析、分片分析、
+后台任务和 ai_service 中的调用都在发送请求前领取额度，批量分析时按配额匀速发送请求，而不是
+集中发送后被服务商以 429 拒绝。收到 429、5xx 或连接错误时，AIConfig.auto_retry 开启则按指数退避
+（带随机抖动）重试，服务商返回 Retry-After 时至少等待该时间，并暂停该服务商的所有调用。
+
+限额通过环境变量按服务商账号的配额配置，0 表示不限制（只依靠 429 重试）：
+AI_RATE_LIMIT_RPM / AI_RATE_LIMIT_TPM 为默认值，AI_RATE_LIMIT_<PROVIDER>_RPM / _TPM 为单个服务商的值。
+"""
+
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import os
+import random
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 默认每分钟请求数和 token 数（0 表示不限制）
+AI_RATE_LIMIT_RPM = float(os.getenv("AI_RATE_LIMIT_RPM", "0"))
+AI_RATE_LIMIT_TPM = float(os.getenv("AI_RATE_LIMIT_TPM", "0"))
+# 最多重试次数、首次重试等待时间和最长等待时间（秒）
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "3"))
+AI_RETRY_BASE_DELAY = float(os.getenv("AI_RETRY_BASE_DELAY", "1"))
+AI_RETRY_MAX_DELAY = float(os.getenv("AI_RETRY_MAX_DELAY", "30"))
+
+# 可重试的HTTP状态码：限流和服务端临时错误
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """令牌桶：容量为每分钟的额度，按 每分钟额度/60 的速度补充
+
+    采用预约方式：领取时直接扣除（可以为负），返回需要等待的时间，先领取的调用先获得额度。
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: Optional[float] = None) -> float:
+        """预约 amount 个额度，返回需要等待的秒数（单次超过容量时按容量计算）"""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.capacity, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = max(self.updated, now)
+        self.tokens -= min(amount, self.capacity)
+        return max(0.0, -self.tokens / self.rate)
+
+class ProviderRateLimiter:
+    """单个服务商的限流器（每分钟请求数和 token 数，为 0 时不限制）"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.paused_until = 0.0
+
+    def reserve(self, tokens: int, now: Optional[float] = None) -> float:
+        """预约一次请求和 tokens 个 token 的额度，返回需要等待的秒数"""
+        now = time.monotonic() if now is None else now
+        wait = max(0.0, self.paused_until - now)
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1, now))
+        if self.tokens:
+            wait = max(wait, self.tokens.reserve(tokens, now))
+        return wait
+
+    async def acquire(self, tokens: int):
+        """等待到有足够的额度"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """服务商返回限流时，暂停该服务商的所有调用 seconds 秒"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+def _provider_limit(provider: str, name: str, default: float) -> float:
+    """读取服务商的限额（AI_RATE_LIMIT_<PROVIDER>_<NAME>），未设置时使用默认值"""
+    value = os.getenv(f"AI_RATE_LIMIT_{provider.upper()}_{name}")
+    return float(value) if value else default
+
+class RateLimiterRegistry:
+    """按服务商（provider + base_url）管理限流器"""
+
+    def __init__(self):
+        self._limiters: Dict[Tuple[str, str], ProviderRateLimiter] = {}
+
+    def get(self, ai_config: Dict) -> ProviderRateLimiter:
+        """获取AI配置对应的限流器，不存在时按环境变量中的限额创建"""
+        provider = ai_config.get("provider") or "openai"
+        key = (provider, (ai_config.get("base_url") or "").rstrip("/"))
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            rpm = _provider_limit(provider, "RPM", AI_RATE_LIMIT_RPM)
+            tpm = _provider_limit(provider, "TPM", AI_RATE_LIMIT_TPM)
+            limiter = self._limiters[key] = ProviderRateLimiter(rpm, tpm)
+            logger.info(f"已创建AI接口限流器: {provider} {key[1]}（每分钟请求数 {rpm or '不限'}，token 数 {tpm or '不限'}）")
+        return limiter
+
+    def clear(self):
+        """清除所有限流器（限额变化后重新创建）"""
+        self._limiters.clear()
+
+def parse_retry_after(value: Optional[str], now: Optional[datetime] = None) -> Optional[float]:
+    """解析 Retry-After 响应头（秒数或HTTP日期），无法解析时返回 None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - (now or datetime.now(timezone.utc))).total_seconds())
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """第 attempt 次重试（从0开始）前的等待时间：指数退避加随机抖动，不少于 Retry-After"""
+    delay = min(AI_RETRY_MAX_DELAY, AI_RETRY_BASE_DELAY * (2 ** attempt)) * random.uniform(0.5, 1.0)
+    if retry_after is not None:
+        delay = max(delay, retry_after + random.uniform(0, AI_RETRY_BASE_DELAY))
+    return delay
+
+def failure(error: str, status: Optional[int] = None, retry_after: Optional[float] = None,
+            retryable: Optional[bool] = None) -> Dict:
+    """构建AI调用失败的结果，可重试的失败带有 retryable 标记"""
+    return {
+        "success": False,
+        "error": error,
+        "status": status,
+        "retry_after": retry_after,
+        "retryable": status in RETRYABLE_STATUSES if retryable is None else retryable
+    }
+
+async def call_with_retry(
+    ai_config: Dict,
+    call: Callable[[], Awaitable[Dict]],
+    estimated_tokens: int,
+    timeout: Optional[float] = None
+) -> Dict:
+    """限流后执行一次AI调用，可重试的失败按 auto_retry 重试，返回最后一次调用的结果
+
+    call 返回 {"success": ..., "content"/"error": ...}，失败结果中 retryable 为真时重试。
+    timeout 限制每次调用的时间（不包括等待限流和重试的时间），超时抛出 asyncio.TimeoutError。
+    """
+    limiter = ai_rate_limiters.get(ai_config)
+    retries = AI_MAX_RETRIES if ai_config.get("auto_retry", True) is not False else 0
+    for attempt in range(retries + 1):
+        await limiter.acquire(estimated_tokens)
+        result = await (asyncio.wait_for(call(), timeout) if timeout else call())
+        if result.get("success") or not result.get("retryable") or attempt == retries:
+            return result
+
+        delay = backoff_delay(attempt, result.get("retry_after"))
+        if result.get("status") == 429:
+            # 服务商限流时暂停该服务商的所有调用，避免其他并发调用继续被拒绝
+            limiter.pause(delay)
+        logger.warning(f"AI接口调用失败（{result['error'][:200]}），{delay:.1f} 秒后第 {attempt + 1} 次重试")
+        await asyncio.sleep(delay)
+    return result
+
+# 全局限流器实例
+ai_rate_limiters = RateLimiterRegistry()
@@ -4,6 +4,9 @@ import json
 import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime
+from .http_client import http_client_pool
+from .ai_rate_limit import ai_rate_limiters, call_with_retry, failure, parse_retry_after
+from .config_reducer import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -34,49 +37,60 @@ class AlibabaService(AIService):
         self.base_url = self.base_url or "https://dashscope.aliyuncs.com/compatible-mode/v1"
         
     async def analyze_config(self, config_content: str, prompt: str) -> Dict[str, Any]:
-        """使用阿里云通义千问分析配置"""
+        """使用阿里云通义千问分析配置（与分析服务共用限流器，按 auto_retry 重试）"""
+        user_content = f"{prompt}\n\n配置内容：\n{config_content}"
+        config = {**self.config, "provider": self.provider, "base_url": self.base_url}
+        return await call_with_retry(
+            config, lambda: self._request_analysis(user_content), estimate_tokens(user_content) + 800
+        )
+    
+    async def _request_analysis(self, user_content: str) -> Dict[str, Any]:
+        """发送一次分析请求"""
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                data = {
-                    "model": self.model,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "你是一个专业的网络设备配置分析专家。请提供简洁、重点突出的分析报告，控制在500字以内。"
-                        },
-                        {
-                            "role": "user",
-                            "content": f"{prompt}\n\n配置内容：\n{config_content}"
-                        }
-                    ],
-                    "temperature": 0.3,
-                    "max_tokens": 800
-                }
-                
-                async with session.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=data,
-                    timeout=aiohttp.ClientTimeout(total=self.timeout)
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return {
-                            "success": True,
-                            "content": result["choices"][0]["message"]["content"],
-                            "usage": result.get("usage", {})
-                        }
-                    else:
-                        error_text = await response.text()
-                        return {
-                            "success": False,
-                            "error": f"API调用失败: {response.status} - {error_text}"
-                        }
+            session = http_client_pool.get_session(self.base_url)
+            headers = {
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            }
+            
+            data = {
+                "model": self.model,
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": "你是一个专业的网络设备配置分析专家。请提供简洁、重点突出的分析报告，控制在500字以内。"
+                    },
+                    {
+                        "role": "user",
+                        "content": user_content
+                    }
+                ],
+                "temperature": 0.3,
+                "max_tokens": 800
+            }
+            
+            async with session.post(
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                json=data,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            ) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    return {
+                        "success": True,
+                        "content": result["choices"][0]["message"]["content"],
+                        "usage": result.get("usage", {})
+                    }
+                else:
+                    error_text = await response.text()
+                    return failure(
+                        f"API调用失败: {response.status} - {error_text}", response.status,
+                        parse_retry_after(response.headers.get("Retry-After"))
+                    )
+        except aiohttp.ClientConnectionError as e:
+            logger.error(f"阿里云分析失败: {str(e)}")
+            return failure(f"分析失败: {str(e)}", retryable=True)
         except Exception as e:
             logger.error(f"阿里云分析失败: {str(e)}")
             return {
@@ -85,41 +99,42 @@ class AlibabaService(AIService):
             }
     
     async def test_connection(self) -> Dict[str, Any]:
-        """测试阿里云连接"""
+        """测试阿里云连接（计入限流额度，不重试）"""
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                # 阿里云通义千问的正确API格式
-                data = {
-                    "model": self.model,
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": "Hello"
-                        }
-                    ],
-                    "max_tokens": 5
-                }
-                
-                async with session.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=data,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    if response.status == 200:
-                        return {"success": True, "message": "连接成功"}
+            await ai_rate_limiters.get({**self.config, "provider": self.provider, "base_url": self.base_url}).acquire(10)
+            session = http_client_pool.get_session(self.base_url)
+            headers = {
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            }
+            
+            # 阿里云通义千问的正确API格式
+            data = {
+                "model": self.model,
+                "messages": [
+                    {
+                        "role": "user",
+                        "content": "Hello"
+                    }
+                ],
+                "max_tokens": 5
+            }
+            
+            async with session.post(
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                json=data,
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                if response.status == 200:
+                    return {"success": True, "message": "连接成功"}
+                else:
+                    error_text = await response.text()
+                    logger.error(f"阿里云API调用失败: {response.status} - {error_text}")
+                    if error_text:
+                        return {"success": False, "message": f"连接失败: {error_text}"}
                     else:
-                        error_text = await response.text()
-                        logger.error(f"阿里云API调用失败: {response.status} - {error_text}")
-                        if error_text:
-                            return {"success": False, "message": f"连接失败: {error_text}"}
-                        else:
-                            return {"success": False, "message": f"连接失败: HTTP {response.status} - 无响应内容"}
+                        return {"success": False, "message": f"连接失败: HTTP {response.status} - 无响应内容"}
         except Exception as e:
             logger.error(f"阿里云连接测试异常: {str(e)}")
             error_msg = str(e)
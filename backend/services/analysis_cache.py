@@ -0,0 +1,214 @@
+"""
+AI分析结果缓存 - 相同的配置内容用相同的提示词和模型分析时直接返回上次的结果
+
+缓存键是规范化后的配置内容、提示词内容和模型参数（服务商、地址、模型、生成参数）的 SHA-256，
+配置中每次备份都会变化的时间戳等行不参与计算，未修改的配置重新备份后仍能命中缓存。
+结果持久化在 analysis_cache 表中（过期时间和最大条数可配置，超出时淘汰最久未使用的记录），
+进程内的 LRU 缓存放在数据库之前，命中时无需查询数据库。AI配置的 enable_cache 关闭时不读写缓存。
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..models import AnalysisCacheEntry
+from .config_manager import ConfigManager
+import hashlib
+import json
+import re
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 进程内 LRU 缓存的最大条数
+MEMORY_CACHE_SIZE = 256
+# 默认缓存有效期（小时）和数据库中的最大缓存条数
+DEFAULT_CACHE_TTL_HOURS = 168
+DEFAULT_CACHE_MAX_ENTRIES = 2000
+
+# 每次导出配置都会变化、与配置本身无关的行（时间戳、字节数等）
+VOLATILE_LINE_PATTERNS = [
+    re.compile(r"^\s*!\s*(Last configuration change|NVRAM config last updated|Time:)", re.IGNORECASE),
+    re.compile(r"^\s*(Building configuration|Current configuration\s*:)", re.IGNORECASE),
+    re.compile(r"^\s*ntp clock-period\b", re.IGNORECASE),
+]
+
+def normalize_config(content: Optional[str]) -> str:
+    """规范化配置内容：统一换行、去掉行尾空白、空行和易变的行"""
+    lines = []
+    for line in (content or "").replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        line = line.rstrip()
+        if not line or any(pattern.match(line) for pattern in VOLATILE_LINE_PATTERNS):
+            continue
+        lines.append(line)
+    return "\n".join(lines)
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def build_cache_key(config_content: Optional[str], prompt: str, ai_config: Dict, params: Dict) -> str:
+    """根据配置内容、提示词和模型参数计算缓存键"""
+    payload = {
+        "config": _sha256(normalize_config(config_content)),
+        "prompt": _sha256(prompt),
+        "provider": ai_config.get("provider"),
+        "base_url": (ai_config.get("base_url") or "").rstrip("/"),
+        "model": ai_config.get("model"),
+        "params": params,
+    }
+    return _sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False))
+
+class AnalysisResultCache:
+    """AI分析结果缓存（进程内 LRU + 数据库）"""
+
+    def __init__(self, memory_size: int = MEMORY_CACHE_SIZE):
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, Tuple[str, datetime]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def _remember(self, key: str, content: str, expires_at: datetime):
+        """写入进程内缓存（调用方持有锁）"""
+        self._memory[key] = (content, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get_many(self, db: Session, keys: Iterable[str], now: Optional[datetime] = None) -> Dict[str, str]:
+        """查找缓存，返回命中的 {缓存键: 分析结果}（同步，由 run_db 调用）"""
+        now = now or datetime.now()
+        found = {}
+        missing = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                entry = self._memory.get(key)
+                if entry and entry[1] > now:
+                    self._memory.move_to_end(key)
+                    found[key] = entry[0]
+                else:
+                    self._memory.pop(key, None)
+                    missing.append(key)
+            self.memory_hits += len(found)
+
+        if not missing:
+            return found
+
+        entries = db.query(AnalysisCacheEntry).filter(
+            AnalysisCacheEntry.cache_key.in_(missing), AnalysisCacheEntry.expires_at > now
+        ).all()
+        if entries:
+            db.query(AnalysisCacheEntry).filter(
+                AnalysisCacheEntry.id.in_([entry.id for entry in entries])
+            ).update({
+                AnalysisCacheEntry.hit_count: AnalysisCacheEntry.hit_count + 1,
+                AnalysisCacheEntry.last_hit_at: now
+            }, synchronize_session=False)
+            db.commit()
+
+        with self._lock:
+            for entry in entries:
+                found[entry.cache_key] = entry.content
+                self._remember(entry.cache_key, entry.content, entry.expires_at)
+            self.db_hits += len(entries)
+            self.misses += len(missing) - len(entries)
+        return found
+
+    def put_many(
+        self,
+        db: Session,
+        results: Dict[str, Tuple[str, str]],
+        model: Optional[str] = None,
+        now: Optional[datetime] = None
+    ) -> int:
+        """写入缓存，results 为 {缓存键: (维度, 分析结果)}，返回写入条数（同步，由 run_db 调用）"""
+        if not results:
+            return 0
+        now = now or datetime.now()
+        ttl_hours = float(ConfigManager.get_config('analysis', 'cache_ttl_hours', DEFAULT_CACHE_TTL_HOURS))
+        expires_at = now + timedelta(hours=ttl_hours)
+
+        existing = {
+            entry.cache_key: entry
+            for entry in db.query(AnalysisCacheEntry).filter(AnalysisCacheEntry.cache_key.in_(list(results)))
+        }
+        for key, (dimension, content) in results.items():
+            entry = existing.get(key)
+            if entry is None:
+                db.add(AnalysisCacheEntry(
+                    cache_key=key, dimension=dimension, model=model, content=content,
+                    created_at=now, last_hit_at=now, expires_at=expires_at
+                ))
+            else:
+                entry.content = content
+                entry.last_hit_at = now
+                entry.expires_at = expires_at
+        try:
+            db.commit()
+        except IntegrityError:
+            # 并发的分析同时写入了相同的缓存键，保留先写入的结果
+            db.rollback()
+            logger.info("分析结果缓存已由其他请求写入")
+
+        with self._lock:
+            for key, (_, content) in results.items():
+                self._remember(key, content, expires_at)
+            self.stores += len(results)
+
+        self.evict(db, now)
+        return len(results)
+
+    def evict(self, db: Session, now: Optional[datetime] = None) -> int:
+        """删除过期的缓存，并在超出最大条数时淘汰最久未使用的缓存，返回删除条数"""
+        now = now or datetime.now()
+        max_entries = int(ConfigManager.get_config('analysis', 'cache_max_entries', DEFAULT_CACHE_MAX_ENTRIES))
+        deleted = db.query(AnalysisCacheEntry).filter(
+            AnalysisCacheEntry.expires_at <= now
+        ).delete(synchronize_session=False)
+
+        overflow = db.query(AnalysisCacheEntry.id).count() - max_entries
+        if overflow > 0:
+            oldest_ids = [row.id for row in db.query(AnalysisCacheEntry.id).order_by(
+                AnalysisCacheEntry.last_hit_at, AnalysisCacheEntry.id
+            ).limit(overflow)]
+            deleted += db.query(AnalysisCacheEntry).filter(
+                AnalysisCacheEntry.id.in_(oldest_ids)
+            ).delete(synchronize_session=False)
+        if deleted:
+            db.commit()
+            logger.info(f"已清理 {deleted} 条分析结果缓存")
+        return deleted
+
+    def clear(self, db: Session) -> int:
+        """清空缓存，返回删除的数据库记录数"""
+        with self._lock:
+            self._memory.clear()
+        deleted = db.query(AnalysisCacheEntry).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    def get_stats(self, db: Session) -> Dict:
+        """缓存命中统计（进程启动以来）"""
+        with self._lock:
+            hits = self.memory_hits + self.db_hits
+            lookups = hits + self.misses
+            stats = {
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_size": self.memory_size,
+            }
+        stats["db_entries"] = db.query(AnalysisCacheEntry.id).count()
+        stats["ttl_hours"] = float(ConfigManager.get_config('analysis', 'cache_ttl_hours', DEFAULT_CACHE_TTL_HOURS))
+        stats["max_entries"] = int(ConfigManager.get_config('analysis', 'cache_max_entries', DEFAULT_CACHE_MAX_ENTRIES))
+        return stats
+
+# 全局分析结果缓存
+analysis_cache = AnalysisResultCache()
@@ -0,0 +1,193 @@
+"""
+后台分析任务 - 提交后立即返回任务ID，分析在后台执行并逐个维度更新分析记录
+
+任务ID即分析记录ID，状态和进度保存在分析记录中（processing / success / failed），
+因此轮询接口和其他进程都可以通过记录查询进度；本进程内的进度变化和AI实时生成的内容同时推送给 SSE 订阅者。
+"""
+
+import asyncio
+import json
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set
+from .analysis_service import AnalysisService
+from .config_manager import ConfigManager
+from ..database import run_db
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 分析任务的最长执行时间（秒），超过后服务启动时遗留的 processing 记录视为已中断
+DEFAULT_JOB_STALE_SECONDS = 3600
+# SSE 没有进度变化时重新读取记录和发送心跳的间隔（秒）
+SSE_POLL_INTERVAL = 5
+
+def _default_session_factory():
+    """后台任务使用独立的数据库会话（请求的会话在返回任务ID后即关闭）"""
+    from ..database import AsyncSessionLocal, SessionLocal
+    return AsyncSessionLocal() if AsyncSessionLocal is not None else SessionLocal()
+
+async def _close_session(db):
+    """关闭同步或异步数据库会话"""
+    result = db.close()
+    if asyncio.iscoroutine(result):
+        await result
+
+def format_sse(event: str, data: Dict) -> str:
+    """格式化一条 SSE 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+class AnalysisJobManager:
+    """后台分析任务管理"""
+
+    def __init__(self, session_factory: Optional[Callable] = None):
+        self._session_factory = session_factory or _default_session_factory
+        self._tasks: Dict[int, asyncio.Task] = {}
+        # 每个任务的 SSE 订阅者队列，进度变化和生成的内容放入每个订阅者的队列
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        # 每个任务进行中的维度已生成的内容，供中途订阅的客户端补齐
+        self._partial: Dict[int, Dict[str, str]] = {}
+
+    async def submit(
+        self,
+        db,
+        device_id: int,
+        backup_id: int,
+        dimensions: List[str] = None,
+        ai_config: Dict = None,
+        combined: Optional[bool] = None,
+        incremental: Optional[bool] = None
+    ) -> Dict:
+        """校验参数并创建分析记录，分析在后台执行，立即返回任务ID"""
+        context = await AnalysisService.start_analysis(
+            db, device_id, backup_id, dimensions, ai_config, combined, incremental
+        )
+        if not context["success"]:
+            return context
+
+        job_id = context["record_id"]
+        task = asyncio.create_task(self._run(job_id, context))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+        logger.info(f"分析任务已提交: 任务={job_id}, 设备={device_id}, 备份={backup_id}")
+        return {
+            "success": True,
+            "message": "分析任务已提交",
+            "job_id": job_id,
+            "status": "processing",
+            "dimensions": context["dimensions"],
+            "incremental": context["incremental"]
+        }
+
+    async def _run(self, job_id: int, context: Dict):
+        """在独立的数据库会话中执行分析"""
+        db = self._session_factory()
+        partial = self._partial.setdefault(job_id, {})
+        
+        async def on_token(dimension: str, text: str):
+            partial[dimension] = partial.get(dimension, "") + text
+            self._publish(job_id, "token", {"dimension": dimension, "text": text})
+        
+        try:
+            result = await AnalysisService.run_analysis(db, context, on_progress=self._notify, on_token=on_token)
+            logger.info(f"分析任务 {job_id} 完成，模式: {result['mode']}")
+        except asyncio.CancelledError:
+            logger.warning(f"分析任务 {job_id} 已取消")
+            await run_db(db, AnalysisService._finish_analysis_record, job_id, None, "failed", "分析任务已取消", 0)
+            await self._notify(job_id)
+            raise
+        except Exception as e:
+            # run_analysis 已将记录标记为失败
+            logger.error(f"分析任务 {job_id} 执行失败: {str(e)}")
+        finally:
+            self._partial.pop(job_id, None)
+            await _close_session(db)
+
+    def _publish(self, job_id: int, kind: str, data: Optional[Dict] = None):
+        """把消息放入任务所有订阅者的队列"""
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait((kind, data))
+
+    async def _notify(self, job_id: int):
+        """通知订阅者任务进度有变化"""
+        self._publish(job_id, "progress")
+
+    async def get_job(self, job_id: int) -> Optional[Dict]:
+        """读取任务状态和进度"""
+        db = self._session_factory()
+        try:
+            return await run_db(db, AnalysisService.get_analysis_job, job_id)
+        finally:
+            await _close_session(db)
+
+    async def stream(self, job_id: int, poll_interval: float = SSE_POLL_INTERVAL) -> AsyncIterator[str]:
+        """以 SSE 推送任务进度：维度完成时发送 progress，AI生成内容时发送 token，结束时发送 done
+
+        第一条 progress 的 partial 字段包含进行中的维度已生成的内容。本进程内执行的任务实时推送，
+        其他进程执行的任务按 poll_interval 读取记录（只有 progress 和 done）。
+        """
+        # 订阅和读取已生成的内容之间没有 await，内容不会丢失或重复
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        partial = dict(self._partial.get(job_id, {}))
+        try:
+            job = await self.get_job(job_id)
+            if job is None:
+                yield format_sse("error", {"job_id": job_id, "message": "分析任务不存在"})
+                return
+            if job["status"] == "processing":
+                partial = {dimension: text for dimension, text in partial.items() if dimension not in job["data"]}
+                yield format_sse("progress", {**job, "partial": partial})
+            last_completed = job["completed_dimensions"]
+            
+            while job["status"] == "processing":
+                try:
+                    kind, data = await asyncio.wait_for(queue.get(), poll_interval)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    kind, data = "progress", None
+                if kind == "token":
+                    yield format_sse("token", data)
+                    continue
+                
+                job = await self.get_job(job_id)
+                if job is None:
+                    yield format_sse("error", {"job_id": job_id, "message": "分析任务不存在"})
+                    return
+                if job["status"] == "processing" and job["completed_dimensions"] != last_completed:
+                    last_completed = job["completed_dimensions"]
+                    yield format_sse("progress", job)
+            yield format_sse("done", job)
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+    async def shutdown(self):
+        """取消本进程中执行的分析任务（记录标记为失败）"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.info(f"已取消 {len(tasks)} 个执行中的分析任务")
+
+def recover_analysis_jobs():
+    """服务启动时处理上次运行遗留的分析任务"""
+    from ..database import SessionLocal
+    db = SessionLocal()
+    try:
+        stale_after = int(ConfigManager.get_config('analysis', 'job_stale_seconds', DEFAULT_JOB_STALE_SECONDS))
+        AnalysisService.recover_interrupted_analyses(db, stale_after)
+    except Exception as e:
+        logger.error(f"处理中断的分析任务失败: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+# 全局分析任务管理实例
+analysis_job_manager = AnalysisJobManager()
+
+async def stop_analysis_jobs():
+    """取消执行中的分析任务"""
+    await analysis_job_manager.shutdown()
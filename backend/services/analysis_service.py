@@ -2,12 +2,20 @@ import asyncio
 import json
 import logging
 import re
-from typing import Dict, List, Optional, Any
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, defer
 from ..models import Device, Backup, AnalysisRecord, AnalysisPrompt, AIConfig
-from .ai_service import ai_service_manager
-from ..database import get_db
+from .config_manager import ConfigManager
+from .archive_service import ArchiveService
+from .http_client import http_client_pool
+from .analysis_cache import analysis_cache, build_cache_key
+from .config_reducer import diff_config, estimate_tokens, reduce_config, split_config_sections
+from .ai_rate_limit import call_with_retry, failure, parse_retry_after
+from ..database import get_db, run_db
+from ..pagination import paginate
 import aiohttp
 import json
 import logging
@@ -15,6 +23,28 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# 同时进行AI调用的分析维度数
+DEFAULT_MAX_CONCURRENT_DIMENSIONS = 3
+# 单个维度的默认超时时间（秒），AI配置未设置超时时使用
+DEFAULT_DIMENSION_TIMEOUT = 60
+
+# AI调用的系统提示和生成参数（同时是分析结果缓存键的一部分）
+SYSTEM_PROMPT = "你是一个专业的网络设备配置分析专家。"
+AI_GENERATION_PARAMS = {"max_tokens": 2000, "temperature": 0.7}
+# 合并分析（一次调用分析所有维度）的最大输出长度和超时倍数（相对单个维度的超时时间）
+COMBINED_MAX_TOKENS = 8000
+COMBINED_TIMEOUT_FACTOR = 2
+# 发送给AI的配置内容的默认 token 预算（精简后仍超出时分片分析或截断）
+DEFAULT_MAX_CONFIG_TOKENS = 12000
+# 分片分析时单个片段的最大输出长度，以及中间合并的最多轮数
+CHUNK_MAX_TOKENS = 1000
+MAX_MERGE_ROUNDS = 3
+# 增量分析：配置变化（差异文本）超过完整配置 token 数的该比例时改为完整分析，以及查找基准记录的数量
+DEFAULT_INCREMENTAL_MAX_RATIO = 0.5
+INCREMENTAL_BASELINE_CANDIDATES = 10
+# 分析失败的维度结果的前缀（不能作为增量分析的基准）
+FAILED_RESULT_PREFIXES = ("分析失败", "AI服务调用超时", "AI服务调用失败", "结果解析失败", "分析异常")
+
 class AnalysisService:
     """AI分析服务"""
     
@@ -24,9 +54,18 @@ class AnalysisService:
         backup_id: int, 
         dimensions: List[str] = None,  # 新增：支持维度选择
         ai_config: Dict = None,  # 新增：支持动态AI配置
-        db: Session = None
+        db = None,
+        combined: Optional[bool] = None,
+        incremental: Optional[bool] = None
     ) -> Dict:
-        """分析配置"""
+        """分析配置
+
+        db 可以是同步会话或 AsyncSession，数据库操作通过 run_db 执行，不阻塞事件循环。
+        combined 为 True 时配置内容只发送一次，由一次AI调用以JSON返回所有维度的结果，
+        解析失败或缺少的维度再逐个维度调用；为 None 时使用系统配置 analysis.combined_mode。
+        incremental 为 True 时以设备最近一次成功的分析为基准，只发送变化的配置段和上次的分析结果；
+        为 None 时使用系统配置 analysis.incremental（默认不启用）。
+        """
         should_close_db = False
         try:
             if db is None:
@@ -34,94 +73,12 @@ class AnalysisService:
                 db = SessionLocal()
                 should_close_db = True
             
-            # 获取设备和备份信息
-            device = db.query(Device).filter(Device.id == device_id).first()
-            backup = db.query(Backup).filter(Backup.id == backup_id).first()
-            
-            if not device or not backup:
-                return {"success": False, "message": "设备或备份不存在"}
-            
-            # 获取AI配置
-            if ai_config is None:
-                # 如果没有提供AI配置，从数据库获取
-                db_ai_config = db.query(AIConfig).first()
-                if not db_ai_config:
-                    return {"success": False, "message": "AI配置不存在"}
-                ai_config = {
-                    "provider": db_ai_config.provider,
-                    "api_key": db_ai_config.api_key,
-                    "model": db_ai_config.model,
-                    "base_url": db_ai_config.base_url,
-                    "timeout": db_ai_config.timeout,
-                    "enable_cache": db_ai_config.enable_cache
-                }
-            
-            # 获取分析提示词
-            prompts = db.query(AnalysisPrompt).all()
-            prompt_dict = {p.dimension: p.content for p in prompts}
-            
-            # 如果没有指定维度，使用所有可用维度
-            if not dimensions:
-                dimensions = list(prompt_dict.keys())
-            
-            # 验证维度是否有效
-            valid_dimensions = list(prompt_dict.keys())
-            invalid_dimensions = [d for d in dimensions if d not in valid_dimensions]
-            if invalid_dimensions:
-                return {"success": False, "message": f"无效的分析维度: {invalid_dimensions}"}
-            
-            # 执行分析
-            analysis_results = {}
-            
-            for dimension in dimensions:
-                try:
-                    prompt = prompt_dict.get(dimension)
-                    if not prompt:
-                        logger.warning(f"维度 {dimension} 没有对应的提示词")
-                        continue
-                    
-                    # 构建分析提示
-                    analysis_prompt = AnalysisService._build_analysis_prompt(
-                        device, backup, prompt, dimension
-                    )
-                    
-                    # 调用AI API
-                    result = await AnalysisService._call_ai_api(
-                        ai_config, analysis_prompt
-                    )
-                    
-                    if result["success"]:
-                        analysis_results[dimension] = result["content"]
-                    else:
-                        analysis_results[dimension] = f"分析失败: {result['error']}"
-                        
-                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-                    logger.error(f"维度 {dimension} AI API调用失败: {str(e)}")
-                    analysis_results[dimension] = f"AI服务调用失败: {str(e)}"
-                except (json.JSONDecodeError, ValueError) as e:
-                    logger.error(f"维度 {dimension} 结果解析失败: {str(e)}")
-                    analysis_results[dimension] = f"结果解析失败: {str(e)}"
-                except Exception as e:
-                    logger.error(f"维度 {dimension} 分析失败: {str(e)}")
-                    analysis_results[dimension] = f"分析异常: {str(e)}"
-            
-            # 保存分析记录
-            analysis_record = AnalysisRecord(
-                device_id=device_id,
-                backup_id=backup_id,
-                dimensions=dimensions,  # 保存选中的维度
-                result=json.dumps(analysis_results, ensure_ascii=False),
-                created_at=datetime.now()
+            context = await AnalysisService.start_analysis(
+                db, device_id, backup_id, dimensions, ai_config, combined, incremental
             )
-            db.add(analysis_record)
-            db.commit()
-            
-            return {
-                "success": True,
-                "message": "分析完成",
-                "data": analysis_results,
-                "record_id": analysis_record.id
-            }
+            if not context["success"]:
+                return context
+            return await AnalysisService.run_analysis(db, context)
             
         except Exception as e:
             logger.error(f"配置分析失败: {str(e)}")
@@ -134,10 +91,679 @@ class AnalysisService:
                     logger.error(f"关闭数据库会话失败: {str(e)}")
     
     @staticmethod
-    def _build_analysis_prompt(device: Device, backup: Backup, base_prompt: str, dimension: str) -> str:
-        """构建分析提示"""
-        prompt = f"""
-设备信息:
+    async def start_analysis(
+        db,
+        device_id: int,
+        backup_id: int,
+        dimensions: List[str] = None,
+        ai_config: Dict = None,
+        combined: Optional[bool] = None,
+        incremental: Optional[bool] = None
+    ) -> Dict:
+        """校验参数、构建各维度的分析提示并创建状态为 processing 的分析记录
+
+        返回 run_analysis 使用的分析上下文（record_id 为分析记录ID），参数无效时返回 success 为 False 的结果。
+        """
+        # 读取设备、备份、AI配置和提示词，构建各维度的分析提示
+        context = await run_db(
+            db, AnalysisService._prepare_analysis, device_id, backup_id, dimensions, ai_config, combined, incremental
+        )
+        if context["success"]:
+            context["device_id"] = device_id
+            context["backup_id"] = backup_id
+            context["record_id"] = await run_db(
+                db, AnalysisService._create_analysis_record, device_id, backup_id, context["dimensions"],
+                context["incremental"]["baseline_record_id"] if context["incremental"] else None
+            )
+        return context
+    
+    @staticmethod
+    async def run_analysis(
+        db,
+        context: Dict,
+        on_progress: Optional[Callable[[int], Awaitable[None]]] = None,
+        on_token: Optional[Callable[[str, str], Awaitable[None]]] = None
+    ) -> Dict:
+        """执行分析并逐个维度更新分析记录
+
+        每个维度完成后结果立即写入记录（on_progress 在写入后以记录ID调用），全部完成后记录状态改为
+        success（所有维度都失败时为 failed）并记录处理时间；出现异常时记录状态改为 failed。
+        提供 on_token 且启用了流式输出（analysis.stream，默认启用）时，逐个维度分析和分片分析的最终合并
+        以流式方式调用AI，生成的内容以 (维度, 文本片段) 实时回调。
+        增量分析时配置没有变化的维度直接沿用基准记录的结果，不调用AI。
+        """
+        started = time.monotonic()
+        record_id = context["record_id"]
+        ai_config = context["ai_config"]
+        prompts = context["prompts"]
+        cache_keys = context["cache_keys"]
+        write_lock = asyncio.Lock()
+        if not context["stream"]:
+            on_token = None
+        
+        async def report(dimension: str, success: bool, content: str):
+            # 同一个会话不能并发使用，结果写入串行执行
+            async with write_lock:
+                await run_db(db, AnalysisService._save_analysis_progress, record_id, {dimension: content})
+            if on_progress:
+                await on_progress(record_id)
+        
+        try:
+            # 先查找缓存，配置和提示词未变化的维度不再调用AI
+            cached = {}
+            if cache_keys:
+                hits = await run_db(db, analysis_cache.get_many, cache_keys.values())
+                cached = {dimension: hits[key] for dimension, key in cache_keys.items() if key in hits}
+            for dimension, content in cached.items():
+                await report(dimension, True, content)
+            reused = context["reused_results"]
+            for dimension, content in reused.items():
+                await report(dimension, True, content)
+            
+            remaining = {
+                dimension: prompt for dimension, prompt in prompts.items()
+                if dimension not in cached and dimension not in reused
+            }
+            fresh_results, failed = {}, set()
+            mode = "incremental" if context["incremental"] else "per_dimension"
+            
+            # 配置超出 token 预算：各片段分别分析后按维度合并
+            if context["chunks"] and remaining:
+                mode = "chunked"
+                fresh_results, failed = await AnalysisService._analyze_chunked(
+                    ai_config, context, {dimension: context["base_prompts"][dimension] for dimension in remaining},
+                    report, on_token
+                )
+                remaining = {}
+            
+            # 合并模式：一次调用分析所有未命中缓存的维度
+            if context["combined"] and len(remaining) > 1:
+                mode = "combined"
+                fresh_results = await AnalysisService._analyze_combined(
+                    ai_config,
+                    context["combined_header"],
+                    context["combined_subject"],
+                    {dimension: context["base_prompts"][dimension] for dimension in remaining},
+                    context["dimension_timeout"] * COMBINED_TIMEOUT_FACTOR
+                )
+                for dimension, content in fresh_results.items():
+                    await report(dimension, True, content)
+                remaining = {dimension: prompt for dimension, prompt in remaining.items() if dimension not in fresh_results}
+            
+            # 其余维度并发执行分析
+            if remaining:
+                results, failed = await AnalysisService._analyze_dimensions(
+                    ai_config, remaining, context["max_concurrency"], context["dimension_timeout"],
+                    on_result=report, on_token=on_token
+                )
+                fresh_results.update(results)
+            analysis_results = {
+                dimension: cached[dimension] if dimension in cached
+                else reused[dimension] if dimension in reused else fresh_results[dimension]
+                for dimension in context["base_prompts"]
+            }
+            
+            if cache_keys:
+                await run_db(db, analysis_cache.put_many, {
+                    cache_keys[dimension]: (dimension, content)
+                    for dimension, content in fresh_results.items() if dimension not in failed
+                }, ai_config.get("model"))
+            
+            # 所有维度都失败时分析记录为失败，部分维度失败时结果中保留各维度的错误信息
+            all_failed = bool(prompts) and failed >= set(prompts)
+            await run_db(
+                db, AnalysisService._finish_analysis_record, record_id, analysis_results,
+                "failed" if all_failed else "success", "所有维度分析失败" if all_failed else None,
+                time.monotonic() - started
+            )
+        except Exception as e:
+            logger.error(f"分析记录 {record_id} 执行失败: {str(e)}")
+            await run_db(
+                db, AnalysisService._finish_analysis_record, record_id, None,
+                "failed", f"分析失败: {str(e)}", time.monotonic() - started
+            )
+            raise
+        finally:
+            if on_progress:
+                await on_progress(record_id)
+        
+        return {
+            "success": True,
+            "message": "分析完成",
+            "data": analysis_results,
+            "record_id": record_id,
+            "cached_dimensions": list(cached),
+            "mode": mode,
+            "config_reduction": context["config_reduction"],
+            "chunks": len(context["chunks"]) if context["chunks"] else 0,
+            "incremental": context["incremental"]
+        }
+    
+    @staticmethod
+    async def _analyze_dimensions(
+        ai_config: Dict,
+        prompts: Dict[str, str],
+        max_concurrency: int = DEFAULT_MAX_CONCURRENT_DIMENSIONS,
+        timeout: Optional[float] = None,
+        params: Optional[Dict] = None,
+        on_result: Optional[Callable[[str, bool, str], Awaitable[None]]] = None,
+        on_token: Optional[Callable[[str, str], Awaitable[None]]] = None
+    ) -> Tuple[Dict[str, str], set]:
+        """并发分析各维度，返回 ({维度: 分析结果}, 失败的维度)，结果保持维度顺序
+
+        同时进行的AI调用数不超过 max_concurrency，每个维度的调用时间不超过 timeout 秒（默认使用AI配置的超时时间）。
+        单个维度失败或超时不影响其他维度，失败的维度记录错误信息，总耗时约等于最慢的维度。
+        params 为覆盖默认生成参数的AI调用参数，on_result 在每个维度完成时以 (维度, 是否成功, 结果) 调用，
+        提供 on_token 时以流式方式调用AI，生成的内容以 (维度, 文本片段) 实时回调。
+        """
+        timeout = timeout or ai_config.get('timeout') or DEFAULT_DIMENSION_TIMEOUT
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def analyze(dimension: str, analysis_prompt: str) -> Tuple[bool, str]:
+            async with semaphore:
+                outcome = await AnalysisService._analyze_dimension(
+                    ai_config, dimension, analysis_prompt, timeout, params,
+                    (lambda text: on_token(dimension, text)) if on_token else None
+                )
+            if on_result:
+                await on_result(dimension, *outcome)
+            return outcome
+        
+        outcomes = await asyncio.gather(*(analyze(dimension, prompt) for dimension, prompt in prompts.items()))
+        results = {dimension: content for dimension, (_, content) in zip(prompts, outcomes)}
+        failed = {dimension for dimension, (success, _) in zip(prompts, outcomes) if not success}
+        return results, failed
+    
+    @staticmethod
+    async def _analyze_dimension(
+        ai_config: Dict,
+        dimension: str,
+        analysis_prompt: str,
+        timeout: float,
+        params: Optional[Dict] = None,
+        on_token: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Tuple[bool, str]:
+        """分析单个维度，返回 (是否成功, 分析结果或错误信息)"""
+        try:
+            # 调用AI API（限流，可重试的失败按 auto_retry 重试，timeout 限制每次调用的时间）
+            if on_token:
+                call = lambda: AnalysisService._stream_ai_api(ai_config, analysis_prompt, on_token, params)
+            elif params:
+                call = lambda: AnalysisService._call_ai_api(ai_config, analysis_prompt, params)
+            else:
+                call = lambda: AnalysisService._call_ai_api(ai_config, analysis_prompt)
+            result = await call_with_retry(
+                ai_config, call, AnalysisService._estimate_request_tokens(analysis_prompt, params), timeout
+            )
+            
+            if result["success"]:
+                return True, result["content"]
+            return False, f"分析失败: {result['error']}"
+                
+        except asyncio.TimeoutError:
+            logger.error(f"维度 {dimension} AI API调用超时（{timeout}秒）")
+            return False, f"AI服务调用超时: 超过 {timeout} 秒"
+        except aiohttp.ClientError as e:
+            logger.error(f"维度 {dimension} AI API调用失败: {str(e)}")
+            return False, f"AI服务调用失败: {str(e)}"
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.error(f"维度 {dimension} 结果解析失败: {str(e)}")
+            return False, f"结果解析失败: {str(e)}"
+        except Exception as e:
+            logger.error(f"维度 {dimension} 分析失败: {str(e)}")
+            return False, f"分析异常: {str(e)}"
+    
+    @staticmethod
+    async def _analyze_combined(
+        ai_config: Dict,
+        header: str,
+        subject: str,
+        base_prompts: Dict[str, str],
+        timeout: float
+    ) -> Dict[str, str]:
+        """一次AI调用分析多个维度，返回成功解析的 {维度: 分析结果}（调用或解析失败时为空）"""
+        prompt = AnalysisService._build_combined_prompt(header, subject, base_prompts)
+        params = {
+            **AI_GENERATION_PARAMS,
+            "max_tokens": min(AI_GENERATION_PARAMS["max_tokens"] * len(base_prompts), COMBINED_MAX_TOKENS),
+            "response_format": {"type": "json_object"}
+        }
+        try:
+            result = await call_with_retry(
+                ai_config, lambda: AnalysisService._call_ai_api(ai_config, prompt, params),
+                AnalysisService._estimate_request_tokens(prompt, params), timeout
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"合并分析AI API调用超时（{timeout}秒），改为逐个维度分析")
+            return {}
+        if not result["success"]:
+            logger.warning(f"合并分析失败，改为逐个维度分析: {result['error']}")
+            return {}
+        
+        results = AnalysisService._parse_combined_result(result["content"], list(base_prompts))
+        missing = [dimension for dimension in base_prompts if dimension not in results]
+        if missing:
+            logger.warning(f"合并分析结果缺少维度 {missing}，这些维度将逐个分析")
+        return results
+    
+    @staticmethod
+    async def _analyze_chunked(
+        ai_config: Dict,
+        context: Dict,
+        base_prompts: Dict[str, str],
+        on_result: Optional[Callable[[str, bool, str], Awaitable[None]]] = None,
+        on_token: Optional[Callable[[str, str], Awaitable[None]]] = None
+    ) -> Tuple[Dict[str, str], set]:
+        """分片分析：各维度的每个配置片段并发分析，再按维度合并为完整报告
+
+        返回 ({维度: 分析结果}, 失败的维度)。部分片段失败时合并其余片段的结果并注明失败的片段，
+        所有片段都失败的维度记为失败。片段结果超出 token 预算时先分组合并，再做最终合并。
+        on_result 在每个维度得到最终结果时调用，on_token 用于流式输出最终合并的报告。
+        """
+        chunks = context["chunks"]
+        device_info = context["device_info"]
+        subject = context["combined_subject"]
+        budget = context["config_budget"]
+        
+        async def run(prompts: Dict, params: Optional[Dict] = None) -> Tuple[Dict, set]:
+            return await AnalysisService._analyze_dimensions(
+                ai_config, prompts, context["max_concurrency"], context["dimension_timeout"], params
+            )
+        
+        # map：所有维度的所有片段共用同一个并发上限
+        chunk_prompts = {}
+        for dimension, base_prompt in base_prompts.items():
+            for index, chunk in enumerate(chunks, 1):
+                chunk_prompts[(dimension, index)] = AnalysisService._build_chunk_prompt(
+                    device_info, subject, chunk, index, len(chunks), base_prompt, dimension
+                )
+        chunk_results, chunk_failed = await run(
+            chunk_prompts, {**AI_GENERATION_PARAMS, "max_tokens": CHUNK_MAX_TOKENS}
+        )
+        
+        findings = {dimension: [] for dimension in base_prompts}
+        failed_titles = {dimension: [] for dimension in base_prompts}
+        for (dimension, index), content in chunk_results.items():
+            title = chunks[index - 1]["title"]
+            if (dimension, index) in chunk_failed:
+                failed_titles[dimension].append(title)
+            else:
+                findings[dimension].append(f"【{title}】\n{content}")
+        
+        results, failed = {}, set()
+        for dimension, items in findings.items():
+            if not items:
+                logger.error(f"维度 {dimension} 的所有配置片段分析失败")
+                results[dimension] = f"分析失败: 所有配置片段分析失败（{chunk_results[(dimension, 1)]}）"
+                failed.add(dimension)
+                if on_result:
+                    await on_result(dimension, False, results[dimension])
+        
+        # 中间合并：片段结果过多时分组合并，直到可以一次完成最终合并
+        for _ in range(MAX_MERGE_ROUNDS):
+            groups = {}
+            for dimension, items in findings.items():
+                if dimension in failed or estimate_tokens("\n\n".join(items)) <= budget:
+                    continue
+                for group_index, group in enumerate(AnalysisService._group_findings(items, budget)):
+                    if len(group) > 1:
+                        groups[(dimension, group_index)] = group
+            if not groups:
+                break
+            merged, merge_failed = await run({
+                key: AnalysisService._build_merge_prompt(
+                    device_info, subject, base_prompts[key[0]], key[0], group, [], final=False
+                )
+                for key, group in groups.items()
+            })
+            for dimension in {dimension for dimension, _ in groups}:
+                grouped = AnalysisService._group_findings(findings[dimension], budget)
+                findings[dimension] = [
+                    merged[(dimension, group_index)]
+                    if (dimension, group_index) in merged and (dimension, group_index) not in merge_failed
+                    else "\n\n".join(group)
+                    for group_index, group in enumerate(grouped)
+                ]
+        
+        # reduce：每个维度合并为一份完整报告
+        final_prompts = {
+            dimension: AnalysisService._build_merge_prompt(
+                device_info, subject, base_prompts[dimension], dimension, items, failed_titles[dimension], final=True
+            )
+            for dimension, items in findings.items() if dimension not in failed
+        }
+        merged, merge_failed = await AnalysisService._analyze_dimensions(
+            ai_config, final_prompts, context["max_concurrency"], context["dimension_timeout"],
+            on_result=on_result, on_token=on_token
+        )
+        results.update(merged)
+        failed |= merge_failed
+        return {dimension: results[dimension] for dimension in base_prompts}, failed
+    
+    @staticmethod
+    def _group_findings(findings: List[str], budget: int) -> List[List[str]]:
+        """按 token 预算把片段分析结果依次分组（单个结果超出预算时单独成组）"""
+        groups, current, current_tokens = [], [], 0
+        for item in findings:
+            tokens = estimate_tokens(item)
+            if current and current_tokens + tokens > budget:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(item)
+            current_tokens += tokens
+        if current:
+            groups.append(current)
+        return groups
+    
+    @staticmethod
+    def _parse_combined_result(content: str, dimensions: List[str]) -> Dict[str, str]:
+        """解析合并分析返回的JSON对象，只保留请求的维度中内容不为空的结果"""
+        text = re.sub(r"^\s*```(?:json)?\s*|\s*```\s*$", "", content or "")
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            # 模型在JSON前后附加了说明文字
+            start, end = text.find("{"), text.rfind("}")
+            try:
+                data = json.loads(text[start:end + 1]) if 0 <= start < end else None
+            except json.JSONDecodeError:
+                data = None
+        if not isinstance(data, dict):
+            logger.warning("合并分析结果不是有效的JSON对象")
+            return {}
+        
+        results = {}
+        for dimension in dimensions:
+            value = data.get(dimension)
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value, ensure_ascii=False, indent=2)
+            if isinstance(value, str) and value.strip():
+                results[dimension] = value.strip()
+        return results
+    
+    @staticmethod
+    def _prepare_analysis(
+        db: Session,
+        device_id: int,
+        backup_id: int,
+        dimensions: Optional[List[str]],
+        ai_config: Optional[Dict],
+        combined: Optional[bool] = None,
+        incremental: Optional[bool] = None
+    ) -> Dict:
+        """读取分析所需的数据并构建各维度的分析提示（同步，由 run_db 调用）"""
+        # 获取设备和备份信息
+        device = db.query(Device).filter(Device.id == device_id).first()
+        backup = ArchiveService.find_backup(db, backup_id)
+        
+        if not device or not backup:
+            return {"success": False, "message": "设备或备份不存在"}
+        
+        # 获取AI配置
+        if ai_config is None:
+            # 如果没有提供AI配置，从数据库获取
+            db_ai_config = db.query(AIConfig).first()
+            if not db_ai_config:
+                return {"success": False, "message": "AI配置不存在"}
+            ai_config = {
+                "provider": db_ai_config.provider,
+                "api_key": db_ai_config.api_key,
+                "model": db_ai_config.model,
+                "base_url": db_ai_config.base_url,
+                "timeout": db_ai_config.timeout,
+                "enable_cache": db_ai_config.enable_cache,
+                "auto_retry": db_ai_config.auto_retry
+            }
+        
+        # 获取分析提示词
+        prompts = db.query(AnalysisPrompt).all()
+        prompt_dict = {p.dimension: p.content for p in prompts}
+        
+        # 如果没有指定维度，使用所有可用维度
+        if not dimensions:
+            dimensions = list(prompt_dict.keys())
+        
+        # 验证维度是否有效
+        valid_dimensions = list(prompt_dict.keys())
+        invalid_dimensions = [d for d in dimensions if d not in valid_dimensions]
+        if invalid_dimensions:
+            return {"success": False, "message": f"无效的分析维度: {invalid_dimensions}"}
+        
+        # 精简配置内容（去掉无关内容、合并相同的接口配置），控制发送给AI的 token 数
+        config_content, reduction, chunks = AnalysisService._reduce_config_content(backup.content)
+        
+        # 构建分析提示（在会话内完成，之后不再访问ORM对象）
+        analysis_prompts = {}
+        base_prompts = {}
+        cache_keys = {}
+        use_cache = ai_config.get("enable_cache", True) is not False
+        for dimension in dimensions:
+            prompt = prompt_dict.get(dimension)
+            if not prompt:
+                logger.warning(f"维度 {dimension} 没有对应的提示词")
+                continue
+            analysis_prompts[dimension] = AnalysisService._build_analysis_prompt(
+                device, backup, prompt, dimension, config_content
+            )
+            base_prompts[dimension] = prompt
+            if use_cache:
+                # 缓存键不包含备份时间和文件大小，配置未变化的新备份可以命中缓存
+                cache_prompt = "\n".join([
+                    SYSTEM_PROMPT, dimension, prompt, device.name, device.ip_address,
+                    str(device.protocol), backup.backup_type
+                ])
+                cache_keys[dimension] = build_cache_key(config_content, cache_prompt, ai_config, AI_GENERATION_PARAMS)
+        
+        # 增量分析：只发送相对基准记录变化的配置段和上次的分析结果，变化过大或没有可用的基准时完整分析
+        incremental_info, reused_results = None, {}
+        if ConfigManager.get_config('analysis', 'incremental', False) if incremental is None else incremental:
+            plan = AnalysisService._plan_incremental(db, device, backup, base_prompts)
+            if plan:
+                incremental_info, reused_results = plan["info"], plan["reused"]
+                analysis_prompts, chunks, cache_keys = plan["prompts"], None, {}
+        
+        return {
+            "success": True,
+            "ai_config": ai_config,
+            "dimensions": dimensions,
+            "prompts": analysis_prompts,
+            "cache_keys": cache_keys,
+            "base_prompts": base_prompts,
+            "combined": incremental_info is None and bool(
+                ConfigManager.get_config('analysis', 'combined_mode', False) if combined is None else combined
+            ),
+            "incremental": incremental_info,
+            "reused_results": reused_results,
+            "stream": bool(ConfigManager.get_config('analysis', 'stream', True)),
+            "combined_header": AnalysisService._build_prompt_header(device, backup, config_content),
+            "config_reduction": reduction,
+            "chunks": chunks,
+            "config_budget": int(ConfigManager.get_config('analysis', 'max_config_tokens', DEFAULT_MAX_CONFIG_TOKENS)),
+            "device_info": AnalysisService._build_device_info(device, backup),
+            "combined_subject": f"{device.name}的{backup.backup_type}配置",
+            # 并发分析的配置在这里读取（可能查询数据库），不在事件循环中读取
+            "max_concurrency": int(ConfigManager.get_config(
+                'analysis', 'max_concurrent_dimensions', DEFAULT_MAX_CONCURRENT_DIMENSIONS
+            )),
+            "dimension_timeout": float(ConfigManager.get_config(
+                'analysis', 'dimension_timeout', ai_config.get('timeout') or DEFAULT_DIMENSION_TIMEOUT
+            ))
+        }
+    
+    @staticmethod
+    def _reduce_config_content(content: Optional[str]) -> Tuple[str, Optional[Dict], Optional[List[Dict]]]:
+        """按系统配置精简配置内容，返回 (配置内容, 精简统计, 配置片段)
+
+        未启用精简时统计为 None。配置（精简后）超过 analysis.max_config_tokens 时，启用分片
+        （analysis.chunking，默认启用）则按配置段切分为片段分别分析，否则截断。
+        """
+        max_tokens = int(ConfigManager.get_config('analysis', 'max_config_tokens', DEFAULT_MAX_CONFIG_TOKENS))
+        chunking = bool(ConfigManager.get_config('analysis', 'chunking', True))
+        reduction = None
+        config_content = content or ""
+        if ConfigManager.get_config('analysis', 'reduce_config', True):
+            reduction = reduce_config(content, None if chunking else max_tokens)
+            config_content = reduction.pop("content")
+            if reduction["truncated_lines"]:
+                logger.warning(
+                    f"配置精简后仍超过 {max_tokens} tokens，已省略 {reduction['truncated_lines']} 行"
+                )
+        
+        chunks = None
+        if chunking and estimate_tokens(config_content) > max_tokens:
+            chunks = split_config_sections(config_content, max_tokens)
+            logger.info(f"配置超过 {max_tokens} tokens，已按配置段切分为 {len(chunks)} 个片段分析")
+        return config_content, reduction, chunks
+    
+    @staticmethod
+    def _find_incremental_baseline(
+        db: Session, device_id: int, dimensions: List[str]
+    ) -> Optional[Tuple[AnalysisRecord, Backup, Dict[str, str]]]:
+        """查找设备最近一次所有指定维度都分析成功、备份仍然存在的分析记录，返回 (记录, 备份, {维度: 结果})"""
+        records = db.query(AnalysisRecord).filter(
+            AnalysisRecord.device_id == device_id,
+            AnalysisRecord.status == "success"
+        ).order_by(
+            AnalysisRecord.created_at.desc(), AnalysisRecord.id.desc()
+        ).limit(INCREMENTAL_BASELINE_CANDIDATES).all()
+        
+        for record in records:
+            results = AnalysisService._load_result(record.result)
+            previous = {dimension: results.get(dimension) for dimension in dimensions}
+            if any(
+                not isinstance(content, str) or not content.strip() or content.startswith(FAILED_RESULT_PREFIXES)
+                for content in previous.values()
+            ):
+                continue
+            baseline_backup = ArchiveService.find_backup(db, record.backup_id) if record.backup_id else None
+            if baseline_backup is None or not baseline_backup.content:
+                continue
+            return record, baseline_backup, previous
+        return None
+    
+    @staticmethod
+    def _plan_incremental(
+        db: Session, device: Device, backup: Backup, base_prompts: Dict[str, str]
+    ) -> Optional[Dict]:
+        """规划增量分析，返回 {info, prompts, reused}，没有可用的基准或配置变化过大时返回 None
+
+        配置没有变化时 prompts 为空，reused 为沿用的基准记录结果；否则 prompts 为各维度的增量分析提示，
+        只包含变化的配置段（和少量上下文）以及该维度上次的分析结果，token 数与变化的大小成正比。
+        """
+        baseline = AnalysisService._find_incremental_baseline(db, device.id, list(base_prompts))
+        if baseline is None:
+            logger.info(f"设备 {device.name} 没有可作为基准的分析记录，进行完整分析")
+            return None
+        record, baseline_backup, previous = baseline
+        
+        diff = diff_config(baseline_backup.content, backup.content)
+        # 差异和完整配置按相同方式计算（不合并接口），精简后的配置合并了相同接口，不能直接比较
+        config_tokens = diff["config_tokens"]
+        max_ratio = float(ConfigManager.get_config('analysis', 'incremental_max_ratio', DEFAULT_INCREMENTAL_MAX_RATIO))
+        max_tokens = int(ConfigManager.get_config('analysis', 'max_config_tokens', DEFAULT_MAX_CONFIG_TOKENS))
+        if diff["tokens"] > config_tokens * max_ratio or diff["tokens"] > max_tokens:
+            logger.info(
+                f"设备 {device.name} 的配置相对分析记录 {record.id} 变化较大"
+                f"（{diff['tokens']} / {config_tokens} tokens），进行完整分析"
+            )
+            return None
+        
+        info = {
+            "baseline_record_id": record.id,
+            "baseline_backup_id": baseline_backup.id,
+            "changed_sections": len(diff["changes"]),
+            "changed_lines": diff["changed_lines"],
+            "diff_tokens": diff["tokens"],
+            "config_tokens": config_tokens
+        }
+        if not diff["changes"]:
+            logger.info(f"设备 {device.name} 的配置相对分析记录 {record.id} 没有变化，沿用上次的分析结果")
+            return {"info": info, "prompts": {}, "reused": previous}
+        
+        logger.info(
+            f"增量分析设备 {device.name}: 基准记录 {record.id}，{len(diff['changes'])} 个配置段变化"
+            f"（{diff['tokens']} / {config_tokens} tokens）"
+        )
+        device_info = AnalysisService._build_device_info(device, backup)
+        subject = f"{device.name}的{backup.backup_type}配置"
+        prompts = {
+            dimension: AnalysisService._build_incremental_prompt(
+                device_info, subject, base_prompt, dimension, previous[dimension],
+                baseline_backup.created_at, diff["content"]
+            )
+            for dimension, base_prompt in base_prompts.items()
+        }
+        return {"info": info, "prompts": prompts, "reused": {}}
+    
+    @staticmethod
+    def _create_analysis_record(
+        db: Session,
+        device_id: int,
+        backup_id: int,
+        dimensions: List[str],
+        baseline_record_id: Optional[int] = None
+    ) -> int:
+        """创建状态为 processing 的分析记录，返回记录ID（同步，由 run_db 调用）"""
+        analysis_record = AnalysisRecord(
+            device_id=device_id,
+            backup_id=backup_id,
+            dimensions=dimensions,  # 保存选中的维度
+            baseline_record_id=baseline_record_id,
+            status="processing",
+            result=json.dumps({}, ensure_ascii=False),
+            created_at=datetime.now()
+        )
+        db.add(analysis_record)
+        db.commit()
+        return analysis_record.id
+    
+    @staticmethod
+    def _save_analysis_progress(db: Session, record_id: int, results: Dict[str, str]):
+        """把已完成维度的结果写入分析记录（同步，由 run_db 调用）"""
+        record = db.query(AnalysisRecord).filter(AnalysisRecord.id == record_id).first()
+        if not record:
+            return
+        record.result = json.dumps(
+            {**AnalysisService._load_result(record.result), **results}, ensure_ascii=False
+        )
+        db.commit()
+    
+    @staticmethod
+    def _finish_analysis_record(
+        db: Session,
+        record_id: int,
+        analysis_results: Optional[Dict],
+        status: str,
+        error_message: Optional[str],
+        elapsed: float
+    ):
+        """记录分析的最终结果、状态和处理时间（同步，由 run_db 调用）"""
+        record = db.query(AnalysisRecord).filter(AnalysisRecord.id == record_id).first()
+        if not record:
+            return
+        if analysis_results is not None:
+            record.result = json.dumps(analysis_results, ensure_ascii=False)
+        record.status = status
+        record.error_message = error_message
+        record.processing_time = int(round(elapsed))
+        db.commit()
+    
+    @staticmethod
+    def _load_result(result) -> Dict:
+        """解析分析记录中保存的结果（JSON 字符串或字典）"""
+        if not result:
+            return {}
+        if isinstance(result, str):
+            try:
+                result = json.loads(result)
+            except json.JSONDecodeError:
+                return {}
+        return result if isinstance(result, dict) else {}
+    
+    @staticmethod
+    def _build_device_info(device: Device, backup: Backup) -> str:
+        """构建分析提示中的设备和备份信息"""
+        return f"""设备信息:
 - 名称: {device.name}
 - IP地址: {device.ip_address}
 - 协议: {device.protocol}
@@ -145,10 +771,23 @@ class AnalysisService:
 备份信息:
 - 类型: {backup.backup_type}
 - 创建时间: {backup.created_at}
-- 文件大小: {backup.file_size} bytes
+- 文件大小: {backup.file_size} bytes"""
+    
+    @staticmethod
+    def _build_prompt_header(device: Device, backup: Backup, content: Optional[str] = None) -> str:
+        """构建分析提示中的设备、备份信息和配置内容（content 为精简后的配置，默认使用备份原文）"""
+        return f"""{AnalysisService._build_device_info(device, backup)}
 
 配置内容:
-{backup.content}
+{backup.content if content is None else content}"""
+    
+    @staticmethod
+    def _build_analysis_prompt(
+        device: Device, backup: Backup, base_prompt: str, dimension: str, content: Optional[str] = None
+    ) -> str:
+        """构建分析提示"""
+        prompt = f"""
+{AnalysisService._build_prompt_header(device, backup, content)}
 
 分析要求:
 {base_prompt}
@@ -158,8 +797,164 @@ class AnalysisService:
         return prompt.strip()
     
     @staticmethod
-    async def _call_ai_api(ai_config: Dict, prompt: str) -> Dict:
-        """调用AI API"""
+    def _build_combined_prompt(header: str, subject: str, base_prompts: Dict[str, str]) -> str:
+        """构建一次分析多个维度的提示（配置内容只出现一次）"""
+        requirements = "\n\n".join(f"### {dimension}\n{prompt}" for dimension, prompt in base_prompts.items())
+        keys = ", ".join(base_prompts)
+        prompt = f"""
+{header}
+
+请针对{subject}，分别从以下维度进行分析，每个维度提供详细的分析报告和改进建议。
+
+{requirements}
+
+只输出一个JSON对象，不要输出其他内容。JSON对象的键为上面的维度标识（{keys}），值为该维度的分析报告（Markdown格式的字符串）。
+"""
+        return prompt.strip()
+    
+    @staticmethod
+    def _build_chunk_prompt(
+        device_info: str, subject: str, chunk: Dict, index: int, total: int, base_prompt: str, dimension: str
+    ) -> str:
+        """构建分析单个配置片段的提示"""
+        prompt = f"""
+{device_info}
+
+配置片段 {index}/{total}（{chunk['title']}）:
+{chunk['content']}
+
+分析要求:
+{base_prompt}
+
+这是{subject}的一部分（共 {total} 个片段），请只针对本片段从{dimension}维度进行分析，简要列出发现的问题和改进建议；本片段中没有相关内容时回复"无相关问题"。
+"""
+        return prompt.strip()
+    
+    @staticmethod
+    def _build_merge_prompt(
+        device_info: str, subject: str, base_prompt: str, dimension: str, findings: List[str],
+        failed_titles: List[str], final: bool
+    ) -> str:
+        """构建合并各配置片段分析结果的提示（final 为 False 时是中间合并，只需去重汇总）"""
+        joined = "\n\n".join(findings)
+        failed_note = f"\n\n以下配置片段分析失败，未包含在上述结果中: {', '.join(failed_titles)}" if failed_titles else ""
+        if final:
+            instruction = f"请综合以上结果，针对{subject}从{dimension}维度给出完整的分析报告和改进建议，去掉重复的内容。"
+        else:
+            instruction = "请合并以上结果，保留所有问题和改进建议，去掉重复的内容，不需要写成完整报告。"
+        prompt = f"""
+{device_info}
+
+分析要求:
+{base_prompt}
+
+{subject}较大，已按配置段切分后分别分析，以下是各片段的分析结果:
+
+{joined}{failed_note}
+
+{instruction}
+"""
+        return prompt.strip()
+    
+    @staticmethod
+    def _build_incremental_prompt(
+        device_info: str, subject: str, base_prompt: str, dimension: str, previous: str,
+        baseline_time: Optional[datetime], diff_content: str
+    ) -> str:
+        """构建增量分析的提示（上次的分析结果加变化的配置段）"""
+        prompt = f"""
+{device_info}
+
+分析要求:
+{base_prompt}
+
+上次分析（{baseline_time} 的备份）从{dimension}维度得出的分析结果:
+{previous}
+
+此后配置的变化（只列出变化的配置段，"+" 开头为新增的行，"-" 开头为删除的行，其余为上下文，"..." 表示省略的未变化内容）:
+{diff_content}
+
+请根据以上配置变化更新上次的分析结果：保留仍然适用的问题，去掉已经解决的问题，补充配置变化引入的新问题，针对{subject}从{dimension}维度给出更新后的完整分析报告和改进建议。
+"""
+        return prompt.strip()
+    
+    @staticmethod
+    def _estimate_request_tokens(prompt: str, params: Optional[Dict] = None) -> int:
+        """估算一次AI调用消耗的 token 数（提示加最大输出长度），用于按每分钟 token 数限流"""
+        return estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prompt) + (params or AI_GENERATION_PARAMS)["max_tokens"]
+    
+    @staticmethod
+    async def _stream_ai_api(
+        ai_config: Dict,
+        prompt: str,
+        on_token: Callable[[str], Awaitable[None]],
+        params: Optional[Dict] = None
+    ) -> Dict:
+        """以流式方式调用AI API（stream: true），每收到一段生成内容调用 on_token，返回完整结果
+
+        返回值与 _call_ai_api 相同；服务端不支持流式输出而返回普通JSON响应时，整段内容回调一次。
+        """
+        try:
+            headers = {
+                "Authorization": f"Bearer {ai_config['api_key']}",
+                "Content-Type": "application/json",
+                "Accept": "text/event-stream"
+            }
+            
+            data = {
+                "model": ai_config['model'],
+                "messages": [
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                **(params or AI_GENERATION_PARAMS),
+                "stream": True
+            }
+            parts = []
+            
+            session = http_client_pool.get_session(ai_config['base_url'])
+            async with session.post(
+                f"{ai_config['base_url']}/chat/completions",
+                headers=headers,
+                json=data,
+                timeout=aiohttp.ClientTimeout(total=ai_config['timeout'])
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    return failure(
+                        f"API调用失败: {response.status} - {error_text}", response.status,
+                        parse_retry_after(response.headers.get("Retry-After"))
+                    )
+                
+                if response.content_type != "text/event-stream":
+                    result = await response.json(content_type=None)
+                    content = result["choices"][0]["message"]["content"]
+                    await on_token(content)
+                    return {"success": True, "content": content}
+                
+                async for raw_line in response.content:
+                    line = raw_line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[len("data:"):].strip()
+                    if payload == "[DONE]":
+                        break
+                    choices = json.loads(payload).get("choices") or []
+                    text = (choices[0].get("delta") or {}).get("content") if choices else None
+                    if text:
+                        parts.append(text)
+                        await on_token(text)
+                return {"success": True, "content": "".join(parts)}
+                    
+        except aiohttp.ClientConnectionError as e:
+            # 已经输出部分内容后不再重试，避免重复输出
+            return failure(f"AI服务连接失败: {str(e)}", retryable=not parts)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    @staticmethod
+    async def _call_ai_api(ai_config: Dict, prompt: str, params: Optional[Dict] = None) -> Dict:
+        """调用AI API（params 覆盖默认的生成参数）"""
         try:
             headers = {
                 "Authorization": f"Bearer {ai_config['api_key']}",
@@ -169,73 +964,113 @@ class AnalysisService:
             data = {
                 "model": ai_config['model'],
                 "messages": [
-                    {"role": "system", "content": "你是一个专业的网络设备配置分析专家。"},
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
-                "max_tokens": 2000,
-                "temperature": 0.7
+                **(params or AI_GENERATION_PARAMS)
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{ai_config['base_url']}/chat/completions",
-                    headers=headers,
-                    json=data,
-                    timeout=aiohttp.ClientTimeout(total=ai_config['timeout'])
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        content = result["choices"][0]["message"]["content"]
-                        return {"success": True, "content": content}
-                    else:
-                        error_text = await response.text()
-                        return {"success": False, "error": f"API调用失败: {response.status} - {error_text}"}
-                        
+            session = http_client_pool.get_session(ai_config['base_url'])
+            async with session.post(
+                f"{ai_config['base_url']}/chat/completions",
+                headers=headers,
+                json=data,
+                timeout=aiohttp.ClientTimeout(total=ai_config['timeout'])
+            ) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    content = result["choices"][0]["message"]["content"]
+                    return {"success": True, "content": content}
+                else:
+                    error_text = await response.text()
+                    return failure(
+                        f"API调用失败: {response.status} - {error_text}", response.status,
+                        parse_retry_after(response.headers.get("Retry-After"))
+                    )
+                    
+        except aiohttp.ClientConnectionError as e:
+            return failure(f"AI服务连接失败: {str(e)}", retryable=True)
         except Exception as e:
             return {"success": False, "error": str(e)}
     
     @staticmethod
-    def get_analysis_history(db: Session = None) -> List[Dict]:
+    def get_analysis_history(db: Session = None, limit: int = 50) -> List[Dict]:
         """获取分析历史"""
         try:
             if db is None:
                 db = next(get_db())
-            
-            from ..models import Device, Backup
-            
-            # 使用join查询获取设备和备份信息
-            records = db.query(
-                AnalysisRecord,
-                Device.name.label('device_name'),
-                Device.ip_address.label('device_ip'),
-                Backup.backup_type.label('backup_type'),
-                Backup.created_at.label('backup_created_at')
-            ).join(
-                Device, AnalysisRecord.device_id == Device.id
-            ).join(
-                Backup, AnalysisRecord.backup_id == Backup.id
-            ).order_by(AnalysisRecord.created_at.desc()).limit(50).all()
-            
-            return [
-                {
-                    "id": record.AnalysisRecord.id,
-                    "device_id": record.AnalysisRecord.device_id,
-                    "backup_id": record.AnalysisRecord.backup_id,
-                    "device_name": record.device_name,
-                    "device_ip": record.device_ip,
-                    "backup_type": record.backup_type,
-                    "backup_created_at": record.backup_created_at.isoformat() if record.backup_created_at else None,
-                    "dimensions": record.AnalysisRecord.dimensions,  # 返回选中的维度
-                    "result": json.loads(record.AnalysisRecord.result) if record.AnalysisRecord.result else {},
-                    "created_at": record.AnalysisRecord.created_at.isoformat() if record.AnalysisRecord.created_at else None
-                }
-                for record in records
-            ]
-            
+            return AnalysisService.get_analysis_history_page(db, limit=limit)[0]
         except Exception as e:
             logger.error(f"获取分析历史失败: {str(e)}")
             return []
     
+    @staticmethod
+    def get_analysis_history_page(
+        db: Session,
+        device_id: Optional[int] = None,
+        status: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        include_result: bool = True,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """按游标分页获取分析历史（最新记录在前），返回 (记录列表, 下一页游标)
+
+        include_result 为 False 时不读取和解析分析结果，适合只展示列表的场景。
+        """
+        from ..models import Device, Backup, BackupArchive
+        
+        # 使用join查询获取设备和备份信息（分析的备份可能已归档）
+        query = db.query(
+            AnalysisRecord,
+            Device.name.label('device_name'),
+            Device.ip_address.label('device_ip'),
+            func.coalesce(Backup.backup_type, BackupArchive.backup_type).label('backup_type'),
+            func.coalesce(Backup.created_at, BackupArchive.created_at).label('backup_created_at')
+        ).join(
+            Device, AnalysisRecord.device_id == Device.id
+        ).outerjoin(
+            Backup, AnalysisRecord.backup_id == Backup.id
+        ).outerjoin(
+            BackupArchive, AnalysisRecord.backup_id == BackupArchive.id
+        ).filter(or_(Backup.id.isnot(None), BackupArchive.id.isnot(None)))
+        if not include_result:
+            query = query.options(defer(AnalysisRecord.result))
+        if device_id:
+            query = query.filter(AnalysisRecord.device_id == device_id)
+        if status:
+            query = query.filter(AnalysisRecord.status == status)
+        if created_after:
+            query = query.filter(AnalysisRecord.created_at >= created_after)
+        if created_before:
+            query = query.filter(AnalysisRecord.created_at < created_before)
+        
+        records, next_cursor = paginate(
+            query, AnalysisRecord.created_at, AnalysisRecord.id, cursor=cursor, limit=limit,
+            key_func=lambda row: (row.AnalysisRecord.created_at, row.AnalysisRecord.id)
+        )
+        
+        history = []
+        for record in records:
+            item = {
+                "id": record.AnalysisRecord.id,
+                "device_id": record.AnalysisRecord.device_id,
+                "backup_id": record.AnalysisRecord.backup_id,
+                "device_name": record.device_name,
+                "device_ip": record.device_ip,
+                "backup_type": record.backup_type,
+                "backup_created_at": record.backup_created_at.isoformat() if record.backup_created_at else None,
+                "dimensions": record.AnalysisRecord.dimensions,  # 返回选中的维度
+                "status": record.AnalysisRecord.status,
+                "baseline_record_id": record.AnalysisRecord.baseline_record_id,
+                "created_at": record.AnalysisRecord.created_at.isoformat() if record.AnalysisRecord.created_at else None
+            }
+            if include_result:
+                item["result"] = json.loads(record.AnalysisRecord.result) if record.AnalysisRecord.result else {}
+            history.append(item)
+        return history, next_cursor
+    
     @staticmethod
     def get_analysis_result(record_id: int, db: Session = None) -> Dict:
         """获取分析结果"""
@@ -255,6 +1090,7 @@ class AnalysisService:
                     "device_id": record.device_id,
                     "backup_id": record.backup_id,
                     "dimensions": record.dimensions,
+                    "baseline_record_id": record.baseline_record_id,
                     "result": json.loads(record.result) if record.result else {},
                     "created_at": record.created_at.isoformat() if record.created_at else None
                 }
@@ -264,6 +1100,58 @@ class AnalysisService:
             logger.error(f"获取分析结果失败: {str(e)}")
             return {"success": False, "message": f"获取分析结果失败: {str(e)}"}
     
+    @staticmethod
+    def get_analysis_job(db: Session, record_id: int) -> Optional[Dict]:
+        """获取分析任务的状态和进度（已完成维度的结果在分析过程中即可读取），记录不存在时返回 None"""
+        record = db.query(AnalysisRecord).filter(AnalysisRecord.id == record_id).first()
+        if not record:
+            return None
+        
+        results = AnalysisService._load_result(record.result)
+        dimensions = record.dimensions or list(results)
+        completed = [dimension for dimension in dimensions if dimension in results]
+        return {
+            "job_id": record.id,
+            "record_id": record.id,
+            "device_id": record.device_id,
+            "backup_id": record.backup_id,
+            "status": record.status,
+            "baseline_record_id": record.baseline_record_id,
+            "dimensions": dimensions,
+            "completed_dimensions": completed,
+            "progress": {
+                "completed": len(completed),
+                "total": len(dimensions),
+                "percent": round(len(completed) * 100 / len(dimensions)) if dimensions else 100
+            },
+            "data": results,
+            "error_message": record.error_message,
+            "processing_time": record.processing_time,
+            "created_at": record.created_at.isoformat() if record.created_at else None
+        }
+    
+    @staticmethod
+    def recover_interrupted_analyses(db: Session, stale_after: int, now: Optional[datetime] = None) -> int:
+        """处理服务重启后遗留的 processing 分析记录，返回标记为失败的记录数
+
+        所有维度都已有结果的记录（包括旧版本保存的记录）改为 success；创建时间超过 stale_after 秒
+        仍未完成的记录视为已中断，改为 failed。未超时的记录可能仍在其他进程中执行，保持不变。
+        """
+        cutoff = (now or datetime.now()).timestamp() - stale_after
+        interrupted = 0
+        for record in db.query(AnalysisRecord).filter(AnalysisRecord.status == "processing").all():
+            results = AnalysisService._load_result(record.result)
+            if record.dimensions and all(dimension in results for dimension in record.dimensions):
+                record.status = "success"
+            elif record.created_at is None or record.created_at.timestamp() < cutoff:
+                record.status = "failed"
+                record.error_message = "分析任务已中断（服务重启）"
+                interrupted += 1
+        db.commit()
+        if interrupted:
+            logger.warning(f"已将 {interrupted} 个中断的分析任务标记为失败")
+        return interrupted
+    
     @staticmethod
     def initialize_default_prompts(db: Session = None) -> bool:
         """初始化默认提示词"""
@@ -0,0 +1,119 @@
+"""
+备份归档 - 把超过归档期限的备份记录从 backups 移到 backups_archive
+
+backups 表只保留近期的备份（热数据），列表、统计和保留期清理等常用查询只扫描较小的热表和索引，
+数据库的工作集可以留在页缓存中。归档由调度主节点定期分批执行，每批一个短事务；
+备份历史查询自动合并归档表，按ID读取单条备份时自动回退到归档表。
+归档记录保留原备份ID，backups 的ID不会复用（SQLite 使用 AUTOINCREMENT，见迁移 5；PostgreSQL 使用序列）。
+归档只是移动记录，备份统计计数（backup_stats）保持不变。
+保留期清理会删除超过 backup_retention_days 的备份，归档期限不超过保留天数的一半，备份在删除前先进入归档表。
+被分析记录引用的备份保留在热表中，分析历史仍可关联到备份。
+"""
+
+from sqlalchemy import DateTime, exists, literal, select
+from sqlalchemy.orm import Session
+from ..models import AnalysisRecord, Backup, BackupArchive
+from .config_manager import ConfigManager
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 每批归档的备份数
+ARCHIVE_BATCH_SIZE = 500
+# 单次归档最多移动的备份数，避免长时间占用调度线程
+ARCHIVE_MAX_ROWS_PER_RUN = 50000
+
+# 归档期限最多为备份保留天数的该比例
+ARCHIVE_RETENTION_RATIO = 0.5
+
+# 归档时从 backups 复制的字段（与 backups_archive 同名）
+ARCHIVE_COLUMNS = [column.name for column in Backup.__table__.columns]
+
+class ArchiveService:
+    """备份归档服务"""
+
+    @staticmethod
+    def get_archive_after_days() -> int:
+        """实际归档天数：archive_after_days 与保留天数一半中的较小值，0 表示不归档"""
+        archive_after_days = int(ConfigManager.get_config('backup', 'archive_after_days', 90))
+        retention_days = int(ConfigManager.get_config('backup', 'backup_retention_days', 30))
+        if archive_after_days <= 0 or retention_days <= 0:
+            return max(archive_after_days, 0)
+        return min(archive_after_days, max(1, int(retention_days * ARCHIVE_RETENTION_RATIO)))
+
+    @staticmethod
+    def get_archive_cutoff(now: Optional[datetime] = None) -> Optional[datetime]:
+        """早于该时间的备份需要归档（归档天数配置为0时不归档，返回 None）"""
+        archive_after_days = ArchiveService.get_archive_after_days()
+        if archive_after_days <= 0:
+            return None
+        return (now or datetime.now()) - timedelta(days=archive_after_days)
+
+    @staticmethod
+    def archive_old_backups(
+        db: Session,
+        now: Optional[datetime] = None,
+        cutoff: Optional[datetime] = None,
+        batch_size: int = ARCHIVE_BATCH_SIZE,
+        max_rows: int = ARCHIVE_MAX_ROWS_PER_RUN
+    ) -> Dict:
+        """把早于 cutoff 的备份分批移到归档表，返回 {archived, cutoff}"""
+        now = now or datetime.now()
+        cutoff = cutoff or ArchiveService.get_archive_cutoff(now)
+        if cutoff is None:
+            return {"archived": 0, "cutoff": None}
+
+        referenced = exists().where(AnalysisRecord.backup_id == Backup.id)
+        backups = Backup.__table__
+        archived = 0
+        while archived < max_rows:
+            ids = [row.id for row in db.query(Backup.id).filter(
+                Backup.created_at < cutoff, ~referenced
+            ).order_by(Backup.created_at, Backup.id).limit(min(batch_size, max_rows - archived))]
+            if not ids:
+                break
+
+            try:
+                db.execute(BackupArchive.__table__.insert().from_select(
+                    ARCHIVE_COLUMNS + ["archived_at"],
+                    select(*[backups.c[name] for name in ARCHIVE_COLUMNS], literal(now, DateTime))
+                    .where(backups.c.id.in_(ids))
+                ))
+                db.query(Backup).filter(Backup.id.in_(ids)).delete(synchronize_session=False)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            archived += len(ids)
+
+        if archived:
+            logger.info(f"已归档 {archived} 条 {cutoff.strftime('%Y-%m-%d %H:%M:%S')} 之前的备份记录")
+        return {"archived": archived, "cutoff": cutoff.isoformat()}
+
+    @staticmethod
+    def find_backup(db: Session, backup_id: int) -> Optional[Union[Backup, BackupArchive]]:
+        """按ID查找备份，热表中不存在时查找归档表"""
+        backup = db.query(Backup).filter(Backup.id == backup_id).first()
+        if backup is None:
+            backup = db.query(BackupArchive).filter(BackupArchive.id == backup_id).first()
+        return backup
+
+    @staticmethod
+    def get_status(db: Session, now: Optional[datetime] = None) -> Dict:
+        """热表和归档表的记录数及归档配置"""
+        cutoff = ArchiveService.get_archive_cutoff(now)
+        pending = 0
+        if cutoff is not None:
+            referenced = exists().where(AnalysisRecord.backup_id == Backup.id)
+            pending = db.query(Backup.id).filter(Backup.created_at < cutoff, ~referenced).count()
+        oldest_archived = db.query(BackupArchive.created_at).order_by(BackupArchive.created_at).first()
+        return {
+            "archive_after_days": ArchiveService.get_archive_after_days(),
+            "cutoff": cutoff.isoformat() if cutoff else None,
+            "hot_count": db.query(Backup.id).count(),
+            "archived_count": db.query(BackupArchive.id).count(),
+            "pending_count": pending,
+            "oldest_archived_at": oldest_archived[0].isoformat() if oldest_archived else None
+        }
@@ -14,24 +14,87 @@ import shutil
 import logging
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from ..models import Device, Backup, Config
+from ..models import Device, Backup, BackupArchive, Config, Strategy, AnalysisRecord
 from ..database import get_db
 import paramiko
 import socket
 import time
 import threading
-from typing import List, Dict, Optional
+from typing import Iterable, List, Dict, Optional, Tuple
+from ..pagination import paginate, paginate_union
+from .stats_service import StatsService, ID_CHUNK_SIZE
+from .file_deleter import file_deleter
+from sqlalchemy import and_, func, literal, select, union_all
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 单飞（single-flight）控制：同一设备同一备份类型的并发请求共享同一次备份执行
+_inflight_backups = {}
+_inflight_lock = threading.Lock()
+# 同一设备的不同备份类型串行执行，避免同时建立多个SSH会话；没有使用者时移除
+_device_locks = {}
+
+class _DeviceLock:
+    """设备级互斥锁，记录使用者数量"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+
+class _InFlightBackup:
+    """正在执行中的备份，供后到的请求等待并共享结果"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+def _backup_filters(
+    model,
+    device_id: Optional[int],
+    status: Optional[str],
+    backup_type: Optional[str],
+    created_after: Optional[datetime],
+    created_before: Optional[datetime]
+) -> List:
+    """备份列表的过滤条件（备份表和归档表共用）"""
+    conditions = []
+    if device_id:
+        conditions.append(model.device_id == device_id)
+    if status:
+        conditions.append(model.status == status)
+    if backup_type:
+        conditions.append(model.backup_type == backup_type)
+    if created_after:
+        conditions.append(model.created_at >= created_after)
+    if created_before:
+        conditions.append(model.created_at < created_before)
+    return conditions
+
+def _backup_list_item(row) -> Dict:
+    """把备份列表查询的结果行转换为列表项"""
+    return {
+        "id": row.id,
+        "device_id": row.device_id,
+        "backup_type": row.backup_type,
+        "status": row.status,
+        "file_path": row.file_path,
+        "file_size": row.file_size,
+        "created_at": row.created_at,
+        "archived": bool(row.archived),
+        "device": {"id": row.device_id, "name": row.device_name, "ip_address": row.device_ip_address}
+    }
+
 class BackupService:
     @staticmethod
     def create_backup(db: Session, backup: BackupCreate) -> Backup:
         """创建备份记录"""
         db_backup = Backup(**backup.model_dump())
+        db_backup.created_at = db_backup.created_at or datetime.now()
+        db_backup.status = db_backup.status or "pending"
         db.add(db_backup)
+        StatsService.record_created(db, db_backup)
         db.commit()
         db.refresh(db_backup)
         return db_backup
@@ -39,15 +102,102 @@ class BackupService:
     @staticmethod
     def get_backups(db: Session, device_id: Optional[int] = None, skip: int = 0, limit: int = 100):
         """获取备份记录（最新备份在前）"""
-        query = db.query(Backup).join(Device, Backup.device_id == Device.id)
-        if device_id:
-            query = query.filter(Backup.device_id == device_id)
-        # 按创建时间倒序排列，最新备份在前
-        return query.order_by(Backup.created_at.desc()).offset(skip).limit(limit).all()
+        return BackupService.get_backups_page(db, device_id=device_id, skip=skip, limit=limit)[0]
+    
+    @staticmethod
+    def get_backups_page(
+        db: Session,
+        device_id: Optional[int] = None,
+        status: Optional[str] = None,
+        backup_type: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Tuple[List[Backup], Optional[str]]:
+        """按游标分页获取热表中的备份记录（最新备份在前），返回 (备份列表, 下一页游标)"""
+        query = db.query(Backup).join(Device, Backup.device_id == Device.id).filter(*_backup_filters(
+            Backup, device_id, status, backup_type, created_after, created_before
+        ))
+        return paginate(query, Backup.created_at, Backup.id, cursor=cursor, limit=limit, skip=skip)
+    
+    @staticmethod
+    def get_backup_list_page(
+        db: Session,
+        device_id: Optional[int] = None,
+        status: Optional[str] = None,
+        backup_type: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """备份历史接口使用的分页查询，合并热表和归档表，只查询列表需要的字段，返回 (列表项, 下一页游标)
+
+        过滤和排序与 get_backups_page 相同，但不加载配置内容和完整的设备信息（含登录凭据），
+        结果为可直接序列化的字典（结构同 BackupListItem）。
+        """
+        def build_query(model):
+            return db.query(
+                model.id, model.device_id, model.backup_type, model.status, model.file_path,
+                model.file_size, model.created_at,
+                Device.name.label("device_name"), Device.ip_address.label("device_ip_address"),
+                literal(model is BackupArchive).label("archived")
+            ).join(Device, model.device_id == Device.id).filter(*_backup_filters(
+                model, device_id, status, backup_type, created_after, created_before
+            ))
+        
+        rows, next_cursor = paginate_union([
+            (build_query(Backup), Backup.created_at, Backup.id),
+            (build_query(BackupArchive), BackupArchive.created_at, BackupArchive.id),
+        ], cursor=cursor, limit=limit, skip=skip)
+        return [_backup_list_item(row) for row in rows], next_cursor
     
     @staticmethod
     def execute_backup(db: Session, device_id: int, backup_type: str) -> dict:
-        """执行备份操作"""
+        """执行备份操作
+
+        同一设备同一备份类型已有备份在执行时，不再建立新的SSH会话，
+        而是等待正在执行的备份完成并返回相同的结果。
+        """
+        key = (device_id, backup_type)
+        with _inflight_lock:
+            flight = _inflight_backups.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = _InFlightBackup()
+                _inflight_backups[key] = flight
+                device_lock = _device_locks.setdefault(device_id, _DeviceLock())
+                device_lock.users += 1
+        
+        if not is_leader:
+            logger.info(f"设备 {device_id} 的 {backup_type} 备份正在执行，等待其结果")
+            flight.done.wait()
+            result = dict(flight.result)
+            result["shared"] = True
+            return result
+        
+        try:
+            with device_lock.lock:
+                flight.result = BackupService._execute_backup(db, device_id, backup_type)
+        except Exception as e:
+            flight.result = {"success": False, "message": f"备份执行失败: {str(e)}"}
+            raise
+        finally:
+            with _inflight_lock:
+                _inflight_backups.pop(key, None)
+                device_lock.users -= 1
+                if device_lock.users == 0:
+                    _device_locks.pop(device_id, None)
+            flight.done.set()
+        
+        return flight.result
+    
+    @staticmethod
+    def _execute_backup(db: Session, device_id: int, backup_type: str) -> dict:
+        """执行备份操作（实际执行，调用方需保证同一设备不会并发进入）"""
         # 获取设备信息
         device = db.query(Device).filter(Device.id == device_id).first()
         if not device:
@@ -58,6 +208,7 @@ class BackupService:
         db_backup = BackupService.create_backup(db, backup)
         
         result = {"success": False, "message": "备份执行失败"}
+        old_status = db_backup.status
         
         try:
             # 执行备份
@@ -86,30 +237,35 @@ class BackupService:
                 db_backup.status = "failed"
                 db_backup.error_message = result["message"]
             
+            StatsService.record_status_change(db, db_backup, old_status)
             db.commit()
             
         except (ValueError, TypeError) as e:
             logger.error(f"备份执行参数错误: {str(e)}")
             db_backup.status = "failed"
             db_backup.error_message = f"参数错误: {str(e)}"
+            StatsService.record_status_change(db, db_backup, old_status)
             db.commit()
             result = {"success": False, "message": f"备份执行参数错误: {str(e)}"}
         except (ConnectionError, TimeoutError) as e:
             logger.error(f"备份连接失败: {str(e)}")
             db_backup.status = "failed"
             db_backup.error_message = f"连接失败: {str(e)}"
+            StatsService.record_status_change(db, db_backup, old_status)
             db.commit()
             result = {"success": False, "message": f"备份连接失败: {str(e)}"}
         except (OSError, IOError) as e:
             logger.error(f"备份文件操作失败: {str(e)}")
             db_backup.status = "failed"
             db_backup.error_message = f"文件操作失败: {str(e)}"
+            StatsService.record_status_change(db, db_backup, old_status)
             db.commit()
             result = {"success": False, "message": f"备份文件操作失败: {str(e)}"}
         except Exception as e:
             logger.error(f"备份执行失败: {str(e)}")
             db_backup.status = "failed"
             db_backup.error_message = str(e)
+            StatsService.record_status_change(db, db_backup, old_status)
             db.commit()
             result = {"success": False, "message": f"备份执行失败: {str(e)}"}
         
@@ -117,6 +273,7 @@ class BackupService:
         if not result.get("success", False) and not result.get("message"):
             result["message"] = "备份执行失败，请检查设备连接和命令配置"
         
+        result["backup_id"] = db_backup.id
 
         
         return result
@@ -130,11 +287,15 @@ class BackupService:
             if not device:
                 return
             
-            # 查找该设备的最新备份记录
-            latest_backup = db.query(Backup).filter(
-                Backup.device_id == device_id,
-                Backup.status == 'success'
-            ).order_by(Backup.created_at.desc()).first()
+            # 查找该设备的最新备份记录（成功的备份都已归档时查找归档表）
+            latest_backup = None
+            for model in (Backup, BackupArchive):
+                latest_backup = db.query(model).filter(
+                    model.device_id == device_id,
+                    model.status == 'success'
+                ).order_by(model.created_at.desc()).first()
+                if latest_backup:
+                    break
             
             if latest_backup:
                 # 更新设备的最近备份信息
@@ -152,6 +313,106 @@ class BackupService:
             logger.error(f"更新设备最近备份信息失败: {str(e)}")
             db.rollback()
     
+    @staticmethod
+    def refresh_last_backup_info(db: Session, device_ids: Iterable[int]) -> int:
+        """批量重新计算设备的最近备份信息（调用方负责提交），返回更新的设备数
+
+        每批设备用一条分组查询找出各自最新的成功备份（合并热表和归档表，成功的备份都已归档的设备
+        仍保留最近备份信息）。
+        """
+        device_ids = list(dict.fromkeys(device_id for device_id in device_ids if device_id is not None))
+        for start in range(0, len(device_ids), ID_CHUNK_SIZE):
+            chunk = device_ids[start:start + ID_CHUNK_SIZE]
+            successful = union_all(*(
+                select(model.device_id, model.id, model.created_at, model.backup_type).where(
+                    model.device_id.in_(chunk),
+                    model.status == 'success'
+                )
+                for model in (Backup, BackupArchive)
+            )).subquery()
+            latest = select(
+                successful.c.device_id,
+                func.max(successful.c.created_at).label('created_at')
+            ).group_by(successful.c.device_id).subquery()
+            rows = db.execute(select(successful).join(
+                latest,
+                and_(successful.c.device_id == latest.c.device_id, successful.c.created_at == latest.c.created_at)
+            )).all()
+            
+            # 同一时刻有多条成功备份时取ID最大的一条
+            latest_by_device = {}
+            for row in rows:
+                current = latest_by_device.get(row.device_id)
+                if current is None or row.id > current.id:
+                    latest_by_device[row.device_id] = row
+            
+            db.bulk_update_mappings(Device, [
+                {
+                    "id": device_id,
+                    "last_backup_time": latest_by_device[device_id].created_at if device_id in latest_by_device else None,
+                    "last_backup_type": latest_by_device[device_id].backup_type if device_id in latest_by_device else None
+                }
+                for device_id in chunk
+            ])
+        return len(device_ids)
+    
+    @staticmethod
+    def delete_backups(db: Session, backup_ids: Iterable[int]) -> dict:
+        """批量删除备份记录（热表或归档表中的备份）
+        
+        按批执行 DELETE ... WHERE id IN (...)，在同一事务中扣减统计计数、解除分析记录的关联、
+        重新计算受影响设备的最近备份信息；提交后由后台线程删除备份文件。
+        """
+        backup_ids = list(dict.fromkeys(backup_ids))
+        existing_ids = {Backup: [], BackupArchive: []}
+        file_paths = []
+        affected_devices = set()
+        remaining_ids = backup_ids
+        for model in (Backup, BackupArchive):
+            for start in range(0, len(remaining_ids), ID_CHUNK_SIZE):
+                chunk = remaining_ids[start:start + ID_CHUNK_SIZE]
+                for backup_id, device_id, file_path in db.query(
+                    model.id, model.device_id, model.file_path
+                ).filter(model.id.in_(chunk)):
+                    existing_ids[model].append(backup_id)
+                    affected_devices.add(device_id)
+                    if file_path:
+                        file_paths.append(file_path)
+            # 热表中不存在的ID再到归档表中查找
+            found = set(existing_ids[model])
+            remaining_ids = [backup_id for backup_id in remaining_ids if backup_id not in found]
+        deleted = len(existing_ids[Backup]) + len(existing_ids[BackupArchive])
+        
+        if deleted:
+            try:
+                for model, model_ids in existing_ids.items():
+                    if not model_ids:
+                        continue
+                    StatsService.record_deleted(db, model_ids, model=model)
+                    for start in range(0, len(model_ids), ID_CHUNK_SIZE):
+                        chunk = model_ids[start:start + ID_CHUNK_SIZE]
+                        if model is Backup:
+                            db.query(AnalysisRecord).filter(AnalysisRecord.backup_id.in_(chunk)).update(
+                                {AnalysisRecord.backup_id: None}, synchronize_session=False
+                            )
+                        db.query(model).filter(model.id.in_(chunk)).delete(synchronize_session=False)
+                BackupService.refresh_last_backup_info(db, affected_devices)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            # 已删除的备份对象不再保留在会话中
+            db.expire_all()
+            file_deleter.submit(file_paths)
+        
+        logger.info(f"已删除 {deleted} 条备份记录，{len(file_paths)} 个备份文件交由后台删除")
+        return {
+            "deleted": deleted,
+            "missing": len(backup_ids) - deleted,
+            "files": len(file_paths),
+            "devices": len(affected_devices)
+        }
+    
     @staticmethod
     def _perform_backup(device: Device, backup_type: str, backup_id: int) -> dict:
         """执行具体的备份操作"""
@@ -982,7 +1243,9 @@ class AutoBackupService:
     def perform_auto_backup():
         """执行自动备份"""
         logger.info("开始执行自动备份...")
+        from .job_queue_service import JobQueueService, PRIORITY_SCHEDULED
         
+        db = None
         try:
             # 获取数据库会话
             db = next(get_db())
@@ -1008,27 +1271,22 @@ class AutoBackupService:
                         logger.info(f"设备 {device.name} 没有活跃的备份策略")
                         continue
                     
-                    # 执行备份
+                    # 提交到备份任务队列，由工作线程执行
                     for strategy in strategies:
-                        result = BackupService.create_backup(
-                            db, device.id, strategy.backup_type, "auto"
+                        result = JobQueueService.submit(
+                            db,
+                            device.id,
+                            strategy.backup_type,
+                            priority=PRIORITY_SCHEDULED,
+                            source="auto"
                         )
-                        
-                        if result["success"]:
-                            backup_results.append({
-                                "device": device.name,
-                                "type": strategy.backup_type,
-                                "status": "success"
-                            })
-                            logger.info(f"设备 {device.name} 的 {strategy.backup_type} 备份成功")
-                        else:
-                            backup_results.append({
-                                "device": device.name,
-                                "type": strategy.backup_type,
-                                "status": "failed",
-                                "error": result["message"]
-                            })
-                            logger.error(f"设备 {device.name} 的 {strategy.backup_type} 备份失败: {result['message']}")
+                        backup_results.append({
+                            "device": device.name,
+                            "type": strategy.backup_type,
+                            "status": "queued",
+                            "job_id": result["job_id"]
+                        })
+                        logger.info(f"设备 {device.name} 的 {strategy.backup_type} 备份任务已提交: {result['job_id']}")
                 
                 except Exception as e:
                     logger.error(f"设备 {device.name} 自动备份异常: {str(e)}")
@@ -1045,12 +1303,32 @@ class AutoBackupService:
             # 清理旧备份
             AutoBackupService._cleanup_old_backups()
             
-            logger.info(f"自动备份完成，成功: {len([r for r in backup_results if r['status'] == 'success'])}，失败: {len([r for r in backup_results if r['status'] == 'failed'])}")
+            logger.info(f"自动备份任务提交完成，已提交: {len([r for r in backup_results if r['status'] == 'queued'])}，失败: {len([r for r in backup_results if r['status'] == 'failed'])}")
             
         except Exception as e:
             logger.error(f"自动备份执行失败: {str(e)}")
         finally:
-            db.close()
+            if db:
+                db.close()
+    
+    @staticmethod
+    def get_recent_auto_backups(db: Session, limit: int = 5) -> List[Dict]:
+        """获取最近的自动备份记录"""
+        recent_auto_backups = db.query(Backup).filter(
+            Backup.status == 'completed',
+            Backup.backup_type.like('%auto%')
+        ).order_by(Backup.created_at.desc()).limit(limit).all()
+        
+        return [
+            {
+                "id": backup.id,
+                "device_id": backup.device_id,
+                "backup_type": backup.backup_type,
+                "status": backup.status,
+                "created_at": backup.created_at.isoformat() if backup.created_at else None
+            }
+            for backup in recent_auto_backups
+        ]
     
     @staticmethod
     def _log_backup_results(results: List[Dict]):
@@ -1078,20 +1356,12 @@ class AutoBackupService:
             retention_days = ConfigManager.get_config('backup', 'backup_retention_days', 30)
             cutoff_date = datetime.now() - timedelta(days=int(retention_days))
             
-            # 清理数据库中的旧备份记录
+            # 清理数据库中的旧备份记录（包括已归档的备份）
             db = next(get_db())
-            old_backups = db.query(Backup).filter(Backup.created_at < cutoff_date).all()
-            
-            for backup in old_backups:
-                # 删除备份文件
-                if backup.file_path and os.path.exists(backup.file_path):
-                    os.remove(backup.file_path)
-                
-                # 删除数据库记录
-                db.delete(backup)
-            
-            db.commit()
-            logger.info(f"清理了 {len(old_backups)} 个旧备份")
+            old_ids = [row.id for row in db.query(Backup.id).filter(Backup.created_at < cutoff_date)]
+            old_ids += [row.id for row in db.query(BackupArchive.id).filter(BackupArchive.created_at < cutoff_date)]
+            result = BackupService.delete_backups(db, old_ids)
+            logger.info(f"清理了 {result['deleted']} 个旧备份")
             
         except Exception as e:
             logger.error(f"清理旧备份失败: {str(e)}")
@@ -0,0 +1,377 @@
+"""
+配置精简 - 发送给AI之前去掉配置中的无关内容，并把大量相同的接口配置合并为模板
+
+备份文件中的文件头、分隔符、注释、横幅和空行对分析没有帮助，接入交换机上几百个配置相同的接入端口
+也只需要分析一次。精简按厂商（Cisco 风格 / H3C、华为风格）处理：
+- 去掉 XConfKit 写入的文件头、命令回显和设备提示符、注释行和空行，连续的分隔行只保留一行；
+- 横幅（banner/header）内容替换为行数说明；
+- 除 description 外配置相同的接口合并为一个模板，并列出接口范围和数量。
+精简后仍超过 token 预算时，split_config_sections 按配置段（接口、路由、ACL、认证授权等）切分为
+不超过预算的片段分别分析；不分片时截断并注明省略的行数。token 数按字符估算（中文约1字1个token，
+其他字符约4个字符1个token），只用于预算控制，不要求与模型的分词结果完全一致。
+增量分析时 diff_config 按配置段比较两份配置，只输出变化的配置段和少量上下文。
+"""
+
+from typing import Dict, List, Optional, Tuple
+import difflib
+import re
+
+# 同一配置的接口达到该数量时合并为模板
+FOLD_MIN_INTERFACES = 3
+
+# XConfKit 保存备份文件时写入的文件头
+BACKUP_HEADER_PATTERN = re.compile(r"^#\s*(设备|备份类型|备份时间|备份ID)\s*:")
+SEPARATOR_PATTERN = re.compile(r"^[-=#!]{3,}\s*$")
+# 命令回显和设备提示符，如 <H3C>display current-configuration、[Huawei]、Switch#show run
+PROMPT_PATTERN = re.compile(r"^(<[^>]+>|\[[^\]]+\]|\S+#\s*(show|sh|display|dis)\b).*$", re.IGNORECASE)
+# 与配置本身无关、每次导出都会变化的行
+VOLATILE_PATTERNS = [
+    re.compile(r"^(Building configuration|Current configuration\s*:)", re.IGNORECASE),
+    re.compile(r"^ntp clock-period\b", re.IGNORECASE),
+]
+# 配置块之间的分隔行（H3C/华为的顶层命令同样有行首空格，只能按分隔行划分配置块）
+SECTION_SEPARATORS = ("!", "#")
+INTERFACE_PATTERN = re.compile(r"^interface\s+(\S+)", re.IGNORECASE)
+DESCRIPTION_PATTERN = re.compile(r"^\s*description\b", re.IGNORECASE)
+# 配置段分类（按第一行的命令判断），未匹配的归入"其他配置"
+SECTION_CATEGORIES = [
+    ("接口配置", re.compile(r"^\s*interface\b", re.IGNORECASE)),
+    ("路由配置", re.compile(
+        r"^\s*(router|ospf|ospfv3|bgp|rip|ripng|isis|ip route|ip route-static|ipv6 route|route-policy|"
+        r"route-map|ip prefix-list|ip ip-prefix|vrrp|ip vpn-instance)\b", re.IGNORECASE
+    )),
+    ("访问控制配置", re.compile(
+        r"^\s*(acl|access-list|ip access-list|ipv6 access-list|traffic classifier|traffic behavior|"
+        r"qos policy|traffic-policy|packet-filter|firewall)\b", re.IGNORECASE
+    )),
+    ("认证与管理配置", re.compile(
+        r"^\s*(aaa|local-user|username|radius|radius-server|hwtacacs|tacacs|tacacs-server|domain|"
+        r"user-interface|line|ssh|stelnet|snmp-agent|snmp-server|ntp|ntp-service|info-center|logging|"
+        r"enable|password|service)\b", re.IGNORECASE
+    )),
+]
+OTHER_CATEGORY = "其他配置"
+CJK_PATTERN = re.compile(r"[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]")
+# 配置段差异中保留的上下文行数
+DIFF_CONTEXT_LINES = 3
+DIFF_STATUS_LABELS = {"added": "新增", "removed": "删除", "modified": "修改"}
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """估算文本的 token 数"""
+    if not text:
+        return 0
+    cjk = len(CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+def detect_vendor(content: str) -> str:
+    """根据配置内容判断配置风格：cisco（! 分隔、hostname）或 comware（H3C/华为，# 分隔、sysname）"""
+    if re.search(r"^\s*sysname\s", content, re.MULTILINE):
+        return "comware"
+    if re.search(r"^\s*hostname\s", content, re.MULTILINE):
+        return "cisco"
+    return "generic"
+
+def _strip_banners(lines: List[str], vendor: str) -> List[str]:
+    """把横幅内容替换为行数说明（Cisco: banner motd ^C...^C，H3C/华为: header motd %...%）"""
+    keyword = "header" if vendor == "comware" else "banner"
+    pattern = re.compile(rf"^{keyword}\s+(\S+)\s*(.*)$", re.IGNORECASE)
+    result = []
+    index = 0
+    while index < len(lines):
+        match = pattern.match(lines[index])
+        if not match or not match.group(2):
+            result.append(lines[index])
+            index += 1
+            continue
+        # 横幅以第一个字符为定界符（^C 作为一个定界符），到再次出现定界符的行结束
+        rest = match.group(2)
+        delimiter = rest[:2] if rest.startswith("^C") else rest[0]
+        end = index
+        if delimiter not in rest[len(delimiter):]:
+            end = index + 1
+            while end < len(lines) and delimiter not in lines[end]:
+                end += 1
+        result.append(f"{keyword} {match.group(1)} <横幅内容已省略，{end - index + 1} 行>")
+        index = end + 1
+    return result
+
+def _strip_noise(content: str, vendor: str) -> List[str]:
+    """去掉文件头、提示符、注释和空行（单独的 ! / # 分隔行保留，用于划分配置块）"""
+    lines = []
+    for line in content.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        line = line.rstrip()
+        stripped = line.strip()
+        if stripped in SECTION_SEPARATORS:
+            lines.append(stripped)
+            continue
+        if not stripped or BACKUP_HEADER_PATTERN.match(stripped) or SEPARATOR_PATTERN.match(stripped):
+            continue
+        if stripped in ("return", "end") or (vendor == "cisco" and stripped.startswith("!")):
+            continue
+        if PROMPT_PATTERN.match(stripped) or any(pattern.match(stripped) for pattern in VOLATILE_PATTERNS):
+            continue
+        lines.append(line)
+    return _strip_banners(lines, vendor)
+
+def _split_interface_name(name: str) -> Tuple[str, Optional[int]]:
+    """GigabitEthernet1/0/12 -> ("GigabitEthernet1/0/", 12)"""
+    match = re.match(r"^(.*?)(\d+)$", name)
+    if not match:
+        return name, None
+    return match.group(1), int(match.group(2))
+
+def compress_interface_names(names: List[str]) -> str:
+    """把接口名压缩为范围，如 GigabitEthernet1/0/1-24, GigabitEthernet2/0/1"""
+    ranges = []
+    for name in names:
+        prefix, number = _split_interface_name(name)
+        if ranges and number is not None and ranges[-1][0] == prefix and ranges[-1][2] == number - 1:
+            ranges[-1][2] = number
+        else:
+            ranges.append([prefix, number, number])
+    return ", ".join(
+        prefix if start is None else f"{prefix}{start}" if start == end else f"{prefix}{start}-{end}"
+        for prefix, start, end in ranges
+    )
+
+def fold_interfaces(lines: List[str], min_count: int = FOLD_MIN_INTERFACES) -> Tuple[List[str], int]:
+    """合并除 description 外配置相同的接口，返回 (精简后的行, 被合并的接口数)"""
+    # 切分为 (接口名, 接口配置块) 或 (None, [普通行])
+    blocks = []
+    index = 0
+    while index < len(lines):
+        match = INTERFACE_PATTERN.match(lines[index])
+        if not match:
+            blocks.append((None, [lines[index]]))
+            index += 1
+            continue
+        end = index + 1
+        while end < len(lines) and lines[end][:1].isspace() and lines[end] not in SECTION_SEPARATORS:
+            end += 1
+        blocks.append((match.group(1), lines[index:end]))
+        index = end
+
+    groups: Dict[Tuple[str, ...], List[str]] = {}
+    for name, block in blocks:
+        if name is not None:
+            body = tuple(line for line in block[1:] if not DESCRIPTION_PATTERN.match(line))
+            groups.setdefault(body, []).append(name)
+
+    result = []
+    folded = 0
+    emitted = set()
+    for name, block in blocks:
+        if name is None:
+            result.extend(block)
+            continue
+        body = tuple(line for line in block[1:] if not DESCRIPTION_PATTERN.match(line))
+        members = groups[body]
+        if len(members) < min_count:
+            result.extend(block)
+            continue
+        if body in emitted:
+            continue
+        emitted.add(body)
+        folded += len(members)
+        result.append(f"interface {members[0]}")
+        result.append(f" ! 以下配置同样用于 {len(members)} 个接口（已省略 description）: {compress_interface_names(members)}")
+        result.extend(body)
+    return result, folded
+
+def _collapse_separators(lines: List[str]) -> List[str]:
+    """连续的分隔行只保留一行，去掉开头和结尾的分隔行"""
+    result = []
+    for line in lines:
+        if line in SECTION_SEPARATORS and (not result or result[-1] in SECTION_SEPARATORS):
+            continue
+        result.append(line)
+    if result and result[-1] in SECTION_SEPARATORS:
+        result.pop()
+    return result
+
+def _truncate(lines: List[str], max_tokens: int) -> Tuple[List[str], int]:
+    """截断到 token 预算以内，返回 (保留的行, 省略的行数)"""
+    kept = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    omitted = len(lines) - len(kept)
+    if omitted:
+        kept.append(f"...（配置过长，已省略剩余 {omitted} 行）")
+    return kept, omitted
+
+def reduce_config(content: Optional[str], max_tokens: Optional[int] = None) -> Dict:
+    """精简配置内容，返回精简结果和 token 统计
+
+    返回 {content, vendor, original_tokens, reduced_tokens, folded_interfaces, truncated_lines}。
+    max_tokens 为 None 或 0 时不截断。
+    """
+    content = content or ""
+    vendor = detect_vendor(content)
+    lines, folded = fold_interfaces(_strip_noise(content, vendor))
+    lines = _collapse_separators(lines)
+    truncated = 0
+    if max_tokens and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines, truncated = _truncate(lines, max_tokens)
+    reduced = "\n".join(lines)
+    return {
+        "content": reduced,
+        "vendor": vendor,
+        "original_tokens": estimate_tokens(content),
+        "reduced_tokens": estimate_tokens(reduced),
+        "folded_interfaces": folded,
+        "truncated_lines": truncated,
+    }
+
+def _section_category(first_line: str) -> str:
+    for category, pattern in SECTION_CATEGORIES:
+        if pattern.match(first_line):
+            return category
+    return OTHER_CATEGORY
+
+def _split_sections(lines: List[str]) -> List[List[str]]:
+    """按分隔行和顶格的命令切分配置段"""
+    sections = []
+    current: List[str] = []
+    for line in lines:
+        if line in SECTION_SEPARATORS or (line[:1] and not line[:1].isspace() and current):
+            if current:
+                sections.append(current)
+            current = [] if line in SECTION_SEPARATORS else [line]
+            continue
+        current.append(line)
+    if current:
+        sections.append(current)
+    return sections
+
+def split_config_sections(content: str, max_tokens: int) -> List[Dict]:
+    """把（精简后的）配置按配置段切分为不超过 max_tokens 的片段
+
+    同类配置段放在一起（接口、路由、访问控制、认证与管理、其他），按类别顺序输出；
+    单个配置段超过预算时按行切分。返回 [{title, content, tokens}, ...]。
+    """
+    lines = (content or "").split("\n")
+    separator = "!" if detect_vendor(content or "") == "cisco" else "#"
+    by_category: Dict[str, List[List[str]]] = {}
+    for section in _split_sections(lines):
+        by_category.setdefault(_section_category(section[0].strip()), []).append(section)
+
+    chunks = []
+    order = [category for category, _ in SECTION_CATEGORIES] + [OTHER_CATEGORY]
+    for category in order:
+        pieces: List[List[str]] = []
+        for section in by_category.get(category, []):
+            # 超过预算的配置段按行切分，后续部分重复配置段的第一行作为上下文
+            piece: List[str] = []
+            used = 0
+            for line in section:
+                cost = estimate_tokens(line) + 1
+                if piece and used + cost > max_tokens:
+                    pieces.append(piece)
+                    piece = [f"{section[0]} （续）"]
+                    used = estimate_tokens(piece[0]) + 1
+                piece.append(line)
+                used += cost
+            if piece:
+                pieces.append(piece)
+
+        current: List[str] = []
+        used = 0
+        for piece in pieces:
+            cost = estimate_tokens("\n".join(piece)) + 2
+            if current and used + cost > max_tokens:
+                chunks.append((category, current))
+                current, used = [], 0
+            if current:
+                current.append(separator)
+            current.extend(piece)
+            used += cost
+        if current:
+            chunks.append((category, current))
+
+    counts: Dict[str, int] = {}
+    totals = {category: sum(1 for name, _ in chunks if name == category) for category in order}
+    result = []
+    for category, chunk_lines in chunks:
+        counts[category] = counts.get(category, 0) + 1
+        title = category if totals[category] == 1 else f"{category}（{counts[category]}/{totals[category]}）"
+        chunk_content = "\n".join(chunk_lines)
+        result.append({"title": title, "content": chunk_content, "tokens": estimate_tokens(chunk_content)})
+    return result
+
+
+def _diff_lines(content: str) -> List[str]:
+    """去掉无关内容（不合并接口，单个接口的变化只影响该接口）"""
+    return _collapse_separators(_strip_noise(content, detect_vendor(content)))
+
+def _diff_sections(lines: List[str]) -> Dict[Tuple[str, int], List[str]]:
+    """按配置段切分，以 (第一行, 序号) 为键"""
+    sections: Dict[Tuple[str, int], List[str]] = {}
+    for section in _split_sections(lines):
+        header = section[0].strip()
+        index = 0
+        while (header, index) in sections:
+            index += 1
+        sections[(header, index)] = section
+    return sections
+
+def diff_config(old_content: Optional[str], new_content: Optional[str],
+                context_lines: int = DIFF_CONTEXT_LINES) -> Dict:
+    """按配置段比较两份配置，返回变化的配置段和差异文本
+
+    返回 {changes: [{title, category, status, diff}], changed_lines, content, tokens, config_tokens}。status 为
+    added / removed / modified；diff 中 "+" 为新增的行，"-" 为删除的行，修改的配置段保留第一行和
+    变化前后 context_lines 行作为上下文。content 为所有变化配置段的差异文本，配置没有变化时为空。
+    config_tokens 为新配置按相同方式（去掉无关内容、不合并接口）计算的 token 数，用于和 tokens 比较。
+    """
+    new_lines = _diff_lines(new_content or "")
+    old_sections = _diff_sections(_diff_lines(old_content or ""))
+    new_sections = _diff_sections(new_lines)
+
+    changes = []
+    changed_lines = 0
+    # 按新配置中的顺序输出，删除的配置段放在最后
+    for key in list(new_sections) + [key for key in old_sections if key not in new_sections]:
+        old, new = old_sections.get(key), new_sections.get(key)
+        if old == new:
+            continue
+        if old is None:
+            status, lines = "added", [f"+{line}" for line in new]
+        elif new is None:
+            status, lines = "removed", [f"-{line}" for line in old]
+        else:
+            status = "modified"
+            # 多处变化之间以 ... 分隔（不保留行号）
+            lines = [
+                " ..." if line.startswith("@@") else line
+                for line in difflib.unified_diff(old, new, n=context_lines, lineterm="")
+                if not line.startswith(("---", "+++"))
+            ]
+            if lines[1] == f" {new[0]}":
+                lines = lines[1:]
+            else:
+                # 变化不在第一行附近时补充配置段的第一行，说明变化属于哪个配置段
+                lines = [f" {new[0]}"] + lines
+        changed_lines += sum(1 for line in lines if line[:1] in "+-")
+        changes.append({
+            "title": key[0],
+            "category": _section_category(key[0]),
+            "status": status,
+            "diff": "\n".join(lines),
+        })
+
+    content = "\n\n".join(
+        f"[{DIFF_STATUS_LABELS[change['status']]}] {change['category']}: {change['title']}\n{change['diff']}"
+        for change in changes
+    )
+    return {
+        "changes": changes,
+        "changed_lines": changed_lines,
+        "content": content,
+        "tokens": estimate_tokens(content),
+        "config_tokens": estimate_tokens("\n".join(new_lines)),
+    }
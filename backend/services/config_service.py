@@ -67,6 +67,40 @@ class ConfigService:
         db.refresh(db_config)
         return db_config
 
+    @staticmethod
+    def set_config_value(db: Session, category: str, key: str, value: Any, data_type: str = "string") -> Config:
+        """设置配置值，配置项不存在时创建"""
+        stored = str(value).lower() if isinstance(value, bool) else str(value)
+        db_config = ConfigService.get_config(db, category, key)
+        if db_config:
+            db_config.value = stored
+            db_config.data_type = data_type
+        else:
+            db_config = Config(category=category, key=key, value=stored, data_type=data_type)
+            db.add(db_config)
+        
+        db.commit()
+        db.refresh(db_config)
+        return db_config
+
+    @staticmethod
+    def _convert_value(value: Optional[str], data_type: Optional[str]) -> Any:
+        """按数据类型转换配置值，无法转换时返回原值"""
+        if value is None:
+            return None
+        try:
+            if data_type == "boolean":
+                return value.strip().lower() in ("true", "1", "yes", "on")
+            if data_type == "integer":
+                return int(value)
+            if data_type == "float":
+                return float(value)
+            if data_type == "json":
+                return json.loads(value)
+        except (ValueError, TypeError):
+            return value
+        return value
+
     @staticmethod
     def batch_update_configs(db: Session, configs: List[Dict[str, str]]) -> Dict[str, Any]:
         """批量更新配置"""
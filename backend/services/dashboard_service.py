@@ -0,0 +1,146 @@
+"""
+仪表盘统计 - 在数据库中聚合设备、备份、策略和分析记录的统计数据
+
+仪表盘只获取统计结果和少量最近记录，不再下载完整列表在浏览器中计数。
+备份数量和字节数读取 backup_stats 统计表（见 stats_service）。
+"""
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session, joinedload, load_only
+from ..models import Device, Backup, Strategy, AnalysisRecord
+from .config_manager import ConfigManager
+from .stats_service import StatsService
+from datetime import datetime
+from typing import Dict, Optional
+import os
+import shutil
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 仪表盘展示的最近记录条数
+RECENT_LIMIT = 5
+
+BACKUP_SUCCESS_STATUSES = ("success", "completed")
+DEVICE_OFFLINE_STATUSES = ("failed", "unknown")
+
+class DashboardService:
+    """仪表盘统计服务"""
+
+    @staticmethod
+    def get_summary(db: Session, now: Optional[datetime] = None) -> Dict:
+        """获取仪表盘汇总数据"""
+        now = now or datetime.now()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        # 备份计数来自增量维护的统计表，不扫描 backups 表
+        backup_totals = StatsService.get_backup_totals(db, today=today.date())
+
+        return {
+            "devices": DashboardService._device_summary(db),
+            "backups": DashboardService._backup_summary(db, backup_totals),
+            "strategies": DashboardService._strategy_summary(db),
+            "analysis": DashboardService._analysis_summary(db, today),
+            "storage": DashboardService._storage_summary(backup_totals["total_bytes"]),
+            "generated_at": now.isoformat()
+        }
+
+    @staticmethod
+    def _device_summary(db: Session) -> Dict:
+        """设备总数及在线/离线数"""
+        total, online, offline = db.query(
+            func.count(Device.id),
+            func.coalesce(func.sum(case((Device.connection_status == "success", 1), else_=0)), 0),
+            func.coalesce(func.sum(case((Device.connection_status.in_(DEVICE_OFFLINE_STATUSES), 1), else_=0)), 0)
+        ).one()
+
+        recent = db.query(Device).options(
+            load_only(Device.id, Device.name, Device.ip_address, Device.connection_status, Device.created_at)
+        ).order_by(Device.created_at.desc(), Device.id.desc()).limit(RECENT_LIMIT).all()
+
+        return {
+            "total": total,
+            "online": online,
+            "offline": offline,
+            "recent": [
+                {
+                    "id": device.id,
+                    "name": device.name,
+                    "ip_address": device.ip_address,
+                    "connection_status": device.connection_status
+                }
+                for device in recent
+            ]
+        }
+
+    @staticmethod
+    def _backup_summary(db: Session, totals: Dict) -> Dict:
+        """备份总数、成功/失败数、今日备份数及最近备份"""
+        by_status = totals["by_status"]
+
+        # 最近备份不加载配置内容
+        recent = db.query(Backup).options(
+            load_only(Backup.id, Backup.device_id, Backup.backup_type, Backup.status,
+                      Backup.file_size, Backup.created_at),
+            joinedload(Backup.device).load_only(Device.id, Device.name)
+        ).order_by(Backup.created_at.desc(), Backup.id.desc()).limit(RECENT_LIMIT).all()
+
+        return {
+            "total": totals["total"],
+            "success": sum(by_status.get(status, 0) for status in BACKUP_SUCCESS_STATUSES),
+            "failed": by_status.get("failed", 0),
+            "today": totals["today"],
+            "last_backup_time": recent[0].created_at.isoformat() if recent and recent[0].created_at else None,
+            "recent": [
+                {
+                    "id": backup.id,
+                    "device_id": backup.device_id,
+                    "device": {"id": backup.device.id, "name": backup.device.name} if backup.device else None,
+                    "backup_type": backup.backup_type,
+                    "status": backup.status,
+                    "file_size": backup.file_size,
+                    "created_at": backup.created_at.isoformat() if backup.created_at else None
+                }
+                for backup in recent
+            ]
+        }
+
+    @staticmethod
+    def _strategy_summary(db: Session) -> Dict:
+        """策略总数及启用/禁用数"""
+        total, active = db.query(
+            func.count(Strategy.id),
+            func.coalesce(func.sum(case((Strategy.is_active == True, 1), else_=0)), 0)
+        ).one()
+        return {"total": total, "active": active, "inactive": total - active}
+
+    @staticmethod
+    def _analysis_summary(db: Session, today: datetime) -> Dict:
+        """分析记录总数及今日分析数"""
+        total = db.query(func.count(AnalysisRecord.id)).scalar()
+        today_count = db.query(func.count(AnalysisRecord.id)).filter(AnalysisRecord.created_at >= today).scalar()
+        return {"total": total, "today": today_count}
+
+    @staticmethod
+    def _storage_summary(backup_bytes: int) -> Dict:
+        """备份文件占用的字节数及备份目录所在磁盘的使用情况"""
+        storage_path = ConfigManager.get_config('backup', 'storage_path', 'data/backups')
+
+        summary = {
+            "storage_path": storage_path,
+            "backup_bytes": int(backup_bytes),
+            "disk_total_bytes": None,
+            "disk_free_bytes": None,
+            "disk_usage_percent": None
+        }
+        # 备份目录尚未创建时统计其上级目录所在磁盘
+        path = storage_path
+        while path and not os.path.exists(path):
+            path = os.path.dirname(path)
+        try:
+            usage = shutil.disk_usage(path or ".")
+            summary["disk_total_bytes"] = usage.total
+            summary["disk_free_bytes"] = usage.free
+            summary["disk_usage_percent"] = round(usage.used / usage.total * 100, 1) if usage.total else 0
+        except OSError as e:
+            logger.warning(f"获取备份目录磁盘使用情况失败: {str(e)}")
+        return summary
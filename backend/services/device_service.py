@@ -1,14 +1,15 @@
 from sqlalchemy.orm import Session
-from ..models import Device
+from ..models import Device, BackupArchive
 from ..schemas import DeviceCreate, DeviceUpdate
 import paramiko
 import socket
 import time
 import ping3
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
 from .config_manager import ConfigManager
+from ..pagination import paginate
 from threading import Lock
 
 # 全局会话管理器
@@ -33,7 +34,24 @@ class DeviceService:
     @staticmethod
     def get_devices(db: Session, skip: int = 0, limit: int = 100) -> List[Device]:
         """获取设备列表"""
-        return db.query(Device).offset(skip).limit(limit).all()
+        return DeviceService.get_devices_page(db, skip=skip, limit=limit)[0]
+    
+    @staticmethod
+    def get_devices_page(
+        db: Session,
+        connection_status: Optional[str] = None,
+        protocol: Optional[str] = None,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Tuple[List[Device], Optional[str]]:
+        """按游标分页获取设备列表（按添加顺序），返回 (设备列表, 下一页游标)"""
+        query = db.query(Device)
+        if connection_status:
+            query = query.filter(Device.connection_status == connection_status)
+        if protocol:
+            query = query.filter(Device.protocol == protocol)
+        return paginate(query, Device.created_at, Device.id, cursor=cursor, limit=limit, skip=skip, descending=False)
     
     @staticmethod
     def get_device(db: Session, device_id: int) -> Optional[Device]:
@@ -62,6 +80,10 @@ class DeviceService:
         if not db_device:
             return False
         
+        # 与 backups 一样保留归档的备份记录，只解除与设备的关联
+        db.query(BackupArchive).filter(BackupArchive.device_id == device_id).update(
+            {BackupArchive.device_id: None}, synchronize_session=False
+        )
         db.delete(db_device)
         db.commit()
         return True
@@ -0,0 +1,134 @@
+"""
+备份耗时预测 - 基于设备历史备份任务耗时，按最长任务优先（LPT）安排批量备份
+"""
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..models import BackupJob
+from .config_manager import ConfigManager
+from datetime import datetime, timedelta
+from statistics import median
+from typing import Dict, Iterable, List, Optional, Tuple
+import heapq
+
+# 每个设备/备份类型参与预测的最近成功任务数
+HISTORY_SIZE = 10
+
+class DurationService:
+    """备份耗时预测服务"""
+
+    @staticmethod
+    def get_default_duration() -> float:
+        """没有历史记录时使用的默认耗时（秒）"""
+        return float(ConfigManager.get_config('backup', 'default_job_duration', 60))
+
+    @staticmethod
+    def get_expected_durations(
+        db: Session,
+        keys: Iterable[Tuple[int, str]],
+        default_duration: Optional[float] = None
+    ) -> Dict[Tuple[int, str], float]:
+        """批量获取 (设备ID, 备份类型) 的预期耗时（秒）
+
+        取最近成功任务耗时的中位数；该类型没有记录时退化为设备所有类型的中位数，
+        设备没有任何记录时使用默认耗时。
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        device_ids = list({device_id for device_id, _ in keys})
+        # 按 (设备, 备份类型) 分别取最近的记录，避免任务多的设备挤占其他设备的历史
+        recent = db.query(
+            BackupJob.id,
+            BackupJob.device_id,
+            BackupJob.backup_type,
+            BackupJob.started_at,
+            BackupJob.finished_at,
+            func.row_number().over(
+                partition_by=(BackupJob.device_id, BackupJob.backup_type),
+                order_by=BackupJob.id.desc()
+            ).label("recency")
+        ).filter(
+            BackupJob.device_id.in_(device_ids),
+            BackupJob.status == "success",
+            BackupJob.started_at.isnot(None),
+            BackupJob.finished_at.isnot(None)
+        ).subquery()
+        rows = db.query(recent).filter(recent.c.recency <= HISTORY_SIZE).order_by(recent.c.id.desc()).all()
+
+        by_key: Dict[Tuple[int, str], List[float]] = {}
+        by_device: Dict[int, List[float]] = {}
+        for row in rows:
+            duration = (row.finished_at - row.started_at).total_seconds()
+            samples = by_key.setdefault((row.device_id, row.backup_type), [])
+            if len(samples) < HISTORY_SIZE:
+                samples.append(duration)
+            device_samples = by_device.setdefault(row.device_id, [])
+            if len(device_samples) < HISTORY_SIZE:
+                device_samples.append(duration)
+
+        if default_duration is None:
+            default_duration = DurationService.get_default_duration()
+        expected = {}
+        for key in keys:
+            samples = by_key.get(key) or by_device.get(key[0])
+            expected[key] = float(median(samples)) if samples else default_duration
+        return expected
+
+    @staticmethod
+    def order_longest_first(items: List, durations: Dict, key_func) -> List:
+        """按预期耗时从长到短排序（耗时相同时保持原顺序）"""
+        return sorted(items, key=lambda item: -durations.get(key_func(item), 0))
+
+    @staticmethod
+    def plan_batch(
+        db: Session,
+        items: List[Dict],
+        workers: Optional[int] = None,
+        start_time: Optional[datetime] = None
+    ) -> Dict:
+        """预测一批备份任务的执行计划和完成时间
+
+        items: [{"device_id": 1, "backup_type": "running-config"}, ...]
+        使用最长任务优先的列表调度：任务按预期耗时从长到短依次分配给最早空闲的工作线程。
+        """
+        if workers is None:
+            workers = int(ConfigManager.get_config('backup', 'max_concurrent_jobs', 4))
+        workers = max(1, workers)
+        start_time = start_time or datetime.now()
+
+        durations = DurationService.get_expected_durations(
+            db, [(item["device_id"], item["backup_type"]) for item in items]
+        )
+        ordered = DurationService.order_longest_first(
+            items, durations, lambda item: (item["device_id"], item["backup_type"])
+        )
+
+        # (空闲时刻偏移秒数, 工作线程编号)
+        free_at = [(0.0, index) for index in range(workers)]
+        heapq.heapify(free_at)
+        schedule = []
+        for item in ordered:
+            offset, worker = heapq.heappop(free_at)
+            duration = durations[(item["device_id"], item["backup_type"])]
+            schedule.append({
+                "device_id": item["device_id"],
+                "backup_type": item["backup_type"],
+                "worker": worker,
+                "expected_duration": round(duration, 1),
+                "predicted_start": (start_time + timedelta(seconds=offset)).isoformat(),
+                "predicted_finish": (start_time + timedelta(seconds=offset + duration)).isoformat()
+            })
+            heapq.heappush(free_at, (offset + duration, worker))
+
+        makespan = max((offset for offset, _ in free_at), default=0.0)
+        return {
+            "workers": workers,
+            "job_count": len(schedule),
+            "total_duration": round(sum(durations[(i["device_id"], i["backup_type"])] for i in items), 1),
+            "makespan": round(makespan, 1),
+            "start_time": start_time.isoformat(),
+            "predicted_completion": (start_time + timedelta(seconds=makespan)).isoformat(),
+            "schedule": schedule
+        }
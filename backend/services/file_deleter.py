@@ -0,0 +1,85 @@
+"""
+后台文件删除 - 批量删除备份记录后在后台线程中删除备份文件
+
+数据库记录在事务中集中删除，文件删除可能涉及大量磁盘操作，交给后台线程处理，
+接口无需等待。文件已不存在或删除失败时只记录日志，不影响数据库中的删除结果。
+"""
+
+from typing import Iterable, Optional
+import os
+import queue
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+class BackgroundFileDeleter:
+    """后台文件删除线程"""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.deleted_count = 0
+        self.failed_count = 0
+
+    def submit(self, paths: Iterable[str]) -> int:
+        """提交待删除的文件，返回提交数量"""
+        count = 0
+        for path in paths:
+            if path:
+                self._queue.put(path)
+                count += 1
+        if count:
+            self._ensure_started()
+        return count
+
+    def _ensure_started(self):
+        """首次提交时启动删除线程"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="backup-file-deleter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        """删除线程主循环，收到 None 时退出"""
+        while True:
+            path = self._queue.get()
+            try:
+                if path is None:
+                    return
+                self._delete(path)
+            finally:
+                self._queue.task_done()
+
+    def _delete(self, path: str):
+        """删除单个文件"""
+        try:
+            os.remove(path)
+            self.deleted_count += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.failed_count += 1
+            logger.warning(f"删除备份文件失败 {path}: {str(e)}")
+
+    def wait_idle(self):
+        """等待已提交的文件全部处理完"""
+        self._queue.join()
+
+    def stop(self):
+        """处理完剩余文件后停止删除线程"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout=30)
+
+
+# 全局删除器实例
+file_deleter = BackgroundFileDeleter()
+
+def stop_file_deleter():
+    """停止后台文件删除线程"""
+    file_deleter.stop()
@@ -0,0 +1,94 @@
+"""
+AI接口HTTP客户端 - 按 base_url 共享的 aiohttp 会话和连接池
+
+每个AI服务地址在应用运行期间共用一个 ClientSession，连接保持 keep-alive 并在请求之间复用，
+批量分析和多维度并发分析不再为每个请求重复进行DNS解析、TCP和TLS握手。
+会话与创建它的事件循环绑定，事件循环变化时关闭旧会话；应用关闭时调用 close_http_clients() 关闭所有会话。
+"""
+
+from typing import Dict, Set, Tuple
+import asyncio
+import os
+import logging
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# 每个服务地址的最大连接数（多维度并发分析和并发请求共用）
+AI_HTTP_POOL_SIZE = int(os.getenv("AI_HTTP_POOL_SIZE", "20"))
+# 空闲连接保持时间（秒）
+AI_HTTP_KEEPALIVE = float(os.getenv("AI_HTTP_KEEPALIVE", "60"))
+# DNS解析结果缓存时间（秒）
+AI_HTTP_DNS_CACHE_TTL = int(os.getenv("AI_HTTP_DNS_CACHE_TTL", "300"))
+
+class HTTPClientPool:
+    """按 base_url 管理共享的 aiohttp 会话"""
+
+    def __init__(self):
+        self._sessions: Dict[str, Tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession]] = {}
+        # 正在关闭的旧会话，保留引用直到关闭完成
+        self._closing: Set[asyncio.Future] = set()
+
+    def get_session(self, base_url: str) -> aiohttp.ClientSession:
+        """获取服务地址对应的会话（必须在事件循环中调用），不存在或已关闭时创建"""
+        key = base_url.rstrip("/")
+        loop = asyncio.get_running_loop()
+        entry = self._sessions.get(key)
+        if entry is not None:
+            session_loop, session = entry
+            if session_loop is loop and not session.closed:
+                return session
+            # 会话属于其他事件循环（如测试中多次 asyncio.run），无法在当前循环中复用
+            if session_loop is not loop:
+                if not session_loop.is_closed():
+                    logger.warning(f"AI接口会话属于其他事件循环，为当前事件循环重新创建: {key}")
+                self._close_detached(loop, session_loop, session)
+
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(
+            limit=AI_HTTP_POOL_SIZE,
+            limit_per_host=AI_HTTP_POOL_SIZE,
+            keepalive_timeout=AI_HTTP_KEEPALIVE,
+            ttl_dns_cache=AI_HTTP_DNS_CACHE_TTL
+        ))
+        self._sessions[key] = (loop, session)
+        logger.info(f"已创建AI接口连接池: {key}（最大连接数 {AI_HTTP_POOL_SIZE}）")
+        return session
+
+    def _close_detached(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        session_loop: asyncio.AbstractEventLoop,
+        session: aiohttp.ClientSession
+    ):
+        """关闭属于其他事件循环的会话"""
+        if session.closed:
+            return
+        if session_loop.is_closed():
+            # 原事件循环已结束，连接随之失效，在当前循环中释放连接器即可
+            future = loop.create_task(session.close())
+        else:
+            # 连接只能在原事件循环所在的线程中关闭
+            future = asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), session_loop), loop=loop)
+        self._closing.add(future)
+        future.add_done_callback(self._closing.discard)
+
+    async def close(self):
+        """关闭所有会话（其他事件循环中的会话交由其所在循环关闭）"""
+        loop = asyncio.get_running_loop()
+        for key, (session_loop, session) in list(self._sessions.items()):
+            if session_loop is loop:
+                if not session.closed:
+                    await session.close()
+            else:
+                self._close_detached(loop, session_loop, session)
+            self._sessions.pop(key, None)
+        pending = [future for future in self._closing if future.get_loop() is loop]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+# 全局AI接口HTTP客户端池
+http_client_pool = HTTPClientPool()
+
+async def close_http_clients():
+    """关闭所有AI接口会话（应用关闭时调用）"""
+    await http_client_pool.close()
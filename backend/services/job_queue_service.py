@@ -0,0 +1,206 @@
+"""
+备份任务队列 - 基于数据库的持久化优先级队列
+
+所有备份入口（手动备份、快速备份、策略执行、调度器）都只负责入队，
+由 job_worker 中的工作线程按优先级领取并执行。
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from ..models import BackupJob
+from datetime import datetime, timedelta
+from typing import List, Optional
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 任务优先级：交互式请求优先于调度任务
+PRIORITY_INTERACTIVE = 10
+PRIORITY_SCHEDULED = 0
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# 入队时唤醒本进程内的工作线程，避免等待轮询间隔
+job_available = threading.Event()
+
+class JobQueueService:
+    """备份任务队列服务"""
+
+    @staticmethod
+    def enqueue(
+        db: Session,
+        device_id: int,
+        backup_type: str,
+        priority: int = PRIORITY_INTERACTIVE,
+        source: str = "manual",
+        strategy_id: Optional[int] = None,
+        advance_strategy: bool = False,
+        now: Optional[datetime] = None
+    ) -> tuple[BackupJob, bool]:
+        """提交备份任务，返回 (任务, 是否为新建任务)
+
+        同一设备同一备份类型已有排队中/执行中的任务时不会重复入队，
+        而是复用已有任务（必要时提升其优先级）。
+        """
+        existing = JobQueueService.get_active_job(db, device_id, backup_type)
+        if existing:
+            return JobQueueService._merge_into(db, existing, priority, strategy_id, advance_strategy), False
+
+        job = BackupJob(
+            device_id=device_id,
+            backup_type=backup_type,
+            priority=priority,
+            source=source,
+            strategy_id=strategy_id,
+            advance_strategy=advance_strategy,
+            status="queued",
+            created_at=now or datetime.now()
+        )
+        db.add(job)
+        try:
+            db.commit()
+        except IntegrityError:
+            # 其他进程同时提交了相同任务，复用对方的任务
+            db.rollback()
+            existing = JobQueueService.get_active_job(db, device_id, backup_type)
+            if not existing:
+                raise
+            return JobQueueService._merge_into(db, existing, priority, strategy_id, advance_strategy), False
+
+        db.refresh(job)
+        job_available.set()
+        logger.info(f"备份任务已入队: 任务={job.id}, 设备={device_id}, 类型={backup_type}, 优先级={priority}")
+        return job, True
+
+    @staticmethod
+    def submit(db: Session, device_id: int, backup_type: str, **kwargs) -> dict:
+        """提交备份任务并返回接口响应数据"""
+        job, created = JobQueueService.enqueue(db, device_id, backup_type, **kwargs)
+        return {
+            "success": True,
+            "message": "备份任务已提交" if created else "相同的备份任务正在排队或执行中",
+            "job_id": job.id,
+            "status": job.status,
+            "deduplicated": not created
+        }
+
+    @staticmethod
+    def _merge_into(
+        db: Session,
+        job: BackupJob,
+        priority: int,
+        strategy_id: Optional[int],
+        advance_strategy: bool
+    ) -> BackupJob:
+        """将重复提交合并到已有任务"""
+        changed = False
+        if job.status == "queued" and priority > (job.priority or 0):
+            job.priority = priority
+            changed = True
+        if advance_strategy and not job.advance_strategy:
+            # 调度任务合并到手动任务时，保证策略在完成后仍会推进
+            job.strategy_id = strategy_id
+            job.advance_strategy = True
+            changed = True
+        if changed:
+            db.commit()
+            db.refresh(job)
+        logger.info(f"备份任务已存在，复用任务 {job.id} (设备={job.device_id}, 类型={job.backup_type})")
+        return job
+
+    @staticmethod
+    def get_active_job(db: Session, device_id: int, backup_type: str) -> Optional[BackupJob]:
+        """获取设备指定类型的排队中/执行中任务"""
+        return db.query(BackupJob).filter(
+            BackupJob.device_id == device_id,
+            BackupJob.backup_type == backup_type,
+            BackupJob.status.in_(ACTIVE_STATUSES)
+        ).first()
+
+    @staticmethod
+    def get_job(db: Session, job_id: int) -> Optional[BackupJob]:
+        """根据ID获取任务"""
+        return db.query(BackupJob).filter(BackupJob.id == job_id).first()
+
+    @staticmethod
+    def get_jobs(db: Session, status: Optional[str] = None, limit: int = 100) -> List[BackupJob]:
+        """获取任务列表（最新任务在前）"""
+        query = db.query(BackupJob)
+        if status:
+            query = query.filter(BackupJob.status == status)
+        return query.order_by(BackupJob.id.desc()).limit(limit).all()
+
+    @staticmethod
+    def claim_next(db: Session, worker_id: str, now: Optional[datetime] = None) -> Optional[BackupJob]:
+        """领取优先级最高的排队任务
+
+        通过带状态条件的UPDATE实现原子领取，多个进程并发领取时只有一个能成功。
+        """
+        for _ in range(5):
+            candidate = db.query(BackupJob.id).filter(
+                BackupJob.status == "queued"
+            ).order_by(BackupJob.priority.desc(), BackupJob.id.asc()).first()
+            if not candidate:
+                return None
+
+            claimed_at = now or datetime.now()
+            claimed = db.query(BackupJob).filter(
+                BackupJob.id == candidate.id,
+                BackupJob.status == "queued"
+            ).update({
+                BackupJob.status: "running",
+                BackupJob.worker_id: worker_id,
+                BackupJob.started_at: claimed_at,
+                BackupJob.heartbeat_at: claimed_at
+            }, synchronize_session=False)
+            db.commit()
+
+            if claimed == 1:
+                return JobQueueService.get_job(db, candidate.id)
+        return None
+
+    @staticmethod
+    def complete_job(db: Session, job_id: int, result: dict, now: Optional[datetime] = None) -> Optional[BackupJob]:
+        """记录任务执行结果"""
+        job = JobQueueService.get_job(db, job_id)
+        if not job:
+            return None
+
+        job.status = "success" if result.get("success") else "failed"
+        job.message = result.get("message")
+        job.backup_id = result.get("backup_id")
+        job.finished_at = now or datetime.now()
+        db.commit()
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def heartbeat(db: Session, job_ids: List[int]):
+        """刷新执行中任务的心跳时间"""
+        if not job_ids:
+            return
+        db.query(BackupJob).filter(
+            BackupJob.id.in_(job_ids),
+            BackupJob.status == "running"
+        ).update({BackupJob.heartbeat_at: datetime.now()}, synchronize_session=False)
+        db.commit()
+
+    @staticmethod
+    def requeue_stale_jobs(db: Session, stale_seconds: int) -> int:
+        """将心跳超时的执行中任务重新放回队列（工作进程崩溃后的恢复）"""
+        cutoff = datetime.now() - timedelta(seconds=stale_seconds)
+        count = db.query(BackupJob).filter(
+            BackupJob.status == "running",
+            BackupJob.heartbeat_at < cutoff
+        ).update({
+            BackupJob.status: "queued",
+            BackupJob.worker_id: None,
+            BackupJob.started_at: None,
+            BackupJob.heartbeat_at: None
+        }, synchronize_session=False)
+        db.commit()
+        if count:
+            logger.warning(f"已重新排队 {count} 个心跳超时的备份任务")
+            job_available.set()
+        return count
@@ -0,0 +1,215 @@
+"""
+备份统计计数 - 按设备、日期、状态增量维护备份数量和字节数
+
+备份记录的新增、状态变化和删除都在同一事务中累加到 backup_stats 表，
+仪表盘读取统计时只需查询少量计数行，而不是扫描整个 backups 表。
+device_id 为 0 的行是全部设备的合计（已删除设备遗留的备份也计入合计）。
+day 为 ALL_TIME 的行是不分日期的累计计数，与当天的行在同一次写入中更新，汇总总数时只需读取这一行。
+计数包含热表 backups 和归档表 backups_archive 中的备份（归档只移动记录，不改变计数）。
+计数出现偏差时（例如直接修改了数据库）可以通过 rebuild 从这两个表重建。
+"""
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from ..models import Backup, BackupArchive, BackupStat
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 合计行使用的设备ID
+ALL_DEVICES = 0
+
+# 累计行使用的日期
+ALL_TIME = date.min
+
+# 按ID查询时每批的数量，避免超过数据库的参数个数限制
+ID_CHUNK_SIZE = 500
+
+def _to_date(value) -> date:
+    """数据库日期函数的返回值统一转换为 date（SQLite 返回字符串）"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
+
+class StatsService:
+    """备份统计计数服务"""
+
+    @staticmethod
+    def apply_delta(
+        db: Session,
+        device_id: Optional[int],
+        created_at: Optional[datetime],
+        status: Optional[str],
+        count: int = 1,
+        size: int = 0
+    ):
+        """在当前事务中累加设备行和合计行的计数（不提交）"""
+        deltas: Dict[Tuple[int, date, str], List[int]] = {}
+        StatsService._add_delta(deltas, device_id, created_at, status, count, size)
+        StatsService.apply_deltas(db, deltas)
+
+    @staticmethod
+    def _add_delta(deltas: Dict, device_id: Optional[int], day, status: Optional[str], count: int, size: int):
+        """把一组变化累加到 {(设备ID, 日期, 状态): [数量, 字节数]}，同时计入合计行和累计行"""
+        day = _to_date(day or datetime.now())
+        status = status or "pending"
+        targets = [ALL_DEVICES] if device_id is None else [device_id, ALL_DEVICES]
+        for target in targets:
+            for target_day in (day, ALL_TIME):
+                entry = deltas.setdefault((target, target_day, status), [0, 0])
+                entry[0] += count
+                entry[1] += int(size or 0)
+
+    @staticmethod
+    def apply_deltas(db: Session, deltas: Dict[Tuple[int, date, str], List[int]]):
+        """批量累加计数，行不存在时插入（一条语句批量执行，不提交）"""
+        now = datetime.now()
+        rows = [
+            {"device_id": device_id, "day": day, "status": status,
+             "backup_count": count, "total_bytes": size, "updated_at": now}
+            for (device_id, day, status), (count, size) in deltas.items()
+            if count or size
+        ]
+        if not rows:
+            return
+
+        dialect = db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            statement = insert(BackupStat.__table__)
+            statement = statement.on_conflict_do_update(
+                index_elements=["device_id", "day", "status"],
+                set_={
+                    "backup_count": BackupStat.__table__.c.backup_count + statement.excluded.backup_count,
+                    "total_bytes": BackupStat.__table__.c.total_bytes + statement.excluded.total_bytes,
+                    "updated_at": statement.excluded.updated_at
+                }
+            )
+            db.execute(statement, rows)
+            return
+
+        # 其他数据库：逐行加锁读取后更新
+        for row in rows:
+            stat = db.query(BackupStat).filter(
+                BackupStat.device_id == row["device_id"],
+                BackupStat.day == row["day"],
+                BackupStat.status == row["status"]
+            ).with_for_update().first()
+            if stat:
+                stat.backup_count += row["backup_count"]
+                stat.total_bytes += row["total_bytes"]
+            else:
+                db.add(BackupStat(**row))
+                db.flush()
+
+    @staticmethod
+    def record_created(db: Session, backup: Backup):
+        """记录新增的备份（调用方负责提交）"""
+        StatsService.apply_delta(db, backup.device_id, backup.created_at, backup.status, 1, backup.file_size or 0)
+
+    @staticmethod
+    def record_status_change(db: Session, backup: Backup, old_status: str, old_size: int = 0):
+        """记录备份状态或文件大小的变化（调用方负责提交）"""
+        new_size = backup.file_size or 0
+        if backup.status == old_status and new_size == (old_size or 0):
+            return
+        deltas: Dict[Tuple[int, date, str], List[int]] = {}
+        StatsService._add_delta(deltas, backup.device_id, backup.created_at, old_status, -1, -(old_size or 0))
+        StatsService._add_delta(deltas, backup.device_id, backup.created_at, backup.status, 1, new_size)
+        StatsService.apply_deltas(db, deltas)
+
+    @staticmethod
+    def record_deleted(db: Session, backup_ids: Iterable[int], model=Backup) -> int:
+        """在删除备份之前扣减其计数（调用方负责删除和提交），返回扣减的备份数
+
+        model 为备份所在的表（Backup 或 BackupArchive）。
+        """
+        backup_ids = list(backup_ids)
+        deltas: Dict[Tuple[int, date, str], List[int]] = {}
+        removed = 0
+        for start in range(0, len(backup_ids), ID_CHUNK_SIZE):
+            chunk = backup_ids[start:start + ID_CHUNK_SIZE]
+            rows = db.query(
+                model.device_id,
+                func.date(model.created_at),
+                model.status,
+                func.count(model.id),
+                func.coalesce(func.sum(model.file_size), 0)
+            ).filter(model.id.in_(chunk)).group_by(
+                model.device_id, func.date(model.created_at), model.status
+            ).all()
+            for device_id, day, status, count, size in rows:
+                StatsService._add_delta(deltas, device_id, day, status, -count, -int(size))
+                removed += count
+        StatsService.apply_deltas(db, deltas)
+        return removed
+
+    @staticmethod
+    def rebuild(db: Session) -> Dict:
+        """根据 backups 和 backups_archive 表重建全部统计（修复计数偏差）"""
+        totals: Dict[Tuple[int, date, str], List[int]] = {}
+        for model in (Backup, BackupArchive):
+            rows = db.query(
+                model.device_id,
+                func.date(model.created_at),
+                model.status,
+                func.count(model.id),
+                func.coalesce(func.sum(model.file_size), 0)
+            ).group_by(model.device_id, func.date(model.created_at), model.status).all()
+            for device_id, day, status, count, size in rows:
+                StatsService._add_delta(totals, device_id, day, status, count, size)
+
+        db.query(BackupStat).delete(synchronize_session=False)
+        now = datetime.now()
+        db.bulk_insert_mappings(BackupStat, [
+            {
+                "device_id": device_id, "day": day, "status": status,
+                "backup_count": count, "total_bytes": size, "updated_at": now
+            }
+            for (device_id, day, status), (count, size) in totals.items()
+        ])
+        db.commit()
+
+        backup_count = sum(
+            count for (device_id, day, _), (count, _) in totals.items()
+            if device_id == ALL_DEVICES and day == ALL_TIME
+        )
+        logger.info(f"备份统计已重建: {len(totals)} 行统计, {backup_count} 个备份")
+        return {"stat_rows": len(totals), "backup_count": backup_count}
+
+    @staticmethod
+    def get_backup_totals(db: Session, device_id: Optional[int] = None, today: Optional[date] = None) -> Dict:
+        """汇总备份数量：总数、按状态计数、今日数量和字节数"""
+        target = ALL_DEVICES if device_id is None else device_id
+        today = today or date.today()
+        # 只读取累计行和今天（及之后）的行，与统计的天数无关
+        rows = db.query(
+            BackupStat.day, BackupStat.status, BackupStat.backup_count, BackupStat.total_bytes
+        ).filter(
+            BackupStat.device_id == target,
+            or_(BackupStat.day == ALL_TIME, BackupStat.day >= today)
+        ).all()
+
+        by_status: Dict[str, int] = {}
+        total_bytes = 0
+        today_count = 0
+        for day, status, count, size in rows:
+            if day == ALL_TIME:
+                by_status[status] = by_status.get(status, 0) + count
+                total_bytes += size
+            else:
+                today_count += count
+
+        return {
+            "total": sum(by_status.values()),
+            "by_status": {status: count for status, count in by_status.items() if count},
+            "today": today_count,
+            "total_bytes": total_bytes
+        }
@@ -2,7 +2,8 @@ from sqlalchemy.orm import Session, joinedload
 from ..models import Strategy, Device
 from ..schemas import BackupStrategyCreate, BackupStrategyUpdate
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+from ..pagination import paginate, InvalidCursorError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,12 +28,82 @@ class StrategyService:
     @staticmethod
     def get_strategies(db: Session, skip: int = 0, limit: int = 100) -> List[Strategy]:
         """获取备份策略列表"""
+        return StrategyService.get_strategies_page(db, skip=skip, limit=limit)[0]
+    
+    @staticmethod
+    def get_strategies_page(
+        db: Session,
+        device_id: Optional[int] = None,
+        is_active: Optional[bool] = None,
+        strategy_type: Optional[str] = None,
+        backup_type: Optional[str] = None,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Tuple[List[Strategy], Optional[str]]:
+        """按游标分页获取备份策略列表（按创建顺序），返回 (策略列表, 下一页游标)"""
+        query = db.query(Strategy)
+        if device_id:
+            query = query.filter(Strategy.device_id == device_id)
+        if is_active is not None:
+            query = query.filter(Strategy.is_active == is_active)
+        if strategy_type:
+            query = query.filter(Strategy.strategy_type == strategy_type)
+        if backup_type:
+            query = query.filter(Strategy.backup_type == backup_type)
+        
         try:
-            return db.query(Strategy).options(joinedload(Strategy.device)).offset(skip).limit(limit).all()
+            return paginate(
+                query.options(joinedload(Strategy.device)), Strategy.created_at, Strategy.id,
+                cursor=cursor, limit=limit, skip=skip, descending=False
+            )
+        except InvalidCursorError:
+            raise
         except Exception as e:
             # 如果关联查询失败，返回不包含设备信息的策略列表
             logger.warning(f"获取策略列表时关联查询失败: {str(e)}")
-            return db.query(Strategy).offset(skip).limit(limit).all()
+            db.rollback()
+            return paginate(query, Strategy.created_at, Strategy.id, cursor=cursor, limit=limit, skip=skip, descending=False)
+    
+    @staticmethod
+    def get_strategy_list_page(
+        db: Session,
+        device_id: Optional[int] = None,
+        is_active: Optional[bool] = None,
+        strategy_type: Optional[str] = None,
+        backup_type: Optional[str] = None,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """策略列表接口使用的分页查询，设备只查询名称和地址，返回 (列表项, 下一页游标)
+
+        结果为可直接序列化的字典（结构同 BackupStrategyListItem），不加载设备的登录凭据。
+        """
+        columns = [column for column in Strategy.__table__.columns]
+        query = db.query(
+            *columns, Device.name.label("device_name"), Device.ip_address.label("device_ip_address")
+        ).outerjoin(Device, Strategy.device_id == Device.id)
+        if device_id:
+            query = query.filter(Strategy.device_id == device_id)
+        if is_active is not None:
+            query = query.filter(Strategy.is_active == is_active)
+        if strategy_type:
+            query = query.filter(Strategy.strategy_type == strategy_type)
+        if backup_type:
+            query = query.filter(Strategy.backup_type == backup_type)
+        
+        rows, next_cursor = paginate(
+            query, Strategy.created_at, Strategy.id, cursor=cursor, limit=limit, skip=skip, descending=False
+        )
+        items = []
+        for row in rows:
+            item = {column.name: getattr(row, column.name) for column in columns}
+            item["device"] = None if row.device_name is None else {
+                "id": row.device_id, "name": row.device_name, "ip_address": row.device_ip_address
+            }
+            items.append(item)
+        return items, next_cursor
     
     @staticmethod
     def get_strategy(db: Session, strategy_id: int) -> Optional[Strategy]:
@@ -93,22 +164,22 @@ class StrategyService:
         return db_strategy
     
     @staticmethod
-    def get_due_strategies(db: Session) -> List[Strategy]:
+    def get_due_strategies(db: Session, now: Optional[datetime] = None) -> List[Strategy]:
         """获取到期的策略"""
-        now = datetime.now()
+        now = now or datetime.now()
         return db.query(Strategy).filter(
             Strategy.is_active == True,
             Strategy.next_execution <= now
         ).all()
     
     @staticmethod
-    def mark_strategy_executed(db: Session, strategy_id: int) -> Optional[Strategy]:
+    def mark_strategy_executed(db: Session, strategy_id: int, now: Optional[datetime] = None) -> Optional[Strategy]:
         """标记策略已执行"""
         db_strategy = db.query(Strategy).filter(Strategy.id == strategy_id).first()
         if not db_strategy:
             return None
         
-        db_strategy.last_execution = datetime.now()
+        db_strategy.last_execution = now or datetime.now()
         
         # 计算下次执行时间
         if db_strategy.strategy_type == "one-time":
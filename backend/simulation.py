@@ -0,0 +1,356 @@
+"""
+调度仿真 - 使用虚拟时钟和模拟备份执行器运行真实的调度逻辑
+
+调度器（BackupScheduler）、策略服务（StrategyService）和任务队列（JobQueueService）
+均使用真实实现，只有时间和备份执行被替换：时钟按调度间隔跳跃推进，备份由模拟执行器
+按设备生成耗时，工作线程以事件驱动的方式在两次调度检查之间领取和完成任务。
+
+用法:
+    python -m backend.simulation --strategies 10000 --days 30 --workers 8
+"""
+
+import argparse
+import heapq
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from .database import Base
+from .models import Device, Strategy
+from .scheduler import BackupScheduler
+from .job_worker import BackupJobWorker
+from .services.job_queue_service import JobQueueService
+
+class VirtualClock:
+    """虚拟时钟"""
+
+    def __init__(self, start: datetime):
+        self.current = start
+
+    def now(self) -> datetime:
+        return self.current
+
+    def advance_to(self, moment: datetime):
+        if moment > self.current:
+            self.current = moment
+
+class SimulatedExecutor:
+    """模拟备份执行器：核心设备耗时数分钟，接入设备耗时数秒到数十秒"""
+
+    def __init__(self, seed: int = 42, core_ratio: float = 0.05, failure_rate: float = 0.0):
+        self.random = random.Random(seed)
+        self.core_ratio = core_ratio
+        self.failure_rate = failure_rate
+        self._base_durations: Dict[int, float] = {}
+
+    def base_duration(self, device_id: int) -> float:
+        """设备的基准备份耗时（秒），同一设备保持稳定"""
+        if device_id not in self._base_durations:
+            if self.random.random() < self.core_ratio:
+                self._base_durations[device_id] = self.random.uniform(120, 600)
+            else:
+                self._base_durations[device_id] = self.random.uniform(5, 60)
+        return self._base_durations[device_id]
+
+    def run(self, device_id: int) -> tuple[float, dict]:
+        """返回 (耗时秒数, 备份结果)"""
+        duration = self.base_duration(device_id) * self.random.uniform(0.8, 1.2)
+        if self.random.random() < self.failure_rate:
+            return duration, {"success": False, "message": "模拟备份失败"}
+        return duration, {"success": True, "message": "模拟备份成功"}
+
+class _SimulatedScheduler(BackupScheduler):
+    """记录每个新任务对应策略的到期时间，用于计算调度延迟"""
+
+    def __init__(self, simulation, **kwargs):
+        super().__init__(**kwargs)
+        self.simulation = simulation
+
+    def _execute_strategy(self, db, strategy):
+        due_at = strategy.next_execution
+        job = super()._execute_strategy(db, strategy)
+        if job is not None:
+            self.simulation._on_job_enqueued(job.id, due_at)
+        return job
+
+def _percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+class SchedulerSimulation:
+    """调度仿真"""
+
+    WORKER_ID = "simulation"
+
+    def __init__(
+        self,
+        strategies: int = 1000,
+        devices: Optional[int] = None,
+        days: float = 7,
+        workers: int = 4,
+        seed: int = 42,
+        failure_rate: float = 0.0,
+        start: Optional[datetime] = None,
+        quiet: bool = True
+    ):
+        self.strategy_count = strategies
+        self.device_count = devices or strategies
+        self.days = days
+        self.workers = workers
+        self.seed = seed
+        self.start = start or datetime(2025, 1, 1)
+        self.clock = VirtualClock(self.start)
+        self.executor = SimulatedExecutor(seed=seed, failure_rate=failure_rate)
+        self.tick = timedelta(seconds=BackupScheduler.CHECK_INTERVAL)
+
+        if quiet:
+            logging.getLogger("backend").setLevel(logging.WARNING)
+
+        self._counting = False
+        self.query_count = 0
+        self._due_at: Dict[int, datetime] = {}
+        self._running = []  # (完成时刻, 序号, 任务ID, 结果, 耗时)
+        self._sequence = 0
+        self._idle_workers = workers
+        self._queue_depth = 0
+
+        # 统计数据
+        self.dispatch_lags: List[float] = []
+        self.enqueue_lags: List[float] = []
+        self.queue_depth_samples: List[int] = []
+        self.peak_concurrency = 0
+        self.busy_seconds = 0.0
+        self.jobs_enqueued = 0
+        self.jobs_succeeded = 0
+        self.jobs_failed = 0
+        self.ticks_evaluated = 0
+        self.ticks_skipped = 0
+
+        self._setup_database()
+
+    def _setup_database(self):
+        """创建内存数据库并生成设备和策略"""
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        event.listen(self.engine, "before_cursor_execute", self._count_query)
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.scheduler = _SimulatedScheduler(
+            self,
+            session_factory=self.Session,
+            clock=self.clock.now,
+            default_job_duration=60
+        )
+
+        rng = random.Random(self.seed)
+        db = self.Session()
+        try:
+            db.add_all([
+                Device(id=i, name=f"sim-device-{i}", ip_address="192.0.2.1", username="sim", password="sim")
+                for i in range(1, self.device_count + 1)
+            ])
+            strategies = []
+            for i in range(1, self.strategy_count + 1):
+                # 80% 每天一次，15% 每12小时一次，5% 每月一次；首次执行时间分布在第一天内
+                roll = rng.random()
+                if roll < 0.80:
+                    frequency_type, frequency_value = "day", 1
+                elif roll < 0.95:
+                    frequency_type, frequency_value = "hour", 12
+                else:
+                    frequency_type, frequency_value = "month", 1
+                start_time = self.start + timedelta(seconds=rng.uniform(0, 86400))
+                strategies.append(Strategy(
+                    name=f"sim-strategy-{i}",
+                    device_id=(i - 1) % self.device_count + 1,
+                    strategy_type="recurring",
+                    backup_type="running-config",
+                    is_active=True,
+                    frequency_type=frequency_type,
+                    frequency_value=frequency_value,
+                    start_time=start_time,
+                    next_execution=start_time
+                ))
+            db.add_all(strategies)
+            db.commit()
+        finally:
+            db.close()
+
+    def _count_query(self, conn, cursor, statement, parameters, context, executemany):
+        if self._counting:
+            self.query_count += 1
+
+    def _on_job_enqueued(self, job_id: int, due_at: Optional[datetime]):
+        self.jobs_enqueued += 1
+        self._queue_depth += 1
+        if due_at is not None:
+            self._due_at[job_id] = due_at
+            self.enqueue_lags.append((self.clock.now() - due_at).total_seconds())
+
+    def _dispatch(self, db, at: datetime):
+        """空闲工作线程在指定时刻领取排队任务"""
+        while self._idle_workers > 0:
+            job = JobQueueService.claim_next(db, self.WORKER_ID, now=at)
+            if not job:
+                break
+            self._idle_workers -= 1
+            self._queue_depth -= 1
+
+            due_at = self._due_at.pop(job.id, None)
+            if due_at is not None:
+                self.dispatch_lags.append((at - due_at).total_seconds())
+
+            duration, result = self.executor.run(job.device_id)
+            self._sequence += 1
+            heapq.heappush(self._running, (at + timedelta(seconds=duration), self._sequence, job.id, result, duration))
+            self.peak_concurrency = max(self.peak_concurrency, self.workers - self._idle_workers)
+
+    def _run_workers_until(self, db, limit: datetime):
+        """完成截止到指定时刻的所有任务，完成后的工作线程立即领取下一个任务"""
+        while self._running and self._running[0][0] <= limit:
+            finished_at, _, job_id, result, duration = heapq.heappop(self._running)
+            self.clock.advance_to(finished_at)
+            job = JobQueueService.get_job(db, job_id)
+            BackupJobWorker.finalize_job(db, job, result, now=finished_at)
+            self.busy_seconds += duration
+            if result["success"]:
+                self.jobs_succeeded += 1
+            else:
+                self.jobs_failed += 1
+            self._idle_workers += 1
+            self._dispatch(db, finished_at)
+
+    def _next_due_tick(self, db, current: datetime) -> datetime:
+        """没有策略到期的调度检查可以跳过：返回下一个可能有策略到期的检查时刻"""
+        counting, self._counting = self._counting, False
+        try:
+            next_due = db.query(func.min(Strategy.next_execution)).filter(Strategy.is_active == True).scalar()
+        finally:
+            self._counting = counting
+
+        following = current + self.tick
+        if next_due is None or next_due <= following:
+            return following
+        ticks = -(-(next_due - self.start) // self.tick)  # 向上取整到调度检查网格
+        return self.start + self.tick * ticks
+
+    def run(self) -> Dict:
+        """运行仿真并返回统计报告"""
+        wall_start = time.perf_counter()
+        end = self.start + timedelta(days=self.days)
+        db = self.Session()
+        self._counting = True
+        try:
+            current = self.start
+            while current <= end:
+                self._run_workers_until(db, current)
+                self.clock.advance_to(current)
+
+                # 真实调度逻辑：查询到期策略并入队
+                self.scheduler._check_and_execute_strategies()
+                self.ticks_evaluated += 1
+
+                self._dispatch(db, current)
+                self.queue_depth_samples.append(self._queue_depth)
+
+                following = self._next_due_tick(db, current)
+                self.ticks_skipped += int((following - current) / self.tick) - 1
+                current = following
+
+            # 收尾：完成仿真窗口内已开始的任务
+            self._run_workers_until(db, datetime.max)
+        finally:
+            self._counting = False
+            db.close()
+
+        return self._build_report(time.perf_counter() - wall_start)
+
+    def _build_report(self, wall_seconds: float) -> Dict:
+        simulated_seconds = self.days * 86400
+        # 被跳过的空闲检查在真实运行中各产生一次到期策略查询
+        total_queries = self.query_count + self.ticks_skipped
+        ticks = self.ticks_evaluated + self.ticks_skipped
+        completed = self.jobs_succeeded + self.jobs_failed
+        return {
+            "strategies": self.strategy_count,
+            "devices": self.device_count,
+            "workers": self.workers,
+            "simulated_days": self.days,
+            "wall_time_seconds": round(wall_seconds, 2),
+            "jobs_enqueued": self.jobs_enqueued,
+            "jobs_succeeded": self.jobs_succeeded,
+            "jobs_failed": self.jobs_failed,
+            "dispatch_lag_seconds": {
+                "avg": round(sum(self.dispatch_lags) / len(self.dispatch_lags), 1) if self.dispatch_lags else 0.0,
+                "p50": round(_percentile(self.dispatch_lags, 50), 1),
+                "p95": round(_percentile(self.dispatch_lags, 95), 1),
+                "p99": round(_percentile(self.dispatch_lags, 99), 1),
+                "max": round(max(self.dispatch_lags, default=0.0), 1)
+            },
+            "enqueue_lag_seconds": {
+                "avg": round(sum(self.enqueue_lags) / len(self.enqueue_lags), 1) if self.enqueue_lags else 0.0,
+                "max": round(max(self.enqueue_lags, default=0.0), 1)
+            },
+            "queue_depth": {
+                "max": max(self.queue_depth_samples, default=0),
+                "avg": round(sum(self.queue_depth_samples) / len(self.queue_depth_samples), 1) if self.queue_depth_samples else 0.0
+            },
+            "peak_concurrency": self.peak_concurrency,
+            "worker_utilization": round(self.busy_seconds / (self.workers * simulated_seconds), 3),
+            "scheduler_ticks": ticks,
+            "scheduler_ticks_skipped": self.ticks_skipped,
+            "db_queries": {
+                "total": total_queries,
+                "per_tick": round(total_queries / ticks, 2) if ticks else 0.0,
+                "per_job": round(total_queries / completed, 2) if completed else 0.0
+            }
+        }
+
+def _print_report(report: Dict):
+    print("=" * 50)
+    print("调度仿真报告")
+    print("=" * 50)
+    print(f"策略数: {report['strategies']}  设备数: {report['devices']}  "
+          f"工作线程: {report['workers']}  仿真天数: {report['simulated_days']}")
+    print(f"实际耗时: {report['wall_time_seconds']} 秒")
+    print(f"任务: 入队 {report['jobs_enqueued']}，成功 {report['jobs_succeeded']}，失败 {report['jobs_failed']}")
+    lag = report["dispatch_lag_seconds"]
+    print(f"调度延迟(秒): 平均 {lag['avg']}  P50 {lag['p50']}  P95 {lag['p95']}  P99 {lag['p99']}  最大 {lag['max']}")
+    print(f"入队延迟(秒): 平均 {report['enqueue_lag_seconds']['avg']}  最大 {report['enqueue_lag_seconds']['max']}")
+    print(f"队列深度: 最大 {report['queue_depth']['max']}  平均 {report['queue_depth']['avg']}")
+    print(f"并发峰值: {report['peak_concurrency']}  工作线程利用率: {report['worker_utilization']:.1%}")
+    queries = report["db_queries"]
+    print(f"数据库查询: 总计 {queries['total']}  每次检查 {queries['per_tick']}  每个任务 {queries['per_job']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="XConfKit 调度仿真")
+    parser.add_argument("--strategies", type=int, default=1000, help="策略数量")
+    parser.add_argument("--devices", type=int, default=None, help="设备数量（默认与策略数量相同）")
+    parser.add_argument("--days", type=float, default=7, help="仿真天数")
+    parser.add_argument("--workers", type=int, default=4, help="并发工作线程数")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="模拟备份失败率")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    simulation = SchedulerSimulation(
+        strategies=args.strategies,
+        devices=args.devices,
+        days=args.days,
+        workers=args.workers,
+        seed=args.seed,
+        failure_rate=args.failure_rate
+    )
+    _print_report(simulation.run())
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,17 @@
 数据保护系统 - 防止数据丢失和异常重构
 """
 
-import sqlite3
 import os
-import shutil
 import json
 from datetime import datetime
 import hashlib
-from pathlib import Path
+
+from backend.maintenance import (
+    REQUIRED_TABLES, count_rows, find_snapshot, get_missing_tables, restore_database, snapshot_database
+)
 
 class DataProtectionSystem:
-    def __init__(self, db_path="data/xconfkit.db"):
-        self.db_path = db_path
+    def __init__(self):
         self.backup_dir = "data/backups"
         self.protection_dir = "data/protection"
         self.metadata_file = f"{self.protection_dir}/metadata.json"
@@ -23,8 +23,9 @@ class DataProtectionSystem:
     
     def create_data_snapshot(self, snapshot_name=None):
         """创建数据快照"""
-        if not os.path.exists(self.db_path):
-            print(f"❌ 数据库文件不存在: {self.db_path}")
+        missing_tables = get_missing_tables()
+        if missing_tables:
+            print(f"❌ 数据库未初始化，缺少关键表: {missing_tables}")
             return False
         
         if snapshot_name is None:
@@ -34,9 +35,8 @@ class DataProtectionSystem:
         os.makedirs(snapshot_dir, exist_ok=True)
         
         try:
-            # 1. 复制数据库文件
-            snapshot_db = f"{snapshot_dir}/xconfkit.db"
-            shutil.copy2(self.db_path, snapshot_db)
+            # 1. 保存数据库（SQLite使用在线备份，数据库服务器导出全部记录）
+            snapshot_file = snapshot_database(snapshot_dir)
             
             # 2. 创建数据摘要
             data_summary = self._get_data_summary()
@@ -46,8 +46,9 @@ class DataProtectionSystem:
                 "snapshot_name": snapshot_name,
                 "created_at": datetime.now().isoformat(),
                 "data_summary": data_summary,
-                "file_size": os.path.getsize(self.db_path),
-                "file_hash": self._calculate_file_hash(self.db_path)
+                "snapshot_file": os.path.basename(snapshot_file),
+                "file_size": os.path.getsize(snapshot_file),
+                "file_hash": self._calculate_file_hash(snapshot_file)
             }
             
             with open(f"{snapshot_dir}/metadata.json", 'w', encoding='utf-8') as f:
@@ -67,21 +68,22 @@ class DataProtectionSystem:
     def restore_from_snapshot(self, snapshot_name):
         """从快照恢复数据"""
         snapshot_dir = f"{self.protection_dir}/{snapshot_name}"
-        snapshot_db = f"{snapshot_dir}/xconfkit.db"
+        snapshot_file = find_snapshot(snapshot_dir)
         
-        if not os.path.exists(snapshot_db):
+        if not snapshot_file:
             print(f"❌ 快照不存在: {snapshot_name}")
             return False
         
         try:
             # 1. 创建当前数据的备份
-            current_backup = f"data/xconfkit_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-            if os.path.exists(self.db_path):
-                shutil.copy2(self.db_path, current_backup)
+            if not get_missing_tables():
+                current_backup = snapshot_database(
+                    f"data/xconfkit_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                )
                 print(f"📦 当前数据已备份到: {current_backup}")
             
             # 2. 恢复快照数据
-            shutil.copy2(snapshot_db, self.db_path)
+            restore_database(snapshot_file)
             
             # 3. 验证恢复结果
             restored_summary = self._get_data_summary()
@@ -121,22 +123,9 @@ class DataProtectionSystem:
     
     def validate_data_integrity(self):
         """验证数据完整性"""
-        if not os.path.exists(self.db_path):
-            print("❌ 数据库文件不存在")
-            return False
-        
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # 检查关键表是否存在
-            required_tables = ['devices', 'backups', 'strategies', 'configs', 'ai_configs', 'analysis_prompts']
-            missing_tables = []
-            
-            for table in required_tables:
-                cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table}'")
-                if not cursor.fetchone():
-                    missing_tables.append(table)
+            missing_tables = get_missing_tables()
             
             if missing_tables:
                 print(f"❌ 缺少关键表: {missing_tables}")
@@ -151,9 +140,6 @@ class DataProtectionSystem:
         except Exception as e:
             print(f"❌ 数据完整性检查失败: {e}")
             return False
-        finally:
-            if conn:
-                conn.close()
     
     def auto_backup_before_changes(self):
         """在变更前自动备份"""
@@ -163,24 +149,9 @@ class DataProtectionSystem:
     def _get_data_summary(self):
         """获取数据摘要"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            summary = {}
-            tables = ['devices', 'backups', 'strategies', 'configs', 'ai_configs', 'analysis_prompts']
-            
-            for table in tables:
-                cursor.execute(f"SELECT COUNT(*) FROM {table}")
-                count = cursor.fetchone()[0]
-                summary[table] = count
-            
-            return summary
-            
+            return count_rows(REQUIRED_TABLES)
         except Exception as e:
             return {"error": str(e)}
-        finally:
-            if conn:
-                conn.close()
     
     def _calculate_file_hash(self, file_path):
         """计算文件哈希值"""
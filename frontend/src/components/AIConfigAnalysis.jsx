@@ -32,6 +32,7 @@ const { Text } = Typography;
 
 const AIConfigAnalysis = () => {
   const [loading, setLoading] = useState(false);
+  const [analysisProgress, setAnalysisProgress] = useState(null);
   const [analysisHistory, setAnalysisHistory] = useState([]);
   const [selectedDevice, setSelectedDevice] = useState(null);
   const [selectedBackup, setSelectedBackup] = useState(null);
@@ -44,6 +45,8 @@ const AIConfigAnalysis = () => {
   const [selectedDimensions, setSelectedDimensions] = useState([
     'security', 'redundancy', 'performance', 'integrity', 'best_practices'
   ]);
+  // 增量分析：只分析相对设备上次分析变化的配置
+  const [incremental, setIncremental] = useState(false);
 
   // 分析维度配置
   const analysisDimensions = [
@@ -212,6 +215,8 @@ const AIConfigAnalysis = () => {
     }
 
     setLoading(true);
+    setAnalysisProgress(null);
+    setAnalysisResult(null);
     try {
       // 获取当前AI配置
       const aiConfig = await getCurrentAIConfig();
@@ -220,7 +225,17 @@ const AIConfigAnalysis = () => {
         device_id: selectedDevice,
         backup_id: selectedBackup,
         dimensions: selectedDimensions,
-        ai_config: aiConfig  // 传递当前AI配置
+        ai_config: aiConfig,  // 传递当前AI配置
+        incremental,
+        onProgress: (job) => job.progress && setAnalysisProgress(job.progress),
+        // 实时显示AI生成的内容
+        onToken: ({ dimension, text }) => {
+          setAnalysisResult((previous) => ({
+            ...(previous || {}),
+            [dimension]: ((previous || {})[dimension] || '') + text
+          }));
+          setShowResultModal(true);
+        }
       });
 
       if (response.success) {
@@ -235,6 +250,7 @@ const AIConfigAnalysis = () => {
       message.error('分析失败，请稍后重试');
     } finally {
       setLoading(false);
+      setAnalysisProgress(null);
     }
   };
 
@@ -384,6 +400,12 @@ const AIConfigAnalysis = () => {
                         清空
                       </Button>
                     </div>
+                    
+                    <div style={{ marginTop: '8px' }}>
+                      <Checkbox checked={incremental} onChange={(e) => setIncremental(e.target.checked)}>
+                        增量分析（只分析相对上次分析变化的配置）
+                      </Checkbox>
+                    </div>
                   </div>
                 </div>
 
@@ -395,7 +417,9 @@ const AIConfigAnalysis = () => {
                   disabled={!selectedDevice || !selectedBackup || selectedDimensions.length === 0}
                   style={{ width: '100%', height: '40px' }}
                 >
-                  开始分析 ({selectedDimensions.length} 个维度)
+                  {loading && analysisProgress
+                    ? `分析中 (${analysisProgress.completed}/${analysisProgress.total} 个维度)`
+                    : `开始分析 (${selectedDimensions.length} 个维度)`}
                 </Button>
               </Space>
             </Card>
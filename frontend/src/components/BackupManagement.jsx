@@ -371,8 +371,8 @@ const BackupManagement = () => {
       title: '状态',
       dataIndex: 'status',
       key: 'status',
-      width: 80,
-      render: (status) => {
+      width: 130,
+      render: (status, record) => {
         const statusMap = {
           pending: { color: 'processing', text: '进行中' },
           success: { color: 'success', text: '成功' },
@@ -380,7 +380,12 @@ const BackupManagement = () => {
           failed: { color: 'error', text: '失败' },
         };
         const config = statusMap[status] || { color: 'default', text: status };
-        return <Tag color={config.color}>{config.text}</Tag>;
+        return (
+          <>
+            <Tag color={config.color}>{config.text}</Tag>
+            {record.archived && <Tag>已归档</Tag>}
+          </>
+        );
       },
     },
     {
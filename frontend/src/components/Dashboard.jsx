@@ -21,7 +21,7 @@ const Dashboard = () => {
     backups: { total: 0, success: 0, failed: 0, today: 0, recent: [] },
     strategies: { total: 0, active: 0, inactive: 0, recent: [] },
     analysis: { total: 0, today: 0, recent: [] },
-    system: { uptime: 0, lastBackup: null, storageUsage: 0 }
+    system: { uptime: 0, lastBackup: null, storageUsage: 0, backupBytes: 0 }
   });
 
   useEffect(() => {
@@ -54,47 +54,24 @@ const Dashboard = () => {
     try {
       setLoading(true);
       
-      const [devices, backups, strategies, analysisHistory, systemUptime] = await Promise.all([
-        fetch('/api/devices/').then(r => r.json()),
-        fetch('/api/backups/').then(r => r.json()),
-        fetch('/api/strategies/').then(r => r.json()),
-        fetch('/api/analysis/history').then(r => r.json()),
+      // 统计数据由后端聚合，不再下载完整列表
+      const [summary, systemUptime] = await Promise.all([
+        fetch('/api/dashboard/summary').then(r => r.json()),
         fetch('/api/system/uptime').then(r => r.json())
       ]);
       
-      const today = dayjs().format('YYYY-MM-DD');
-      
       setDashboardData({
-        devices: {
-          total: devices.length,
-          online: devices.filter(d => d.connection_status === 'success').length,
-          offline: devices.filter(d => d.connection_status === 'failed' || d.connection_status === 'unknown').length,
-          recent: devices.slice(0, 5)
-        },
-        backups: {
-          total: backups.length,
-          success: backups.filter(b => b.status === 'success' || b.status === 'completed').length,
-          failed: backups.filter(b => b.status === 'failed').length,
-          today: backups.filter(b => dayjs(b.created_at).format('YYYY-MM-DD') === today).length,
-          recent: backups.slice(0, 5)
-        },
-        strategies: {
-          total: strategies.length,
-          active: strategies.filter(s => s.is_active).length,
-          inactive: strategies.filter(s => !s.is_active).length,
-          recent: strategies.slice(0, 5)
-        },
-        analysis: {
-          total: analysisHistory.length,
-          today: analysisHistory.filter(a => dayjs(a.created_at).format('YYYY-MM-DD') === today).length,
-          recent: analysisHistory.slice(0, 5)
-        },
+        devices: summary.devices,
+        backups: summary.backups,
+        strategies: summary.strategies,
+        analysis: summary.analysis,
         system: {
           uptime: systemUptime.uptime_hours,
           uptimeMinutes: systemUptime.uptime_minutes,
           uptimeSeconds: systemUptime.uptime_seconds,
-          lastBackup: backups.length > 0 ? backups[0].created_at : null,
-          storageUsage: Math.min(100, Math.max(10, Math.floor(backups.length * 2 + 20))) // 基于实际备份数量计算
+          lastBackup: summary.backups.last_backup_time,
+          storageUsage: summary.storage.disk_usage_percent ?? 0,
+          backupBytes: summary.storage.backup_bytes
         }
       });
     } catch (error) {
@@ -104,6 +81,13 @@ const Dashboard = () => {
     }
   };
 
+  const formatBytes = (bytes) => {
+    if (!bytes) return '0 B';
+    const units = ['B', 'KB', 'MB', 'GB', 'TB'];
+    const index = Math.min(units.length - 1, Math.floor(Math.log(bytes) / Math.log(1024)));
+    return `${(bytes / Math.pow(1024, index)).toFixed(index === 0 ? 0 : 1)} ${units[index]}`;
+  };
+
   const getStatusColor = (status) => {
     const colorMap = {
       'success': 'success', 'completed': 'success', 'online': 'success', 'active': 'success',
@@ -243,6 +227,9 @@ const Dashboard = () => {
                     size="small"
                     status={dashboardData.system.storageUsage > 90 ? 'exception' : 'normal'}
                   />
+                  <Text type="secondary" style={{ fontSize: '12px' }}>
+                    备份文件占用 {formatBytes(dashboardData.system.backupBytes)}
+                  </Text>
                 </div>
               </div>
               <div>
@@ -3,6 +3,7 @@ import { Modal, Button, Checkbox, Space, Typography, Alert, Spin, message, Colla
 import { RobotOutlined } from '@ant-design/icons';
 import ReactMarkdown from 'react-markdown';
 import remarkGfm from 'remark-gfm';
+import { analysisAPI } from '../../services/api';
 
 const { Text } = Typography;
 
@@ -48,21 +49,13 @@ const QuickAnalysisModal = ({ visible, onCancel, device, backup, onAnalysisCompl
 
     setAnalyzing(true);
     try {
-      // 调用后端API - 修复API路径
-      const response = await fetch('http://localhost:8000/api/analysis/analyze', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          device_id: device.id,
-          backup_id: backup.id,
-          dimensions: selectedDimensions
-        }),
+      // 提交后台分析任务并等待完成
+      const result = await analysisAPI.analyzeConfig({
+        device_id: device.id,
+        backup_id: backup.id,
+        dimensions: selectedDimensions
       });
 
-      const result = await response.json();
-
       if (result.success) {
         message.success('分析完成');
         setAnalysisResult(result.data);
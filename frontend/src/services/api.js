@@ -32,6 +32,35 @@ api.interceptors.response.use(
   }
 );
 
+// 备份任务API
+export const jobAPI = {
+  // 获取任务列表
+  getJobs: (status) => api.get('/jobs', { params: { status } }),
+  
+  // 查询任务状态
+  getJob: (id) => api.get(`/jobs/${id}`),
+};
+
+// 等待备份任务执行完成，返回与原同步接口一致的结果结构
+export const waitForJob = async (submitResult, { interval = 2000, timeout = 600000 } = {}) => {
+  const deadline = Date.now() + timeout;
+  
+  while (Date.now() < deadline) {
+    const job = await jobAPI.getJob(submitResult.job_id);
+    if (job.status === 'success' || job.status === 'failed') {
+      return {
+        success: job.status === 'success',
+        message: job.message,
+        backup_id: job.backup_id,
+        data: job,
+      };
+    }
+    await new Promise((resolve) => setTimeout(resolve, interval));
+  }
+  
+  return { success: false, message: '备份任务仍在执行中，请稍后在备份列表中查看结果', data: submitResult };
+};
+
 // 设备管理API
 export const deviceAPI = {
   // 获取设备列表
@@ -53,12 +82,12 @@ export const deviceAPI = {
   testConnection: (id) => api.post(`/devices/${id}/test`),
   
   // 快速备份设备
-  quickBackup: (id) => api.post(`/devices/${id}/quick-backup`),
+  quickBackup: async (id) => waitForJob(await api.post(`/devices/${id}/quick-backup`)),
 };
 
 // 备份管理API
 export const backupAPI = {
-  // 获取备份列表
+  // 获取备份列表（包含已归档的历史备份）
   getBackups: (deviceId) => api.get('/backups', { params: { device_id: deviceId } }),
   
   // 获取单个备份
@@ -71,8 +100,8 @@ export const backupAPI = {
   downloadBackup: (id) => api.get(`/backups/${id}/download`, { responseType: 'blob' }),
   
   // 执行备份
-  executeBackup: (deviceId, backupType = 'running-config') => 
-    api.post(`/backups/execute?device_id=${deviceId}&backup_type=${backupType}`),
+  executeBackup: async (deviceId, backupType = 'running-config') => 
+    waitForJob(await api.post(`/backups/execute?device_id=${deviceId}&backup_type=${backupType}`)),
   
   // 删除备份
   deleteBackup: (id) => api.delete(`/backups/${id}`),
@@ -105,10 +134,10 @@ export const strategyAPI = {
   getDueStrategies: () => api.get('/strategies/due/list'),
   
   // 执行策略
-  executeStrategy: (id) => api.post(`/strategies/${id}/execute`),
+  executeStrategy: async (id) => waitForJob(await api.post(`/strategies/${id}/execute`)),
   
   // 立即执行策略（不影响调度）
-  executeStrategyNow: (id) => api.post(`/strategies/${id}/execute-now`),
+  executeStrategyNow: async (id) => waitForJob(await api.post(`/strategies/${id}/execute-now`)),
 };
 
 // 系统配置API
@@ -205,29 +234,107 @@ export const configAPI = {
 
 // AI分析相关API
 export const analysisAPI = {
-  // 分析配置
+  // 分析配置：提交后台分析任务并等待完成，返回分析结果
+  // params.onProgress 在进度变化时以任务状态调用（包含 progress 和已完成维度的结果）；
+  // 提供 params.onToken 时通过 SSE 实时接收AI生成的内容（{dimension, text}），SSE 不可用时改为轮询
   analyzeConfig: async (params) => {
-    try {
-      const response = await fetch('/api/analysis/analyze', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          device_id: params.device_id,
-          backup_id: params.backup_id,
-          dimensions: params.dimensions || null  // 支持维度选择
-        }),
+    const job = await analysisAPI.submitAnalysisJob(params);
+    if (!job.success) {
+      return job;
+    }
+
+    if (params.onToken && typeof EventSource !== 'undefined') {
+      const finished = await new Promise((resolve) => {
+        analysisAPI.subscribeAnalysisJob(job.job_id, {
+          onProgress: params.onProgress,
+          onToken: params.onToken,
+          onDone: resolve,
+          onError: () => resolve(null)
+        });
       });
-      
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
+      if (finished) {
+        return analysisAPI.jobResult(finished);
       }
-      
-      return await response.json();
-    } catch (error) {
-      throw error;
     }
+    return analysisAPI.waitForAnalysisJob(job.job_id, params);
+  },
+
+  // 轮询分析任务直到完成
+  waitForAnalysisJob: async (jobId, params = {}) => {
+    const pollInterval = params.pollInterval || 1000;
+    for (;;) {
+      const status = await analysisAPI.getAnalysisJob(jobId);
+      if (params.onProgress) {
+        params.onProgress(status);
+      }
+      if (status.status !== 'processing') {
+        return analysisAPI.jobResult(status);
+      }
+      await new Promise((resolve) => setTimeout(resolve, pollInterval));
+    }
+  },
+
+  // 把已结束的任务状态转换为分析结果
+  jobResult: (job) => (job.status === 'success'
+    ? { success: true, message: '分析完成', data: job.data, record_id: job.record_id }
+    : { success: false, message: job.error_message || '分析失败', data: job.data, record_id: job.record_id }),
+
+  // 提交后台分析任务，立即返回任务ID
+  submitAnalysisJob: async (params) => {
+    const response = await fetch('/api/analysis/jobs', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        device_id: params.device_id,
+        backup_id: params.backup_id,
+        dimensions: params.dimensions || null,  // 支持维度选择
+        combined: params.combined ?? null,  // 一次调用分析所有维度，默认使用系统配置
+        incremental: params.incremental ?? null  // 只分析相对上次分析变化的配置，默认使用系统配置
+      }),
+    });
+
+    if (response.status === 400) {
+      const error = await response.json();
+      return { success: false, message: error.detail };
+    }
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    return await response.json();
+  },
+
+  // 查询分析任务的状态和进度
+  getAnalysisJob: async (jobId) => {
+    const response = await fetch(`/api/analysis/jobs/${jobId}`);
+
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    return await response.json();
+  },
+
+  // 订阅分析任务进度和AI实时生成的内容（SSE），返回 EventSource，调用 close() 取消订阅
+  subscribeAnalysisJob: (jobId, { onProgress, onToken, onDone, onError } = {}) => {
+    const source = new EventSource(`/api/analysis/jobs/${jobId}/events`);
+    source.addEventListener('progress', (event) => onProgress && onProgress(JSON.parse(event.data)));
+    source.addEventListener('token', (event) => onToken && onToken(JSON.parse(event.data)));
+    source.addEventListener('done', (event) => {
+      source.close();
+      if (onDone) {
+        onDone(JSON.parse(event.data));
+      }
+    });
+    source.onerror = (error) => {
+      source.close();
+      if (onError) {
+        onError(error);
+      }
+    };
+    return source;
   },
 
   // 获取分析历史
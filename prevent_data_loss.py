@@ -5,36 +5,27 @@
 
 import os
 import sys
+import shutil
 import subprocess
 import time
 from datetime import datetime
 
+from backend.maintenance import (
+    REQUIRED_TABLES, count_rows, find_snapshot, get_missing_tables, restore_database, snapshot_database
+)
+
 def check_database_integrity():
     """检查数据库完整性"""
     try:
-        import sqlite3
-        conn = sqlite3.connect('data/xconfkit.db')
-        cursor = conn.cursor()
-        
         # 检查关键表是否存在
-        required_tables = ['devices', 'backups', 'strategies', 'configs', 'ai_configs', 'analysis_prompts']
-        missing_tables = []
-        
-        for table in required_tables:
-            cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table}'")
-            if not cursor.fetchone():
-                missing_tables.append(table)
+        missing_tables = get_missing_tables()
         
         if missing_tables:
             print(f"❌ 缺少关键表: {missing_tables}")
             return False
         
         # 检查数据量
-        data_counts = {}
-        for table in required_tables:
-            cursor.execute(f"SELECT COUNT(*) FROM {table}")
-            count = cursor.fetchone()[0]
-            data_counts[table] = count
+        data_counts = count_rows(REQUIRED_TABLES)
         
         print("✅ 数据库完整性检查通过")
         print(f"📊 数据统计: {data_counts}")
@@ -49,9 +40,6 @@ def check_database_integrity():
     except Exception as e:
         print(f"❌ 数据库完整性检查失败: {e}")
         return False
-    finally:
-        if conn:
-            conn.close()
 
 def auto_backup_before_restart():
     """重启前自动备份"""
@@ -61,11 +49,10 @@ def auto_backup_before_restart():
     backup_dir = f"data/auto_backups/{datetime.now().strftime('%Y%m%d_%H%M%S')}"
     os.makedirs(backup_dir, exist_ok=True)
     
-    # 备份数据库
-    if os.path.exists('data/xconfkit.db'):
-        import shutil
-        shutil.copy2('data/xconfkit.db', f"{backup_dir}/xconfkit.db")
-        print(f"✅ 数据库已备份到: {backup_dir}/xconfkit.db")
+    # 备份数据库（SQLite使用在线备份，数据库服务器导出全部记录）
+    if not get_missing_tables():
+        snapshot_file = snapshot_database(backup_dir)
+        print(f"✅ 数据库已备份到: {snapshot_file}")
     
     # 备份配置文件
     if os.path.exists('data/backups'):
@@ -95,10 +82,9 @@ def restore_from_latest_backup():
     print(f"📦 使用最新备份: {latest_backup}")
     
     # 恢复数据库
-    backup_db = f"{backup_path}/xconfkit.db"
-    if os.path.exists(backup_db):
-        import shutil
-        shutil.copy2(backup_db, 'data/xconfkit.db')
+    snapshot_file = find_snapshot(backup_path)
+    if snapshot_file:
+        restore_database(snapshot_file)
         print("✅ 数据库已恢复")
     
     # 恢复备份文件
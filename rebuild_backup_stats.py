@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+重建备份统计计数
+
+backup_stats 表由备份的新增、状态变化和删除增量维护。直接修改过数据库或计数出现偏差时，
+运行本脚本根据 backups 表重新计算。
+"""
+
+import sys
+
+from backend.database import SessionLocal, init_db
+from backend.services.stats_service import StatsService
+
+def rebuild_backup_stats():
+    """重建备份统计"""
+    init_db()
+    db = SessionLocal()
+    try:
+        print("🔄 开始重建备份统计...")
+        result = StatsService.rebuild(db)
+        print(f"✅ 备份统计已重建: {result['backup_count']} 个备份, {result['stat_rows']} 行统计")
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"❌ 重建备份统计失败: {e}")
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(0 if rebuild_backup_stats() else 1)
@@ -3,23 +3,29 @@
 恢复默认系统配置数据
 """
 
-import sqlite3
-import os
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from backend.database import SessionLocal
+from backend.maintenance import count_rows, get_missing_tables
+from backend.models import AIConfig, AnalysisPrompt, Config, Device, Strategy
+
+def next_run_at(hour):
+    """下一个整点 hour:00 的时间"""
+    run_at = datetime.now().replace(hour=hour, minute=0, second=0, microsecond=0)
+    if run_at <= datetime.now():
+        run_at += timedelta(days=1)
+    return run_at
 
 def restore_default_data():
     """恢复默认的系统配置数据"""
     
-    db_path = 'data/xconfkit.db'
-    
-    if not os.path.exists(db_path):
-        print(f"❌ 数据库文件不存在: {db_path}")
+    missing_tables = get_missing_tables(['configs'])
+    if missing_tables:
+        print(f"❌ 数据库未初始化，缺少表: {missing_tables}")
         return False
     
+    db = SessionLocal()
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
         print("🔄 开始恢复默认系统配置...")
         
         # 1. 恢复系统配置
@@ -96,29 +102,31 @@ def restore_default_data():
             else:
                 data_type = 'string'
             
-            cursor.execute('''
-                INSERT OR REPLACE INTO configs (category, "key", value, data_type, description, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (category, key, value, data_type, description, datetime.now(), datetime.now()))
+            config = db.query(Config).filter(Config.category == category, Config.key == key).first()
+            if config is None:
+                config = Config(category=category, key=key, created_at=datetime.now())
+                db.add(config)
+            config.value = value
+            config.data_type = data_type
+            config.description = description
+            config.updated_at = datetime.now()
         
         # 2. 恢复AI配置
         print("🤖 恢复AI配置...")
         
-        # 检查ai_configs表是否存在
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='ai_configs'")
-        if cursor.fetchone():
-            cursor.execute('''
-                INSERT OR REPLACE INTO ai_configs 
-                (provider, api_key, model, base_url, timeout, enable_cache, enable_history, auto_retry, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', ('openai', 'your-api-key-here', 'gpt-4', 'https://api.openai.com/v1', 30, True, True, True, datetime.now(), datetime.now()))
+        # 检查ai_configs表是否存在，已有AI配置时保留
+        if not get_missing_tables(['ai_configs']) and db.query(AIConfig).count() == 0:
+            db.add(AIConfig(
+                provider='openai', api_key='your-api-key-here', model='gpt-4',
+                base_url='https://api.openai.com/v1', timeout=30, enable_cache=True,
+                enable_history=True, auto_retry=True, created_at=datetime.now(), updated_at=datetime.now()
+            ))
         
         # 3. 恢复分析提示词
         print("📝 恢复分析提示词...")
         
         # 检查analysis_prompts表是否存在
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='analysis_prompts'")
-        if cursor.fetchone():
+        if not get_missing_tables(['analysis_prompts']):
             default_prompts = [
                 ('security', '安全加固', '检查访问控制、认证授权、安全策略等', 
                  '请从网络安全角度分析此网络设备配置，重点关注访问控制列表(ACL)配置是否完整和合理。'),
@@ -133,75 +141,64 @@ def restore_default_data():
             ]
             
             for dimension, name, description, content in default_prompts:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO analysis_prompts 
-                    (dimension, name, description, content, is_default, created_at, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (dimension, name, description, content, True, datetime.now(), datetime.now()))
+                prompt = db.query(AnalysisPrompt).filter(AnalysisPrompt.dimension == dimension).first()
+                if prompt is None:
+                    prompt = AnalysisPrompt(dimension=dimension, created_at=datetime.now())
+                    db.add(prompt)
+                prompt.name = name
+                prompt.description = description
+                prompt.content = content
+                prompt.is_default = True
+                prompt.updated_at = datetime.now()
         
         # 4. 添加示例设备（可选）
         print("📱 添加示例设备...")
         
         # 检查devices表是否存在
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='devices'")
-        if cursor.fetchone():
+        if not get_missing_tables(['devices']):
             # 检查是否已有设备
-            cursor.execute("SELECT COUNT(*) FROM devices")
-            if cursor.fetchone()[0] == 0:
-                cursor.execute('''
-                    INSERT INTO devices 
-                    (name, ip_address, username, password, protocol, description, created_at, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', ('示例设备', '192.168.1.1', 'admin', 'CHANGE_ME', 'ssh', '这是一个示例设备，请根据实际情况修改', datetime.now(), datetime.now()))
+            if db.query(Device).count() == 0:
+                db.add(Device(
+                    name='示例设备', ip_address='192.168.1.1', username='admin', password='CHANGE_ME',
+                    protocol='ssh', description='这是一个示例设备，请根据实际情况修改',
+                    created_at=datetime.now(), updated_at=datetime.now()
+                ))
         
         # 5. 添加示例备份策略（可选）
         print("📋 添加示例备份策略...")
         
         # 检查strategies表是否存在
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='strategies'")
-        if cursor.fetchone():
+        if not get_missing_tables(['strategies']):
             # 检查是否已有策略
-            cursor.execute("SELECT COUNT(*) FROM strategies")
-            if cursor.fetchone()[0] == 0:
-                cursor.execute('''
-                    INSERT INTO strategies 
-                    (name, strategy_type, backup_type, schedule, is_active, created_at, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', ('每日备份', 'scheduled', 'running-config', '0 2 * * *', True, datetime.now(), datetime.now()))
-        
-        conn.commit()
+            if db.query(Strategy).count() == 0:
+                # 每天02:00执行的周期性策略
+                start_time = next_run_at(2)
+                db.add(Strategy(
+                    name='每日备份', strategy_type='recurring', backup_type='running-config',
+                    frequency_type='day', frequency_value=1, start_time=start_time, next_execution=start_time,
+                    is_active=True, created_at=datetime.now(), updated_at=datetime.now()
+                ))
+        
+        db.commit()
         print("✅ 默认数据恢复完成！")
         
         # 显示恢复的数据统计
         print("\n📊 数据恢复统计:")
-        cursor.execute("SELECT COUNT(*) FROM configs")
-        config_count = cursor.fetchone()[0]
-        print(f"   - 系统配置: {config_count} 项")
-        
-        cursor.execute("SELECT COUNT(*) FROM devices")
-        device_count = cursor.fetchone()[0]
-        print(f"   - 设备: {device_count} 台")
-        
-        cursor.execute("SELECT COUNT(*) FROM strategies")
-        strategy_count = cursor.fetchone()[0]
-        print(f"   - 备份策略: {strategy_count} 个")
-        
-        cursor.execute("SELECT COUNT(*) FROM ai_configs")
-        ai_config_count = cursor.fetchone()[0]
-        print(f"   - AI配置: {ai_config_count} 项")
-        
-        cursor.execute("SELECT COUNT(*) FROM analysis_prompts")
-        prompt_count = cursor.fetchone()[0]
-        print(f"   - 分析提示词: {prompt_count} 个")
+        counts = count_rows(['configs', 'devices', 'strategies', 'ai_configs', 'analysis_prompts'])
+        print(f"   - 系统配置: {counts['configs']} 项")
+        print(f"   - 设备: {counts['devices']} 台")
+        print(f"   - 备份策略: {counts['strategies']} 个")
+        print(f"   - AI配置: {counts['ai_configs']} 项")
+        print(f"   - 分析提示词: {counts['analysis_prompts']} 个")
         
         return True
         
     except Exception as e:
+        db.rollback()
         print(f"❌ 恢复数据时出错: {e}")
         return False
     finally:
-        if conn:
-            conn.close()
+        db.close()
 
 if __name__ == "__main__":
     restore_default_data()
@@ -3,30 +3,42 @@
 从备份文件中恢复数据
 """
 
-import sqlite3
 import os
 import shutil
-from datetime import datetime
+from datetime import datetime, timedelta
 import re
 
+from sqlalchemy import func
+
+from backend.database import SessionLocal
+from backend.maintenance import get_missing_tables, reset_sequences
+from backend.models import AnalysisRecord, Backup, BackupArchive, BackupJob, Device, Strategy
+from backend.services.backup_service import BackupService
+from backend.services.stats_service import StatsService
+
+def next_run_at(hour):
+    """下一个整点 hour:00 的时间"""
+    run_at = datetime.now().replace(hour=hour, minute=0, second=0, microsecond=0)
+    if run_at <= datetime.now():
+        run_at += timedelta(days=1)
+    return run_at
+
 def restore_from_backup():
     """从备份文件中恢复数据"""
     
-    db_path = 'data/xconfkit.db'
     backup_data_path = 'backups/temp_restore/data/backups'
     
-    if not os.path.exists(db_path):
-        print(f"❌ 数据库文件不存在: {db_path}")
+    missing_tables = get_missing_tables(['devices', 'backups', 'strategies'])
+    if missing_tables:
+        print(f"❌ 数据库未初始化，缺少表: {missing_tables}")
         return False
     
     if not os.path.exists(backup_data_path):
         print(f"❌ 备份数据路径不存在: {backup_data_path}")
         return False
     
+    db = SessionLocal()
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
         print("🔄 开始从备份恢复数据...")
         
         # 1. 恢复备份文件
@@ -43,8 +55,13 @@ def restore_from_backup():
         # 2. 恢复设备数据
         print("📱 恢复设备数据...")
         
-        # 清空现有设备
-        cursor.execute("DELETE FROM devices")
+        # 清空现有设备（先删除引用设备的策略、任务和备份记录）
+        db.query(Strategy).delete()
+        db.query(BackupJob).delete()
+        db.query(AnalysisRecord).update({AnalysisRecord.backup_id: None})
+        db.query(Backup).delete()
+        db.query(BackupArchive).delete()
+        db.query(Device).delete()
         
         # 从备份文件推断设备信息
         device_dirs = [d for d in os.listdir('data/backups') if d.isdigit()]
@@ -75,21 +92,20 @@ def restore_from_backup():
                         username = 'admin'
                         password = 'CHANGE_ME'  # 请在生产环境中修改为实际密码
                     
-                    cursor.execute('''
-                        INSERT INTO devices 
-                        (name, ip_address, username, password, protocol, description, created_at, updated_at)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (device_name, ip_address, username, password, 'ssh', 
-                          f'从备份恢复的设备 {device_id}', datetime.now(), datetime.now()))
+                    # 备份目录名即设备ID，恢复时保持不变
+                    db.add(Device(
+                        id=int(device_id), name=device_name, ip_address=ip_address, username=username,
+                        password=password, protocol='ssh', description=f'从备份恢复的设备 {device_id}',
+                        created_at=datetime.now(), updated_at=datetime.now()
+                    ))
                     
                     print(f"   ✅ 已恢复设备: {device_name} ({ip_address})")
         
+        db.flush()
+        
         # 3. 恢复备份记录
         print("💾 恢复备份记录...")
         
-        # 清空现有备份记录
-        cursor.execute("DELETE FROM backups")
-        
         # 遍历所有备份文件
         for device_id in device_dirs:
             device_path = f'data/backups/{device_id}'
@@ -122,83 +138,76 @@ def restore_from_backup():
                         # 计算文件大小
                         file_size = len(content.encode('utf-8'))
                         
-                        cursor.execute('''
-                            INSERT INTO backups 
-                            (device_id, backup_type, status, file_path, file_size, content, created_at)
-                            VALUES (?, ?, ?, ?, ?, ?, ?)
-                        ''', (int(device_id), backup_type, 'completed', backup_file_path, 
-                              file_size, content, created_at))
+                        db.add(Backup(
+                            device_id=int(device_id), backup_type=backup_type, status='completed',
+                            file_path=backup_file_path, file_size=file_size, content=content, created_at=created_at
+                        ))
                         
                         print(f"   ✅ 已恢复备份: {backup_type} ({backup_file})")
         
         # 4. 恢复策略数据
         print("📋 恢复备份策略...")
         
-        # 清空现有策略
-        cursor.execute("DELETE FROM strategies")
-        
         # 为每个设备创建默认策略
-        cursor.execute("SELECT id FROM devices")
-        devices = cursor.fetchall()
-        
-        for device_id, in devices:
-            # 创建运行配置备份策略
-            cursor.execute('''
-                INSERT INTO strategies 
-                (name, device_id, strategy_type, backup_type, schedule, is_active, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (f'每日运行配置备份', device_id, 'scheduled', 'running-config', 
-                  '0 2 * * *', True, datetime.now(), datetime.now()))
+        db.flush()
+        device_ids = [device_id for device_id, in db.query(Device.id).all()]
+        
+        for device_id in device_ids:
+            # 创建运行配置备份策略（每天02:00）
+            daily_start = next_run_at(2)
+            db.add(Strategy(
+                name='每日运行配置备份', device_id=device_id, strategy_type='recurring',
+                backup_type='running-config', frequency_type='day', frequency_value=1,
+                start_time=daily_start, next_execution=daily_start, is_active=True,
+                created_at=datetime.now(), updated_at=datetime.now()
+            ))
             
-            # 创建启动配置备份策略
-            cursor.execute('''
-                INSERT INTO strategies 
-                (name, device_id, strategy_type, backup_type, schedule, is_active, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (f'每周启动配置备份', device_id, 'scheduled', 'startup-config', 
-                  '0 3 * * 0', True, datetime.now(), datetime.now()))
+            # 创建启动配置备份策略（每周03:00）
+            weekly_start = next_run_at(3)
+            db.add(Strategy(
+                name='每周启动配置备份', device_id=device_id, strategy_type='recurring',
+                backup_type='startup-config', frequency_type='day', frequency_value=7,
+                start_time=weekly_start, next_execution=weekly_start, is_active=True,
+                created_at=datetime.now(), updated_at=datetime.now()
+            ))
             
             print(f"   ✅ 已为设备 {device_id} 创建备份策略")
         
-        conn.commit()
+        # 设备ID是显式写入的，需要校正自增序列；同时更新设备的最近备份信息
+        db.flush()
+        reset_sequences(db.connection(), [Device.__table__])
+        BackupService.refresh_last_backup_info(db, device_ids)
+        db.commit()
+        
+        # 备份统计根据恢复后的备份记录重建
+        StatsService.rebuild(db)
         print("✅ 从备份恢复数据完成！")
         
         # 显示恢复的数据统计
         print("\n📊 数据恢复统计:")
-        cursor.execute("SELECT COUNT(*) FROM devices")
-        device_count = cursor.fetchone()[0]
-        print(f"   - 设备: {device_count} 台")
-        
-        cursor.execute("SELECT COUNT(*) FROM backups")
-        backup_count = cursor.fetchone()[0]
-        print(f"   - 备份记录: {backup_count} 条")
-        
-        cursor.execute("SELECT COUNT(*) FROM strategies")
-        strategy_count = cursor.fetchone()[0]
-        print(f"   - 备份策略: {strategy_count} 个")
+        print(f"   - 设备: {db.query(Device).count()} 台")
+        print(f"   - 备份记录: {db.query(Backup).count()} 条")
+        print(f"   - 备份策略: {db.query(Strategy).count()} 个")
         
         # 显示设备详情
         print("\n📱 设备详情:")
-        cursor.execute("SELECT id, name, ip_address FROM devices")
-        devices = cursor.fetchall()
-        for device_id, name, ip in devices:
+        for device_id, name, ip in db.query(Device.id, Device.name, Device.ip_address).all():
             print(f"   - {name} ({ip}) - ID: {device_id}")
         
         # 显示备份类型统计
         print("\n💾 备份类型统计:")
-        cursor.execute("SELECT backup_type, COUNT(*) FROM backups GROUP BY backup_type")
-        backup_types = cursor.fetchall()
+        backup_types = db.query(Backup.backup_type, func.count(Backup.id)).group_by(Backup.backup_type).all()
         for backup_type, count in backup_types:
             print(f"   - {backup_type}: {count} 条")
         
         return True
         
     except Exception as e:
+        db.rollback()
         print(f"❌ 恢复数据时出错: {e}")
         return False
     finally:
-        if conn:
-            conn.close()
+        db.close()
 
 if __name__ == "__main__":
     restore_from_backup()
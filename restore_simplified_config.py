@@ -3,27 +3,26 @@
 恢复精简的系统配置数据 - 优化版本
 """
 
-import sqlite3
-import os
 from datetime import datetime
 
+from backend.database import SessionLocal
+from backend.maintenance import get_missing_tables
+from backend.models import AIConfig, AnalysisPrompt, Config
+
 def restore_simplified_config():
     """恢复精简的系统配置数据"""
     
-    db_path = 'data/xconfkit.db'
-    
-    if not os.path.exists(db_path):
-        print(f"❌ 数据库文件不存在: {db_path}")
+    missing_tables = get_missing_tables(['configs', 'ai_configs', 'analysis_prompts'])
+    if missing_tables:
+        print(f"❌ 数据库未初始化，缺少表: {missing_tables}")
         return False
     
+    db = SessionLocal()
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
         print("🔄 开始恢复精简系统配置...")
         
         # 清空现有配置
-        cursor.execute("DELETE FROM configs")
+        db.query(Config).delete()
         print("📝 已清空现有配置")
         
         # 1. 基础设置 (basic) - 只保留用户需要了解的配置
@@ -93,29 +92,29 @@ def restore_simplified_config():
             else:
                 data_type = 'string'
             
-            cursor.execute('''
-                INSERT INTO configs (category, "key", value, data_type, description, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (category, key, value, data_type, description, datetime.now(), datetime.now()))
+            db.add(Config(
+                category=category, key=key, value=value, data_type=data_type, description=description,
+                created_at=datetime.now(), updated_at=datetime.now()
+            ))
         
         # 3. 恢复AI配置
         print("🤖 恢复AI配置...")
         
         # 清空现有AI配置
-        cursor.execute("DELETE FROM ai_configs")
+        db.query(AIConfig).delete()
         
         # 插入默认AI配置
-        cursor.execute('''
-            INSERT INTO ai_configs 
-            (provider, api_key, model, base_url, timeout, enable_cache, enable_history, auto_retry, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', ('openai', '', 'gpt-4', 'https://api.openai.com/v1', 30, True, True, True, datetime.now(), datetime.now()))
+        db.add(AIConfig(
+            provider='openai', api_key='', model='gpt-4', base_url='https://api.openai.com/v1', timeout=30,
+            enable_cache=True, enable_history=True, auto_retry=True,
+            created_at=datetime.now(), updated_at=datetime.now()
+        ))
         
         # 4. 恢复分析提示词
         print("📝 恢复分析提示词...")
         
         # 清空现有提示词
-        cursor.execute("DELETE FROM analysis_prompts")
+        db.query(AnalysisPrompt).delete()
         
         # 插入默认提示词
         default_prompts = [
@@ -172,24 +171,19 @@ def restore_simplified_config():
         ]
         
         for dimension, name, description, content, is_default in default_prompts:
-            cursor.execute('''
-                INSERT INTO analysis_prompts 
-                (dimension, name, description, content, is_default, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (dimension, name, description, content, is_default, datetime.now(), datetime.now()))
+            db.add(AnalysisPrompt(
+                dimension=dimension, name=name, description=description, content=content,
+                is_default=is_default, created_at=datetime.now(), updated_at=datetime.now()
+            ))
         
-        conn.commit()
+        db.commit()
         print("✅ 精简配置恢复完成！")
         
         # 统计信息
-        cursor.execute("SELECT COUNT(*) FROM configs WHERE category = 'basic'")
-        basic_count = cursor.fetchone()[0]
-        cursor.execute("SELECT COUNT(*) FROM configs WHERE category = 'advanced'")
-        advanced_count = cursor.fetchone()[0]
-        cursor.execute("SELECT COUNT(*) FROM ai_configs")
-        ai_count = cursor.fetchone()[0]
-        cursor.execute("SELECT COUNT(*) FROM analysis_prompts")
-        prompt_count = cursor.fetchone()[0]
+        basic_count = db.query(Config).filter(Config.category == 'basic').count()
+        advanced_count = db.query(Config).filter(Config.category == 'advanced').count()
+        ai_count = db.query(AIConfig).count()
+        prompt_count = db.query(AnalysisPrompt).count()
         
         print(f"\n📊 配置统计:")
         print(f"   - 基础设置: {basic_count} 项")
@@ -200,11 +194,11 @@ def restore_simplified_config():
         return True
         
     except Exception as e:
+        db.rollback()
         print(f"❌ 恢复数据时出错: {e}")
         return False
     finally:
-        if conn:
-            conn.close()
+        db.close()
 
 if __name__ == "__main__":
     restore_simplified_config()
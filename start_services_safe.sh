@@ -101,7 +101,13 @@ create_backup() {
     
     # 备份数据库
     if [ -f "data/xconfkit.db" ]; then
-        cp "data/xconfkit.db" "$backup_dir/"
+        # WAL模式下直接复制文件可能缺少未检查点的数据，优先使用SQLite在线备份
+        if command -v sqlite3 &> /dev/null; then
+            sqlite3 "data/xconfkit.db" ".backup '$backup_dir/xconfkit.db'"
+        else
+            cp "data/xconfkit.db" "$backup_dir/"
+            cp "data/xconfkit.db-wal" "$backup_dir/" 2>/dev/null || true
+        fi
         log_success "数据库已备份到 $backup_dir/"
     fi
     
@@ -136,7 +142,10 @@ restore_from_backup() {
     
     # 恢复数据库
     if [ -f "$backup_path/xconfkit.db" ]; then
+        # 删除旧数据库残留的WAL文件，避免与恢复的数据库混用
+        rm -f "data/xconfkit.db-wal" "data/xconfkit.db-shm"
         cp "$backup_path/xconfkit.db" "data/xconfkit.db"
+        cp "$backup_path/xconfkit.db-wal" "data/" 2>/dev/null || true
         log_success "数据库已恢复"
     fi
     
@@ -0,0 +1,48 @@
+"""
+后端测试公共夹具 - 内存数据库和系统配置，各测试文件只准备自己的测试数据
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.database import Base
+from backend.services.config_manager import ConfigManager
+
+
+@pytest.fixture
+def engine():
+    """已建表的内存数据库，所有会话共用同一个连接"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def Session(engine):
+    """内存数据库的会话工厂"""
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def session(Session):
+    """内存数据库会话，测试结束时关闭"""
+    session = Session()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    """系统配置：ConfigManager.get_config 读取此字典中的 "分类.键"，未设置时返回默认值"""
+    settings = {}
+    monkeypatch.setattr(ConfigManager, "get_config", staticmethod(
+        lambda category, key, default=None: settings.get(f"{category}.{key}", default)
+    ))
+    return settings
@@ -0,0 +1,129 @@
+"""
+AI接口限流和重试测试 - 令牌桶按每分钟额度匀速放行，429/5xx 按退避重试并遵守 Retry-After，auto_retry 关闭时不重试
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import pytest
+from aiohttp import web
+
+from backend.services import ai_rate_limit
+from backend.services.ai_rate_limit import ProviderRateLimiter, RateLimiterRegistry, TokenBucket, parse_retry_after
+from backend.services.analysis_service import AnalysisService
+from backend.services.http_client import http_client_pool
+
+
+@pytest.fixture(autouse=True)
+def fast_retry(monkeypatch):
+    monkeypatch.setattr(ai_rate_limit, "AI_RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(ai_rate_limit, "ai_rate_limiters", RateLimiterRegistry())
+
+
+async def _start_fake_ai(statuses, headers=None):
+    """启动本地模拟的 chat/completions 接口，依次返回 statuses 中的状态码，之后返回 200"""
+    calls = []
+
+    async def completions(request):
+        calls.append(time.perf_counter())
+        status = statuses[len(calls) - 1] if len(calls) <= len(statuses) else 200
+        if status != 200:
+            return web.Response(status=status, text="rate limited", headers=headers or {})
+        return web.json_response({"choices": [{"message": {"content": "ok"}}]})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/v1", calls
+
+
+def _analyze(statuses, headers=None, **ai_config):
+    async def scenario():
+        runner, base_url, calls = await _start_fake_ai(statuses, headers)
+        config = {"provider": "alibaba", "api_key": "test", "model": "qwen-turbo",
+                  "base_url": base_url, "timeout": 5, **ai_config}
+        try:
+            start = time.perf_counter()
+            outcome = await AnalysisService._analyze_dimension(config, "security", "检查安全配置", 5)
+            return outcome, calls, start
+        finally:
+            await http_client_pool.close()
+            await runner.cleanup()
+
+    return asyncio.run(scenario())
+
+
+@pytest.mark.backend
+def test_retries_rate_limit_and_server_errors():
+    (success, content), calls, _ = _analyze([429, 503])
+    assert success and content == "ok"
+    assert len(calls) == 3
+
+
+@pytest.mark.backend
+def test_retry_after_is_honored():
+    (success, _), calls, start = _analyze([429], headers={"Retry-After": "0.3"})
+    assert success and len(calls) == 2
+    assert calls[1] - calls[0] >= 0.3
+
+
+@pytest.mark.backend
+def test_no_retry_when_disabled_or_not_retryable():
+    (success, content), calls, _ = _analyze([503], auto_retry=False)
+    assert not success and content.startswith("分析失败: API调用失败: 503")
+    assert len(calls) == 1
+
+    (success, _), calls, _ = _analyze([400])
+    assert not success and len(calls) == 1
+
+
+@pytest.mark.backend
+def test_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(ai_rate_limit, "AI_MAX_RETRIES", 2)
+    (success, content), calls, _ = _analyze([500] * 5)
+    assert not success and "500" in content
+    assert len(calls) == 3
+
+
+@pytest.mark.backend
+def test_token_bucket_paces_requests():
+    bucket = TokenBucket(60)
+    bucket.updated = 0
+    # 容量为一分钟的额度，之后按每秒 1 个补充
+    assert bucket.reserve(60, now=0) == 0
+    assert bucket.reserve(1, now=0) == pytest.approx(1)
+    assert bucket.reserve(1, now=0) == pytest.approx(2)
+    assert bucket.reserve(1, now=3) == pytest.approx(0)
+
+    limiter = ProviderRateLimiter(requests_per_minute=600, tokens_per_minute=6000)
+    limiter.requests.updated = limiter.tokens.updated = 0
+    # token 额度先用完时按 token 数限流：每秒补充 100 个 token
+    assert limiter.reserve(6000, now=0) == 0
+    assert limiter.reserve(500, now=0) == pytest.approx(5)
+    # 单次超过容量时按容量计算，不会永远等待
+    assert ProviderRateLimiter(0, 1000).reserve(5000, now=time.monotonic()) == 0
+    assert ProviderRateLimiter(0, 0).reserve(10 ** 6) == 0
+
+
+@pytest.mark.backend
+def test_rate_limit_shared_per_provider(monkeypatch):
+    monkeypatch.setenv("AI_RATE_LIMIT_ALIBABA_RPM", "120")
+    registry = RateLimiterRegistry()
+    limiter = registry.get({"provider": "alibaba", "base_url": "https://dashscope.aliyuncs.com/compatible-mode/v1/"})
+    assert limiter is registry.get({"provider": "alibaba", "base_url": "https://dashscope.aliyuncs.com/compatible-mode/v1"})
+    assert limiter.requests.capacity == 120 and limiter.tokens is None
+    assert registry.get({"provider": "openai", "base_url": "https://api.openai.com/v1"}).requests is None
+
+
+@pytest.mark.backend
+def test_parse_retry_after():
+    now = datetime(2024, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+    assert parse_retry_after("5") == 5
+    assert parse_retry_after("Mon, 01 Jan 2024 00:00:30 GMT", now=now) == 30
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
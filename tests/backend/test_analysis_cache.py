@@ -0,0 +1,137 @@
+"""
+分析结果缓存测试 - 配置未变化时重复分析命中缓存不调用AI，enable_cache 关闭时不使用缓存，过期和超出容量的缓存被淘汰
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.models import AIConfig, AnalysisCacheEntry, AnalysisPrompt, Backup, Device
+from backend.services import analysis_service
+from backend.services.analysis_cache import AnalysisResultCache, build_cache_key, normalize_config
+from backend.services.analysis_service import AnalysisService
+
+CONFIG = "sysname core-1\ninterface GigabitEthernet0/1\n ip address 10.0.0.1 255.255.255.0\n"
+
+
+@pytest.fixture
+def db(session):
+    session.add(Device(id=1, name="core-1", ip_address="10.0.0.1", username="admin", password="secret"))
+    session.add(Backup(id=1, device_id=1, backup_type="running-config", status="success", content=CONFIG))
+    # 同一份配置的新备份，只有导出时间不同
+    session.add(Backup(id=2, device_id=1, backup_type="running-config", status="success",
+                       content="! Last configuration change at 10:00:00 UTC\r\n" + CONFIG.replace("\n", "\r\n")))
+    session.add(Backup(id=3, device_id=1, backup_type="running-config", status="success",
+                       content=CONFIG + "ntp server 10.0.0.254\n"))
+    session.add(AIConfig(provider="openai", api_key="test", model="gpt-4", base_url="http://ai.invalid", timeout=5))
+    session.add(AnalysisPrompt(dimension="security", name="安全", content="检查安全配置"))
+    session.add(AnalysisPrompt(dimension="redundancy", name="冗余", content="检查冗余配置"))
+    session.commit()
+    return session
+
+
+@pytest.fixture
+def cache(monkeypatch, settings):
+    fresh = AnalysisResultCache(memory_size=2)
+    monkeypatch.setattr(analysis_service, "analysis_cache", fresh)
+    return fresh
+
+
+@pytest.fixture
+def ai_calls(monkeypatch):
+    calls = []
+
+    async def fake_call(ai_config, prompt):
+        calls.append(prompt)
+        return {"success": True, "content": f"report {len(calls)}"}
+
+    monkeypatch.setattr(AnalysisService, "_call_ai_api", staticmethod(fake_call))
+    return calls
+
+
+def _analyze(db, backup_id, ai_config=None):
+    return asyncio.run(AnalysisService.analyze_config(device_id=1, backup_id=backup_id, ai_config=ai_config, db=db))
+
+
+@pytest.mark.backend
+def test_unchanged_config_hits_cache(db, cache, ai_calls):
+    first = _analyze(db, 1)
+    assert first["success"] and first["cached_dimensions"] == []
+    assert len(ai_calls) == 2
+
+    # 时间戳行和换行符不同的同一份配置命中缓存
+    second = _analyze(db, 2)
+    assert len(ai_calls) == 2
+    assert second["data"] == first["data"]
+    assert sorted(second["cached_dimensions"]) == ["redundancy", "security"]
+    assert second["record_id"] != first["record_id"]
+
+    # 配置变化后重新分析
+    _analyze(db, 3)
+    assert len(ai_calls) == 4
+
+    stats = cache.get_stats(db)
+    assert stats["memory_hits"] == 2 and stats["misses"] == 4
+    assert stats["hit_rate"] == round(2 / 6, 4)
+    assert stats["db_entries"] == 4
+
+
+@pytest.mark.backend
+def test_database_hit_after_memory_eviction(db, cache, ai_calls):
+    _analyze(db, 1)
+    _analyze(db, 3)
+    # 进程内缓存只保留最近的两条，第一次分析的结果从数据库读取
+    _analyze(db, 1)
+    assert len(ai_calls) == 4
+    assert cache.db_hits == 2
+    assert db.query(AnalysisCacheEntry).filter(AnalysisCacheEntry.hit_count == 1).count() == 2
+
+
+@pytest.mark.backend
+def test_cache_disabled(db, cache, ai_calls):
+    ai_config = {"provider": "openai", "api_key": "test", "model": "gpt-4",
+                 "base_url": "http://ai.invalid", "timeout": 5, "enable_cache": False}
+    _analyze(db, 1, ai_config)
+    _analyze(db, 1, ai_config)
+    assert len(ai_calls) == 4
+    assert db.query(AnalysisCacheEntry).count() == 0
+
+    # 不同的模型参数使用不同的缓存键
+    _analyze(db, 1)
+    _analyze(db, 1, {**ai_config, "enable_cache": True, "model": "gpt-4o"})
+    assert len(ai_calls) == 8
+
+
+@pytest.mark.backend
+def test_failed_results_not_cached(db, cache, monkeypatch):
+    async def failing_call(ai_config, prompt):
+        return {"success": False, "error": "API调用失败: 500"}
+
+    monkeypatch.setattr(AnalysisService, "_call_ai_api", staticmethod(failing_call))
+    result = _analyze(db, 1)
+    assert result["data"]["security"].startswith("分析失败")
+    assert db.query(AnalysisCacheEntry).count() == 0
+
+
+@pytest.mark.backend
+def test_ttl_and_size_eviction(db, cache, settings):
+    settings.update({"analysis.cache_ttl_hours": 1, "analysis.cache_max_entries": 3})
+    start = datetime(2024, 1, 1)
+    for index in range(5):
+        cache.put_many(db, {f"key-{index}": ("security", f"report {index}")}, now=start + timedelta(minutes=index))
+
+    assert sorted(entry.cache_key for entry in db.query(AnalysisCacheEntry)) == ["key-2", "key-3", "key-4"]
+
+    later = start + timedelta(hours=2)
+    assert cache.get_many(db, ["key-4"], now=later) == {}
+    assert cache.evict(db, now=later) == 3
+
+
+@pytest.mark.backend
+def test_normalize_config():
+    assert normalize_config("a  \r\n\r\n! Time: 10:00\r\nb\n") == "a\nb"
+    params = {"temperature": 0.7}
+    ai_config = {"provider": "openai", "base_url": "http://ai/v1", "model": "gpt-4"}
+    assert build_cache_key("a\nb", "p", ai_config, params) == build_cache_key("a\r\nb\r\n", "p", ai_config, params)
+    assert build_cache_key("a\nb", "p", ai_config, params) != build_cache_key("a\nb", "q", ai_config, params)
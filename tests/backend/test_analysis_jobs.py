@@ -0,0 +1,244 @@
+"""
+后台分析任务测试 - 提交后立即返回任务ID，每个维度完成后更新分析记录，可轮询或通过 SSE 获取进度和实时生成的内容
+"""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.models import AnalysisPrompt, AnalysisRecord, Backup, Device
+from backend.services.analysis_jobs import AnalysisJobManager
+from backend.services.analysis_service import AnalysisService
+
+DIMENSIONS = ["security", "redundancy", "performance"]
+AI_CONFIG = {"provider": "openai", "api_key": "test", "model": "gpt-4",
+             "base_url": "http://ai.invalid", "timeout": 5, "enable_cache": False}
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # 后台任务和轮询使用各自的会话，使用文件数据库而不是共享单个连接的内存数据库
+    engine = create_engine(f"sqlite:///{tmp_path / 'analysis.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    session = factory()
+    session.add(Device(id=1, name="core-1", ip_address="10.0.0.1", username="admin", password="secret"))
+    session.add(Backup(id=1, device_id=1, backup_type="running-config", status="success", content="hostname core-1"))
+    for dimension in DIMENSIONS:
+        session.add(AnalysisPrompt(dimension=dimension, name=dimension, content=f"检查{dimension}"))
+    session.commit()
+    session.close()
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def gated_ai(monkeypatch):
+    """模拟AI接口：每个维度等待对应的事件后返回，测试按顺序放行各维度"""
+    gates = {}
+
+    async def fake_call(ai_config, prompt):
+        dimension = next(dimension for dimension in DIMENSIONS if f"从{dimension}维度" in prompt)
+        await gates.setdefault(dimension, asyncio.Event()).wait()
+        if dimension == "performance":
+            return {"success": False, "error": "API调用失败: 500"}
+        return {"success": True, "content": f"report: {dimension}"}
+
+    async def fake_stream(ai_config, prompt, on_token, params=None):
+        result = await fake_call(ai_config, prompt)
+        if result["success"]:
+            for token in (result["content"][:7], result["content"][7:]):
+                await on_token(token)
+        return result
+
+    monkeypatch.setattr(AnalysisService, "_call_ai_api", staticmethod(fake_call))
+    monkeypatch.setattr(AnalysisService, "_stream_ai_api", staticmethod(fake_stream))
+
+    def release(dimension):
+        gates.setdefault(dimension, asyncio.Event()).set()
+    return release
+
+
+async def _wait_for(manager, job_id, condition):
+    for _ in range(200):
+        job = await manager.get_job(job_id)
+        if condition(job):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"任务状态未达到预期: {job}")
+
+
+@pytest.mark.backend
+def test_job_reports_progress_per_dimension(session_factory, gated_ai):
+    manager = AnalysisJobManager(session_factory)
+
+    async def scenario():
+        db = session_factory()
+        submitted = await manager.submit(db, device_id=1, backup_id=1, dimensions=DIMENSIONS, ai_config=AI_CONFIG)
+        db.close()
+        assert submitted["success"] and submitted["status"] == "processing"
+        job_id = submitted["job_id"]
+
+        job = await manager.get_job(job_id)
+        assert job["status"] == "processing" and job["progress"]["completed"] == 0
+
+        gated_ai("redundancy")
+        job = await _wait_for(manager, job_id, lambda job: job["progress"]["completed"] == 1)
+        assert job["status"] == "processing"
+        assert job["completed_dimensions"] == ["redundancy"]
+        assert job["data"] == {"redundancy": "report: redundancy"}
+        assert job["progress"]["percent"] == 33
+
+        gated_ai("security")
+        gated_ai("performance")
+        return await _wait_for(manager, job_id, lambda job: job["status"] != "processing")
+
+    job = asyncio.run(scenario())
+
+    assert job["status"] == "success" and job["error_message"] is None
+    assert job["progress"] == {"completed": 3, "total": 3, "percent": 100}
+    assert job["data"]["performance"] == "分析失败: API调用失败: 500"
+    assert job["processing_time"] is not None
+
+
+@pytest.mark.backend
+def test_sse_stream(session_factory, gated_ai):
+    manager = AnalysisJobManager(session_factory)
+
+    async def scenario():
+        db = session_factory()
+        job_id = (await manager.submit(db, device_id=1, backup_id=1, dimensions=DIMENSIONS, ai_config=AI_CONFIG))["job_id"]
+        db.close()
+
+        messages = []
+
+        async def consume():
+            async for message in manager.stream(job_id, poll_interval=5):
+                messages.append(message)
+                if message.startswith("event: progress"):
+                    # 收到上一个进度后再放行下一个维度
+                    pending = [dimension for dimension in DIMENSIONS
+                               if dimension not in json.loads(message.split("data: ", 1)[1])["data"]]
+                    if pending:
+                        gated_ai(pending[0])
+
+        await asyncio.wait_for(consume(), 5)
+        return messages
+
+    messages = asyncio.run(scenario())
+
+    events = [message.split("\n")[0] for message in messages]
+    assert events[-1] == "event: done" and set(events[:-1]) == {"event: progress", "event: token"}
+    # 每个维度完成后推送一次进度
+    progress = [message for message in messages if message.startswith("event: progress")]
+    completed = [json.loads(message.split("data: ", 1)[1])["progress"]["completed"] for message in progress]
+    assert completed[:3] == [0, 1, 2] and completed == sorted(set(completed))
+    done = json.loads(messages[-1].split("data: ", 1)[1])
+    assert done["status"] == "success" and len(done["data"]) == 3
+    # 生成的内容在维度完成之前推送，拼接后与最终结果一致
+    streamed = {}
+    for message in messages:
+        if message.startswith("event: token"):
+            token = json.loads(message.split("data: ", 1)[1])
+            streamed[token["dimension"]] = streamed.get(token["dimension"], "") + token["text"]
+    assert streamed == {"security": "report: security", "redundancy": "report: redundancy"}
+    assert events.index("event: token") < events.index("event: progress", 1)
+
+
+@pytest.mark.backend
+def test_submit_validation_and_all_failed(session_factory, monkeypatch):
+    async def failing_call(ai_config, prompt):
+        return {"success": False, "error": "API调用失败: 401"}
+
+    async def failing_stream(ai_config, prompt, on_token, params=None):
+        return await failing_call(ai_config, prompt)
+
+    monkeypatch.setattr(AnalysisService, "_call_ai_api", staticmethod(failing_call))
+    monkeypatch.setattr(AnalysisService, "_stream_ai_api", staticmethod(failing_stream))
+    manager = AnalysisJobManager(session_factory)
+
+    async def scenario():
+        db = session_factory()
+        invalid = await manager.submit(db, device_id=1, backup_id=1, dimensions=["unknown"], ai_config=AI_CONFIG)
+        missing = await manager.submit(db, device_id=1, backup_id=99, ai_config=AI_CONFIG)
+        job_id = (await manager.submit(db, device_id=1, backup_id=1, ai_config=AI_CONFIG))["job_id"]
+        db.close()
+        return invalid, missing, await _wait_for(manager, job_id, lambda job: job["status"] != "processing")
+
+    invalid, missing, job = asyncio.run(scenario())
+
+    assert not invalid["success"] and "无效的分析维度" in invalid["message"]
+    assert not missing["success"]
+    assert job["status"] == "failed" and job["error_message"] == "所有维度分析失败"
+
+
+@pytest.mark.backend
+def test_cancelled_job_marked_failed(session_factory, gated_ai):
+    manager = AnalysisJobManager(session_factory)
+
+    async def scenario():
+        db = session_factory()
+        job_id = (await manager.submit(db, device_id=1, backup_id=1, ai_config=AI_CONFIG))["job_id"]
+        db.close()
+        await asyncio.sleep(0.05)
+        await manager.shutdown()
+        return await manager.get_job(job_id)
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "failed" and job["error_message"] == "分析任务已取消"
+
+
+@pytest.mark.backend
+def test_recover_interrupted_analyses(session_factory):
+    now = datetime(2024, 1, 1, 12, 0)
+    db = session_factory()
+    # 旧版本保存的完整记录、已中断的记录、可能仍在其他进程中执行的记录
+    db.add(AnalysisRecord(id=1, device_id=1, backup_id=1, dimensions=["security"], status="processing",
+                          result=json.dumps({"security": "ok"}), created_at=now - timedelta(days=3)))
+    db.add(AnalysisRecord(id=2, device_id=1, backup_id=1, dimensions=["security", "redundancy"], status="processing",
+                          result=json.dumps({"security": "ok"}), created_at=now - timedelta(hours=2)))
+    db.add(AnalysisRecord(id=3, device_id=1, backup_id=1, dimensions=["security"], status="processing",
+                          result=json.dumps({}), created_at=now - timedelta(minutes=5)))
+    db.commit()
+
+    assert AnalysisService.recover_interrupted_analyses(db, stale_after=3600, now=now) == 1
+
+    statuses = {record.id: record.status for record in db.query(AnalysisRecord)}
+    assert statuses == {1: "success", 2: "failed", 3: "processing"}
+    db.close()
+
+
+@pytest.mark.backend
+def test_late_subscriber_receives_partial_content(session_factory, monkeypatch):
+    gate = asyncio.Event()
+
+    async def half_stream(ai_config, prompt, on_token, params=None):
+        # 生成一半后等待，模拟客户端在生成过程中订阅
+        await on_token("report: ")
+        await gate.wait()
+        await on_token("security")
+        return {"success": True, "content": "report: security"}
+
+    monkeypatch.setattr(AnalysisService, "_stream_ai_api", staticmethod(half_stream))
+    manager = AnalysisJobManager(session_factory)
+
+    async def scenario():
+        db = session_factory()
+        job_id = (await manager.submit(db, device_id=1, backup_id=1, dimensions=["security"], ai_config=AI_CONFIG))["job_id"]
+        db.close()
+        await asyncio.sleep(0.05)
+        stream = manager.stream(job_id, poll_interval=5)
+        first = await stream.__anext__()
+        gate.set()
+        return first, [message async for message in stream]
+
+    first, rest = asyncio.run(scenario())
+
+    assert json.loads(first.split("data: ", 1)[1])["partial"] == {"security": "report: "}
+    assert rest[0] == 'event: token\ndata: {"dimension": "security", "text": "security"}\n\n'
+    assert rest[-1].startswith("event: done")
@@ -0,0 +1,119 @@
+"""
+异步数据库访问测试 - 分析接口的数据库操作不阻塞事件循环，并发请求的AI调用相互重叠
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base, run_db
+from backend.models import AIConfig, AnalysisPrompt, AnalysisRecord, Backup, Device
+from backend.services.analysis_service import AnalysisService
+
+AI_LATENCY = 0.2
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    path = tmp_path / "analysis.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(Device(id=1, name="core-1", ip_address="10.0.0.1", username="admin", password="secret"))
+    session.add(Backup(id=1, device_id=1, backup_type="running-config", status="success", content="hostname core-1"))
+    session.add(AIConfig(provider="openai", api_key="test", model="gpt-4", base_url="http://ai.invalid", timeout=5))
+    session.add(AnalysisPrompt(dimension="security", name="安全", content="检查安全配置"))
+    session.commit()
+    session.close()
+    engine.dispose()
+    return path
+
+
+@pytest.fixture
+def slow_ai(monkeypatch):
+    """模拟网络延迟固定的AI接口"""
+    async def fake_call(ai_config, prompt):
+        await asyncio.sleep(AI_LATENCY)
+        return {"success": True, "content": "ok"}
+
+    monkeypatch.setattr(AnalysisService, "_call_ai_api", staticmethod(fake_call))
+
+
+def _count_records(path):
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        session = sessionmaker(bind=engine)()
+        return session.query(AnalysisRecord).count()
+    finally:
+        engine.dispose()
+
+
+async def _run_concurrently(session_factory, requests):
+    async def analyze():
+        async with session_factory() as db:
+            return await AnalysisService.analyze_config(device_id=1, backup_id=1, db=db)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(analyze() for _ in range(requests)))
+    return results, time.perf_counter() - start
+
+
+@pytest.mark.backend
+@pytest.mark.performance
+def test_concurrent_analyses_overlap_with_async_session(database_path, slow_ai):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}")
+        try:
+            factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+            return await _run_concurrently(factory, requests=8)
+        finally:
+            await engine.dispose()
+
+    results, elapsed = asyncio.run(scenario())
+
+    assert all(result["success"] for result in results), results
+    assert len({result["record_id"] for result in results}) == 8
+    # 8个请求串行需要 8 * AI_LATENCY，重叠执行应接近单次延迟
+    assert elapsed < AI_LATENCY * 4
+    assert _count_records(database_path) == 8
+
+
+@pytest.mark.backend
+def test_sync_session_runs_in_threadpool(database_path, slow_ai):
+    """未安装异步驱动时，同步会话在线程池中执行"""
+    engine = create_engine(f"sqlite:///{database_path}", connect_args={"check_same_thread": False})
+    SessionLocal = sessionmaker(bind=engine)
+
+    class _SyncSessionContext:
+        async def __aenter__(self):
+            self.db = SessionLocal()
+            return self.db
+
+        async def __aexit__(self, *exc):
+            self.db.close()
+
+    async def scenario():
+        loop_thread = threading.get_ident()
+        db = SessionLocal()
+        try:
+            worker_thread = await run_db(db, lambda session: threading.get_ident())
+        finally:
+            db.close()
+        results, _ = await _run_concurrently(_SyncSessionContext, requests=3)
+        return loop_thread, worker_thread, results
+
+    try:
+        loop_thread, worker_thread, results = asyncio.run(scenario())
+    finally:
+        engine.dispose()
+
+    assert worker_thread != loop_thread
+    assert all(result["success"] for result in results)
+    assert _count_records(database_path) == 3
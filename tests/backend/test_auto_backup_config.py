@@ -0,0 +1,60 @@
+"""
+自动备份配置接口测试 - 配置写入数据库并刷新配置缓存
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.database import get_async_db
+from backend.models import Config
+from backend.routers import backups
+from backend.services.config_manager import ConfigManager
+
+
+@pytest.fixture
+def client(Session, monkeypatch):
+    monkeypatch.setattr(ConfigManager, "_get_db_session", staticmethod(Session))
+    monkeypatch.setattr(ConfigManager, "_cache", {})
+    monkeypatch.setattr(ConfigManager, "_cache_valid", False)
+
+    async def override_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(backups.router)
+    app.dependency_overrides[get_async_db] = override_db
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.mark.backend
+def test_update_auto_backup_config(client, session):
+    response = client.post("/api/backups/auto-backup/config", params={
+        "enabled": "false", "schedule_time": "03:30", "retention_days": 7
+    })
+    assert response.status_code == 200 and response.json()["success"]
+
+    # 配置写入数据库，并立即通过配置管理器生效
+    stored = {
+        config.key: (config.value, config.data_type)
+        for config in session.query(Config).filter(Config.category == "backup")
+    }
+    assert stored == {
+        "enable_auto_backup": ("false", "boolean"),
+        "auto_backup_time": ("03:30", "string"),
+        "backup_retention_days": ("7", "integer"),
+    }
+    assert ConfigManager.get_config("backup", "enable_auto_backup", True) is False
+    assert ConfigManager.get_config("backup", "auto_backup_time") == "03:30"
+    assert ConfigManager.get_config("backup", "backup_retention_days") == 7
+
+    # 只更新传入的配置项
+    response = client.post("/api/backups/auto-backup/config", params={"enabled": "true"})
+    assert response.status_code == 200
+    assert ConfigManager.get_config("backup", "enable_auto_backup") is True
+    assert ConfigManager.get_config("backup", "backup_retention_days") == 7
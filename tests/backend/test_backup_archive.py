@@ -0,0 +1,205 @@
+"""
+备份归档测试 - 旧备份在保留期清理前移到归档表，普通列表只查询热表，备份历史合并查询、按ID读取、删除和统计计数保持正确
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import MetaData, create_engine, func, inspect
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.database import Base
+from backend.migrations import run_migrations
+from backend.models import AnalysisRecord, Backup, BackupArchive, BackupStat, Device
+from backend.services.archive_service import ArchiveService
+from backend.services.backup_service import BackupService
+from backend.services.stats_service import StatsService
+
+NOW = datetime(2024, 6, 1, 12, 0)
+CUTOFF = NOW - timedelta(days=90)
+
+
+@pytest.fixture
+def db(session):
+    session.add(Device(id=1, name="sw-1", ip_address="10.0.0.1", username="admin", password="secret"))
+    # 200 天前到现在，每 10 天一个备份；最新的备份 ID 最大
+    for index in range(20):
+        session.add(Backup(
+            device_id=1, backup_type="running-config", status="success", file_size=10,
+            created_at=NOW - timedelta(days=200 - index * 10)
+        ))
+    session.commit()
+    StatsService.rebuild(session)
+    return session
+
+
+def _stats(db):
+    return sorted(
+        (stat.device_id, stat.day, stat.status, stat.backup_count, stat.total_bytes)
+        for stat in db.query(BackupStat).all()
+        if stat.backup_count or stat.total_bytes
+    )
+
+
+@pytest.mark.backend
+def test_archive_moves_old_backups(db):
+    oldest = db.query(Backup).order_by(Backup.created_at).first()
+    # 被分析记录引用的备份保留在热表
+    db.add(AnalysisRecord(device_id=1, backup_id=oldest.id, dimensions=["security"], status="success"))
+    db.commit()
+    stats_before = _stats(db)
+
+    result = ArchiveService.archive_old_backups(db, now=NOW, cutoff=CUTOFF, batch_size=3)
+
+    old_count = db.query(BackupArchive).filter(BackupArchive.created_at < CUTOFF).count()
+    assert result["archived"] == old_count == 10
+    assert db.query(Backup).filter(Backup.created_at < CUTOFF).one().id == oldest.id
+    assert db.query(Backup).count() + db.query(BackupArchive).count() == 20
+    # 归档只移动记录，统计不变
+    assert _stats(db) == stats_before
+    StatsService.rebuild(db)
+    assert _stats(db) == stats_before
+
+    # 再次执行没有需要归档的记录
+    assert ArchiveService.archive_old_backups(db, now=NOW, cutoff=CUTOFF)["archived"] == 0
+
+
+@pytest.mark.backend
+def test_lists_and_lookup_include_archive(db):
+    expected = [
+        backup.id for backup in db.query(Backup).order_by(Backup.created_at.desc(), Backup.id.desc())
+    ]
+    ArchiveService.archive_old_backups(db, now=NOW, cutoff=CUTOFF)
+    archived_id = db.query(BackupArchive.id).first()[0]
+
+    hot, _ = BackupService.get_backups_page(db, limit=100)
+    assert all(backup.created_at >= CUTOFF for backup in hot)
+
+    # 备份历史自动合并归档表，游标分页与归档前的完整列表一致
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = BackupService.get_backup_list_page(db, cursor=cursor, limit=3)
+        seen.extend(item["id"] for item in page)
+        if not cursor:
+            break
+    assert seen == expected
+
+    page, _ = BackupService.get_backup_list_page(db, skip=5, limit=4)
+    assert [item["id"] for item in page] == expected[5:9]
+    assert page[0]["device"]["name"] == "sw-1"
+
+    backup = ArchiveService.find_backup(db, archived_id)
+    assert isinstance(backup, BackupArchive) and backup.archived
+
+
+@pytest.mark.backend
+def test_archive_before_retention_cleanup(db, settings):
+    # 默认配置：归档期限不超过保留天数的一半，保留期清理之前备份已进入归档表
+    assert ArchiveService.get_archive_after_days() == 15
+    settings["backup.backup_retention_days"] = 365
+    assert ArchiveService.get_archive_after_days() == 90
+    settings["backup.archive_after_days"] = 0
+    assert ArchiveService.get_archive_cutoff(NOW) is None
+    settings.clear()
+
+    result = ArchiveService.archive_old_backups(db, now=NOW)
+
+    assert result["cutoff"] == (NOW - timedelta(days=15)).isoformat()
+    assert result["archived"] == db.query(BackupArchive).count() == 19
+    assert [backup.created_at for backup in db.query(Backup)] == [NOW - timedelta(days=10)]
+
+
+@pytest.mark.backend
+def test_delete_archived_backup_updates_stats(db):
+    ArchiveService.archive_old_backups(db, now=NOW, cutoff=CUTOFF)
+    archived_id = db.query(BackupArchive.id).first()[0]
+    hot_id = db.query(Backup.id).first()[0]
+
+    result = BackupService.delete_backups(db, [archived_id, hot_id, 9999])
+    assert result["deleted"] == 2 and result["missing"] == 1
+    assert ArchiveService.find_backup(db, archived_id) is None
+
+    incremental = _stats(db)
+    StatsService.rebuild(db)
+    assert incremental == _stats(db)
+    assert StatsService.get_backup_totals(db)["total"] == 18
+
+
+@pytest.mark.backend
+def test_archived_ids_are_not_reused(db):
+    # 归档全部旧备份后删除最大ID的备份，新备份仍不能使用已归档的ID
+    ArchiveService.archive_old_backups(db, now=NOW, cutoff=NOW + timedelta(days=1))
+    assert db.query(Backup).count() == 0
+    max_archived = db.query(func.max(BackupArchive.id)).scalar()
+
+    backup = Backup(device_id=1, backup_type="running-config", status="success", created_at=NOW)
+    db.add(backup)
+    db.commit()
+    assert backup.id > max_archived
+    BackupService.delete_backups(db, [backup.id])
+
+    backup = Backup(device_id=1, backup_type="running-config", status="success", created_at=NOW)
+    db.add(backup)
+    db.commit()
+    assert backup.id == max_archived + 2
+    assert isinstance(ArchiveService.find_backup(db, 1), BackupArchive)
+
+
+@pytest.mark.backend
+def test_migration_rebuilds_backups_with_autoincrement():
+    """升级前的 backups 表没有 AUTOINCREMENT：迁移后保留数据和索引，新ID从热表和归档表的最大ID之后开始"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE backups")
+        metadata = MetaData()
+        Device.__table__.to_metadata(metadata)
+        legacy = Backup.__table__.to_metadata(metadata)
+        legacy.dialect_options['sqlite']['autoincrement'] = False
+        legacy.create(bind=connection)
+        connection.execute(legacy.insert(), [
+            {"id": 3, "device_id": 1, "backup_type": "running-config", "status": "success"},
+        ])
+        connection.execute(BackupArchive.__table__.insert(), [
+            {"id": backup_id, "device_id": 1, "backup_type": "running-config", "status": "success"}
+            for backup_id in (1, 2, 7)
+        ])
+
+    run_migrations(engine)
+
+    with engine.connect() as connection:
+        table_sql = connection.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'backups'").scalar()
+    assert "AUTOINCREMENT" in table_sql
+    assert {index.name for index in Backup.__table__.indexes} <= {
+        index["name"] for index in inspect(engine).get_indexes("backups")
+    }
+    session = sessionmaker(bind=engine)()
+    assert [backup.id for backup in session.query(Backup)] == [3]
+    backup = Backup(device_id=1, backup_type="running-config", status="success")
+    session.add(backup)
+    session.commit()
+    assert backup.id == 8
+    session.close()
+    engine.dispose()
+
+
+@pytest.mark.backend
+def test_last_backup_info_falls_back_to_archive(db):
+    # 成功的备份都已归档，之后只有一次失败的备份
+    ArchiveService.archive_old_backups(db, now=NOW, cutoff=NOW + timedelta(days=1))
+    latest_archived = db.query(BackupArchive).order_by(BackupArchive.created_at.desc()).first()
+    failed = Backup(device_id=1, backup_type="startup-config", status="failed", created_at=NOW)
+    db.add(failed)
+    db.commit()
+
+    BackupService.delete_backups(db, [failed.id])
+    device = db.query(Device).filter(Device.id == 1).one()
+    assert device.last_backup_time == latest_archived.created_at
+    assert device.last_backup_type == "running-config"
+
+    device.last_backup_time = None
+    db.commit()
+    BackupService.update_device_last_backup_info(db, 1)
+    assert device.last_backup_time == latest_archived.created_at
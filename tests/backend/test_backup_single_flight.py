@@ -0,0 +1,108 @@
+"""
+备份单飞控制测试 - 同一设备同一备份类型的并发请求只执行一次备份，设备锁在无人使用时移除
+"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services import backup_service
+from backend.services.backup_service import BackupService
+
+
+class _SignalingEvent(threading.Event):
+    """后到的请求开始等待时发出通知"""
+
+    def __init__(self, waiting):
+        super().__init__()
+        self.waiting = waiting
+
+    def wait(self, timeout=None):
+        self.waiting.set()
+        return super().wait(timeout)
+
+
+@pytest.fixture
+def backup(monkeypatch):
+    """模拟备份执行：阻塞到 release 被设置，设备2执行失败"""
+    backup = SimpleNamespace(calls=[], started=threading.Event(), release=threading.Event())
+
+    def fake_execute(db, device_id, backup_type):
+        backup.calls.append((device_id, backup_type))
+        backup.started.set()
+        assert backup.release.wait(5)
+        if device_id == 2:
+            raise RuntimeError("连接超时")
+        return {"success": True, "message": "备份成功", "backup_id": len(backup.calls)}
+
+    monkeypatch.setattr(BackupService, "_execute_backup", staticmethod(fake_execute))
+    return backup
+
+
+def _run_in_thread(results, name, device_id, backup_type):
+    def run():
+        try:
+            results[name] = BackupService.execute_backup(None, device_id, backup_type)
+        except RuntimeError as e:
+            results[name] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+@pytest.mark.backend
+def test_concurrent_requests_share_one_backup(backup):
+    results = {}
+    first = _run_in_thread(results, "first", 1, "running-config")
+    assert backup.started.wait(5)
+
+    # 第二个请求在第一个备份执行期间到达
+    waiting = threading.Event()
+    backup_service._inflight_backups[(1, "running-config")].done = _SignalingEvent(waiting)
+    second = _run_in_thread(results, "second", 1, "running-config")
+    assert waiting.wait(5)
+
+    backup.release.set()
+    first.join(5)
+    second.join(5)
+
+    assert backup.calls == [(1, "running-config")]
+    assert results["first"] == {"success": True, "message": "备份成功", "backup_id": 1}
+    assert results["second"] == {**results["first"], "shared": True}
+    assert backup_service._inflight_backups == {}
+    assert backup_service._device_locks == {}
+
+
+@pytest.mark.backend
+def test_device_lock_released_when_unused(backup):
+    results = {}
+    running = _run_in_thread(results, "running", 1, "running-config")
+    assert backup.started.wait(5)
+    assert backup_service._device_locks[1].users == 1
+
+    # 同一设备的其他备份类型等待设备锁，共用同一个锁
+    startup = _run_in_thread(results, "startup", 1, "startup-config")
+    while backup_service._device_locks[1].users < 2:
+        startup.join(0.01)
+    assert backup.calls == [(1, "running-config")]
+
+    backup.release.set()
+    running.join(5)
+    startup.join(5)
+
+    assert backup.calls == [(1, "running-config"), (1, "startup-config")]
+    assert results["startup"]["success"] and "shared" not in results["startup"]
+    assert backup_service._device_locks == {}
+
+    # 执行失败时同样移除
+    backup.release.clear()
+    backup.started.clear()
+    failing = _run_in_thread(results, "failing", 2, "running-config")
+    assert backup.started.wait(5)
+    assert 2 in backup_service._device_locks
+    backup.release.set()
+    failing.join(5)
+    assert isinstance(results["failing"], RuntimeError)
+    assert backup_service._device_locks == {}
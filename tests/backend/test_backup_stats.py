@@ -0,0 +1,100 @@
+"""
+备份统计计数测试 - 增量维护的计数与从备份记录重建的结果一致
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.models import Backup, BackupStat, Device
+from backend.schemas import BackupCreate
+from backend.services.backup_service import BackupService
+from backend.services.stats_service import ALL_DEVICES, ALL_TIME, StatsService
+
+
+@pytest.fixture
+def db(session):
+    for device_id in (1, 2):
+        session.add(Device(id=device_id, name=f"sw-{device_id}", ip_address=f"10.0.0.{device_id}",
+                           username="admin", password="secret"))
+    session.commit()
+    return session
+
+
+def _snapshot(db):
+    return sorted(
+        (stat.device_id, stat.day, stat.status, stat.backup_count, stat.total_bytes)
+        for stat in db.query(BackupStat).all()
+        if stat.backup_count or stat.total_bytes
+    )
+
+
+@pytest.mark.backend
+def test_incremental_counters_match_rebuild(db):
+    backups = []
+    for index in range(6):
+        backup = BackupService.create_backup(db, BackupCreate(device_id=1 + index % 2, backup_type="running-config"))
+        backups.append(backup)
+
+    # 备份完成：状态从 pending 变为 success/failed，并写入文件大小
+    for index, backup in enumerate(backups):
+        backup.status = "failed" if index == 0 else "success"
+        backup.file_size = 0 if index == 0 else 100 * index
+        StatsService.record_status_change(db, backup, "pending")
+        db.commit()
+
+    # 删除两条备份（包含一个不存在的ID）
+    StatsService.record_deleted(db, [backups[1].id, backups[2].id, 9999])
+    db.delete(backups[1])
+    db.delete(backups[2])
+    db.commit()
+
+    incremental = _snapshot(db)
+    StatsService.rebuild(db)
+    assert incremental == _snapshot(db)
+
+    totals = StatsService.get_backup_totals(db)
+    assert totals["total"] == 4
+    assert totals["by_status"] == {"success": 3, "failed": 1}
+    assert totals["total_bytes"] == 300 + 400 + 500
+    assert StatsService.get_backup_totals(db, device_id=2)["total"] == 2
+
+
+@pytest.mark.backend
+def test_rebuild_fixes_drift(db):
+    yesterday = datetime.now() - timedelta(days=1)
+    db.add(Backup(device_id=1, backup_type="running-config", status="success", file_size=10, created_at=yesterday))
+    db.add(Backup(device_id=2, backup_type="running-config", status="success", file_size=20))
+    db.commit()
+    # 直接写入的记录没有更新计数
+    assert StatsService.get_backup_totals(db)["total"] == 0
+
+    result = StatsService.rebuild(db)
+
+    assert result["backup_count"] == 2
+    totals = StatsService.get_backup_totals(db)
+    assert totals["total"] == 2
+    assert totals["today"] == 1
+    assert totals["total_bytes"] == 30
+
+
+@pytest.mark.backend
+def test_totals_read_all_time_rows(db):
+    today = datetime.now()
+    for days_ago in range(30):
+        backup = Backup(device_id=1, backup_type="running-config", status="success", file_size=10,
+                        created_at=today - timedelta(days=days_ago))
+        db.add(backup)
+        db.flush()
+        StatsService.record_created(db, backup)
+    db.commit()
+
+    all_time = db.query(BackupStat).filter(BackupStat.device_id == ALL_DEVICES, BackupStat.day == ALL_TIME).one()
+    assert (all_time.status, all_time.backup_count, all_time.total_bytes) == ("success", 30, 300)
+
+    # 总数只来自累计行，历史日期的行不参与汇总
+    db.query(BackupStat).filter(BackupStat.day == (today - timedelta(days=3)).date()).delete()
+    db.commit()
+    totals = StatsService.get_backup_totals(db, today=today.date())
+    assert totals == {"total": 30, "by_status": {"success": 30}, "today": 1, "total_bytes": 300}
+    assert StatsService.get_backup_totals(db, device_id=1, today=today.date())["total"] == 30
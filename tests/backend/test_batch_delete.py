@@ -0,0 +1,95 @@
+"""
+批量删除测试 - 集中删除记录、后台删除文件、分组重算设备最近备份信息
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from backend.models import AnalysisRecord, Backup, BackupStat, Device
+from backend.services.backup_service import BackupService
+from backend.services.file_deleter import file_deleter
+from backend.services.stats_service import StatsService
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def db(session, tmp_path):
+    for device_id in (1, 2, 3):
+        session.add(Device(id=device_id, name=f"sw-{device_id}", ip_address=f"10.0.0.{device_id}",
+                           username="admin", password="secret"))
+    for index in range(1200):
+        path = tmp_path / f"backup_{index}.txt"
+        path.write_text("config")
+        session.add(Backup(
+            id=index + 1,
+            device_id=1 + index % 3,
+            backup_type="startup-config" if index % 2 else "running-config",
+            status="failed" if index % 7 == 0 else "success",
+            file_path=str(path),
+            file_size=6,
+            created_at=START + timedelta(minutes=index)
+        ))
+    session.add(AnalysisRecord(id=1, device_id=1, backup_id=1200, status="success"))
+    session.commit()
+    StatsService.rebuild(session)
+    return session
+
+
+def _stats(db):
+    return sorted(
+        (stat.device_id, stat.day, stat.status, stat.backup_count, stat.total_bytes)
+        for stat in db.query(BackupStat).all()
+        if stat.backup_count or stat.total_bytes
+    )
+
+
+@pytest.mark.backend
+def test_delete_backups_is_set_based(db, tmp_path):
+    """删除1000条备份只执行与批次数相关的少量查询"""
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        result = BackupService.delete_backups(db, list(range(201, 1201)) + [99999])
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    file_deleter.wait_idle()
+
+    assert result == {"deleted": 1000, "missing": 1, "files": 1000, "devices": 3}
+    assert len(statements) < 40
+    assert db.query(Backup).count() == 200
+    assert len(list(tmp_path.iterdir())) == 200
+
+    # 分析记录保留，但不再关联已删除的备份
+    assert db.query(AnalysisRecord).filter(AnalysisRecord.id == 1).one().backup_id is None
+
+    # 计数与重建结果一致
+    incremental = _stats(db)
+    StatsService.rebuild(db)
+    assert incremental == _stats(db)
+
+
+@pytest.mark.backend
+def test_delete_backups_recomputes_last_backup(db):
+    """删除后设备的最近备份信息指向剩余的最新成功备份，没有成功备份时清空"""
+    remaining = {
+        device_id: db.query(Backup).filter(
+            Backup.device_id == device_id, Backup.status == "success", Backup.id <= 600
+        ).order_by(Backup.created_at.desc()).first()
+        for device_id in (1, 2)
+    }
+    device_3_ids = [row.id for row in db.query(Backup.id).filter(Backup.device_id == 3)]
+
+    BackupService.delete_backups(db, list(range(601, 1201)) + device_3_ids)
+
+    for device_id, latest in remaining.items():
+        device = db.query(Device).filter(Device.id == device_id).one()
+        assert device.last_backup_time == latest.created_at
+        assert device.last_backup_type == latest.backup_type
+    device_3 = db.query(Device).filter(Device.id == 3).one()
+    assert device_3.last_backup_time is None
+    assert device_3.last_backup_type is None
@@ -0,0 +1,149 @@
+"""
+分片分析测试 - 超过 token 预算的配置按配置段切分，各片段并发分析后按维度合并，部分片段失败时仍返回结果
+"""
+
+import asyncio
+
+import pytest
+
+from backend.models import AnalysisPrompt, Backup, Device
+from backend.services.analysis_service import AnalysisService
+from backend.services.config_reducer import estimate_tokens, split_config_sections
+
+CONFIG = "\n".join(
+    ["hostname core-1", "!"]
+    + [line for index in range(1, 21) for line in (
+        f"interface GigabitEthernet0/{index}", f" description uplink-{index}",
+        f" ip address 10.0.{index}.1 255.255.255.0", "!"
+    )]
+    + ["router ospf 1", " network 10.0.0.0 0.255.255.255 area 0", "!",
+       "ip access-list extended MGMT", " permit tcp 10.0.0.0 0.0.0.255 any eq 22", "!",
+       "line vty 0 4", " transport input ssh", "!", "end"]
+)
+DIMENSIONS = ["security", "performance"]
+AI_CONFIG = {"provider": "openai", "api_key": "test", "model": "gpt-4",
+             "base_url": "http://ai.invalid", "timeout": 5, "enable_cache": False}
+
+
+@pytest.fixture
+def db(session, settings):
+    settings["analysis.max_config_tokens"] = 200
+    session.add(Device(id=1, name="core-1", ip_address="10.0.0.1", username="admin", password="secret"))
+    session.add(Backup(id=1, device_id=1, backup_type="running-config", status="success", content=CONFIG))
+    for dimension in DIMENSIONS:
+        session.add(AnalysisPrompt(dimension=dimension, name=dimension, content=f"检查{dimension}"))
+    session.commit()
+    return session
+
+
+def _fake_ai(monkeypatch, fail_chunk=None):
+    """片段分析返回 finding: <维度> <片段序号>，合并返回 merged: <维度>；提示中包含 fail_chunk 时模拟失败"""
+    calls = []
+
+    async def fake_call(ai_config, prompt, params=None):
+        calls.append((prompt, params))
+        dimension = next(dimension for dimension in DIMENSIONS if f"检查{dimension}" in prompt)
+        if "配置片段 " in prompt:
+            if fail_chunk and fail_chunk in prompt:
+                return {"success": False, "error": "API调用失败: 500"}
+            index = prompt.split("配置片段 ")[1].split("/")[0]
+            return {"success": True, "content": f"finding: {dimension} {index}"}
+        return {"success": True, "content": f"merged: {dimension}"}
+
+    monkeypatch.setattr(AnalysisService, "_call_ai_api", staticmethod(fake_call))
+    return calls
+
+
+def _analyze(db):
+    return asyncio.run(AnalysisService.analyze_config(
+        device_id=1, backup_id=1, dimensions=DIMENSIONS, ai_config=AI_CONFIG, db=db
+    ))
+
+
+@pytest.mark.backend
+def test_split_config_sections():
+    chunks = split_config_sections(CONFIG, 200)
+
+    assert len(chunks) > 2
+    assert all(chunk["tokens"] <= 200 for chunk in chunks)
+    assert chunks[0]["title"].startswith("接口配置")
+    titles = [chunk["title"] for chunk in chunks]
+    assert "路由配置" in titles and "访问控制配置" in titles
+    # 每个配置段完整地出现在一个片段中
+    joined = "\n".join(chunk["content"] for chunk in chunks)
+    for index in range(1, 21):
+        assert joined.count(f"interface GigabitEthernet0/{index}\n") == 1
+    assert split_config_sections(CONFIG, 100000)[0]["content"].count("interface") == 20
+
+
+@pytest.mark.backend
+def test_chunked_map_reduce(db, monkeypatch):
+    calls = _fake_ai(monkeypatch)
+    chunk_count = len(split_config_sections(CONFIG, 200))
+
+    result = _analyze(db)
+
+    assert result["success"] and result["mode"] == "chunked"
+    assert result["chunks"] == chunk_count
+    assert result["data"] == {dimension: f"merged: {dimension}" for dimension in DIMENSIONS}
+    chunk_calls = [(prompt, params) for prompt, params in calls if "配置片段 " in prompt]
+    merge_calls = [prompt for prompt, _ in calls if "配置片段 " not in prompt]
+    assert len(chunk_calls) == chunk_count * len(DIMENSIONS)
+    assert all(params["max_tokens"] == 1000 for _, params in chunk_calls)
+    # 每个片段的提示都不超过预算，配置内容不会被截断
+    assert all(estimate_tokens(prompt) < 200 + 200 for prompt, _ in chunk_calls)
+    assert len(merge_calls) == len(DIMENSIONS)
+    assert all(f"finding: security {index}" in merge_calls[0] for index in range(1, chunk_count + 1))
+
+
+@pytest.mark.backend
+def test_partial_chunk_failure(db, monkeypatch):
+    calls = _fake_ai(monkeypatch, fail_chunk="router ospf 1")
+
+    result = _analyze(db)
+
+    assert result["data"]["security"] == "merged: security"
+    merge_prompt = next(prompt for prompt, _ in calls if "检查security" in prompt and "配置片段 " not in prompt)
+    assert "以下配置片段分析失败" in merge_prompt and "路由配置" in merge_prompt
+
+
+@pytest.mark.backend
+def test_intermediate_merge(monkeypatch):
+    findings = [f"【片段{index}】\n" + "问题 " * 60 for index in range(6)]
+
+    groups = AnalysisService._group_findings(findings, 400)
+    assert len(groups) > 1 and sum(len(group) for group in groups) == 6
+
+    context = {
+        "chunks": [{"title": f"片段{index}", "content": "x"} for index in range(1, 7)],
+        "device_info": "设备信息", "combined_subject": "core-1的配置", "config_budget": 400,
+        "max_concurrency": 3, "dimension_timeout": 5,
+    }
+
+    calls = []
+
+    async def long_findings(ai_config, prompt, params=None):
+        calls.append((prompt, params))
+        if "配置片段 " in prompt:
+            return {"success": True, "content": "问题 " * 60}
+        return {"success": True, "content": "merged"}
+
+    monkeypatch.setattr(AnalysisService, "_call_ai_api", staticmethod(long_findings))
+    results, failed = asyncio.run(AnalysisService._analyze_chunked(AI_CONFIG, context, {"security": "检查security"}))
+
+    assert results == {"security": "merged"} and not failed
+    merges = [prompt for prompt, _ in calls if "配置片段 " not in prompt]
+    assert any("不需要写成完整报告" in prompt for prompt in merges)
+    assert "完整的分析报告" in merges[-1]
+
+
+@pytest.mark.backend
+def test_chunking_disabled_truncates(db, settings, monkeypatch):
+    settings["analysis.chunking"] = False
+    calls = _fake_ai(monkeypatch)
+
+    result = _analyze(db)
+
+    assert result["mode"] == "per_dimension" and result["chunks"] == 0
+    assert result["config_reduction"]["truncated_lines"] > 0
+    assert len(calls) == len(DIMENSIONS)
@@ -0,0 +1,93 @@
+"""
+合并分析测试 - 一次AI调用分析所有维度（配置内容只发送一次），JSON解析失败或缺少维度时改为逐个维度分析
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from backend.models import AnalysisPrompt, Backup, Device
+from backend.services.analysis_service import AnalysisService
+
+CONFIG = "sysname core-1\ninterface GigabitEthernet0/1\n ip address 10.0.0.1 255.255.255.0"
+DIMENSIONS = ["security", "redundancy", "performance"]
+AI_CONFIG = {"provider": "openai", "api_key": "test", "model": "gpt-4",
+             "base_url": "http://ai.invalid", "timeout": 5, "enable_cache": False}
+
+
+@pytest.fixture
+def db(session):
+    session.add(Device(id=1, name="core-1", ip_address="10.0.0.1", username="admin", password="secret"))
+    session.add(Backup(id=1, device_id=1, backup_type="running-config", status="success", content=CONFIG))
+    for dimension in DIMENSIONS:
+        session.add(AnalysisPrompt(dimension=dimension, name=dimension, content=f"检查{dimension}"))
+    session.commit()
+    return session
+
+
+def _fake_ai(monkeypatch, combined_reply):
+    """合并调用返回 combined_reply，单个维度调用返回 single: <维度>"""
+    calls = []
+
+    async def fake_call(ai_config, prompt, params=None):
+        calls.append((prompt, params))
+        if params and params.get("response_format"):
+            return {"success": True, "content": combined_reply}
+        dimension = next(dimension for dimension in DIMENSIONS if f"从{dimension}维度" in prompt)
+        return {"success": True, "content": f"single: {dimension}"}
+
+    monkeypatch.setattr(AnalysisService, "_call_ai_api", staticmethod(fake_call))
+    return calls
+
+
+def _analyze(db):
+    return asyncio.run(AnalysisService.analyze_config(
+        device_id=1, backup_id=1, dimensions=DIMENSIONS, ai_config=AI_CONFIG, db=db, combined=True
+    ))
+
+
+@pytest.mark.backend
+def test_combined_single_call(db, monkeypatch):
+    calls = _fake_ai(monkeypatch, json.dumps({dimension: f"combined: {dimension}" for dimension in DIMENSIONS}))
+
+    result = _analyze(db)
+
+    assert result["mode"] == "combined"
+    assert result["data"] == {dimension: f"combined: {dimension}" for dimension in DIMENSIONS}
+    assert len(calls) == 1
+    prompt, params = calls[0]
+    # 配置内容只发送一次
+    assert prompt.count(CONFIG) == 1
+    assert all(f"检查{dimension}" in prompt for dimension in DIMENSIONS)
+    assert params["max_tokens"] == 6000
+
+
+@pytest.mark.backend
+def test_missing_dimension_falls_back(db, monkeypatch):
+    reply = "```json\n" + json.dumps({"security": "combined: security", "redundancy": {"score": 80}}) + "\n```"
+    calls = _fake_ai(monkeypatch, reply)
+
+    result = _analyze(db)
+
+    assert result["data"]["security"] == "combined: security"
+    assert json.loads(result["data"]["redundancy"]) == {"score": 80}
+    assert result["data"]["performance"] == "single: performance"
+    assert len(calls) == 2
+
+
+@pytest.mark.backend
+def test_invalid_json_falls_back_to_each_dimension(db, monkeypatch):
+    calls = _fake_ai(monkeypatch, "抱歉，无法按要求输出JSON")
+
+    result = _analyze(db)
+
+    assert result["data"] == {dimension: f"single: {dimension}" for dimension in DIMENSIONS}
+    assert len(calls) == 1 + len(DIMENSIONS)
+
+
+@pytest.mark.backend
+def test_parse_combined_result():
+    content = '以下是分析结果：{"security": "ok", "redundancy": "  ", "extra": "ignored"} 以上'
+    assert AnalysisService._parse_combined_result(content, ["security", "redundancy"]) == {"security": "ok"}
+    assert AnalysisService._parse_combined_result("[1, 2]", ["security"]) == {}
@@ -0,0 +1,71 @@
+"""
+多维度并发分析测试 - 各维度的AI调用并发执行且不超过并发上限，超时或失败的维度不影响其他维度的结果
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from backend.services.analysis_service import AnalysisService
+
+AI_LATENCY = 0.2
+DIMENSIONS = ["security", "redundancy", "performance", "integrity", "best_practices"]
+
+
+@pytest.fixture
+def fake_ai(monkeypatch):
+    """模拟AI接口：记录同时进行的调用数，提示中包含 slow/fail 时模拟超时/失败"""
+    state = {"active": 0, "peak": 0}
+
+    async def fake_call(ai_config, prompt):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        try:
+            await asyncio.sleep(AI_LATENCY * (10 if "slow" in prompt else 1))
+            if "fail" in prompt:
+                return {"success": False, "error": "API调用失败: 500"}
+            return {"success": True, "content": f"report: {prompt}"}
+        finally:
+            state["active"] -= 1
+
+    monkeypatch.setattr(AnalysisService, "_call_ai_api", staticmethod(fake_call))
+    return state
+
+
+@pytest.mark.backend
+@pytest.mark.performance
+def test_dimensions_run_concurrently(fake_ai):
+    prompts = {dimension: dimension for dimension in DIMENSIONS}
+
+    start = time.perf_counter()
+    results, failed = asyncio.run(AnalysisService._analyze_dimensions({"timeout": 5}, prompts, max_concurrency=5))
+    elapsed = time.perf_counter() - start
+
+    assert list(results) == DIMENSIONS
+    assert results["security"] == "report: security"
+    assert not failed
+    assert fake_ai["peak"] == 5
+    # 总耗时约等于单个维度，而不是五个维度之和
+    assert elapsed < AI_LATENCY * 2.5
+
+
+@pytest.mark.backend
+def test_concurrency_cap(fake_ai):
+    prompts = {dimension: dimension for dimension in DIMENSIONS}
+    asyncio.run(AnalysisService._analyze_dimensions({"timeout": 5}, prompts, max_concurrency=2))
+    assert fake_ai["peak"] == 2
+
+
+@pytest.mark.backend
+def test_partial_results_on_timeout_and_failure(fake_ai):
+    prompts = {"security": "security", "redundancy": "slow", "performance": "fail"}
+
+    results, failed = asyncio.run(AnalysisService._analyze_dimensions(
+        {"timeout": 5}, prompts, max_concurrency=3, timeout=AI_LATENCY * 2
+    ))
+
+    assert results["security"] == "report: security"
+    assert results["redundancy"].startswith("AI服务调用超时")
+    assert results["performance"] == "分析失败: API调用失败: 500"
+    assert failed == {"redundancy", "performance"}
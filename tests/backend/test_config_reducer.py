@@ -0,0 +1,136 @@
+"""
+配置精简测试 - 去掉文件头、注释、横幅和空行，合并配置相同的接口，超出 token 预算时截断
+"""
+
+import asyncio
+
+import pytest
+
+from backend.models import AnalysisPrompt, Backup, Device
+from backend.services.analysis_service import AnalysisService
+from backend.services.config_reducer import compress_interface_names, diff_config, estimate_tokens, reduce_config
+
+BACKUP_HEADER = (
+    "# 设备: access-1 (10.0.0.1)\n"
+    "# 备份类型: running-config\n"
+    "# 备份时间: 2024-01-01 02:00:00\n"
+    "# 备份ID: 12\n"
+    + "-" * 50 + "\n"
+)
+
+H3C_CONFIG = BACKUP_HEADER + "<access-1>display current-configuration\n#\n version 7.1.070\n#\n sysname access-1\n#\n" + "".join(
+    f"interface GigabitEthernet1/0/{index}\n port link-type access\n port access vlan 10\n description user-{index}\n#\n"
+    for index in range(1, 49)
+) + (
+    "interface GigabitEthernet1/0/49\n port link-type trunk\n port trunk permit vlan all\n#\n"
+    "interface Vlan-interface10\n ip address 10.0.10.1 255.255.255.0\n#\n"
+    " local-user admin class manage\n  password hash $h$6$abc\n#\n"
+    "header motd %\nAuthorized access only\n%\n#\nreturn\n"
+)
+
+CISCO_CONFIG = (
+    "Building configuration...\n\nCurrent configuration : 4096 bytes\n!\n"
+    "! Last configuration change at 10:00:00 UTC Mon Jan 1 2024\n"
+    "version 15.2\nhostname core-1\n!\n"
+    "banner motd ^C\nUnauthorized access prohibited\n^C\n!\n"
+    + "".join(f"interface FastEthernet0/{index}\n switchport mode access\n switchport access vlan 20\n!\n"
+              for index in range(1, 25))
+    + "interface FastEthernet0/30\n shutdown\n!\nline vty 0 4\n transport input ssh\n!\nend\n"
+)
+
+
+@pytest.mark.backend
+def test_reduce_comware_config():
+    result = reduce_config(H3C_CONFIG)
+    content = result["content"]
+
+    assert result["vendor"] == "comware"
+    assert "备份时间" not in content and "display current-configuration" not in content
+    assert "return" not in content and "Authorized access only" not in content
+    assert "header motd <横幅内容已省略，3 行>" in content
+    # 48 个接入端口合并为一个模板
+    assert result["folded_interfaces"] == 48
+    assert content.count("port access vlan 10") == 1
+    assert "48 个接口" in content and "GigabitEthernet1/0/1-48" in content
+    assert "description user-" not in content
+    # 其他接口和顶层命令保留，接口配置块不吞并后面的顶层命令
+    assert "port trunk permit vlan all" in content
+    assert "ip address 10.0.10.1 255.255.255.0\n#\n local-user admin class manage" in content
+    assert result["reduced_tokens"] * 5 < result["original_tokens"]
+    assert result["truncated_lines"] == 0
+
+
+@pytest.mark.backend
+def test_reduce_cisco_config():
+    result = reduce_config(CISCO_CONFIG)
+    content = result["content"]
+
+    assert result["vendor"] == "cisco"
+    assert "Building configuration" not in content and "Last configuration change" not in content
+    assert "banner motd <横幅内容已省略，3 行>" in content
+    assert "FastEthernet0/1-24" in content
+    assert "interface FastEthernet0/30\n shutdown" in content
+    assert "\n!\n!" not in content and not content.endswith("!")
+
+
+@pytest.mark.backend
+def test_token_budget_truncates():
+    result = reduce_config(CISCO_CONFIG, max_tokens=40)
+    assert result["truncated_lines"] > 0
+    assert result["content"].endswith(f"已省略剩余 {result['truncated_lines']} 行）")
+    assert result["reduced_tokens"] <= 40 + 20
+
+
+@pytest.mark.backend
+def test_estimate_and_ranges():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("中文配置") == 4
+    assert estimate_tokens("interface") == 3
+    assert compress_interface_names(
+        ["Gi1/0/1", "Gi1/0/2", "Gi1/0/3", "Gi1/0/5", "Gi2/0/1", "Vlan-interface"]
+    ) == "Gi1/0/1-3, Gi1/0/5, Gi2/0/1, Vlan-interface"
+
+
+@pytest.mark.backend
+def test_diff_config_by_section():
+    changed = H3C_CONFIG.replace("备份时间: 2024-01-01", "备份时间: 2024-01-02").replace(
+        " port access vlan 10\n description user-5\n", " port access vlan 20\n description user-5\n"
+    ).replace(" local-user admin class manage\n  password hash $h$6$abc\n#\n", "")
+    result = diff_config(H3C_CONFIG, changed)
+
+    assert [(change["status"], change["title"]) for change in result["changes"]] == [
+        ("modified", "interface GigabitEthernet1/0/5"),
+        ("removed", "local-user admin class manage"),
+    ]
+    assert result["changes"][0]["diff"] == (
+        " interface GigabitEthernet1/0/5\n  port link-type access\n- port access vlan 10\n+ port access vlan 20\n"
+        "  description user-5"
+    )
+    assert result["changed_lines"] == 4
+    assert "[删除] 认证与管理配置: local-user admin class manage" in result["content"]
+    # 文件头、注释的变化不算配置变化
+    assert diff_config(H3C_CONFIG, H3C_CONFIG.replace("2024-01-01", "2024-02-01"))["changes"] == []
+
+
+@pytest.mark.backend
+def test_analysis_prompt_uses_reduced_config(session, settings, monkeypatch):
+    db = session
+    db.add(Device(id=1, name="access-1", ip_address="10.0.0.1", username="admin", password="secret"))
+    db.add(Backup(id=1, device_id=1, backup_type="running-config", status="success", content=H3C_CONFIG))
+    db.add(AnalysisPrompt(dimension="security", name="安全", content="检查安全配置"))
+    db.commit()
+
+    prompts = []
+
+    async def fake_call(ai_config, prompt, params=None):
+        prompts.append(prompt)
+        return {"success": True, "content": "ok"}
+
+    monkeypatch.setattr(AnalysisService, "_call_ai_api", staticmethod(fake_call))
+    ai_config = {"provider": "openai", "api_key": "test", "model": "gpt-4",
+                 "base_url": "http://ai.invalid", "timeout": 5, "enable_cache": False}
+    result = asyncio.run(AnalysisService.analyze_config(device_id=1, backup_id=1, ai_config=ai_config, db=db))
+
+    assert result["config_reduction"]["folded_interfaces"] == 48
+    assert "备份ID" not in prompts[0]
+    assert prompts[0].count("port access vlan 10") == 1
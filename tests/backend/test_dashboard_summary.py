@@ -0,0 +1,94 @@
+"""
+仪表盘统计测试 - 统计结果与明细一致，查询次数不随数据量增长
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.database import Base
+from backend.models import AnalysisRecord, Backup, Device, Strategy
+from backend.services.dashboard_service import DashboardService
+from backend.services.stats_service import StatsService
+
+NOW = datetime(2024, 6, 1, 15, 0)
+
+
+def _make_session(devices):
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    for device_id in range(1, devices + 1):
+        session.add(Device(
+            id=device_id, name=f"sw-{device_id}", ip_address=f"10.0.{device_id // 250}.{device_id % 250}",
+            username="admin", password="secret",
+            connection_status=("success", "failed", "unknown")[device_id % 3]
+        ))
+        session.add(Strategy(name=f"s-{device_id}", device_id=device_id, backup_type="running-config",
+                             is_active=device_id % 2 == 0))
+        for day in range(4):
+            session.add(Backup(
+                device_id=device_id, backup_type="running-config",
+                status="failed" if day == 3 else "success", file_size=1000,
+                created_at=NOW - timedelta(days=day, hours=1)
+            ))
+    session.add(AnalysisRecord(device_id=1, backup_id=1, status="success", created_at=NOW - timedelta(hours=2)))
+    session.add(AnalysisRecord(device_id=1, backup_id=2, status="success", created_at=NOW - timedelta(days=2)))
+    session.commit()
+    StatsService.rebuild(session)
+    return engine, session
+
+
+def _count_queries(engine, call):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        result = call()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return result, len(statements)
+
+
+@pytest.mark.backend
+def test_summary_counts():
+    engine, db = _make_session(devices=6)
+    try:
+        summary = DashboardService.get_summary(db, now=NOW)
+    finally:
+        db.close()
+        engine.dispose()
+
+    assert summary["devices"]["total"] == 6
+    assert summary["devices"]["online"] == 2
+    assert summary["devices"]["offline"] == 4
+    assert summary["backups"] == {**summary["backups"], "total": 24, "success": 18, "failed": 6, "today": 6}
+    assert summary["strategies"] == {"total": 6, "active": 3, "inactive": 3}
+    assert summary["analysis"] == {"total": 2, "today": 1}
+    assert summary["storage"]["backup_bytes"] == 24 * 1000
+    assert len(summary["backups"]["recent"]) == 5
+    assert "content" not in summary["backups"]["recent"][0]
+
+
+@pytest.mark.backend
+@pytest.mark.performance
+def test_summary_query_count_is_constant():
+    """设备和备份数量增加时，统计查询次数保持不变"""
+    counts = []
+    for devices in (3, 60):
+        engine, db = _make_session(devices=devices)
+        try:
+            _, count = _count_queries(engine, lambda: DashboardService.get_summary(db, now=NOW))
+        finally:
+            db.close()
+            engine.dispose()
+        counts.append(count)
+
+    assert counts[0] == counts[1]
@@ -0,0 +1,116 @@
+"""
+备份耗时预测测试 - 按设备取历史耗时、最长任务优先排序、批量备份完成时间预测
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.database import get_db
+from backend.models import BackupJob, Device, Strategy
+from backend.routers import jobs
+from backend.services.duration_service import HISTORY_SIZE, DurationService
+
+START = datetime(2024, 1, 1, 2, 0)
+
+
+@pytest.fixture
+def db(session, settings):
+    settings["backup.default_job_duration"] = 60
+    settings["backup.max_concurrent_jobs"] = 2
+    for device_id in range(1, 5):
+        session.add(Device(id=device_id, name=f"sw-{device_id}", ip_address=f"10.0.0.{device_id}",
+                           username="admin", password="secret"))
+    session.commit()
+    return session
+
+
+def _add_jobs(db, device_id, seconds, count, backup_type="running-config", status="success"):
+    for _ in range(count):
+        db.add(BackupJob(device_id=device_id, backup_type=backup_type, status=status,
+                         started_at=START, finished_at=START + timedelta(seconds=seconds)))
+    db.commit()
+
+
+@pytest.mark.backend
+def test_expected_durations_per_device(db):
+    # 设备2的历史记录较早，之后设备1产生了大量任务
+    _add_jobs(db, 2, 50, 3)
+    _add_jobs(db, 1, 5, HISTORY_SIZE * 20)
+    _add_jobs(db, 1, 500, 5, status="failed")
+
+    durations = DurationService.get_expected_durations(db, [
+        (1, "running-config"), (2, "running-config"), (2, "startup-config"), (3, "running-config")
+    ])
+
+    assert durations == {
+        (1, "running-config"): 5.0,
+        (2, "running-config"): 50.0,
+        # 该类型没有记录时使用设备所有类型的中位数，设备没有记录时使用默认耗时
+        (2, "startup-config"): 50.0,
+        (3, "running-config"): 60.0,
+    }
+
+
+@pytest.mark.backend
+def test_expected_durations_use_recent_history(db):
+    _add_jobs(db, 1, 100, HISTORY_SIZE * 2)
+    _add_jobs(db, 1, 10, HISTORY_SIZE)
+
+    assert DurationService.get_expected_durations(db, [(1, "running-config")]) == {(1, "running-config"): 10.0}
+
+
+@pytest.mark.backend
+def test_order_longest_first():
+    durations = {"a": 10, "b": 30, "c": 20, "d": 30}
+
+    ordered = DurationService.order_longest_first(["a", "b", "c", "d", "e"], durations, lambda item: item)
+
+    # 耗时相同时保持原顺序，没有预期耗时的排在最后
+    assert ordered == ["b", "d", "c", "a", "e"]
+
+
+@pytest.mark.backend
+def test_plan_batch_longest_first(db):
+    _add_jobs(db, 1, 10, 3)
+    _add_jobs(db, 2, 20, 3)
+    _add_jobs(db, 3, 30, 3)
+    _add_jobs(db, 4, 20, 3)
+    items = [{"device_id": device_id, "backup_type": "running-config"} for device_id in (1, 2, 3, 4)]
+
+    plan = DurationService.plan_batch(db, items, start_time=START)
+
+    assert [(entry["device_id"], entry["worker"]) for entry in plan["schedule"]] == [(3, 0), (2, 1), (4, 1), (1, 0)]
+    assert [entry["predicted_finish"] for entry in plan["schedule"]] == [
+        (START + timedelta(seconds=seconds)).isoformat() for seconds in (30, 20, 40, 40)
+    ]
+    assert plan["workers"] == 2 and plan["job_count"] == 4
+    assert plan["total_duration"] == 80.0 and plan["makespan"] == 40.0
+    assert plan["predicted_completion"] == (START + timedelta(seconds=40)).isoformat()
+
+
+@pytest.mark.backend
+def test_plan_api(db):
+    _add_jobs(db, 1, 10, 3)
+    _add_jobs(db, 2, 40, 3)
+    db.add(Strategy(id=7, name="nightly", device_id=2, backup_type="running-config"))
+    db.commit()
+    app = FastAPI()
+    app.include_router(jobs.router)
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app)
+
+    response = client.post("/api/jobs/plan", json={
+        "items": [{"device_id": 1}], "strategy_ids": [7], "workers": 1
+    })
+
+    assert response.status_code == 200
+    plan = response.json()
+    assert [entry["device_id"] for entry in plan["schedule"]] == [2, 1]
+    assert plan["makespan"] == 50.0
+    start = datetime.fromisoformat(plan["start_time"])
+    assert datetime.fromisoformat(plan["predicted_completion"]) == start + timedelta(seconds=50)
+
+    assert client.post("/api/jobs/plan", json={"items": []}).status_code == 400
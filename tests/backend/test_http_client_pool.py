@@ -0,0 +1,150 @@
+"""
+AI接口连接池测试 - 同一服务地址的请求复用 keep-alive 连接，关闭后或事件循环变化时重新创建会话，流式响应逐段回调
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+from aiohttp import web
+
+from backend.services.ai_service import AlibabaService
+from backend.services.analysis_service import AnalysisService
+from backend.services.http_client import HTTPClientPool, http_client_pool
+
+
+async def _start_fake_ai():
+    """启动本地模拟的 chat/completions 接口，记录每个请求使用的客户端端口"""
+    client_ports = []
+
+    async def completions(request):
+        client_ports.append(request.transport.get_extra_info("peername")[1])
+        return web.json_response({"choices": [{"message": {"content": "ok"}}]})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/v1", client_ports
+
+
+@pytest.mark.backend
+def test_requests_reuse_connections():
+    async def scenario():
+        runner, base_url, client_ports = await _start_fake_ai()
+        ai_config = {"api_key": "test", "model": "gpt-4", "base_url": base_url, "timeout": 5}
+        try:
+            for _ in range(5):
+                assert (await AnalysisService._call_ai_api(ai_config, "hello"))["success"]
+            service = AlibabaService({"api_key": "test", "base_url": base_url})
+            assert (await service.analyze_config("hostname sw", "分析"))["success"]
+            assert (await service.test_connection())["success"]
+
+            # 同一服务地址共用一个会话
+            assert http_client_pool.get_session(base_url) is http_client_pool.get_session(base_url + "/")
+            return client_ports
+        finally:
+            await http_client_pool.close()
+            await runner.cleanup()
+
+    client_ports = asyncio.run(scenario())
+    assert len(client_ports) == 7
+    # 顺序请求复用同一个连接
+    assert len(set(client_ports)) == 1
+
+
+@pytest.mark.backend
+def test_closed_pool_recreates_session():
+    async def scenario():
+        pool = HTTPClientPool()
+        first = pool.get_session("http://ai.invalid/v1")
+        await pool.close()
+        assert first.closed
+        second = pool.get_session("http://ai.invalid/v1")
+        assert second is not first and not second.closed
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.backend
+def test_stream_ai_api():
+    async def scenario():
+        async def completions(request):
+            body = await request.json()
+            if not body.get("stream"):
+                return web.json_response({"choices": [{"message": {"content": "not streamed"}}]})
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            for text in ("路由", "配置", "正常"):
+                chunk = {"choices": [{"delta": {"content": text}}]}
+                await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+            await response.write(b"data: [DONE]\n\n")
+            return response
+
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", completions)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        ai_config = {"api_key": "test", "model": "gpt-4", "base_url": f"http://127.0.0.1:{port}/v1", "timeout": 5}
+        tokens = []
+
+        async def on_token(text):
+            tokens.append(text)
+
+        try:
+            return await AnalysisService._stream_ai_api(ai_config, "hello", on_token), tokens
+        finally:
+            await http_client_pool.close()
+            await runner.cleanup()
+
+    result, tokens = asyncio.run(scenario())
+    assert result == {"success": True, "content": "路由配置正常"}
+    assert tokens == ["路由", "配置", "正常"]
+
+
+@pytest.mark.backend
+def test_loop_switch_closes_old_session():
+    pool = HTTPClientPool()
+
+    async def open_session():
+        return pool.get_session("http://ai.invalid/v1")
+
+    # 原事件循环已结束
+    first = asyncio.run(open_session())
+    assert not first.closed
+
+    async def switch():
+        session = pool.get_session("http://ai.invalid/v1")
+        await asyncio.sleep(0)
+        return session
+
+    second = asyncio.run(switch())
+    assert second is not first and first.closed and not second.closed
+
+    # 原事件循环仍在其他线程中运行：旧会话交由原循环关闭
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever)
+    thread.start()
+    try:
+        third = asyncio.run_coroutine_threadsafe(open_session(), other_loop).result(5)
+        assert second.closed and not third.closed
+
+        async def switch_back():
+            session = pool.get_session("http://ai.invalid/v1")
+            await pool.close()
+            return session
+
+        fourth = asyncio.run(switch_back())
+        assert third.closed and fourth.closed
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join(5)
+        other_loop.close()
@@ -0,0 +1,194 @@
+"""
+增量分析测试 - 以设备最近一次成功的分析为基准，只发送变化的配置段和上次的分析结果，配置未变化时沿用上次的结果
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.models import AnalysisPrompt, AnalysisRecord, Backup, Device
+from backend.services.analysis_service import AnalysisService
+from backend.services.archive_service import ArchiveService
+from backend.services.config_reducer import estimate_tokens
+
+CONFIG = "\n".join(
+    ["hostname core-1", "!"]
+    + [line for index in range(1, 61) for line in (
+        f"interface GigabitEthernet0/{index}", f" description uplink-{index}",
+        f" ip address 10.0.{index}.1 255.255.255.0", " no shutdown", "!"
+    )]
+    + ["router ospf 1", " network 10.0.0.0 0.255.255.255 area 0", "!",
+       "ip route 0.0.0.0 0.0.0.0 10.0.0.254", "!",
+       "line vty 0 4", " transport input ssh", "!", "end"]
+)
+# 一个接口被关闭、新增一条静态路由
+CHANGED = CONFIG.replace(
+    " ip address 10.0.7.1 255.255.255.0\n no shutdown", " ip address 10.0.7.1 255.255.255.0\n shutdown"
+).replace("ip route 0.0.0.0 0.0.0.0 10.0.0.254", "ip route 0.0.0.0 0.0.0.0 10.0.0.254\nip route 10.9.0.0 255.255.0.0 10.0.0.253")
+# 只有文件头和注释不同
+SAME = "# 设备: core-1\n# 备份时间: 2024-01-02\n" + CONFIG.replace("line vty 0 4", "! managed by noc\nline vty 0 4")
+# 大部分接口地址都变化
+REWRITTEN = CONFIG.replace("255.255.255.0", "255.255.255.128")
+# 接入交换机：48 个相同的接入端口，精简时合并为一个模板
+ACCESS = "\n".join(
+    ["sysname access-1", "#"]
+    + [line for index in range(1, 49) for line in (
+        f"interface GigabitEthernet1/0/{index}", " port link-type access", " port access vlan 10", "#"
+    )]
+    + ["return"]
+)
+# 三个端口改到其他 VLAN
+ACCESS_CHANGED = ACCESS.replace(
+    "interface GigabitEthernet1/0/5\n port link-type access\n port access vlan 10",
+    "interface GigabitEthernet1/0/5\n port link-type access\n port access vlan 20"
+).replace(
+    "interface GigabitEthernet1/0/6\n port link-type access\n port access vlan 10",
+    "interface GigabitEthernet1/0/6\n port link-type access\n port access vlan 20"
+).replace(
+    "interface GigabitEthernet1/0/7\n port link-type access\n port access vlan 10",
+    "interface GigabitEthernet1/0/7\n port link-type access\n port access vlan 20"
+)
+DIMENSIONS = ["security", "performance"]
+AI_CONFIG = {"provider": "openai", "api_key": "test", "model": "gpt-4",
+             "base_url": "http://ai.invalid", "timeout": 5, "enable_cache": False}
+
+
+@pytest.fixture
+def db(session, settings):
+    session.add(Device(id=1, name="core-1", ip_address="10.0.0.1", username="admin", password="secret"))
+    for backup_id, content in enumerate([CONFIG, CHANGED, SAME, REWRITTEN, ACCESS, ACCESS_CHANGED], 1):
+        session.add(Backup(id=backup_id, device_id=1, backup_type="running-config", status="success", content=content))
+    for dimension in DIMENSIONS:
+        session.add(AnalysisPrompt(dimension=dimension, name=dimension, content=f"检查{dimension}"))
+    session.commit()
+    return session
+
+
+@pytest.fixture
+def failing():
+    """模拟AI接口调用失败的维度"""
+    return set()
+
+
+@pytest.fixture
+def calls(monkeypatch, failing):
+    """模拟AI接口：返回 report: <维度> #<调用序号>，failing 中的维度返回失败"""
+    calls = []
+
+    async def fake_call(ai_config, prompt):
+        calls.append(prompt)
+        dimension = next(dimension for dimension in DIMENSIONS if f"检查{dimension}" in prompt)
+        if dimension in failing:
+            return {"success": False, "error": "API调用失败: 500"}
+        return {"success": True, "content": f"report: {dimension} #{len(calls)}"}
+
+    monkeypatch.setattr(AnalysisService, "_call_ai_api", staticmethod(fake_call))
+    return calls
+
+
+def _analyze(db, backup_id, incremental=True):
+    return asyncio.run(AnalysisService.analyze_config(
+        device_id=1, backup_id=backup_id, dimensions=DIMENSIONS, ai_config=AI_CONFIG, db=db, incremental=incremental
+    ))
+
+
+def _baseline_of(db, record_id):
+    db.expire_all()
+    return db.query(AnalysisRecord).filter(AnalysisRecord.id == record_id).one().baseline_record_id
+
+
+@pytest.mark.backend
+def test_incremental_sends_only_changed_sections(db, calls):
+    # 没有基准记录时完整分析
+    first = _analyze(db, 1)
+    assert first["mode"] == "per_dimension" and first["incremental"] is None
+    full_prompts = list(calls)
+    calls.clear()
+
+    result = _analyze(db, 2)
+
+    assert result["success"] and result["mode"] == "incremental"
+    assert result["incremental"]["baseline_record_id"] == first["record_id"]
+    assert result["incremental"]["changed_sections"] == 2
+    assert _baseline_of(db, result["record_id"]) == first["record_id"]
+    assert len(calls) == 2
+    for prompt in calls:
+        dimension = next(dimension for dimension in DIMENSIONS if f"检查{dimension}" in prompt)
+        # 上次的分析结果和变化的配置段
+        assert first["data"][dimension] in prompt
+        assert "-" + " no shutdown" in prompt and "+ shutdown" in prompt
+        assert "+ip route 10.9.0.0 255.255.0.0 10.0.0.253" in prompt
+        # 未变化的配置段不发送
+        assert "GigabitEthernet0/12" not in prompt and "router ospf 1" not in prompt
+    assert sum(map(estimate_tokens, calls)) * 4 < sum(map(estimate_tokens, full_prompts))
+    assert result["data"] == {"security": "report: security #1", "performance": "report: performance #2"}
+
+
+@pytest.mark.backend
+def test_unchanged_config_reuses_baseline(db, calls):
+    first = _analyze(db, 1)
+    calls.clear()
+
+    result = _analyze(db, 3)
+
+    assert calls == []
+    assert result["success"] and result["mode"] == "incremental"
+    assert result["data"] == first["data"]
+    assert result["incremental"]["changed_sections"] == 0
+    assert _baseline_of(db, result["record_id"]) == first["record_id"]
+
+
+@pytest.mark.backend
+def test_folded_interfaces_do_not_inflate_change_ratio(db, calls):
+    _analyze(db, 5)
+    calls.clear()
+
+    # 精简后的配置把相同接口合并为模板，变化比例按未合并的配置计算
+    result = _analyze(db, 6)
+
+    assert result["mode"] == "incremental"
+    assert result["incremental"]["changed_sections"] == 3
+    assert result["incremental"]["diff_tokens"] < result["incremental"]["config_tokens"] * 0.5
+    assert all("+ port access vlan 20" in prompt and "GigabitEthernet1/0/12" not in prompt for prompt in calls)
+
+
+@pytest.mark.backend
+def test_falls_back_to_full_analysis(db, settings, calls, failing):
+    first = _analyze(db, 1)
+
+    # 最近一次分析有失败的维度时，使用更早的成功记录作为基准
+    failing.add("performance")
+    _analyze(db, 1, incremental=False)
+    failing.clear()
+    result = _analyze(db, 2)
+    assert result["mode"] == "incremental"
+    assert result["incremental"]["baseline_record_id"] == first["record_id"]
+
+    # 配置变化超过完整配置的一半
+    calls.clear()
+    result = _analyze(db, 4)
+    assert result["mode"] == "per_dimension" and result["incremental"] is None
+    assert all("GigabitEthernet0/12" in prompt for prompt in calls)
+
+    # 未启用增量分析时完整分析
+    result = _analyze(db, 2, incremental=None)
+    assert result["mode"] == "per_dimension" and _baseline_of(db, result["record_id"]) is None
+    settings["analysis.incremental"] = True
+    assert _analyze(db, 2, incremental=None)["mode"] == "incremental"
+
+
+@pytest.mark.backend
+def test_analyzes_archived_backups(db, calls):
+    ArchiveService.archive_old_backups(db, cutoff=datetime.now() + timedelta(days=1))
+    assert db.query(Backup).count() == 0
+
+    first = _analyze(db, 1)
+    assert first["success"] and first["mode"] == "per_dimension"
+    result = _analyze(db, 2)
+    assert result["mode"] == "incremental"
+    assert result["incremental"]["baseline_backup_id"] == 1
+
+    history = AnalysisService.get_analysis_history(db)
+    assert [item["backup_id"] for item in history] == [2, 1]
+    assert history[0]["backup_type"] == "running-config" and history[0]["backup_created_at"]
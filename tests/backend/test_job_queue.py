@@ -0,0 +1,214 @@
+"""
+备份任务队列测试 - 入队去重与合并、按优先级领取、任务完成、心跳与超时回收、工作线程执行、202提交接口
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+from backend import job_worker as job_worker_module
+from backend.database import get_db
+from backend.job_worker import BackupJobWorker
+from backend.models import BackupJob, Device, Strategy
+from backend.routers import backups, devices, strategies
+from backend.services.backup_service import BackupService
+from backend.services.job_queue_service import PRIORITY_INTERACTIVE, PRIORITY_SCHEDULED, JobQueueService, job_available
+from backend.services.strategy_service import StrategyService
+
+NOW = datetime(2024, 1, 1, 2, 0)
+
+
+@pytest.fixture
+def db(session, settings):
+    for device_id in (1, 2):
+        session.add(Device(id=device_id, name=f"sw-{device_id}", ip_address=f"10.0.0.{device_id}",
+                           username="admin", password="secret"))
+    session.add(Strategy(id=7, name="nightly", device_id=2, backup_type="running-config"))
+    session.commit()
+    return session
+
+
+@pytest.mark.backend
+def test_submit_deduplicates_and_merges(db):
+    job_available.clear()
+    first = JobQueueService.submit(db, 1, "running-config", priority=PRIORITY_SCHEDULED, source="scheduled")
+    assert first["success"] and not first["deduplicated"] and first["status"] == "queued"
+    assert job_available.is_set()
+
+    # 重复提交复用已有任务，并提升优先级
+    second = JobQueueService.submit(db, 1, "running-config", priority=PRIORITY_INTERACTIVE, source="manual")
+    assert second["deduplicated"] and second["job_id"] == first["job_id"]
+    job = JobQueueService.get_job(db, first["job_id"])
+    assert job.priority == PRIORITY_INTERACTIVE and job.source == "scheduled"
+
+    # 低优先级的重复提交不降低优先级；调度任务合并进来后，完成时仍推进策略
+    JobQueueService.submit(db, 1, "running-config", priority=PRIORITY_SCHEDULED, strategy_id=7, advance_strategy=True)
+    db.refresh(job)
+    assert job.priority == PRIORITY_INTERACTIVE and job.strategy_id == 7 and job.advance_strategy
+
+    # 其他备份类型、其他设备不受影响
+    assert not JobQueueService.submit(db, 1, "startup-config")["deduplicated"]
+    assert not JobQueueService.submit(db, 2, "running-config")["deduplicated"]
+    assert db.query(BackupJob).count() == 3
+
+
+@pytest.mark.backend
+def test_submit_merges_concurrent_insert(db, monkeypatch):
+    first = JobQueueService.submit(db, 1, "running-config", priority=PRIORITY_SCHEDULED)
+    lookups = []
+    original = JobQueueService.get_active_job
+
+    def racing_lookup(db, device_id, backup_type):
+        # 第一次查询时还看不到其他进程刚提交的任务，插入时触发唯一索引冲突
+        lookups.append(device_id)
+        return None if len(lookups) == 1 else original(db, device_id, backup_type)
+
+    monkeypatch.setattr(JobQueueService, "get_active_job", staticmethod(racing_lookup))
+
+    result = JobQueueService.submit(db, 1, "running-config", priority=PRIORITY_INTERACTIVE)
+
+    assert result["deduplicated"] and result["job_id"] == first["job_id"]
+    assert JobQueueService.get_job(db, first["job_id"]).priority == PRIORITY_INTERACTIVE
+    assert db.query(BackupJob).count() == 1
+
+
+@pytest.mark.backend
+def test_claim_next_orders_by_priority(db):
+    low = JobQueueService.submit(db, 1, "running-config", priority=PRIORITY_SCHEDULED)["job_id"]
+    high_first = JobQueueService.submit(db, 1, "startup-config", priority=PRIORITY_INTERACTIVE)["job_id"]
+    high_second = JobQueueService.submit(db, 2, "running-config", priority=PRIORITY_INTERACTIVE)["job_id"]
+
+    # 优先级高的先领取，同优先级按入队顺序
+    claimed = [JobQueueService.claim_next(db, "worker-a", now=NOW) for _ in range(3)]
+    assert [job.id for job in claimed] == [high_first, high_second, low]
+    assert all(job.status == "running" and job.worker_id == "worker-a" for job in claimed)
+    assert claimed[0].started_at == NOW and claimed[0].heartbeat_at == NOW
+    assert JobQueueService.claim_next(db, "worker-a") is None
+
+    # 执行中的任务仍然参与去重
+    assert JobQueueService.submit(db, 1, "running-config")["deduplicated"]
+
+
+@pytest.mark.backend
+def test_claim_next_skips_job_claimed_by_another_worker(db):
+    contested = JobQueueService.submit(db, 1, "running-config")["job_id"]
+    other = JobQueueService.submit(db, 2, "running-config")["job_id"]
+    updates = []
+
+    @event.listens_for(db, "do_orm_execute")
+    def claim_first(state):
+        # 在查询候选任务和领取之间，另一个工作进程领取了同一任务
+        if state.is_update and not updates:
+            updates.append(True)
+            state.session.connection().execute(text(
+                "UPDATE backup_jobs SET status = 'running', worker_id = 'worker-b' WHERE id = :id"
+            ), {"id": contested})
+
+    job = JobQueueService.claim_next(db, "worker-a")
+
+    assert job.id == other and job.worker_id == "worker-a"
+    assert JobQueueService.get_job(db, contested).worker_id == "worker-b"
+
+
+@pytest.mark.backend
+def test_complete_job(db):
+    job_id = JobQueueService.submit(db, 1, "running-config")["job_id"]
+    JobQueueService.claim_next(db, "worker-a")
+
+    job = JobQueueService.complete_job(db, job_id, {"success": True, "message": "备份成功", "backup_id": 5}, now=NOW)
+    assert (job.status, job.message, job.backup_id, job.finished_at) == ("success", "备份成功", 5, NOW)
+
+    failed_id = JobQueueService.submit(db, 1, "running-config")["job_id"]
+    job = JobQueueService.complete_job(db, failed_id, {"success": False, "message": "连接超时"})
+    assert job.status == "failed" and job.backup_id is None
+    assert JobQueueService.complete_job(db, 999, {"success": True}) is None
+
+
+@pytest.mark.backend
+def test_heartbeat_and_requeue_stale_jobs(db):
+    alive = JobQueueService.submit(db, 1, "running-config")["job_id"]
+    crashed = JobQueueService.submit(db, 2, "running-config")["job_id"]
+    waiting = JobQueueService.submit(db, 1, "startup-config")["job_id"]
+    stale = datetime.now() - timedelta(seconds=600)
+    JobQueueService.claim_next(db, "worker-a", now=stale)
+    JobQueueService.claim_next(db, "worker-b", now=stale)
+
+    JobQueueService.heartbeat(db, [alive, waiting])
+    JobQueueService.heartbeat(db, [])
+    db.expire_all()
+    assert JobQueueService.get_job(db, alive).heartbeat_at > stale
+    assert JobQueueService.get_job(db, waiting).heartbeat_at is None
+
+    job_available.clear()
+    assert JobQueueService.requeue_stale_jobs(db, stale_seconds=120) == 1
+    assert job_available.is_set()
+    db.expire_all()
+    job = JobQueueService.get_job(db, crashed)
+    assert (job.status, job.worker_id, job.started_at, job.heartbeat_at) == ("queued", None, None, None)
+    assert JobQueueService.get_job(db, alive).status == "running"
+    assert JobQueueService.requeue_stale_jobs(db, stale_seconds=120) == 0
+
+
+@pytest.mark.backend
+def test_worker_executes_jobs(Session, db, monkeypatch):
+    monkeypatch.setattr(job_worker_module, "SessionLocal", Session)
+    executed = []
+    advanced = []
+
+    def fake_backup(db, device_id, backup_type):
+        executed.append((device_id, backup_type))
+        if device_id == 2:
+            raise RuntimeError("连接超时")
+        return {"success": True, "message": "备份成功", "backup_id": 11}
+
+    monkeypatch.setattr(BackupService, "execute_backup", staticmethod(fake_backup))
+    monkeypatch.setattr(StrategyService, "mark_strategy_executed", staticmethod(
+        lambda db, strategy_id, now=None: advanced.append(strategy_id)
+    ))
+    ok = JobQueueService.submit(db, 1, "running-config", strategy_id=7, advance_strategy=True)["job_id"]
+    failed = JobQueueService.submit(db, 2, "running-config", strategy_id=7, advance_strategy=True)["job_id"]
+    worker = BackupJobWorker()
+
+    assert worker._process_next_job() and worker._process_next_job()
+    assert not worker._process_next_job()
+
+    assert executed == [(1, "running-config"), (2, "running-config")]
+    db.expire_all()
+    job = JobQueueService.get_job(db, ok)
+    assert (job.status, job.backup_id, job.worker_id) == ("success", 11, worker.worker_id)
+    job = JobQueueService.get_job(db, failed)
+    assert job.status == "failed" and "连接超时" in job.message
+    # 只有成功的策略任务推进策略
+    assert advanced == [7]
+    assert worker._active_jobs == set()
+
+
+@pytest.mark.backend
+def test_submit_endpoints_return_202(db):
+    app = FastAPI()
+    for module in (backups, devices, strategies):
+        app.include_router(module.router)
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app)
+
+    response = client.post("/api/backups/execute", params={"device_id": 1})
+    assert response.status_code == 202
+    first = response.json()
+    assert first["success"] and first["status"] == "queued" and not first["deduplicated"]
+
+    # 快速备份使用默认备份类型，与手动备份合并
+    response = client.post("/api/devices/1/quick-backup")
+    assert response.status_code == 202
+    assert response.json()["deduplicated"] and response.json()["job_id"] == first["job_id"]
+
+    response = client.post("/api/strategies/7/execute")
+    assert response.status_code == 202
+    job = JobQueueService.get_job(db, response.json()["job_id"])
+    assert (job.device_id, job.source, job.strategy_id, job.advance_strategy) == (2, "strategy", 7, True)
+
+    assert client.post("/api/backups/execute", params={"device_id": 99}).status_code == 404
+    assert client.post("/api/strategies/99/execute-now").status_code == 404
+    assert db.query(BackupJob).count() == 2
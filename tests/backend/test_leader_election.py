@@ -0,0 +1,77 @@
+"""
+主节点选举测试 - 两个进程竞争同一数据库中的租约：获取、续约、过期接管、主动释放
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.leader_election import LeaderElection
+from backend.models import SchedulerLease
+
+
+def _lease(Session):
+    db = Session()
+    try:
+        return db.query(SchedulerLease).filter(SchedulerLease.name == "scheduler").one()
+    finally:
+        db.close()
+
+
+def _expire(Session):
+    """模拟主节点失联：租约到期未续约"""
+    db = Session()
+    db.query(SchedulerLease).update({SchedulerLease.expires_at: datetime.now() - timedelta(seconds=1)})
+    db.commit()
+    db.close()
+
+
+@pytest.mark.backend
+def test_acquire_renew_takeover_and_release(Session):
+    first = LeaderElection("scheduler", ttl=60, session_factory=Session)
+    second = LeaderElection("scheduler", ttl=60, session_factory=Session)
+
+    # 获取：只有一个进程成为主节点
+    assert first.try_acquire() and first.is_leader
+    assert not second.try_acquire() and not second.is_leader
+    lease = _lease(Session)
+    assert lease.holder == first.holder_id
+    assert lease.expires_at > datetime.now() + timedelta(seconds=50)
+
+    # 续约：延长过期时间，不改变获取时间
+    time.sleep(0.01)
+    assert first.try_acquire()
+    renewed = _lease(Session)
+    assert renewed.holder == first.holder_id and renewed.acquired_at == lease.acquired_at
+    assert renewed.expires_at > lease.expires_at
+
+    # 过期接管：原主节点续约时发现已失去主节点身份
+    _expire(Session)
+    assert second.try_acquire() and second.is_leader
+    assert _lease(Session).holder == second.holder_id
+    assert _lease(Session).acquired_at > lease.acquired_at
+    assert not first.try_acquire() and not first.is_leader
+    assert first.get_status()["current_holder"] == second.holder_id
+
+    # 主动释放：其他进程无需等待租约过期即可接管
+    second.release()
+    assert not second.is_leader
+    assert first.try_acquire() and first.is_leader
+    assert not second.try_acquire()
+
+
+@pytest.mark.backend
+def test_leadership_lapses_without_renewal(Session):
+    election = LeaderElection("scheduler", ttl=60, session_factory=Session)
+    assert election.try_acquire()
+
+    # 本地截止时间基于单调时钟，不受本机时间调整影响
+    election._lease_deadline = time.monotonic() - 1
+    assert not election.is_leader
+    assert election.try_acquire() and election.is_leader
+
+    # 未成为主节点的进程释放租约不影响当前主节点
+    other = LeaderElection("scheduler", ttl=60, session_factory=Session)
+    other.release()
+    assert _lease(Session).expires_at > datetime.now()
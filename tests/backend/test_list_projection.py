@@ -0,0 +1,83 @@
+"""
+列表投影测试 - 备份和策略列表只返回列表需要的字段（不含配置内容和设备凭据），结果与完整查询一致
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.models import Backup, Device, Strategy
+from backend.pagination import NEXT_CURSOR_HEADER
+from backend.responses import list_response
+from backend.schemas import BackupListItem, BackupStrategyListItem
+from backend.services.archive_service import ArchiveService
+from backend.services.backup_service import BackupService
+from backend.services.strategy_service import StrategyService
+
+NOW = datetime(2024, 6, 1, 12, 0)
+
+
+@pytest.fixture
+def db(session):
+    for device_id in (1, 2):
+        session.add(Device(
+            id=device_id, name=f"sw-{device_id}", ip_address=f"10.0.0.{device_id}",
+            username="admin", password="secret"
+        ))
+    for index in range(12):
+        session.add(Backup(
+            device_id=1 + index % 2, backup_type="running-config", status="success",
+            content="sysname sw\n" * 100, file_path=f"/tmp/backup_{index}.txt", file_size=1100,
+            created_at=NOW - timedelta(days=200 - index * 20)
+        ))
+    session.add(Strategy(name="daily", device_id=1, backup_type="running-config",
+                         strategy_type="recurring", frequency_type="day", frequency_value=1, created_at=NOW))
+    session.add(Strategy(name="orphan", backup_type="running-config", created_at=NOW + timedelta(minutes=1)))
+    session.commit()
+    return session
+
+
+@pytest.mark.backend
+def test_backup_list_matches_full_query(db):
+    full, full_cursor = BackupService.get_backups_page(db, limit=5)
+    items, cursor = BackupService.get_backup_list_page(db, limit=5)
+    assert [item["id"] for item in items] == [backup.id for backup in full]
+    assert cursor == full_cursor
+    assert not any(item["archived"] for item in items)
+
+    # 归档后普通列表只查询热表，备份历史仍包含归档的备份
+    ArchiveService.archive_old_backups(db, now=NOW, cutoff=NOW - timedelta(days=90))
+    hot, _ = BackupService.get_backups_page(db, device_id=2, limit=100)
+    items, _ = BackupService.get_backup_list_page(db, device_id=2, limit=100)
+    assert {item["device_id"] for item in items} == {2}
+    assert [item["id"] for item in items if not item["archived"]] == [backup.id for backup in hot]
+    assert any(item["archived"] for item in items)
+
+    item = BackupListItem.model_validate(items[0]).model_dump()
+    assert item == items[0]
+    assert "content" not in item
+    assert item["device"] == {"id": 2, "name": "sw-2", "ip_address": "10.0.0.2"}
+
+
+@pytest.mark.backend
+def test_strategy_list_omits_device_credentials(db):
+    items, cursor = StrategyService.get_strategy_list_page(db)
+    assert cursor is None
+    assert [item["name"] for item in items] == ["daily", "orphan"]
+    assert items[0]["device"] == {"id": 1, "name": "sw-1", "ip_address": "10.0.0.1"}
+    assert items[1]["device"] is None
+    BackupStrategyListItem.model_validate(items[0])
+
+
+@pytest.mark.backend
+def test_list_response_serializes_rows(db):
+    items, cursor = BackupService.get_backup_list_page(db, limit=3)
+    response = list_response(items, cursor)
+
+    assert response.headers[NEXT_CURSOR_HEADER] == cursor
+    body = json.loads(response.body)
+    assert [item["id"] for item in body] == [item["id"] for item in items]
+    assert datetime.fromisoformat(body[0]["created_at"]) == items[0]["created_at"]
+    assert "password" not in response.body.decode()
+    assert NEXT_CURSOR_HEADER not in list_response([]).headers
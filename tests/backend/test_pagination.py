@@ -0,0 +1,133 @@
+"""
+游标分页测试 - 分页遍历结果完整稳定，深页查询与首页使用相同的索引范围扫描
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from backend.models import Backup, Device
+from backend.pagination import InvalidCursorError, decode_cursor, encode_cursor
+from backend.services.backup_service import BackupService
+from backend.services.device_service import DeviceService
+
+
+@pytest.fixture
+def db(session):
+
+    start = datetime(2024, 1, 1)
+    for device_id in (1, 2):
+        session.add(Device(
+            id=device_id, name=f"sw-{device_id}", ip_address=f"10.0.0.{device_id}",
+            username="admin", password="secret", created_at=start
+        ))
+    for index in range(45):
+        # 每三条备份共享同一个创建时间，验证相同时间戳下按ID稳定排序
+        session.add(Backup(
+            device_id=1 + index % 2,
+            backup_type="running-config",
+            status="failed" if index % 5 == 0 else "success",
+            created_at=start + timedelta(minutes=index // 3)
+        ))
+    session.commit()
+    return session
+
+
+def _walk(fetch_page, limit):
+    """沿游标遍历所有分页"""
+    items, cursor, pages = [], None, 0
+    while True:
+        page, cursor = fetch_page(cursor=cursor, limit=limit)
+        items.extend(page)
+        pages += 1
+        if cursor is None:
+            return items, pages
+
+
+@pytest.mark.backend
+def test_cursor_walk_matches_full_ordering(db):
+    """游标遍历结果与一次性查询完全一致，且没有重复和遗漏"""
+    expected = db.query(Backup).order_by(Backup.created_at.desc(), Backup.id.desc()).all()
+
+    walked, pages = _walk(lambda **kwargs: BackupService.get_backups_page(db, **kwargs), limit=7)
+
+    assert [backup.id for backup in walked] == [backup.id for backup in expected]
+    assert pages == 7
+
+
+@pytest.mark.backend
+def test_cursor_walk_applies_filters(db):
+    """过滤条件在每一页都生效"""
+    walked, _ = _walk(
+        lambda **kwargs: BackupService.get_backups_page(db, device_id=1, status="success", **kwargs),
+        limit=4
+    )
+
+    assert walked
+    assert all(backup.device_id == 1 and backup.status == "success" for backup in walked)
+    assert len(walked) == db.query(Backup).filter(Backup.device_id == 1, Backup.status == "success").count()
+
+
+@pytest.mark.backend
+def test_devices_page_in_creation_order(db):
+    """设备列表按添加顺序分页，创建时间相同时按ID排序"""
+    first, cursor = DeviceService.get_devices_page(db, limit=1)
+    second, last_cursor = DeviceService.get_devices_page(db, cursor=cursor, limit=1)
+
+    assert [device.id for device in first + second] == [1, 2]
+    assert last_cursor is None
+
+
+@pytest.mark.backend
+@pytest.mark.performance
+def test_deep_page_uses_index_without_offset(db):
+    """带游标的查询通过索引定位起点，不使用OFFSET也不需要额外排序"""
+    _, cursor = BackupService.get_backups_page(db, limit=30)
+    statements = []
+
+    def capture(conn, cursor_, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        BackupService.get_backups_page(db, cursor=cursor, limit=30)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    statement, parameters = statements[-1]
+    # SQLite 方言总会渲染 OFFSET 占位符，确认其取值为0
+    assert parameters[-1] == 0
+    plan = " | ".join(
+        row[-1] for row in db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    )
+    assert "ix_backups_created_at" in plan
+    assert "USE TEMP B-TREE" not in plan
+
+
+@pytest.mark.backend
+def test_cursor_round_trip_and_invalid_cursor(db):
+    created_at = datetime(2024, 5, 1, 12, 30)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+    with pytest.raises(InvalidCursorError):
+        BackupService.get_backups_page(db, cursor="not-a-cursor")
+
+
+@pytest.mark.backend
+def test_rows_without_created_at_are_skipped(db):
+    """创建时间为空的记录不参与分页，不会生成无法编码的游标"""
+    db.query(Backup).filter(Backup.id.in_([1, 2, 3])).update({Backup.created_at: None}, synchronize_session=False)
+    db.query(Device).filter(Device.id == 1).update({Device.created_at: None}, synchronize_session=False)
+    db.commit()
+    expected = db.query(Backup).filter(Backup.created_at.isnot(None)).order_by(
+        Backup.created_at.desc(), Backup.id.desc()
+    ).all()
+
+    for limit in (7, 42):
+        walked, _ = _walk(lambda **kwargs: BackupService.get_backups_page(db, **kwargs), limit=limit)
+        assert [backup.id for backup in walked] == [backup.id for backup in expected]
+
+    devices, cursor = DeviceService.get_devices_page(db, limit=1)
+    assert [device.id for device in devices] == [2] and cursor is None
@@ -0,0 +1,102 @@
+"""
+查询索引测试 - 捕获服务层实际执行的SQL，用 EXPLAIN QUERY PLAN 确认热点查询走索引
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, inspect
+
+from backend.migrations import MIGRATIONS, run_migrations
+from backend.models import Device
+from backend.services.analysis_service import AnalysisService
+from backend.services.backup_service import BackupService
+from backend.services.strategy_service import StrategyService
+
+MIGRATED_INDEXES = {
+    'backups': {'ix_backups_created_at', 'ix_backups_device_created', 'ix_backups_device_status_created'},
+    'devices': {'ix_devices_created_at'},
+    'strategies': {'ix_strategies_active_next', 'ix_strategies_created_at'},
+    'analysis_records': {
+        'ix_analysis_records_created_at', 'ix_analysis_records_backup_id', 'ix_analysis_records_device_status_created'
+    },
+}
+
+
+@pytest.fixture
+def engine(engine):
+    """模拟升级前的数据库：表已存在但没有新增索引和字段"""
+    with engine.begin() as connection:
+        for names in MIGRATED_INDEXES.values():
+            for name in names:
+                connection.exec_driver_sql(f"DROP INDEX {name}")
+        connection.exec_driver_sql("ALTER TABLE analysis_records DROP COLUMN baseline_record_id")
+    return engine
+
+
+def _index_names(engine, table):
+    return {index['name'] for index in inspect(engine).get_indexes(table)}
+
+
+def _query_plan(engine, call):
+    """执行服务调用，返回其中每条 SELECT 的查询计划"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        call()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    plans = []
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            plans.append(" | ".join(row[-1] for row in rows))
+    return plans
+
+
+@pytest.mark.backend
+def test_migrations_create_indexes_on_existing_database(engine):
+    """已有数据库执行迁移后补齐索引，重复执行不会再做任何事"""
+    for table, names in MIGRATED_INDEXES.items():
+        assert not names & _index_names(engine, table)
+
+    assert 'baseline_record_id' not in {column['name'] for column in inspect(engine).get_columns('analysis_records')}
+
+    assert run_migrations(engine) == [version for version, _, _ in MIGRATIONS]
+    for table, names in MIGRATED_INDEXES.items():
+        assert names <= _index_names(engine, table)
+    assert 'baseline_record_id' in {column['name'] for column in inspect(engine).get_columns('analysis_records')}
+
+    assert run_migrations(engine) == []
+
+
+@pytest.mark.backend
+@pytest.mark.performance
+@pytest.mark.parametrize("name, call, expected_index", [
+    ("备份列表", lambda db: BackupService.get_backups(db), "ix_backups_created_at"),
+    ("设备备份列表", lambda db: BackupService.get_backups(db, device_id=1), "ix_backups_device_created"),
+    ("设备最近备份", lambda db: BackupService.update_device_last_backup_info(db, 1),
+     "ix_backups_device_status_created"),
+    ("批量设备最近备份", lambda db: BackupService.refresh_last_backup_info(db, [1]),
+     "ix_backups_device_status_created"),
+    ("到期策略", lambda db: StrategyService.get_due_strategies(db, datetime.now()), "ix_strategies_active_next"),
+    ("分析历史", lambda db: AnalysisService.get_analysis_history(db), "ix_analysis_records_created_at"),
+    ("增量分析基准", lambda db: AnalysisService._find_incremental_baseline(db, 1, ["security"]),
+     "ix_analysis_records_device_status_created"),
+])
+def test_hot_queries_use_indexes(engine, session, name, call, expected_index):
+    """热点查询的查询计划必须使用对应索引，而不是全表扫描后排序"""
+    run_migrations(engine)
+    session.add(Device(id=1, name="core-1", ip_address="10.0.0.1", username="admin", password="secret"))
+    session.commit()
+    plans = _query_plan(engine, lambda: call(session))
+
+    plan = next((plan for plan in plans if expected_index in plan), None)
+    assert plan is not None, f"{name} 未使用索引 {expected_index}: {plans}"
+    assert "USE TEMP B-TREE FOR ORDER BY" not in plan, f"{name} 需要额外排序: {plan}"
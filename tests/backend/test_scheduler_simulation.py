@@ -0,0 +1,34 @@
+"""
+调度仿真测试 - 使用虚拟时钟验证调度器在批量策略下的行为
+"""
+
+import pytest
+
+from backend.simulation import SchedulerSimulation
+
+
+@pytest.mark.backend
+@pytest.mark.performance
+def test_simulation_runs_every_due_strategy():
+    """仿真一天：每个策略至少执行一次，且调度延迟受检查间隔约束"""
+    simulation = SchedulerSimulation(strategies=30, days=1, workers=3, seed=7)
+    report = simulation.run()
+
+    assert report["jobs_enqueued"] >= 30
+    assert report["jobs_succeeded"] == report["jobs_enqueued"]
+    assert report["jobs_failed"] == 0
+    assert report["peak_concurrency"] <= 3
+    assert report["enqueue_lag_seconds"]["max"] <= 30
+    assert report["dispatch_lag_seconds"]["p50"] >= 0
+    assert report["db_queries"]["total"] > 0
+
+
+@pytest.mark.backend
+@pytest.mark.performance
+def test_simulation_failed_backups_are_retried():
+    """备份失败时策略不推进，下一次调度检查会重新提交"""
+    simulation = SchedulerSimulation(strategies=10, days=1, workers=2, seed=7, failure_rate=0.5)
+    report = simulation.run()
+
+    assert report["jobs_failed"] > 0
+    assert report["jobs_enqueued"] > report["jobs_succeeded"]
@@ -0,0 +1,58 @@
+"""
+SQLite 连接参数测试 - production 配置档的 PRAGMA 在每个新连接上生效
+"""
+
+import pytest
+from sqlalchemy import text
+
+from backend import database
+
+
+def _pragmas(connection):
+    return {
+        name: connection.execute(text(f"PRAGMA {name}")).scalar()
+        for name in ("journal_mode", "synchronous", "busy_timeout", "foreign_keys")
+    }
+
+
+@pytest.mark.backend
+def test_production_profile_applies_pragmas(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PROFILE", "production")
+    engine = database._create_engine(f"sqlite:///{tmp_path / 'pragmas.db'}")
+    try:
+        # 连接池中同时存在的每个连接都执行了 PRAGMA
+        with engine.connect() as first, engine.connect() as second:
+            for connection in (first, second):
+                assert _pragmas(connection) == {
+                    "journal_mode": "wal",
+                    "synchronous": 1,  # NORMAL
+                    "busy_timeout": database.SQLITE_PRAGMAS["busy_timeout"],
+                    "foreign_keys": 0,
+                }
+    finally:
+        engine.dispose()
+
+
+@pytest.mark.backend
+def test_pragmas_follow_configuration(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PROFILE", "production")
+    monkeypatch.setitem(database.SQLITE_PRAGMAS, "synchronous", "FULL")
+    monkeypatch.setitem(database.SQLITE_PRAGMAS, "busy_timeout", 2500)
+    monkeypatch.setitem(database.SQLITE_PRAGMAS, "foreign_keys", "ON")
+    engine = database._create_engine(f"sqlite:///{tmp_path / 'pragmas.db'}")
+    try:
+        with engine.connect() as connection:
+            assert _pragmas(connection) == {
+                "journal_mode": "wal", "synchronous": 2, "busy_timeout": 2500, "foreign_keys": 1
+            }
+    finally:
+        engine.dispose()
+
+    # default 配置档保持 SQLite 默认行为
+    monkeypatch.setattr(database, "DB_PROFILE", "default")
+    engine = database._create_engine(f"sqlite:///{tmp_path / 'default.db'}")
+    try:
+        with engine.connect() as connection:
+            assert _pragmas(connection)["journal_mode"] == "delete"
+    finally:
+        engine.dispose()